@@ -37,3 +37,6 @@ FRONTEND_REG_RESEND_PATH = '/register/resend'
 # Email Site Information
 SITE_ABUSE_MAILBOX = 'abuse@localhost'
 SITE_HELP_MAILBOX = 'help@localhost'
+
+# Run Background Jobs synchronously
+JOB_WORKERS = 0
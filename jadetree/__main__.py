@@ -8,8 +8,10 @@
 #: Jade Tree Application Entry Point for Flask Socket.io Server
 
 from .factory import create_app
+from .jobs import start_jobs
 from .socketio import socketio
 
 app = create_app()
+start_jobs(app)
 
 socketio.run(app)
@@ -9,6 +9,10 @@ from jadetree.api.common import JTApi
 from .account import blp as account_api
 from .auth import blp as auth_api
 from .budget import blp as budget_api
+from .export import blp as export_api
+from .importer import blp as import_api
+from .job import blp as job_api
+from .metrics import blp as metrics_api
 from .payee import blp as payee_api
 from .report import blp as report_api
 from .setup import blp as setup_api
@@ -34,6 +38,10 @@ def init_api(app):
     api_v1.register_blueprint(account_api, url_prefix='/api/v1')
     api_v1.register_blueprint(auth_api, url_prefix='/api/v1')
     api_v1.register_blueprint(budget_api, url_prefix='/api/v1')
+    api_v1.register_blueprint(export_api, url_prefix='/api/v1')
+    api_v1.register_blueprint(import_api, url_prefix='/api/v1')
+    api_v1.register_blueprint(job_api, url_prefix='/api/v1')
+    api_v1.register_blueprint(metrics_api, url_prefix='/api/v1')
     api_v1.register_blueprint(payee_api, url_prefix='/api/v1')
     api_v1.register_blueprint(report_api, url_prefix='/api/v1')
     api_v1.register_blueprint(setup_api, url_prefix='/api/v1')
@@ -14,7 +14,7 @@ from jadetree.service import account as account_service
 
 from ..payee.schema import PayeeSchema
 from ..transactions.schema import TransactionSchema
-from .schema import AccountCreateSchema, AccountSchema
+from .schema import AccountCreateSchema, AccountOrderSchema, AccountSchema
 
 #: Authentication Service Blueprint
 blp = JTApiBlueprint('account', __name__, description='Account Service')
@@ -76,6 +76,38 @@ class AccountsList(MethodView):
         return acct
 
 
+@blp.route('/accounts/order')
+class AccountsOrder(MethodView):
+    '''API Endpoint for `Account` Ordering'''
+    @auth.login_required
+    @blp.arguments(AccountOrderSchema)
+    @blp.response(AccountSchema(many=True))
+    def put(self, json_data):
+        '''Apply a complete ordering to the User Accounts'''
+        account_service.reorder_accounts(
+            db.session,
+            auth.current_user(),
+            json_data['accounts'],
+        )
+
+        accounts = account_service.get_user_account_list(
+            db.session,
+            auth.current_user(),
+        )
+
+        emit(
+            'update',
+            {
+                'class': 'Account',
+                'items': AccountSchema(many=True).dump(accounts),
+            },
+            namespace='/api/v1',
+            room=auth.current_user().uid_hash
+        )
+
+        return accounts
+
+
 @blp.route('/accounts/<int:account_id>')
 class AccountItem(MethodView):
     '''API Endpoint for `Account` Model'''
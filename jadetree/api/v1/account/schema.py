@@ -22,6 +22,11 @@ class AccountCreateSchema(Schema):
     currency = fields.Str()
 
 
+class AccountOrderSchema(Schema):
+    '''Schema to apply a complete Account ordering'''
+    accounts = fields.List(fields.Int(), required=True)
+
+
 class AccountSchema(Schema):
     '''
     '''
@@ -13,7 +13,7 @@ from jadetree.database import db
 from jadetree.service import budget as budget_service
 
 from .base import blp
-from .schema import CategoryGroupSchema, CategorySchema
+from .schema import CategoryGroupSchema, CategoryOrderSchema, CategorySchema
 
 
 @blp.route('/budgets/<int:budget_id>/categories')
@@ -23,12 +23,11 @@ class BudgetCategoryList(MethodView):
     @blp.response(CategoryGroupSchema(many=True))
     def get(self, budget_id):
         '''Return Category Tree for the User Budget'''
-        b = budget_service._load_budget(
+        return budget_service.load_category_tree(
             db.session,
             auth.current_user(),
             budget_id,
-        )
-        return [cg for cg in b.categories if cg.parent is None]
+        ).groups
 
     @auth.login_required
     @blp.arguments(CategorySchema)
@@ -65,6 +64,39 @@ class BudgetCategoryList(MethodView):
         return ret
 
 
+@blp.route('/budgets/<int:budget_id>/categories/order')
+class BudgetCategoryOrder(MethodView):
+    '''API Endpoint for Budget Category Ordering'''
+    @auth.login_required
+    @blp.arguments(CategoryOrderSchema)
+    @blp.response(CategoryGroupSchema(many=True))
+    def put(self, json_data, budget_id):
+        '''Apply a complete Category ordering to the Budget'''
+        changed = budget_service.reorder_categories(
+            db.session,
+            auth.current_user(),
+            budget_id,
+            json_data['groups'],
+        )
+
+        if changed:
+            emit(
+                'update',
+                {
+                    'class': 'Category',
+                    'items': CategorySchema(many=True).dump(changed),
+                },
+                namespace='/api/v1',
+                room=auth.current_user().uid_hash
+            )
+
+        return budget_service.load_category_tree(
+            db.session,
+            auth.current_user(),
+            budget_id,
+        ).groups
+
+
 @blp.route('/budgets/<int:budget_id>/categories/<int:category_id>')
 class BudgetCategoryItem(MethodView):
     '''API Endpoint for Budget Category Tree'''
@@ -38,6 +38,17 @@ class CategoryGroupSchema(CategoryBaseSchema):
     children = fields.List(fields.Nested(CategorySchema))
 
 
+class CategoryOrderGroupSchema(Schema):
+    '''Schema for a Category Group and its Categories in display order'''
+    id = fields.Int(required=True)
+    children = fields.List(fields.Int())
+
+
+class CategoryOrderSchema(Schema):
+    '''Schema to apply a complete Category ordering to a Budget'''
+    groups = fields.List(fields.Nested(CategoryOrderGroupSchema), required=True)
+
+
 class OverspentCategorySchema(Schema):
     '''
     '''
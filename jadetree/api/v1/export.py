@@ -6,15 +6,42 @@
 # =============================================================================
 
 from flask.views import MethodView
+from flask_socketio import emit
 
-from jadetree.api.base import JTApiBlueprint
+from jadetree.api.common import JTApiBlueprint, auth
+from jadetree.database import db
+from jadetree.service import job as job_service
 
-#: Authentication Service Blueprint
+from .job.schema import JobSchema
+
+#: Export Service Blueprint
 blp = JTApiBlueprint('export', __name__, description='Export Service')
 
 
 @blp.route('/export')
-class VersionView(MethodView):
+class ExportView(MethodView):
     '''Export Data API Call'''
-    def get(self):
-        return 'Test'
+    @auth.login_required
+    @blp.response(JobSchema, code=202)
+    def post(self):
+        '''
+        Submit a background Job exporting the current user's data as a JSON
+        document, which is downloaded from the Job artifact once complete
+        '''
+        job = job_service.create_job(
+            db.session,
+            auth.current_user(),
+            'export_json',
+        )
+
+        emit(
+            'create',
+            {
+                'class': 'Job',
+                'items': [JobSchema().dump(job)],
+            },
+            namespace='/',
+            room=auth.current_user().uid_hash
+        )
+
+        return job
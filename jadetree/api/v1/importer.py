@@ -0,0 +1,91 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from flask.views import MethodView
+from flask_smorest.fields import Upload
+from flask_socketio import emit
+from marshmallow import Schema, fields, validate
+
+from jadetree.api.common import JTApiBlueprint, auth
+from jadetree.database import db
+from jadetree.exc import DomainError
+from jadetree.service.importer import IMPORT_FORMATS, submit_import
+from jadetree.service.importer.delimited import CSV_FIELDS
+
+from .job.schema import JobSchema
+
+#: Import Service Blueprint
+blp = JTApiBlueprint('import', __name__, description='Import Service')
+
+
+class ImportFileSchema(Schema):
+    '''Schema for the uploaded QIF or CSV File'''
+    file = Upload(required=True)
+
+
+class ImportOptionsSchema(Schema):
+    '''
+    Schema for the Import Options. The format defaults to the file name
+    extension, and the ``<field>_column`` options give the CSV header names
+    for the record fields when they differ from the field names.
+    '''
+    format = fields.Str(validate=validate.OneOf(IMPORT_FORMATS))
+    date_format = fields.Str()
+    delimiter = fields.Str(validate=validate.Length(equal=1))
+
+    date_column = fields.Str()
+    amount_column = fields.Str()
+    payee_column = fields.Str()
+    memo_column = fields.Str()
+    category_column = fields.Str()
+    check_column = fields.Str()
+    cleared_column = fields.Str()
+
+
+@blp.route('/accounts/<int:account_id>/import')
+class ImportView(MethodView):
+    '''Import Transactions API Call'''
+    @auth.login_required
+    @blp.arguments(ImportOptionsSchema, location='form')
+    @blp.arguments(ImportFileSchema, location='files')
+    @blp.response(JobSchema, code=202)
+    def post(self, form_data, files, account_id):
+        '''
+        Submit a background Job importing Transactions from a QIF or CSV file
+        into an Account, skipping Transactions already in the Account
+        '''
+        options = {k: form_data[k] for k in ('date_format', 'delimiter') if k in form_data}
+        columns = {f: form_data[f'{f}_column'] for f in CSV_FIELDS if f'{f}_column' in form_data}
+        if columns:
+            options['columns'] = columns
+
+        upload = files['file']
+        try:
+            job = submit_import(
+                db.session,
+                auth.current_user(),
+                account_id,
+                upload.stream,
+                upload.filename or 'import',
+                format=form_data.get('format'),
+                **options,
+            )
+
+        except ValueError as e:
+            raise DomainError(str(e), status_code=400)
+
+        emit(
+            'create',
+            {
+                'class': 'Job',
+                'items': [JobSchema().dump(job)],
+            },
+            namespace='/',
+            room=auth.current_user().uid_hash
+        )
+
+        return job
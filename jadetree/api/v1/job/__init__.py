@@ -0,0 +1,10 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from .base import blp
+
+__all__ = ('blp', )
@@ -0,0 +1,124 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from flask import send_file
+from flask.views import MethodView
+from flask_socketio import emit
+
+from jadetree.api.common import JTApiBlueprint, auth
+from jadetree.database import db
+from jadetree.jobs import runner
+from jadetree.service import job as job_service
+from jadetree.socketio import socketio
+
+from .schema import JobSchema
+
+#: Background Job Service Blueprint
+blp = JTApiBlueprint('job', __name__, description='Background Job Service')
+
+
+def emit_job_update(job):
+    '''Send Job status and progress updates to the user's room'''
+    socketio.emit(
+        'update',
+        {
+            'class': 'Job',
+            'items': [JobSchema().dump(job)],
+        },
+        namespace='/',
+        room=job.user.uid_hash
+    )
+
+
+runner.add_listener(emit_job_update)
+
+
+@blp.route('/jobs')
+class JobList(MethodView):
+    '''API Endpoint for `Job` Model'''
+    @auth.login_required
+    @blp.response(JobSchema(many=True))
+    def get(self):
+        '''Return list of Jobs'''
+        return job_service.get_job_list(db.session, auth.current_user())
+
+    @auth.login_required
+    @blp.arguments(JobSchema)
+    @blp.response(JobSchema)
+    def post(self, json_data):
+        '''Submit a new background Job'''
+        job = job_service.create_job(
+            db.session,
+            auth.current_user(),
+            **json_data,
+        )
+
+        emit(
+            'create',
+            {
+                'class': 'Job',
+                'items': [JobSchema().dump(job)],
+            },
+            namespace='/',
+            room=auth.current_user().uid_hash
+        )
+
+        return job
+
+
+@blp.route('/jobs/<int:job_id>')
+class JobItem(MethodView):
+    '''API Endpoint for `Job` Model'''
+    @auth.login_required
+    @blp.response(JobSchema)
+    def get(self, job_id):
+        '''Return a Job'''
+        return job_service._load_job(
+            db.session,
+            auth.current_user(),
+            job_id
+        )
+
+    @auth.login_required
+    @blp.response(code=204)
+    def delete(self, job_id):
+        '''Delete a finished Job and its artifact'''
+        job_service.delete_job(
+            db.session,
+            auth.current_user(),
+            job_id
+        )
+
+        emit(
+            'delete',
+            {
+                'class': 'Job',
+                'items': [JobSchema().dump({'id': job_id})],
+            },
+            namespace='/',
+            room=auth.current_user().uid_hash
+        )
+
+
+@blp.route('/jobs/<int:job_id>/artifact')
+class JobArtifact(MethodView):
+    '''API Endpoint for downloading a `Job` artifact'''
+    @auth.login_required
+    def get(self, job_id):
+        '''Download the file produced by a completed Job'''
+        job = job_service.get_job_artifact(
+            db.session,
+            auth.current_user(),
+            job_id
+        )
+
+        return send_file(
+            job.artifact_path,
+            mimetype=job.artifact_type,
+            as_attachment=True,
+            attachment_filename=job.artifact_name,
+        )
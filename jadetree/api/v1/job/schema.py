@@ -0,0 +1,36 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from marshmallow import Schema, fields
+from marshmallow_enum import EnumField
+
+from jadetree.domain.types import JobStatus
+from jadetree.jobs import runner
+
+
+class JobSchema(Schema):
+    '''
+    Schema for a `Job` object
+    '''
+    id = fields.Int(dump_only=True)
+    kind = fields.Str(required=True)
+    params = fields.Dict(missing=dict)
+
+    status = EnumField(JobStatus, by_value=True, dump_only=True)
+    progress = fields.Method('get_progress', dump_only=True)
+    message = fields.Str(dump_only=True, allow_none=True)
+
+    artifact_name = fields.Str(dump_only=True, allow_none=True)
+    artifact_type = fields.Str(dump_only=True, allow_none=True)
+
+    created_at = fields.DateTime(dump_only=True, allow_none=True)
+    started_at = fields.DateTime(dump_only=True, allow_none=True)
+    finished_at = fields.DateTime(dump_only=True, allow_none=True)
+
+    def get_progress(self, obj):
+        '''Return the progress of a running Job held by the Job Runner'''
+        return runner.live_progress(obj)
@@ -0,0 +1,51 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from flask.views import MethodView
+from marshmallow import Schema, fields
+
+from jadetree.api.common import JTApiBlueprint, auth
+from jadetree.database import pool_monitor
+from jadetree.exc import Unauthorized
+
+#: Server Metrics Blueprint
+blp = JTApiBlueprint('metrics', __name__, description='Server Metrics')
+
+
+class PoolMetricsSchema(Schema):
+    '''
+    Schema for the Database Connection Pool Metrics of the serving process.
+    Wait times are in milliseconds.
+    '''
+    pool_class = fields.Str(allow_none=True)
+    pool_size = fields.Int()
+    checked_in = fields.Int()
+    overflow = fields.Int()
+
+    checkouts = fields.Int()
+    checkout_wait_avg = fields.Float()
+    checkout_wait_max = fields.Float()
+    checkout_timeouts = fields.Int()
+
+    connects = fields.Int()
+    overflows = fields.Int()
+    invalidated = fields.Int()
+    in_use = fields.Int()
+    in_use_max = fields.Int()
+
+
+@blp.route('/metrics/database')
+class DatabaseMetricsView(MethodView):
+    '''Database Metrics API Call'''
+    @auth.login_required
+    @blp.response(PoolMetricsSchema)
+    def get(self):
+        '''Return the Database Connection Pool Metrics (administrators only)'''
+        if not auth.current_user().admin:
+            raise Unauthorized('Database metrics are only available to administrators')
+
+        return pool_monitor.stats()
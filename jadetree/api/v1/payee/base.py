@@ -10,10 +10,15 @@ from flask_socketio import emit
 
 from jadetree.api.common import JTApiBlueprint, auth
 from jadetree.database import db
-from jadetree.domain.types import TransactionType
 from jadetree.service import payee as payee_service
 
-from .schema import PayeeDetailSchema, PayeeSchema
+from .schema import (
+    PayeeDetailSchema,
+    PayeeMatchSchema,
+    PayeeSchema,
+    PayeeSearchArgsSchema,
+    PayeeUpdateSchema,
+)
 
 #: Authentication Service Blueprint
 blp = JTApiBlueprint('payee', __name__, description='Payee Service')
@@ -58,31 +63,62 @@ class PayeeItem(MethodView):
     @auth.login_required
     @blp.response(PayeeDetailSchema)
     def get(self, payee_id):
-        '''Return list of Payees'''
-        p = payee_service._load_payee(
+        '''Return a Payee with its autofill information'''
+        return payee_service._load_payee(
             db.session,
             auth.current_user(),
             payee_id
         )
 
-        # Get the most recent transaction line for the Payee
-        p.last_category_id = None
-        p.last_account_id = None
-        p.last_amount = None
-        p.last_memo = None
-        p.last_type = None
-
-        tl = payee_service.get_payee_last_txn(db.session, p.id)
-        if tl is not None:
-            if tl.type != TransactionType.Transfer:
-                p.last_category_id = tl.category_id
-                p.last_account_id = None
-            else:
-                p.last_category_id = None
-                p.last_account_id = tl.opposing_id
-
-            p.last_amount = tl.amount
-            p.last_memo = tl.memo
-            p.last_type = tl.type
-
-        return p
+    @auth.login_required
+    @blp.arguments(PayeeUpdateSchema)
+    @blp.response(PayeeSchema)
+    def put(self, json_data, payee_id):
+        '''Update a Payee'''
+        payee = payee_service.update_payee(
+            db.session,
+            auth.current_user(),
+            payee_id,
+            **json_data,
+        )
+
+        emit(
+            'update',
+            {
+                'class': 'Payee',
+                'items': [PayeeSchema().dump(payee)],
+            },
+            namespace='/api/v1',
+            room=auth.current_user().uid_hash
+        )
+
+        return payee
+
+
+@blp.route('/payees/search')
+class PayeeSearch(MethodView):
+    '''API Endpoint for `Payee` Autocompletion'''
+    @auth.login_required
+    @blp.arguments(PayeeSearchArgsSchema, location='query')
+    @blp.response(PayeeMatchSchema(many=True))
+    def get(self, args):
+        '''Return the most used Payees matching a name prefix'''
+        return payee_service.search_payees(
+            db.session,
+            auth.current_user(),
+            args['q'],
+            args['limit'],
+        )
+
+
+@blp.route('/payees/autofill')
+class PayeeAutofill(MethodView):
+    '''API Endpoint for `Payee` Autofill Statistics'''
+    @auth.login_required
+    @blp.response(PayeeDetailSchema(many=True))
+    def get(self):
+        '''Return autofill information for all Payees'''
+        return payee_service.get_payee_autofill(
+            db.session,
+            auth.current_user(),
+        )
@@ -5,7 +5,7 @@
 #
 # =============================================================================
 
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 from marshmallow_enum import EnumField
 
 from jadetree.domain.types import PayeeRole, TransactionType
@@ -36,3 +36,31 @@ class PayeeDetailSchema(PayeeSchema):
     last_amount = fields.Decimal(places=4, as_string=True)
     last_memo = fields.Str()
     last_type = EnumField(TransactionType, by_value=True)
+    last_date = fields.Date()
+    use_count = fields.Int()
+
+
+class PayeeUpdateSchema(Schema):
+    '''
+    Schema for updating a `Payee` object
+    '''
+    name = fields.Str()
+    hidden = fields.Bool()
+    amount = fields.Decimal(places=4, as_string=True, allow_none=True)
+    memo = fields.Str(allow_none=True)
+
+
+class PayeeSearchArgsSchema(Schema):
+    '''Schema for Payee autocomplete queries'''
+    q = fields.Str(missing='')
+    limit = fields.Int(missing=20, validate=validate.Range(min=1, max=100))
+
+
+class PayeeMatchSchema(Schema):
+    '''
+    Schema for a `Payee` autocomplete match
+    '''
+    id = fields.Int()
+    name = fields.Str()
+    role = EnumField(PayeeRole, by_value=True)
+    use_count = fields.Int()
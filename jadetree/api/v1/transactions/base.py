@@ -10,10 +10,13 @@ from flask_socketio import emit
 
 from jadetree.api.common import JTApiBlueprint, auth
 from jadetree.database import db
+from jadetree.database.loading import txn_graph_options, txn_lines_options
 from jadetree.domain.types import AccountRole
 from jadetree.service import ledger as ledger_service
 
 from .schema import (
+    BulkClearanceSchema,
+    LineClearanceSchema,
     TransactionClearanceSchema,
     TransactionSchema,
     TransactionSummarySchema,
@@ -28,9 +31,18 @@ class TransactionList(MethodView):
     '''API Endpoint for All User Transactions'''
     @auth.login_required
     @blp.response(TransactionSummarySchema(many=True))
-    def get(self):
-        '''Return list of all Transactions'''
-        return auth.current_user().transactions
+    @blp.paginate(page_size=100, max_page_size=1000)
+    def get(self, pagination_parameters):
+        '''Return a page of Transactions, newest first'''
+        txns, total = ledger_service.load_transactions(
+            db.session,
+            auth.current_user(),
+            page=pagination_parameters.page,
+            per_page=pagination_parameters.page_size,
+        )
+
+        pagination_parameters.item_count = total
+        return txns
 
     @auth.login_required
     @blp.arguments(TransactionSchema, inject_context=True)
@@ -65,7 +77,8 @@ class TransactionDetail(MethodView):
         return ledger_service._load_transaction(
             db.session,
             auth.current_user(),
-            transaction_id
+            transaction_id,
+            txn_graph_options(),
         )
 
     @auth.login_required
@@ -73,7 +86,7 @@ class TransactionDetail(MethodView):
     @blp.response(TransactionSchema)
     def put(self, json_data, transaction_id):
         '''Update a Transaction'''
-        txn = ledger_service.update_transaction(
+        txn, changes = ledger_service.update_transaction_with_changes(
             db.session,
             auth.current_user(),
             transaction_id,
@@ -85,6 +98,7 @@ class TransactionDetail(MethodView):
             {
                 'class': 'Transaction',
                 'items': [TransactionSchema().dump(txn)],
+                'changes': changes,
             },
             namespace='/',
             room=auth.current_user().uid_hash
@@ -95,7 +109,7 @@ class TransactionDetail(MethodView):
     @auth.login_required
     @blp.response(code=204)
     def delete(self, transaction_id):
-        txn = ledger_service._load_transaction(
+        ledger_service.delete_transaction(
             db.session,
             auth.current_user(),
             transaction_id
@@ -105,15 +119,12 @@ class TransactionDetail(MethodView):
             'delete',
             {
                 'class': 'Transaction',
-                'items': [TransactionSchema().dump({'id': txn.id})],
+                'items': [TransactionSchema().dump({'id': transaction_id})],
             },
             namespace='/',
             room=auth.current_user().uid_hash
         )
 
-        db.session.delete(txn)
-        db.session.commit()
-
 
 @blp.route('/transactions/<int:transaction_id>/clear')
 class TransactionClearing(MethodView):
@@ -124,7 +135,8 @@ class TransactionClearing(MethodView):
         txn = ledger_service._load_transaction(
             db.session,
             auth.current_user(),
-            transaction_id
+            transaction_id,
+            txn_lines_options(),
         )
 
         return [ln for ln in txn.lines if ln.account.role == AccountRole.Personal]
@@ -152,3 +164,31 @@ class TransactionClearing(MethodView):
         )
 
         return [ln for ln in txn.lines if ln.account.role == AccountRole.Personal]
+
+
+@blp.route('/transactions/clear')
+class TransactionBulkClearing(MethodView):
+    '''API Endpoint for Clearing many Transaction Lines'''
+    @auth.login_required
+    @blp.arguments(BulkClearanceSchema)
+    @blp.response(LineClearanceSchema(many=True))
+    def put(self, json_data):
+        '''Clear or Un-Clear many Transaction Lines at once'''
+        lines = ledger_service.clear_lines(
+            db.session,
+            auth.current_user(),
+            json_data['lines'],
+            json_data['cleared'],
+        )
+
+        emit(
+            'clear',
+            {
+                'class': 'TransactionLine',
+                'items': LineClearanceSchema(many=True).dump(lines),
+            },
+            namespace='/',
+            room=auth.current_user().uid_hash
+        )
+
+        return lines
@@ -13,20 +13,28 @@ from jadetree.database import db
 from jadetree.service import ledger as ledger_service
 
 from .base import blp
-from .schema import LedgerEntrySchema, TransactionSchema
+from .schema import (
+    LedgerEntrySchema,
+    LedgerQuerySchema,
+    LedgerSearchArgsSchema,
+    LedgerSearchResultSchema,
+    TransactionSchema,
+)
 
 
 @blp.route('/ledger')
 class LedgerList(MethodView):
     '''API Endpoint for All User Transactions'''
     @auth.login_required
+    @blp.arguments(LedgerQuerySchema, location='query')
     @blp.response(LedgerEntrySchema(many=True))
-    def get(self):
-        '''Return list of all Transactions'''
+    def get(self, args):
+        '''Return list of all Transactions matching the filters'''
         return ledger_service.load_all_lines(
             db.session,
             auth.current_user(),
             reverse=True,
+            **args,
         )
 
     @auth.login_required
@@ -57,14 +65,16 @@ class LedgerList(MethodView):
 class AccountLedgerList(MethodView):
     '''API Endpoint for Account Transactions'''
     @auth.login_required
+    @blp.arguments(LedgerQuerySchema, location='query')
     @blp.response(LedgerEntrySchema(many=True))
-    def get(self, account_id):
-        '''Return list of all Transactions'''
+    def get(self, args, account_id):
+        '''Return list of Account Transactions matching the filters'''
         return ledger_service.load_account_lines(
             db.session,
             auth.current_user(),
             account_id,
             reverse=True,
+            **args,
         )
 
     @auth.login_required
@@ -90,3 +100,19 @@ class AccountLedgerList(MethodView):
         )
 
         return txn
+
+
+@blp.route('/ledger/search')
+class LedgerSearch(MethodView):
+    '''API Endpoint for Transaction Search'''
+    @auth.login_required
+    @blp.arguments(LedgerSearchArgsSchema, location='query')
+    @blp.response(LedgerSearchResultSchema)
+    def get(self, args):
+        '''Return a page of Transactions matching a search query'''
+        return ledger_service.search_transactions(
+            db.session,
+            auth.current_user(),
+            args.pop('q', None),
+            **args,
+        )
@@ -11,6 +11,7 @@ from marshmallow import (
     fields,
     pre_dump,
     validates,
+    validate,
     validates_schema,
 )
 from marshmallow_enum import EnumField
@@ -43,6 +44,29 @@ class TransactionClearanceSchema(Schema):
         return data
 
 
+class LineClearanceSchema(Schema):
+    '''Schema for the Clearance Status of a single Line in a bulk update'''
+    line_id = fields.Int()
+    transaction_id = fields.Int()
+    account_id = fields.Int()
+
+    cleared = fields.Bool(dump_only=True)
+    cleared_at = fields.Date(dump_only=True)
+
+    @validates_schema
+    def validate_schema(self, data, **kwargs):
+        if 'line_id' not in data and ('transaction_id' not in data or 'account_id' not in data):
+            raise ValidationError({
+                'line_id': 'Either "line_id" or "transaction_id" and "account_id" are required',
+            })
+
+
+class BulkClearanceSchema(Schema):
+    '''Schema to Clear or Un-Clear many Transaction Lines at once'''
+    lines = fields.List(fields.Nested(LineClearanceSchema), required=True)
+    cleared = fields.Bool(required=True)
+
+
 class TransactionLineSchema(Schema):
     '''Schema for a Transaction Line'''
     id = fields.Int()
@@ -143,10 +167,45 @@ class LedgerEntrySchema(Schema):
 
 
 class LedgerQuerySchema(Schema):
-    '''Schema for querying Ledger Entries'''
-    after_id = fields.Int()
-    after_date = fields.Date()
+    '''Schema for filtering Ledger Entries'''
+    start_date = fields.Date()
+    end_date = fields.Date()
+    cleared = fields.Bool()
+    reconciled = fields.Bool()
+    payee_id = fields.Int()
     category_id = fields.Int()
+    min_amount = fields.Decimal(places=4, as_string=True)
+    max_amount = fields.Decimal(places=4, as_string=True)
+
+    @validates_schema
+    def validate_ranges(self, data, **kwargs):
+        if 'start_date' in data and 'end_date' in data and data['start_date'] > data['end_date']:
+            raise ValidationError({'end_date': 'End date must not be before start date'})
+        if 'min_amount' in data and 'max_amount' in data and data['min_amount'] > data['max_amount']:
+            raise ValidationError({'max_amount': 'Maximum amount must not be less than minimum amount'})
+
+
+class LedgerSearchArgsSchema(Schema):
+    '''Schema for searching Ledger Entries'''
+    q = fields.Str()
+    account_id = fields.Int()
+    start_date = fields.Date()
+    end_date = fields.Date()
+    min_amount = fields.Decimal(places=4, as_string=True)
+    max_amount = fields.Decimal(places=4, as_string=True)
+
+    page = fields.Int(missing=1, validate=validate.Range(min=1))
+    per_page = fields.Int(missing=50, validate=validate.Range(min=1, max=500))
+
+
+class LedgerSearchResultSchema(Schema):
+    '''Schema for a page of Ledger Entry search results'''
+    query = fields.Str(allow_none=True)
+    page = fields.Int()
+    per_page = fields.Int()
+    total = fields.Int()
+
+    items = fields.List(fields.Nested(LedgerEntrySchema))
 
 
 class ReconcileSchema(Schema):
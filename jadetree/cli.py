@@ -27,6 +27,7 @@ def init_shell():       # pragma: no cover
         Budget,
         BudgetEntry,
         Category,
+        Job,
         Payee,
         Transaction,
         TransactionEntry,
@@ -38,14 +39,18 @@ def init_shell():       # pragma: no cover
         AccountRole,
         AccountSubtype,
         AccountType,
+        JobStatus,
         PayeeRole,
         TransactionType,
     )
     from jadetree.service import (
         account as account_service,
         auth as auth_service,
+        backup as backup_service,
         budget as budget_service,
         export as export_service,
+        importer as import_service,
+        job as job_service,
         ledger as ledger_service,
         payee as payee_service,
         user as user_service,
@@ -64,6 +69,7 @@ def init_shell():       # pragma: no cover
         'Budget': Budget,
         'BudgetEntry': BudgetEntry,
         'Category': Category,
+        'Job': Job,
         'Payee': Payee,
         'Transaction': Transaction,
         'TransactionEntry': TransactionEntry,
@@ -74,13 +80,17 @@ def init_shell():       # pragma: no cover
         'AccountRole': AccountRole,
         'AccountType': AccountType,
         'AccountSubtype': AccountSubtype,
+        'JobStatus': JobStatus,
         'PayeeRole': PayeeRole,
         'TransactionType': TransactionType,
 
         'account_service': account_service,
         'auth_service': auth_service,
+        'backup_service': backup_service,
         'budget_service': budget_service,
         'export_service': export_service,
+        'import_service': import_service,
+        'job_service': job_service,
         'ledger_service': ledger_service,
         'payee_service': payee_service,
         'user_service': user_service,
@@ -104,6 +114,81 @@ def export_accounts(user_id):
                 sys.stdout.write(line + '\n')
 
 
+#: Application used by QIF export worker processes
+_export_app = None
+
+
+def _init_export_worker(app_config, app_name):     # pragma: no cover
+    '''Create the Application in a QIF export worker process'''
+    from jadetree.factory import create_app
+
+    global _export_app
+    _export_app = create_app(dict(app_config, JOB_WORKERS=0), app_name)
+
+
+def _export_account_file(task, app=None):
+    '''Export a single Account to a QIF file in its own session'''
+    from jadetree.database import db
+    from jadetree.domain.models import Account
+    from jadetree.service import export
+
+    account_id, path = task
+    with (app or _export_app).app_context():
+        acct = db.session.query(Account).get(account_id)
+        with open(path, 'w') as f:
+            for line in export.export_account_qif(db.session, acct):
+                f.write(line + '\n')
+
+    return path
+
+
+@export_cli.command('qif')
+@click.argument('output_dir', type=click.Path(file_okay=False))
+@click.option('--user', 'user_id', type=int, help='Only export Accounts of this user')
+@click.option('--jobs', type=click.IntRange(min=1), default=None, help='Number of export worker processes')
+def export_qif(output_dir, user_id, jobs):
+    '''Export the Personal Accounts of all users to QIF files'''
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    import os
+
+    from flask import current_app
+
+    from jadetree.database import db
+    from jadetree.domain.models import Account
+    from jadetree.domain.types import AccountRole
+
+    q = db.session.query(Account.id, Account.user_id).filter(Account.role == AccountRole.Personal)
+    if user_id is not None:
+        q = q.filter(Account.user_id == user_id)
+
+    tasks = []
+    for account_id, account_user_id in q.order_by(Account.user_id, Account.id):
+        user_dir = os.path.join(output_dir, f'user-{account_user_id}')
+        os.makedirs(user_dir, exist_ok=True)
+        tasks.append((account_id, os.path.join(user_dir, f'account-{account_id}.qif')))
+
+    db.session.remove()
+
+    app = current_app._get_current_object()
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        for task in tasks:
+            click.echo(_export_account_file(task, app))
+        return
+
+    # Accounts are streamed to their files by worker processes, each with
+    # its own Application and database connection
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_export_worker,
+        initargs=(dict(app.config), app.name),
+    ) as pool:
+        for path in pool.map(_export_account_file, tasks):
+            click.echo(path)
+
+
 @export_cli.command('budgets')
 @click.argument('user_id')
 def export_budgets(user_id):
@@ -128,10 +213,123 @@ def export_payees(user_id):
         sys.stdout.write(line + '\n')
 
 
+@export_cli.command('json')
+@click.argument('user_id')
+@click.argument('output', type=click.File('w'), default='-')
+def export_json(user_id, output):
+    from jadetree.database import db
+    from jadetree.domain.models import User
+    from jadetree.service import export
+
+    user = db.session.query(User).get(user_id)
+    export.write_data_json(db.session, user, output)
+    output.write('\n')
+
+
+backup_cli = AppGroup('backup')
+
+
+@backup_cli.command('dump')
+@click.argument('user_id')
+@click.argument('output', type=click.File('wb'), default='-')
+def backup_dump(user_id, output):
+    from jadetree.database import db
+    from jadetree.domain.models import User
+    from jadetree.service import backup
+
+    user = db.session.query(User).get(user_id)
+    backup.write_backup(db.session, user, output)
+
+
+@backup_cli.command('restore')
+@click.argument('input', type=click.File('rb'))
+@click.option('--email', help='Email address for the restored user')
+def backup_restore(input, email):
+    from jadetree.database import db
+    from jadetree.service import backup
+
+    user = backup.restore_backup(db.session, input, email=email)
+    click.echo(f'Restored user {user.id} ({user.email})')
+
+
+import_cli = AppGroup('import')
+
+
+@import_cli.command('file')
+@click.argument('user_id')
+@click.argument('account_id', type=int)
+@click.argument('input', type=click.File('rb'))
+@click.option('--format', type=click.Choice(['csv', 'qif']), help='File format (default from the file extension)')
+@click.option('--date-format', help='strptime format of the transaction dates')
+@click.option('--delimiter', help='CSV field delimiter')
+@click.option('--column', multiple=True, metavar='FIELD=HEADER', help='CSV header name for a record field')
+def import_file(user_id, account_id, input, format, date_format, delimiter, column):
+    import os
+
+    from jadetree.database import db
+    from jadetree.domain.models import User
+    from jadetree.exc import Error
+    from jadetree.service import importer
+
+    if format is None:
+        format = os.path.splitext(input.name)[1][1:].lower()
+
+    options = {}
+    if date_format:
+        options['date_format'] = date_format
+    if delimiter:
+        options['delimiter'] = delimiter
+    if column:
+        options['columns'] = dict(c.split('=', 1) for c in column)
+
+    user = db.session.query(User).get(user_id)
+    try:
+        result = importer.import_file(db.session, user, account_id, input, format=format, **options)
+    except (Error, ValueError) as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+
+    click.echo(
+        f'Imported {result.imported} transactions '
+        f'({result.duplicates} duplicates skipped, {result.uncategorized} uncategorized, '
+        f'{result.payees} new payees)'
+    )
+
+
+search_cli = AppGroup('search')
+
+
+@search_cli.command('reindex')
+@click.argument('user_id', required=False)
+def search_reindex(user_id):
+    from jadetree.database import db
+    from jadetree.database.search import rebuild_search_index
+
+    rebuild_search_index(db.session, user_id)
+    db.session.commit()
+
+
+views_cli = AppGroup('views')
+
+
+@views_cli.command('refresh')
+@click.argument('names', nargs=-1)
+def views_refresh(names):
+    from jadetree.database import db, materialized_views
+
+    refreshed = materialized_views.refresh(db.session, list(names) or None)
+    db.session.commit()
+    click.echo('Refreshed {}'.format(', '.join(refreshed)))
+
+
 def init_cli(app):
     '''Register the CLI Commands with the Application'''
     app.shell_context_processor(init_shell)
+    app.cli.add_command(backup_cli)
     app.cli.add_command(export_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(views_cli)
 
     # Notify Initialization Complete
     app.logger.debug('CLI Initialized')
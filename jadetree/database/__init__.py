@@ -13,9 +13,23 @@ from sqlalchemy import inspect
 from jadetree.exc import Error
 
 from .globals import db, migrate
+from .pool import pool_monitor, pool_options
+from .profiler import init_profiler, query_profiler
+from .routing import init_replicas, replica_read, replica_reads
+from .sqlite import init_sqlite
 from .util import make_uri
+from .views import materialized_views
 
-__all__ = ('db', 'migrate', 'init_db')
+__all__ = (
+    'db',
+    'migrate',
+    'init_db',
+    'materialized_views',
+    'pool_monitor',
+    'query_profiler',
+    'replica_read',
+    'replica_reads',
+)
 
 
 def check_database():
@@ -36,9 +50,19 @@ def init_db(app):
         else:
             app.config['SQLALCHEMY_DATABASE_URI'] = make_uri(app)
 
+    # Load Connection Pool Settings (explicit SQLalchemy engine options take
+    # priority), timing checkouts unless a pool class is given
+    poolclass, options = pool_options(app.config, app.config['SQLALCHEMY_DATABASE_URI'])
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.setdefault('poolclass', pool_monitor.pool_class(poolclass))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    # Register Read Replicas
+    init_replicas(app)
+
     # Initialize Object Relational Mapping
     from .orm import init_orm
-    init_orm()
+    init_orm(app.config.get('DB_TRANSACTION_LOADING', 'selectin'))
 
     # Log the URI (masked)
     app.logger.debug(
@@ -60,6 +84,19 @@ def init_db(app):
     app.config['_JT_DB_HEAD_REV'] = None
     app.config['_JT_DB_CUR_REV'] = None
     with app.app_context():
+        # Apply the SQLite Profile before the first connection is opened
+        init_sqlite(app, db.engine)
+        for key in app.config['_JT_DB_REPLICAS']:
+            init_sqlite(app, db.get_engine(app, bind=key))
+
+        pool_monitor.reset()
+        pool_monitor.install(db.engine)
+
+        # Profile the SQL Statements of each Request
+        init_profiler(app, [db.engine] + [
+            db.get_engine(app, bind=key) for key in app.config['_JT_DB_REPLICAS']
+        ])
+
         if inspect(db.engine).has_table('alembic_version'):
             app.config['_JT_DB_NEEDS_INIT'] = False
 
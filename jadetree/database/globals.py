@@ -8,40 +8,96 @@
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 import sqlalchemy as sa
+from sqlalchemy import orm
 from sqlalchemy.ext import compiler
 from sqlalchemy.schema import DDLElement
 
+from .routing import RoutingSession
+from .views import REFRESH_DEMAND, MaterializedView, materialized_views
+
 
 class CreateView(DDLElement):
-    def __init__(self, name, selectable):
+    def __init__(self, name, selectable, materialized=False, table=False):
         self.name = name
         self.selectable = selectable
+        self.materialized = materialized
+        self.table = table
 
 
 class DropView(DDLElement):
-    def __init__(self, name, cascade=True):
+    def __init__(self, name, cascade=True, materialized=False, table=False):
         self.name = name
         self.cascade = cascade
+        self.materialized = materialized
+        self.table = table
 
 
 @compiler.compiles(CreateView)
-def compile_create_materialized_view(element, compiler, **kw):
-    return 'CREATE VIEW {} AS {}'.format(
+def compile_create_view(element, compiler, **kw):
+    return 'CREATE {} {} AS {}'.format(
+        'TABLE' if element.table else 'VIEW',
+        element.name,
+        compiler.sql_compiler.process(element.selectable, literal_binds=True),
+    )
+
+
+@compiler.compiles(CreateView, 'postgresql')
+def compile_create_view_postgresql(element, compiler, **kw):
+    return 'CREATE {} {} AS {}'.format(
+        'TABLE' if element.table else 'MATERIALIZED VIEW' if element.materialized else 'VIEW',
+        element.name,
+        compiler.sql_compiler.process(element.selectable, literal_binds=True),
+    )
+
+
+@compiler.compiles(CreateView, 'sqlite')
+def compile_create_view_sqlite(element, compiler, **kw):
+    # SQLite has no materialized views, so they are emulated with a table
+    # which is refreshed from the view query
+    return 'CREATE {} {} AS {}'.format(
+        'TABLE' if element.table or element.materialized else 'VIEW',
         element.name,
         compiler.sql_compiler.process(element.selectable, literal_binds=True),
     )
 
 
 @compiler.compiles(DropView)
-def compile_drop_materialized_view(element, compiler, **kw):
-    return 'DROP VIEW IF EXISTS {} {}'.format(
+def compile_drop_view(element, compiler, **kw):
+    return 'DROP {} IF EXISTS {} {}'.format(
+        'TABLE' if element.table else 'VIEW',
+        element.name,
+        'CASCADE' if element.cascade else ''
+    )
+
+
+@compiler.compiles(DropView, 'postgresql')
+def compile_drop_view_postgresql(element, compiler, **kw):
+    return 'DROP {} IF EXISTS {} {}'.format(
+        'TABLE' if element.table else 'MATERIALIZED VIEW' if element.materialized else 'VIEW',
         element.name,
         'CASCADE' if element.cascade else ''
     )
 
 
+@compiler.compiles(DropView, 'sqlite')
+def compile_drop_view_sqlite(element, compiler, **kw):
+    return 'DROP {} IF EXISTS {}'.format(
+        'TABLE' if element.table or element.materialized else 'VIEW',
+        element.name,
+    )
+
+
+def _creates_tables(ddl, target, bind, tables=None, **kw):
+    # Flask-SQLalchemy runs create_all() and drop_all() once per bind, so only
+    # create or drop views along with the tables in the primary database
+    return bool(tables)
+
+
 def _make_view(db):
-    def create_view(name, selectable, cascade_on_drop=True):
+    def create_view(
+        name, selectable, cascade_on_drop=True, materialized=False,
+        refresh=REFRESH_DEMAND, refresh_interval=None, refresh_tables=(), refresh_keys=()
+    ):
         _mt = db.MetaData()
 
         # Create Table object using temporary Metadata (prevents SQLalchemy
@@ -55,7 +111,7 @@ def _make_view(db):
             name,
             _mt,
             *cols,
-            info=dict(is_view=True, selectable=selectable)
+            info=dict(is_view=True, materialized=materialized, selectable=selectable)
         )
 
         # Create a fake Primary Key constraint if needed
@@ -64,22 +120,68 @@ def _make_view(db):
                 sa.PrimaryKeyConstraint(*[c.name for c in selectable.c])
             )
 
+        # Register the Materialized View for Refreshing
+        view = None
+        if materialized:
+            view = MaterializedView(
+                table,
+                selectable,
+                refresh=refresh,
+                interval=refresh_interval,
+                tables=refresh_tables,
+                keys=refresh_keys,
+            )
+            materialized_views.register(view)
+
         # Add Create/Drop Listeners
-        sa.event.listen(db.metadata, 'after_create', CreateView(name, selectable))
+        as_table = view is not None and view.is_table
+        sa.event.listen(
+            db.metadata,
+            'after_create',
+            CreateView(name, selectable, materialized=materialized, table=as_table)
+            .execute_if(callable_=_creates_tables)
+        )
         sa.event.listen(
             db.metadata,
             'before_drop',
-            DropView(name, cascade=cascade_on_drop)
+            DropView(name, cascade=cascade_on_drop, materialized=materialized, table=as_table)
+            .execute_if(callable_=_creates_tables)
         )
 
+        # Index the Materialized View keys, which are unique (as needed to
+        # refresh a PostgreSQL materialized view concurrently)
+        if refresh_keys:
+            def _creates_index(ddl, target, bind, **kw):
+                # Plain views (used on other databases) cannot be indexed
+                return _creates_tables(ddl, target, bind, **kw) and (
+                    as_table or bind.dialect.name in ('postgresql', 'sqlite')
+                )
+
+            index = sa.Index(
+                'ux_{}_keys'.format(name),
+                *[table.c[k] for k in refresh_keys],
+                unique=True
+            )
+            sa.event.listen(
+                db.metadata,
+                'after_create',
+                sa.schema.CreateIndex(index).execute_if(callable_=_creates_index)
+            )
+
         # Return new Table Objects
         return table
 
     return create_view
 
 
+class JTSQLAlchemy(SQLAlchemy):
+    '''Flask-SQLalchemy Object using the Read Replica Routing Session'''
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
 #: Global Database Object for Models and Views
-db = SQLAlchemy()
+db = JTSQLAlchemy()
 
 # Patch Database Object to create Views
 db.View = _make_view(db)
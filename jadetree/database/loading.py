@@ -0,0 +1,56 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+# Transaction Loader Options
+
+from sqlalchemy.orm import lazyload, selectinload
+
+from jadetree.domain.models import Transaction, TransactionLine, TransactionSplit
+
+__all__ = (
+    'txn_graph_options',
+    'txn_header_options',
+    'txn_lines_options',
+)
+
+
+def txn_graph_options():
+    '''
+    Loader options for the complete Transaction graph (lines, splits and
+    their entries), each level loaded with one ``SELECT ... IN`` query
+    regardless of the configured default strategy.
+    '''
+    return (
+        selectinload(Transaction.lines)
+        .selectinload(TransactionLine.entries),
+        selectinload(Transaction.splits)
+        .selectinload(TransactionSplit.entries),
+    )
+
+
+def txn_lines_options():
+    '''
+    Loader options for call sites which only use the Transaction Lines and
+    their accounts (i.e. clearing), leaving the splits unloaded until they
+    are accessed.
+    '''
+    return (
+        selectinload(Transaction.lines)
+        .joinedload(TransactionLine.account),
+        lazyload(Transaction.splits),
+    )
+
+
+def txn_header_options():
+    '''
+    Loader options for call sites which only use the Transaction columns,
+    leaving the lines and splits unloaded until they are accessed.
+    '''
+    return (
+        lazyload(Transaction.lines),
+        lazyload(Transaction.splits),
+    )
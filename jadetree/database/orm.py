@@ -4,13 +4,14 @@ Jade Tree Personal Budgeting Application | jadetree.io
 Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
 """
 
-from sqlalchemy import and_
+from sqlalchemy import and_, event
 
 from jadetree.domain.models import (
     Account,
     Budget,
     BudgetEntry,
     Category,
+    Job,
     Payee,
     Transaction,
     TransactionEntry,
@@ -18,13 +19,18 @@ from jadetree.domain.models import (
     TransactionSplit,
     User,
 )
+from jadetree.domain.util import month_key
+from jadetree.exc import ConfigError
 
 from .globals import db
+from .queries.cache import clear_query_cache
+from .search import init_search
 from .tables import (
     accounts,
     budget_entries,
     budgets,
     categories,
+    jobs,
     payees,
     transaction_entries,
     transaction_lines,
@@ -32,12 +38,46 @@ from .tables import (
     transactions,
     users,
 )
+from .views import init_views
 
-__all__ = ('init_orm', )
+__all__ = ('LOADER_STRATEGIES', 'init_orm')
 
+#: Relationship loading strategies accepted for the Transaction graph
+LOADER_STRATEGIES = ('joined', 'select', 'selectin', 'subquery')
+
+
+def _set_month_key(target, value, oldvalue, initiator):
+    '''Update the stored Month Key when the underlying date changes'''
+    target.month_key = month_key(value)
+
+
+def _set_split_accounts(mapper, connection, target):
+    '''Store the line accounts and transfer flag when a Split is written'''
+    left = target.left_account
+    right = target.right_account
+    target.left_account_id = left.id if left is not None else None
+    target.right_account_id = right.id if right is not None else None
+    target.transfer = target.is_transfer
+
+
+def init_orm(txn_loading='selectin'):
+    """Initialize the SQLalchemy ORM.
+
+    The ``txn_loading`` strategy is used for the Transaction Line, Split and
+    Entry collections. The default ``selectin`` strategy loads each level of
+    the graph with a single ``SELECT ... IN`` query, so that lines and
+    splits are not multiplied against each other by a joined load. Call
+    sites which need a different shape should use loader options (see
+    `jadetree.database.loading`).
+    """
+    if txn_loading not in LOADER_STRATEGIES:
+        raise ConfigError(
+            'Invalid Transaction loading strategy "{}" (expected one of {})'.format(
+                txn_loading, ', '.join(LOADER_STRATEGIES)
+            ),
+            config_key='DB_TRANSACTION_LOADING'
+        )
 
-def init_orm():
-    """Initialize the SQLalchemy ORM."""
     # User
     db.mapper(User, users, properties={
         'accounts': db.relationship(
@@ -60,6 +100,11 @@ def init_orm():
             backref='user',
             cascade='all, delete-orphan',
         ),
+        'jobs': db.relationship(
+            Job,
+            backref='user',
+            cascade='all, delete-orphan',
+        ),
     })
 
     # Account
@@ -68,7 +113,8 @@ def init_orm():
             Payee,
             backref='account',
             uselist=False,
-            cascade='all, delete-orphan'
+            cascade='all, delete-orphan',
+            foreign_keys=[payees.c.account_id],
         ),
         'transaction_lines': db.relationship(
             TransactionLine,
@@ -127,13 +173,15 @@ def init_orm():
             TransactionLine,
             backref='transaction',
             cascade='all, delete-orphan',
-            lazy='joined',
+            lazy=txn_loading,
+            order_by=transaction_lines.c.id,
         ),
         'splits': db.relationship(
             TransactionSplit,
             backref='transaction',
             cascade='all, delete-orphan',
-            lazy='joined',
+            lazy=txn_loading,
+            order_by=transaction_splits.c.id,
         )
     })
 
@@ -142,6 +190,8 @@ def init_orm():
         'entries': db.relationship(
             TransactionEntry,
             backref='line',
+            lazy=txn_loading,
+            order_by=transaction_entries.c.id,
         ),
     })
 
@@ -151,7 +201,8 @@ def init_orm():
             TransactionEntry,
             backref='split',
             cascade='all, delete-orphan',
-            lazy='joined',
+            lazy=txn_loading,
+            order_by=transaction_entries.c.id,
         ),
         'category': db.relationship(Category),
         'left_line': db.relationship(
@@ -169,9 +220,32 @@ def init_orm():
 
     # Payee
     db.mapper(Payee, payees, properties={
-        'category': db.relationship(Category),
+        'category': db.relationship(
+            Category,
+            foreign_keys=[payees.c.category_id],
+        ),
         'transactions': db.relationship(
             Transaction,
             backref='payee',
         )
     })
+
+    # Job
+    db.mapper(Job, jobs)
+
+    # Keep stored Month Keys in sync with Transaction and Budget Entry dates
+    event.listen(Transaction.date, 'set', _set_month_key)
+    event.listen(BudgetEntry.month, 'set', _set_month_key)
+
+    # Keep the stored Split accounts in sync with the Split lines
+    event.listen(TransactionSplit, 'before_insert', _set_split_accounts)
+    event.listen(TransactionSplit, 'before_update', _set_split_accounts)
+
+    # Keep the Transaction Search Index in sync on flush
+    init_search()
+
+    # Refresh the Materialized Views on commit
+    init_views()
+
+    # Cached queries refer to the previous mappers
+    clear_query_cache()
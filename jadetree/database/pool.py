@@ -0,0 +1,213 @@
+"""Jade Tree Database Connection Pool.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+from jadetree.exc import ConfigError
+
+from .sqlite import _config_bool
+
+__all__ = ('PoolMonitor', 'pool_monitor', 'pool_options')
+
+#: Connection pool configuration keys, with the `create_engine` argument,
+#: value type and minimum value for each
+POOL_CONFIG = (
+    ('DB_POOL_SIZE', 'pool_size', int, 0),
+    ('DB_MAX_OVERFLOW', 'max_overflow', int, -1),
+    ('DB_POOL_TIMEOUT', 'pool_timeout', float, 0),
+    ('DB_POOL_RECYCLE', 'pool_recycle', int, -1),
+    ('DB_POOL_PRE_PING', 'pool_pre_ping', bool, None),
+)
+
+#: Engine arguments which are only accepted by a `QueuePool`
+QUEUE_POOL_ARGS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+#: Default pool size for SQLite file databases with the connection profile
+SQLITE_POOL_SIZE = 5
+
+
+def _config_value(config, key, type_, minimum):
+    """Read and check a numeric or boolean configuration value."""
+    value = config[key]
+    if type_ is bool:
+        if isinstance(value, str):
+            return value.strip().lower() not in ('', '0', 'false', 'no', 'off')
+        return bool(value)
+
+    try:
+        value = type_(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or value < minimum:
+        raise ConfigError(
+            '{} must be a number of at least {}'.format(key, minimum),
+            config_key=key
+        )
+
+    return value
+
+
+def pool_options(config, uri):
+    """Build the `create_engine` connection pool arguments.
+
+    The ``DB_POOL_*`` and ``DB_MAX_OVERFLOW`` configuration keys map to the
+    SQLalchemy pool arguments. Database servers use a `QueuePool`. SQLite
+    file databases with the connection profile (see `SQLiteProfile`) also
+    use a `QueuePool`, of ``SQLITE_POOL_SIZE`` connections unless
+    ``DB_POOL_SIZE`` is set, so the profile PRAGMAs run once per connection
+    and the page cache is kept between checkouts; pooled connections may be
+    shared between threads. Without the profile, SQLite file databases use
+    a `NullPool` (one connection per checkout) unless ``DB_POOL_SIZE`` is
+    set.
+
+    :returns: a tuple of the pool class and the pool arguments
+    """
+    options = {}
+    for key, arg, type_, minimum in POOL_CONFIG:
+        if key in config:
+            options[arg] = _config_value(config, key, type_, minimum)
+
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return QueuePool, options
+
+    if url.database in (None, '', ':memory:'):
+        poolclass = StaticPool
+    elif 'pool_size' in options or _config_bool(config.get('DB_SQLITE_PROFILE', True)):
+        poolclass = QueuePool
+        options.setdefault('pool_size', SQLITE_POOL_SIZE)
+        options['connect_args'] = dict(check_same_thread=False)
+    else:
+        poolclass = NullPool
+
+    if poolclass is not QueuePool:
+        for arg in QUEUE_POOL_ARGS:
+            options.pop(arg, None)
+
+    return poolclass, options
+
+
+class PoolMonitor:
+    """Connection pool instrumentation.
+
+    The monitor wraps the pool class so that the time each checkout waits
+    for a connection (including opening a new one) is measured, and listens
+    to the pool events to track the connections in use, the overflow
+    connections opened beyond ``pool_size`` and checkouts which timed out.
+    """
+    def __init__(self):
+        self.engine = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset the counters."""
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_wait = 0.0
+            self.checkout_wait_max = 0.0
+            self.checkout_timeouts = 0
+            self.connects = 0
+            self.overflows = 0
+            self.invalidated = 0
+            self.in_use = 0
+            self.in_use_max = 0
+
+    def pool_class(self, base):
+        """Return a subclass of a pool class which times checkouts."""
+        monitor = self
+
+        def _do_get(pool):
+            t0 = time.perf_counter()
+            try:
+                return base._do_get(pool)
+            except TimeoutError:
+                monitor._record_timeout()
+                raise
+            finally:
+                monitor._record_wait(time.perf_counter() - t0)
+
+        return type('Monitored' + base.__name__, (base, ), {'_do_get': _do_get})
+
+    def install(self, engine):
+        """Register the pool event listeners on an Engine."""
+        self.engine = engine
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _record_wait(self, elapsed):
+        with self._lock:
+            self.checkout_wait += elapsed
+            self.checkout_wait_max = max(self.checkout_wait_max, elapsed)
+
+    def _record_timeout(self):
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        # QueuePool counts the overflow up from -pool_size before opening a
+        # connection, so a positive overflow is a connection beyond the pool
+        pool = self.engine.pool
+        with self._lock:
+            self.connects += 1
+            if isinstance(pool, QueuePool) and pool.overflow() > 0:
+                self.overflows += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.in_use_max = max(self.in_use_max, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+
+    def stats(self):
+        """Return a dictionary of the pool metrics.
+
+        Wait times are in milliseconds. The ``pool_size``, ``checked_in``
+        and ``overflow`` values are only reported for a `QueuePool`.
+        """
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            ret = dict(
+                pool_class=type(pool).__name__ if pool is not None else None,
+                checkouts=self.checkouts,
+                checkout_wait_avg=1000 * self.checkout_wait / self.checkouts if self.checkouts else 0.0,
+                checkout_wait_max=1000 * self.checkout_wait_max,
+                checkout_timeouts=self.checkout_timeouts,
+                connects=self.connects,
+                overflows=self.overflows,
+                invalidated=self.invalidated,
+                in_use=self.in_use,
+                in_use_max=self.in_use_max,
+            )
+
+        if isinstance(pool, QueuePool):
+            ret.update(
+                pool_size=pool.size(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+
+        return ret
+
+
+#: Global Connection Pool Monitor
+pool_monitor = PoolMonitor()
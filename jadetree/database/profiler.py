@@ -0,0 +1,272 @@
+"""Jade Tree SQL Query Profiler.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import re
+import threading
+import time
+
+from flask import request
+from sqlalchemy import event
+
+from jadetree.exc import ConfigError
+
+from .sqlite import _config_bool
+
+__all__ = ('QueryProfile', 'QueryProfiler', 'init_profiler', 'query_profiler')
+
+#: Matches a list of two or more bind placeholders (e.g. an expanded ``IN``
+#: list), which is collapsed to one placeholder in a statement shape
+PLACEHOLDER_LIST = re.compile(
+    r'(\?|%s|%\(\w+\)s|:\w+)(\s*,\s*(\?|%s|%\(\w+\)s|:\w+))+'
+)
+
+#: Length at which statements are truncated in the request log
+LOG_STATEMENT_LENGTH = 200
+
+
+def statement_shape(statement):
+    """Normalize an SQL statement so repeated executions compare equal.
+
+    Bound parameter values are not part of the statement text, so only the
+    whitespace and the length of ``IN`` lists need to be normalized.
+    """
+    return PLACEHOLDER_LIST.sub(r'\1', ' '.join(statement.split()))
+
+
+class QueryProfile:
+    """SQL statements executed during a request (or other unit of work).
+
+    The profile counts the statements executed, the time spent in the
+    database (executing statements and fetching their rows, in seconds) and
+    the number of rows fetched. Statement shapes which were executed at
+    least ``n1_threshold`` times are reported as likely N+1 queries, i.e. a
+    query run once for each row of an earlier result.
+    """
+    def __init__(self, n1_threshold=10):
+        self.n1_threshold = n1_threshold
+        self.statements = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        """Record an executed statement."""
+        self.statements += 1
+        self.duration += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def record_fetch(self, rows, elapsed):
+        """Record rows fetched from a statement result."""
+        self.rows += rows
+        self.duration += elapsed
+
+    @property
+    def n_plus_one(self):
+        """Statement shapes executed at least ``n1_threshold`` times.
+
+        :returns: a list of ``(statement, count)`` tuples, most repeated first
+        """
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= self.n1_threshold
+        ]
+
+    def server_timing(self):
+        """Return the ``Server-Timing`` header value for the profile."""
+        metrics = [
+            'db;dur={:.3f};desc="{} queries, {} rows"'.format(
+                1000 * self.duration, self.statements, self.rows
+            ),
+        ]
+        n_plus_one = self.n_plus_one
+        if n_plus_one:
+            metrics.append('db-n1;desc="{} repeated statements, {} executions"'.format(
+                len(n_plus_one), sum(count for _, count in n_plus_one)
+            ))
+
+        return ', '.join(metrics)
+
+
+class _ProfiledCursor:
+    """DBAPI cursor proxy which records the rows fetched from a result."""
+    def __init__(self, cursor, profiles):
+        self._cursor = cursor
+        self._profiles = profiles
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _fetch(self, fn, *args):
+        t0 = time.perf_counter()
+        rows = fn(*args)
+        elapsed = time.perf_counter() - t0
+        n = len(rows) if isinstance(rows, list) else int(rows is not None)
+        for p in self._profiles:
+            p.record_fetch(n, elapsed)
+        return rows
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+
+class QueryProfiler:
+    """SQL statement instrumentation.
+
+    The profiler listens to the cursor execution events of each Engine and
+    records every statement into the profiles which are active in the
+    executing thread. `init_profiler` activates a profile for each Flask
+    request, and `profile` activates one for a block of code (such as a
+    test asserting a query budget).
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def active(self):
+        """Profiles which are active in the current thread."""
+        if not hasattr(self._local, 'profiles'):
+            self._local.profiles = []
+        return self._local.profiles
+
+    def start(self, profile):
+        """Record statements in the current thread into a `QueryProfile`."""
+        self.active.append(profile)
+        return profile
+
+    def stop(self, profile):
+        """Stop recording statements into a `QueryProfile`."""
+        if profile in self.active:
+            self.active.remove(profile)
+
+    @contextmanager
+    def profile(self, n1_threshold=10):
+        """Profile the statements executed within a ``with`` block.
+
+        .. code-block:: python
+
+            with query_profiler.profile() as p:
+                client.get('/api/v1/budgets/1')
+            assert p.statements <= 10
+        """
+        profile = self.start(QueryProfile(n1_threshold))
+        try:
+            yield profile
+        finally:
+            self.stop(profile)
+
+    def install(self, engine):
+        """Register the statement execution listeners on an Engine."""
+        for name, fn in (
+            ('before_cursor_execute', self._before_execute),
+            ('after_cursor_execute', self._after_execute),
+        ):
+            if not event.contains(engine, name, fn):
+                event.listen(engine, name, fn)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and context is not None:
+            context._jt_query_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profiles = self.active
+        t0 = getattr(context, '_jt_query_start', None)
+        if not profiles or t0 is None:
+            return
+
+        elapsed = time.perf_counter() - t0
+        for p in profiles:
+            p.record(statement, elapsed)
+
+        # Rows are fetched from the result after this event, so the cursor
+        # is wrapped to record them
+        if cursor.description is not None:
+            context.cursor = _ProfiledCursor(cursor, list(profiles))
+
+
+#: Global SQL Query Profiler
+query_profiler = QueryProfiler()
+
+
+def init_profiler(app, engines):
+    """Profile the SQL statements executed by each request.
+
+    Profiling is enabled by ``DB_PROFILE`` (which defaults to on in debug
+    and testing mode). Each request's statement count, database time and
+    rows fetched are logged and returned in the ``Server-Timing`` response
+    header (unless ``DB_PROFILE_HEADER`` is false), and statements
+    repeated ``DB_PROFILE_N1`` times are logged as warnings.
+
+    Returns True if profiling is enabled.
+    """
+    if not _config_bool(app.config.get('DB_PROFILE', app.debug or app.testing)):
+        return False
+
+    key = 'DB_PROFILE_N1'
+    try:
+        n1_threshold = int(app.config.get(key, 10))
+    except (TypeError, ValueError):
+        n1_threshold = None
+    if n1_threshold is None or n1_threshold < 2:
+        raise ConfigError('{} must be an integer of at least 2'.format(key), config_key=key)
+
+    server_timing = _config_bool(app.config.get('DB_PROFILE_HEADER', True))
+
+    for engine in engines:
+        query_profiler.install(engine)
+
+    def start_profile():
+        request._jt_query_profile = query_profiler.start(QueryProfile(n1_threshold))
+
+    def finish_profile(response):
+        profile = getattr(request, '_jt_query_profile', None)
+        if profile is None:
+            return response
+
+        query_profiler.stop(profile)
+        app.logger.debug(
+            '%s %s: %d queries, %d rows, %.1f ms in database',
+            request.method,
+            request.path,
+            profile.statements,
+            profile.rows,
+            1000 * profile.duration,
+        )
+        for shape, count in profile.n_plus_one:
+            app.logger.warning(
+                '%s %s: possible N+1 query, %d executions of "%s"',
+                request.method,
+                request.path,
+                count,
+                shape[:LOG_STATEMENT_LENGTH],
+            )
+
+        if server_timing:
+            response.headers.add('Server-Timing', profile.server_timing())
+
+        return response
+
+    def teardown_profile(exc):
+        profile = getattr(request, '_jt_query_profile', None)
+        if profile is not None:
+            query_profiler.stop(profile)
+
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(teardown_profile)
+
+    return True
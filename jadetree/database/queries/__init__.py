@@ -6,6 +6,7 @@ Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
 
 from .account import q_account_balances, q_account_list
 from .budget import q_budget_summary, q_budget_tuples
+from .cache import clear_query_cache, query_cache_info
 from .reports import q_report_net_worth
 from .transaction import (
     q_txn_account_amounts,
@@ -14,10 +15,12 @@ from .transaction import (
     q_txn_category_amounts,
     q_txn_category_lines,
     q_txn_schema_fields,
+    q_txn_search,
     q_txn_split_fields,
 )
 
 __all__ = (
+    'clear_query_cache',
     'q_account_balances',
     'q_account_list',
     'q_budget_summary',
@@ -29,5 +32,7 @@ __all__ = (
     'q_txn_category_amounts',
     'q_txn_category_lines',
     'q_txn_schema_fields',
+    'q_txn_search',
     'q_txn_split_fields',
+    'query_cache_info',
 )
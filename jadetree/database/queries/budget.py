@@ -5,131 +5,90 @@
 #
 # =============================================================================
 
-from sqlalchemy import and_, case, func
-
-from jadetree.domain.models import (
-    Account,
-    BudgetEntry,
-    Category,
-    Transaction,
-    TransactionEntry,
-    TransactionLine,
-    TransactionSplit,
-)
-from jadetree.domain.types import AccountRole, AccountType
+from sqlalchemy import and_, bindparam
+
+from jadetree.domain.models import BudgetEntry, Category
+from jadetree.domain.util import month_key
+
+from ..tables import budget_outflows
+from .cache import cached_query
 
 __all__ = ('q_budget_summary', 'q_budget_tuples')
 
 
 def q_budget_tuples(session, budget_id):
     '''
-    Return a list of "Budget Tuples" for a budget, which are 3-tuples of
-    (`Category.id`, ``year``, ``month``) for each `BudgetEntry` and
-    `Transaction` items associated with the budget. This is used to build up
-    the budget summary of budgeted income vs. outflows by month.
+    Return a list of "Budget Tuples" for a budget, which are 2-tuples of
+    (`Category.id`, ``month_key``) for each `BudgetEntry` and `Transaction`
+    items associated with the budget. This is used to build up the budget
+    summary of budgeted income vs. outflows by month.
     '''
     sq1 = session \
         .query(
-            TransactionSplit.category_id.label('category_id'),
-            func.extract('year', Transaction.date).label('year'),
-            func.extract('month', Transaction.date).label('month'),
-        ).join(
-            TransactionEntry,
-            TransactionEntry.split_id == TransactionSplit.id,
-        ).join(
-            TransactionLine,
-            TransactionLine.id == TransactionEntry.line_id,
-        ).join(
-            Account,
-            Account.id == TransactionLine.account_id,
-        ).join(
-            Transaction,
-            Transaction.id == TransactionSplit.transaction_id,
-        ).filter(
-            Account.role == AccountRole.Budget,
-        ).distinct()
-
-    # (Category, Year, Month) tuples from BudgetEntries
+            budget_outflows.c.category_id.label('category_id'),
+            budget_outflows.c.month_key.label('month_key'),
+        )
+
+    # (Category, Month Key) tuples from BudgetEntries
     sq2 = session \
         .query(
             Category.id.label('category_id'),
-            func.extract('year', BudgetEntry.month).label('year'),
-            func.extract('month', BudgetEntry.month).label('month'),
+            BudgetEntry.month_key.label('month_key'),
         ) \
         .join(Category, Category.id == BudgetEntry.category_id)
 
-    # All (Category, Year, Month) tuples (incl. uncategorized)
+    # All (Category, Month Key) tuples (incl. uncategorized)
     return sq2.union(sq1)
 
 
 def q_budget_outflows(session, budget_id, month=None):
     '''
+    Return the budget outflows and number of Transactions by (`Category.id`,
+    ``month_key``) from the `budget_outflows` materialized view
     '''
-    sq_acct_sign = session.query(
-        Account.id.label('account_id'),
-        case(
-            [
-                (Account.type == AccountType.Liability, -1),
-                (Account.type == AccountType.Expense, -1),
-            ],
-            else_=1,
-        ).label('inflow_sign'),
-        case(
-            [
-                (Account.type == AccountType.Liability, 1),
-                (Account.type == AccountType.Expense, 1),
-            ],
-            else_=-1,
-        ).label('outflow_sign'),
-    ).subquery()
-
-    # Outflows by Tuple
     return session.query(
-        TransactionSplit.category_id.label('category_id'),
-        func.extract('year', Transaction.date).label('year'),
-        func.extract('month', Transaction.date).label('month'),
-        func.sum(
-            TransactionEntry.amount * sq_acct_sign.c.outflow_sign
-        ).label('outflow'),
-        func.count(Transaction.id.distinct()).label('num_transactions'),
-    ).join(
-        TransactionEntry,
-        TransactionEntry.split_id == TransactionSplit.id,
-    ).join(
-        TransactionLine,
-        TransactionLine.id == TransactionEntry.line_id,
-    ).join(
-        Account,
-        Account.id == TransactionLine.account_id,
-    ).join(
-        sq_acct_sign,
-        sq_acct_sign.c.account_id == Account.id,
-    ).join(
-        Transaction,
-        Transaction.id == TransactionSplit.transaction_id,
-    ).filter(
-        Account.role == AccountRole.Budget,
-    ).group_by('category_id', 'year', 'month')
+        budget_outflows.c.category_id.label('category_id'),
+        budget_outflows.c.month_key.label('month_key'),
+        budget_outflows.c.outflow.label('outflow'),
+        budget_outflows.c.num_transactions.label('num_transactions'),
+    )
 
 
 def q_budget_summary(session, budget_id, month=None):
     '''
     '''
-    sq_tuples = q_budget_tuples(session, budget_id).subquery()
-    sq_outflows = q_budget_outflows(session, budget_id).subquery()
+    params = dict(budget_id=budget_id)
+
+    # Filter by Month
+    if month is not None:
+        if len(month) != 2:
+            raise TypeError('Expected (year, month) tuple in q_budget_summary')
+        params['month_key'] = month_key(month)
+
+    return cached_query(
+        session,
+        ('q_budget_summary', month is not None),
+        lambda s: _q_budget_summary(s, month is not None),
+        **params
+    )
+
+
+def _q_budget_summary(session, by_month):
+    '''Build the `q_budget_summary` query, optionally for a single month'''
+    sq_tuples = q_budget_tuples(session, bindparam('budget_id')).subquery()
+    sq_outflows = q_budget_outflows(session, bindparam('budget_id')).subquery()
 
     # Budget Entries by Tuple
     sq2 = session \
         .query(
             BudgetEntry.id.label('entry_id'),
             BudgetEntry.category_id.label('category_id'),
-            func.extract('year', BudgetEntry.month).label('year'),
-            func.extract('month', BudgetEntry.month).label('month'),
+            BudgetEntry.month_key.label('month_key'),
             BudgetEntry.amount.label('budget'),
             BudgetEntry.rollover.label('rollover'),
             BudgetEntry.notes.label('notes'),
         ) \
-        .filter(BudgetEntry.budget_id == budget_id) \
+        .filter(BudgetEntry.budget_id == bindparam('budget_id')) \
         .subquery()
 
     # Load Outflows and Budget Entries by Tuple
@@ -137,8 +96,7 @@ def q_budget_summary(session, budget_id, month=None):
         .query(
             sq2.c.entry_id,
             sq_tuples.c.category_id,
-            sq_tuples.c.year,
-            sq_tuples.c.month,
+            sq_tuples.c.month_key,
             sq_outflows.c.outflow,
             sq_outflows.c.num_transactions,
             sq2.c.budget,
@@ -149,28 +107,21 @@ def q_budget_summary(session, budget_id, month=None):
             sq_outflows,
             and_(
                 sq_outflows.c.category_id == sq_tuples.c.category_id,
-                sq_outflows.c.year == sq_tuples.c.year,
-                sq_outflows.c.month == sq_tuples.c.month
+                sq_outflows.c.month_key == sq_tuples.c.month_key,
             )
         ) \
         .outerjoin(
             sq2,
             and_(
                 sq2.c.category_id == sq_tuples.c.category_id,
-                sq2.c.year == sq_tuples.c.year,
-                sq2.c.month == sq_tuples.c.month
+                sq2.c.month_key == sq_tuples.c.month_key,
             )
         ) \
-        .order_by(sq_tuples.c.year, sq_tuples.c.month, sq_tuples.c.category_id)
+        .order_by(sq_tuples.c.month_key, sq_tuples.c.category_id)
 
     # Filter by Month
-    if month is not None:
-        if len(month) != 2:
-            raise TypeError('Expected (year, month) tuple in q_budget_summary')
-        q = q.filter(
-            sq_tuples.c.year == month[0],
-            sq_tuples.c.month == month[1],
-        )
+    if by_month:
+        q = q.filter(sq_tuples.c.month_key == bindparam('month_key'))
 
     # Return Query
     return q
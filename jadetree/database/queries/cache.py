@@ -0,0 +1,62 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+# Cache of parameterized query statements
+
+import threading
+
+__all__ = ('cached_query', 'clear_query_cache', 'query_cache_info')
+
+_query_cache = dict()
+_query_lock = threading.Lock()
+_query_stats = dict(hits=0, misses=0)
+
+
+def cached_query(session, key, build, **params):
+    '''
+    Return the query built by ``build(session)`` for the cache ``key``,
+    bound to the session with the given bound parameter values.
+
+    The ``key`` identifies the shape of the query (the builder and the set of
+    filters which are applied) and the builder must use `bindparam` for every
+    value which varies between calls, so that only the parameters differ
+    between two queries with the same key. The query is built once per key
+    and stored without a session; since the statement is identical for each
+    call, SQLalchemy also finds its compiled form in the per-dialect compiled
+    cache of the engine, so neither the ORM query nor the SQL is rebuilt.
+    '''
+    q = _query_cache.get(key)
+    if q is None:
+        q = build(session).with_session(None)
+        with _query_lock:
+            q = _query_cache.setdefault(key, q)
+            _query_stats['misses'] += 1
+    else:
+        with _query_lock:
+            _query_stats['hits'] += 1
+
+    q = q.with_session(session)
+    if params:
+        q = q.params(**params)
+
+    return q
+
+
+def clear_query_cache():
+    '''
+    Clear the query cache. This must be called when the ORM mappers are
+    reconfigured, since the cached queries refer to the mapped classes.
+    '''
+    with _query_lock:
+        _query_cache.clear()
+        _query_stats.update(hits=0, misses=0)
+
+
+def query_cache_info():
+    '''Return the number of cached queries and the cache hits and misses'''
+    with _query_lock:
+        return dict(size=len(_query_cache), **_query_stats)
@@ -6,7 +6,7 @@ Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
 
 import datetime
 
-from sqlalchemy import and_, case, func
+from sqlalchemy import and_, bindparam, func
 
 from jadetree.domain.models import (
     Account,
@@ -19,6 +19,9 @@ from jadetree.domain.models import (
 )
 from jadetree.domain.types import AccountRole, AccountType
 
+from ..tables import net_worth_months
+from .cache import cached_query
+
 
 def q_report_net_worth(session, user_id, *, filter_accounts=None):
     """Report Assets and Liabilities by month.
@@ -34,65 +37,74 @@ def q_report_net_worth(session, user_id, *, filter_accounts=None):
             argument is None (the default), all accounts are used.
 
     Returns:
-        SQLalchemy Query with columns (year, month, assets, liabilities)
+        SQLalchemy Query with columns (month_key, assets, liabilities)
     """
+    params = dict(user_id=user_id)
+    if filter_accounts:
+        params['filter_accounts'] = list(filter_accounts)
+
+    return cached_query(
+        session,
+        ('q_report_net_worth', bool(filter_accounts)),
+        lambda s: _q_report_net_worth(s, bool(filter_accounts)),
+        **params
+    )
+
+
+def _q_report_net_worth(session, by_account):
+    """Build the `q_report_net_worth` query, optionally for some accounts."""
     # FIXME: Not multiple currency-aware
     sq = session.query(
-        func.extract('year', Transaction.date).label('year'),
-        func.extract('month', Transaction.date).label('month'),
-        func.sum(
-            case(
-                [(Account.type == AccountType.Asset, TransactionEntry.amount)],
-                else_=0
-            )
-        ).label('asset'),
-        func.sum(
-            case(
-                [(Account.type == AccountType.Liability, TransactionEntry.amount)],
-                else_=0
-            )
-        ).label('liability'),
-    ).join(
-        TransactionLine,
-        TransactionLine.transaction_id == Transaction.id
-    ).join(
-        TransactionEntry,
-        TransactionEntry.line_id == TransactionLine.id
-    ).join(
-        Account,
-        Account.id == TransactionLine.account_id
+        net_worth_months.c.month_key.label('month_key'),
+        func.sum(net_worth_months.c.asset).label('asset'),
+        func.sum(net_worth_months.c.liability).label('liability'),
     ).group_by(
-        'year', 'month',
+        net_worth_months.c.month_key,
     ).order_by(
-        'year', 'month'
+        net_worth_months.c.month_key,
     ).filter(
-        Account.type.in_((AccountType.Asset, AccountType.Liability)),
-        Account.user_id == user_id
+        net_worth_months.c.user_id == bindparam('user_id')
     )
 
     # Apply filters to subquery
-    if filter_accounts:
-        sq = sq.filter(Account.id.in_(filter_accounts))
+    if by_account:
+        sq = sq.filter(net_worth_months.c.account_id.in_(bindparam('filter_accounts', expanding=True)))
 
     sq = sq.subquery()
 
     return session.query(
-        sq.c.year,
-        sq.c.month,
+        sq.c.month_key,
         func.sum(sq.c.asset).over(
-            order_by=(sq.c.year, sq.c.month),
+            order_by=sq.c.month_key,
             range_=(None, 0)
         ).label('assets'),
         func.sum(sq.c.liability).over(
-            order_by=(sq.c.year, sq.c.month),
+            order_by=sq.c.month_key,
             range_=(None, 0)
         ).label('liabilities'),
     ).order_by(
-        'year', 'month'
+        sq.c.month_key
     )
 
 
-def sq_spending_report(session, budget_id, *, filter):
+def _spending_report_params(budget_id, filter):
+    """Return the bound parameters for the spending and income reports."""
+    params = dict(budget_id=budget_id)
+    for key in ('accounts', 'categories', 'payees'):
+        if key in filter:
+            params[key] = list(filter[key])
+
+    if 'start_date' in filter and 'end_date' in filter:
+        end_month = filter['end_date'] + datetime.timedelta(days=32)
+        end_month.replace(day=1)
+
+        params['start_date'] = filter['start_date']
+        params['end_month'] = end_month
+
+    return params
+
+
+def sq_spending_report(session, *, filter):
     """Generate a Spending Report subquery for Category or Payee reporting.
 
     Summarizes a user's spending per category over a range of months. Note this
@@ -100,9 +112,10 @@ def sq_spending_report(session, budget_id, *, filter):
 
     Args:
         session: Database Session
-        budget_id: Budget Id for Reporting
-        filter: Dictionary of filters to apply to the query (accepts `start_date`,
-            `end_date`, `categories`, `payees`, and `accounts` keys)
+        filter: Dictionary of report parameters from `_spending_report_params`
+            (with `budget_id` and optionally `accounts`, `categories`, `payees`
+            and `start_date` / `end_month` keys). The values are not used; the
+            query compares against bound parameters named after the keys.
 
     Returns:
         SQLalchemy Query with columns (`year`, `month`, `account_id`, `category_id`,
@@ -134,7 +147,7 @@ def sq_spending_report(session, budget_id, *, filter):
     ).filter(
         Account.role == AccountRole.Budget,
         Account.type == AccountType.Expense,
-        Account.budget_id == budget_id,
+        Account.budget_id == bindparam('budget_id'),
         Category.system == False,               # noqa: E712
         Payee.system == False,                  # noqa: E712
     ).group_by(
@@ -145,21 +158,18 @@ def sq_spending_report(session, budget_id, *, filter):
 
     # Apply filters to subquery
     if 'accounts' in filter:
-        sq = sq.filter(Transaction.account_id.in_(filter['accounts']))
+        sq = sq.filter(Transaction.account_id.in_(bindparam('accounts', expanding=True)))
 
     if 'categories' in filter:
-        sq = sq.filter(Category.id.in_(filter['categories']))
+        sq = sq.filter(Category.id.in_(bindparam('categories', expanding=True)))
 
     if 'payees' in filter:
-        sq = sq.filter(Payee.id.in_(filter['payees']))
-
-    if 'start_date' in filter and 'end_date' in filter:
-        end_month = filter['end_date'] + datetime.timedelta(days=32)
-        end_month.replace(day=1)
+        sq = sq.filter(Payee.id.in_(bindparam('payees', expanding=True)))
 
+    if 'start_date' in filter:
         sq = sq.filter(and_(
-            Transaction.date >= filter['start_date'],
-            Transaction.date < end_month,
+            Transaction.date >= bindparam('start_date'),
+            Transaction.date < bindparam('end_month'),
         ))
 
     return sq.subquery()
@@ -180,7 +190,18 @@ def q_report_by_category(session, budget_id, *, filter=None):
     Returns:
         SQLalchemy Query with columns (category_id, amount, currency)
     """
-    sq = sq_spending_report(session, budget_id, filter=filter)
+    params = _spending_report_params(budget_id, filter or {})
+    return cached_query(
+        session,
+        ('q_report_by_category', frozenset(params)),
+        lambda s: _q_report_by_category(s, params),
+        **params
+    )
+
+
+def _q_report_by_category(session, filter):
+    """Build the `q_report_by_category` query for the given filter keys."""
+    sq = sq_spending_report(session, filter=filter)
 
     return session.query(
         sq.c.category_id,
@@ -207,7 +228,18 @@ def q_report_by_payee(session, budget_id, *, filter=None):
     Returns:
         SQLalchemy Query with columns (payee_id, amount, currency)
     """
-    sq = sq_spending_report(session, budget_id, filter=filter)
+    params = _spending_report_params(budget_id, filter or {})
+    return cached_query(
+        session,
+        ('q_report_by_payee', frozenset(params)),
+        lambda s: _q_report_by_payee(s, params),
+        **params
+    )
+
+
+def _q_report_by_payee(session, filter):
+    """Build the `q_report_by_payee` query for the given filter keys."""
+    sq = sq_spending_report(session, filter=filter)
 
     return session.query(
         sq.c.payee_id,
@@ -231,6 +263,18 @@ def q_report_income(session, budget_id, *, filter=None):
     Returns:
         SQLalchemy Query with columns (income, currency)
     """
+    params = _spending_report_params(budget_id, filter or {})
+    params = {k: v for k, v in params.items() if k in ('budget_id', 'start_date', 'end_month')}
+    return cached_query(
+        session,
+        ('q_report_income', frozenset(params)),
+        lambda s: _q_report_income(s, params),
+        **params
+    )
+
+
+def _q_report_income(session, filter):
+    """Build the `q_report_income` query for the given filter keys."""
     q = session.query(
         func.sum(TransactionEntry.amount).label('amount'),
         TransactionEntry.currency.label('currency')
@@ -246,19 +290,16 @@ def q_report_income(session, budget_id, *, filter=None):
     ).filter(
         Account.role == AccountRole.Budget,
         Account.type == AccountType.Income,
-        Account.budget_id == budget_id,
+        Account.budget_id == bindparam('budget_id'),
     ).group_by(
         TransactionEntry.currency,
     )
 
     # Apply filters to subquery
-    if 'start_date' in filter and 'end_date' in filter:
-        end_month = filter['end_date'] + datetime.timedelta(days=32)
-        end_month.replace(day=1)
-
+    if 'start_date' in filter:
         q = q.filter(and_(
-            Transaction.date >= filter['start_date'],
-            Transaction.date < end_month,
+            Transaction.date >= bindparam('start_date'),
+            Transaction.date < bindparam('end_month'),
         ))
 
     return q
@@ -5,7 +5,7 @@
 #
 # =============================================================================
 
-from sqlalchemy import and_, case, func
+from sqlalchemy import and_, bindparam, case, exists, func, or_, type_coerce
 from sqlalchemy.orm import aliased
 
 from jadetree.domain.models import (
@@ -18,12 +18,16 @@ from jadetree.domain.models import (
 )
 from jadetree.domain.types import AccountRole
 
+from ..search import q_search_match
+from .cache import cached_query
+
 __all__ = (
     'q_txn_account_amounts',
     'q_txn_account_balances',
     'q_txn_account_lines',
     'q_txn_category_amounts',
     'q_txn_category_lines',
+    'q_txn_search',
     'q_txn_split_fields',
     'q_txn_schema_fields',
 )
@@ -55,24 +59,126 @@ def q_txn_account_amounts(session):
         )
 
 
-def q_txn_account_balances(session):
-    '''Retrieve Running Account Balances indexed by Account and Transaction'''
-    sq_txn_amts = q_txn_account_amounts(session).subquery()
-    return session \
+def _filter_ledger(q, filters):
+    '''
+    Apply the named ledger filters to a query which selects from both
+    `Transaction` and `TransactionLine`. Each filter compares against a bound
+    parameter of the same name, which is supplied when the query is run.
+    '''
+    if 'user_id' in filters:
+        q = q.filter(Transaction.user_id == bindparam('user_id'))
+    if 'account_id' in filters:
+        q = q.filter(TransactionLine.account_id == bindparam('account_id'))
+    if 'start_date' in filters:
+        q = q.filter(Transaction.date >= bindparam('start_date'))
+    if 'end_date' in filters:
+        q = q.filter(Transaction.date <= bindparam('end_date'))
+    if 'cleared' in filters:
+        q = q.filter(TransactionLine.cleared == bindparam('cleared'))
+    if 'reconciled' in filters:
+        q = q.filter(TransactionLine.reconciled == bindparam('reconciled'))
+    if 'payee_id' in filters:
+        q = q.filter(Transaction.payee_id == bindparam('payee_id'))
+    if 'category_id' in filters:
+        CategorySplit = aliased(TransactionSplit)
+        q = q.filter(
+            exists().where(
+                and_(
+                    CategorySplit.transaction_id == Transaction.id,
+                    CategorySplit.category_id == bindparam('category_id'),
+                )
+            ).correlate(Transaction)
+        )
+
+    return q
+
+
+def _ledger_params(**filters):
+    '''Return the ledger filters which are not None'''
+    return {k: v for k, v in filters.items() if v is not None}
+
+
+def q_txn_account_balances(
+    session, *, user_id=None, account_id=None, start_date=None, end_date=None
+):
+    '''
+    Retrieve Running Account Balances indexed by Account and Transaction
+
+    The user, account and date filters are applied before the window is
+    evaluated. Since balances are partitioned by account and accumulate in
+    date order, this does not change the balance of any remaining row; the
+    balance carried in from before ``start_date`` is added back from a
+    grouped opening balance subquery.
+    '''
+    params = _ledger_params(
+        user_id=user_id,
+        account_id=account_id,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    return cached_query(
+        session,
+        ('q_txn_account_balances', frozenset(params)),
+        lambda s: _q_txn_account_balances(s, params),
+        **params
+    )
+
+
+def _q_txn_account_balances(session, filters):
+    '''Build the `q_txn_account_balances` query for the named filters'''
+    ledger_filters = {'user_id', 'account_id'} & set(filters)
+    q_txn_amts = _filter_ledger(
+        q_txn_account_amounts(session),
+        {'user_id', 'account_id', 'end_date'} & set(filters),
+    )
+
+    sq_opening = None
+    if 'start_date' in filters:
+        q_txn_amts = q_txn_amts.filter(Transaction.date >= bindparam('start_date'))
+        sq_opening = _filter_ledger(
+            session.query(
+                TransactionLine.account_id.label('account_id'),
+                func.sum(TransactionEntry.amount).label('amount'),
+                TransactionEntry.currency.label('currency'),
+            ).join(
+                Transaction,
+                Transaction.id == TransactionLine.transaction_id
+            ).join(
+                TransactionEntry,
+                TransactionEntry.line_id == TransactionLine.id
+            ).filter(
+                Transaction.date < bindparam('start_date')
+            ),
+            ledger_filters
+        ).group_by(
+            TransactionLine.account_id,
+            TransactionEntry.currency,
+        ).subquery()
+
+    sq_txn_amts = q_txn_amts.subquery()
+    balance = func.sum(sq_txn_amts.c.amount).over(
+        partition_by=sq_txn_amts.c.account_id,
+        # Note: this should match what is used in q_txn_schema_fields
+        order_by=(
+            Transaction.date,
+            sq_txn_amts.c.amount,
+            sq_txn_amts.c.transaction_id
+        ),
+        range_=(None, 0)
+    )
+
+    if sq_opening is not None:
+        balance = type_coerce(
+            func.coalesce(sq_opening.c.amount, 0) + balance,
+            sq_txn_amts.c.amount.type,
+        )
+
+    q = session \
         .query(
             sq_txn_amts.c.transaction_id.label('transaction_id'),
             sq_txn_amts.c.account_id.label('account_id'),
             sq_txn_amts.c.amount.label('amount'),
-            func.sum(sq_txn_amts.c.amount).over(
-                partition_by=sq_txn_amts.c.account_id,
-                # Note: this should match what is used in q_txn_schema_fields
-                order_by=(
-                    Transaction.date,
-                    sq_txn_amts.c.amount,
-                    sq_txn_amts.c.transaction_id
-                ),
-                range_=(None, 0)
-            ).label('balance'),
+            balance.label('balance'),
             sq_txn_amts.c.currency.label('currency')
         ) \
         .join(
@@ -80,6 +186,17 @@ def q_txn_account_balances(session):
             Transaction.id == sq_txn_amts.c.transaction_id
         )
 
+    if sq_opening is not None:
+        q = q.outerjoin(
+            sq_opening,
+            and_(
+                sq_opening.c.account_id == sq_txn_amts.c.account_id,
+                sq_opening.c.currency == sq_txn_amts.c.currency,
+            )
+        )
+
+    return q
+
 
 def q_txn_category_amounts(session):
     '''Query Transaction Amounts by Category'''
@@ -116,64 +233,51 @@ def q_txn_category_amounts(session):
         )
 
 
-def q_txn_split_fields(session):
-    '''Query the fields required for the TransactionSplitSchema interface'''
-    sq_other_line = session \
-        .query(
-            TransactionLine.id.label('line_id'),
-            case(
-                [
-                    (
-                        TransactionLine.id == TransactionSplit.left_line_id,
-                        TransactionSplit.right_line_id
-                    ),
-                    (
-                        TransactionLine.id == TransactionSplit.right_line_id,
-                        TransactionSplit.left_line_id
-                    ),
-                ],
-                else_=None
-            ).label('other_line_id'),
-        ).join(
-            TransactionEntry,
-            TransactionEntry.line_id == TransactionLine.id
-        ).join(
-            TransactionSplit,
-            TransactionSplit.id == TransactionEntry.split_id
-        ).group_by(
-            TransactionLine.id,
-            'other_line_id'
-        ).subquery()
+def q_txn_split_fields(session, **filters):
+    '''
+    Query the fields required for the TransactionSplitSchema interface. Any
+    ledger filters (see `q_txn_schema_fields`) restrict the lines returned.
+
+    The ``transfer_id`` of a split is the opposing account when it is a
+    Personal account. Since the left account of a split is always the
+    Personal account of the Transaction, this is the left account for the
+    right line, or the right account for the left line of a transfer; both
+    are stored on the split when it is written.
+    '''
+    params = _ledger_params(**filters)
+    return cached_query(
+        session,
+        ('q_txn_split_fields', frozenset(params)),
+        lambda s: _q_txn_split_fields(s, params),
+        **params
+    )
+
 
-    OtherLine = aliased(TransactionLine)
-    sq_transfer_id = session.query(
-        TransactionLine.id.label('line_id'),
-        case(
-            [
-                (
-                    Account.role == AccountRole.Personal,
-                    Account.id
+def _q_txn_split_fields(session, filters):
+    '''Build the `q_txn_split_fields` query for the named filters'''
+    transfer_id = case(
+        [
+            (
+                and_(
+                    TransactionLine.id == TransactionSplit.left_line_id,
+                    TransactionSplit.transfer == True,      # noqa: E712
                 ),
-            ],
-            else_=None
-        ).label('transfer_id'),
-    ).join(
-        sq_other_line,
-        sq_other_line.c.line_id == TransactionLine.id
-    ).join(
-        OtherLine,
-        OtherLine.id == sq_other_line.c.other_line_id
-    ).join(
-        Account,
-        Account.id == OtherLine.account_id
-    ).distinct().subquery()
+                TransactionSplit.right_account_id
+            ),
+            (
+                TransactionLine.id == TransactionSplit.right_line_id,
+                TransactionSplit.left_account_id
+            ),
+        ],
+        else_=None
+    )
 
-    return session \
+    q = session \
         .query(
             TransactionLine.id.label('line_id'),
             TransactionSplit.id.label('split_id'),
             TransactionSplit.category_id,
-            sq_transfer_id.c.transfer_id,
+            transfer_id.label('transfer_id'),
             TransactionEntry.amount,
             TransactionEntry.currency,
             TransactionSplit.type,
@@ -184,16 +288,72 @@ def q_txn_split_fields(session):
         ).join(
             TransactionSplit,
             TransactionSplit.id == TransactionEntry.split_id
-        ).join(
-            sq_transfer_id,
-            sq_transfer_id.c.line_id == TransactionLine.id
+        ).filter(
+            # Skip currency trading lines which are neither left nor right
+            or_(
+                TransactionLine.id == TransactionSplit.left_line_id,
+                TransactionLine.id == TransactionSplit.right_line_id,
+            )
         )
 
+    if filters:
+        q = _filter_ledger(
+            q.join(
+                Transaction,
+                Transaction.id == TransactionLine.transaction_id
+            ),
+            filters
+        )
+
+    return q
+
+
+def q_txn_schema_fields(
+    session, *, reverse=False, user_id=None, account_id=None, start_date=None,
+    end_date=None, cleared=None, reconciled=None, payee_id=None,
+    category_id=None, min_amount=None, max_amount=None
+):
+    '''
+    Query the fields required by the TransactionSchema interface
+
+    The ledger filters are pushed down into the running balance and split
+    subqueries so that only the requested window of the ledger is computed.
+    The user, account and date range filters are applied before the balance
+    window function; the remaining line filters are applied to the split
+    subquery and to the outer query. ``reconciled`` and ``cleared`` select
+    lines with that state when not None, ``category_id`` selects
+    transactions with at least one split in the category and the amount
+    range applies to the signed line amount.
+    '''
+    params = _ledger_params(
+        user_id=user_id,
+        account_id=account_id,
+        start_date=start_date,
+        end_date=end_date,
+        cleared=cleared,
+        reconciled=reconciled,
+        payee_id=payee_id,
+        category_id=category_id,
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+    return cached_query(
+        session,
+        ('q_txn_schema_fields', reverse, frozenset(params)),
+        lambda s: _q_txn_schema_fields(s, reverse, params),
+        **params
+    )
+
+
+def _q_txn_schema_fields(session, reverse, filters):
+    '''Build the `q_txn_schema_fields` query for the named filters'''
+    sq_txn_bals = _q_txn_account_balances(
+        session,
+        {'user_id', 'account_id', 'start_date', 'end_date'} & set(filters),
+    ).subquery()
 
-def q_txn_schema_fields(session, *, reverse=False):
-    '''Query the fields required by the TransactionSchema interface'''
-    sq_txn_bals = q_txn_account_balances(session).subquery()
-    sq_txn_splits = q_txn_split_fields(session).subquery()
+    line_filters = set(filters) - {'min_amount', 'max_amount'}
+    sq_txn_splits = _q_txn_split_fields(session, line_filters).subquery()
     q = session \
         .query(
             Transaction.id.label('transaction_id'),
@@ -239,6 +399,12 @@ def q_txn_schema_fields(session, *, reverse=False):
             sq_txn_splits.c.line_id == TransactionLine.id,
         )
 
+    q = _filter_ledger(q, line_filters)
+    if 'min_amount' in filters:
+        q = q.filter(sq_txn_bals.c.amount >= bindparam('min_amount'))
+    if 'max_amount' in filters:
+        q = q.filter(sq_txn_bals.c.amount <= bindparam('max_amount'))
+
     # Ensure predictable transaction / balance ordering; needs to match what
     # is used in q_txn_account_balances
     if reverse:
@@ -255,22 +421,83 @@ def q_txn_schema_fields(session, *, reverse=False):
     )
 
 
-def q_txn_account_lines(session, account_id=None, *, reverse=False, reconciled=True):
-    '''Return TransactionSchema lines for an account (or all user accounts)'''
-    q = q_txn_schema_fields(session, reverse=reverse) \
-        .filter(Account.role == AccountRole.Personal)
+def q_txn_account_lines(session, account_id=None, *, reverse=False, **filters):
+    '''
+    Return TransactionSchema lines for an account (or all user accounts),
+    optionally restricted by the ledger filters of `q_txn_schema_fields`
+    '''
+    params = _ledger_params(account_id=account_id, **filters)
+    return cached_query(
+        session,
+        ('q_txn_account_lines', reverse, frozenset(params)),
+        lambda s: _q_txn_schema_fields(s, reverse, params)
+        .filter(Account.role == AccountRole.Personal),
+        **params
+    )
 
-    if not reconciled:
-        q = q.filter(TransactionLine.reconciled == False)   # noqa: E712
 
-    if account_id is not None:
-        q = q.filter(Account.id == account_id)
+def q_txn_category_lines(session, category_id, *, reverse=False, **filters):
+    '''
+    Return TransactionSchema lines for an expense category, optionally
+    restricted by the ledger filters of `q_txn_schema_fields`
+    '''
+    params = _ledger_params(category_id=category_id, **filters)
+    return cached_query(
+        session,
+        ('q_txn_category_lines', reverse, frozenset(params)),
+        lambda s: _q_txn_schema_fields(s, reverse, params)
+        .filter(Account.role == AccountRole.Budget)
+        .filter_by(category_id=bindparam('category_id')),
+        **params
+    )
 
-    return q
 
+def q_txn_search(
+    session, user_id, terms=None, *, account_id=None, start_date=None,
+    end_date=None, min_amount=None, max_amount=None
+):
+    '''
+    Return the Transaction and Line ids of a user's Transactions matching
+    all of the full-text search terms and the optional filters. The line is
+    the one posted to ``account_id`` if given (so that transfers are found
+    from either side), or to the Transaction's own account otherwise, and the
+    amount filters apply to the signed amount of that line.
+    '''
+    line_account_id = Transaction.account_id if account_id is None else account_id
+    q = session \
+        .query(
+            Transaction.id.label('transaction_id'),
+            TransactionLine.id.label('line_id'),
+        ).join(
+            TransactionLine,
+            and_(
+                TransactionLine.transaction_id == Transaction.id,
+                TransactionLine.account_id == line_account_id,
+            )
+        ).filter(
+            Transaction.user_id == user_id
+        )
+
+    if terms:
+        q = q.filter(Transaction.id.in_(q_search_match(session, terms)))
 
-def q_txn_category_lines(session, category_id, *, reverse=False):
-    '''Return TransactionSchema lines for an expense category'''
-    return q_txn_schema_fields(session, reverse=reverse) \
-        .filter(Account.role == AccountRole.Budget) \
-        .filter_by(category_id=category_id)
+    if start_date is not None:
+        q = q.filter(Transaction.date >= start_date)
+
+    if end_date is not None:
+        q = q.filter(Transaction.date <= end_date)
+
+    if min_amount is not None or max_amount is not None:
+        sq_amount = session \
+            .query(
+                func.sum(TransactionEntry.amount)
+            ).filter(
+                TransactionEntry.line_id == TransactionLine.id
+            ).scalar_subquery()
+
+        if min_amount is not None:
+            q = q.filter(sq_amount >= min_amount)
+        if max_amount is not None:
+            q = q.filter(sq_amount <= max_amount)
+
+    return q
@@ -0,0 +1,125 @@
+"""Jade Tree Read Replica Routing.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+"""
+
+from contextlib import contextmanager
+import functools
+import inspect
+import random
+import re
+
+from flask_sqlalchemy import SignallingSession, get_state
+from sqlalchemy.engine import Connection
+
+__all__ = ('RoutingSession', 'init_replicas', 'replica_read', 'replica_reads')
+
+#: Prefix of the SQLALCHEMY_BINDS keys of the read replica engines
+REPLICA_BIND_PREFIX = '_jt_replica_'
+
+
+def init_replicas(app):
+    """Register the ``DB_REPLICA_URI`` read replicas with the Application.
+
+    ``DB_REPLICA_URI`` holds one database URI, a list of URIs, or several
+    URIs separated by whitespace or commas. Each replica is added to the
+    ``SQLALCHEMY_BINDS`` with a private key, so Flask-SQLalchemy creates its
+    engine with the same engine options as the primary database.
+
+    :returns: the list of replica bind keys
+    """
+    uris = app.config.get('DB_REPLICA_URI') or []
+    if isinstance(uris, str):
+        uris = [u for u in re.split(r'[\s,]+', uris) if u]
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    keys = []
+    for i, uri in enumerate(uris):
+        key = f'{REPLICA_BIND_PREFIX}{i}'
+        binds[key] = uri
+        keys.append(key)
+
+    if keys:
+        app.config['SQLALCHEMY_BINDS'] = binds
+    app.config['_JT_DB_REPLICAS'] = keys
+
+    return keys
+
+
+class RoutingSession(SignallingSession):
+    """Session which routes read-only service calls to a read replica.
+
+    Statements are sent to a replica only within `replica_reads` (usually
+    entered by a `replica_read` service function), and only while the
+    session has not written anything. Once the session flushes or executes
+    an INSERT, UPDATE or DELETE it sticks to the primary database until it
+    is removed at the end of the request, so the request always reads its
+    own writes. Each session uses one replica, chosen at random.
+
+    Sessions bound to an explicit Connection (as in the test fixtures) are
+    never routed.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        if self._flushing or getattr(clause, 'is_dml', False) or not self._is_clean():
+            self.info['jt_primary'] = True
+
+        elif self.info.get('jt_replica_depth') and not self.info.get('jt_primary'):
+            engine = self._replica_engine()
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper, clause)
+
+    def _replica_engine(self):
+        keys = self.app.config.get('_JT_DB_REPLICAS')
+        if not keys or isinstance(self.bind, Connection):
+            return None
+
+        if 'jt_replica' not in self.info:
+            self.info['jt_replica'] = random.choice(keys)
+
+        return get_state(self.app).db.get_engine(self.app, bind=self.info['jt_replica'])
+
+
+@contextmanager
+def replica_reads(session):
+    """Allow the session to read from a replica within the block."""
+    if session is None:
+        yield session
+        return
+
+    session.info['jt_replica_depth'] = session.info.get('jt_replica_depth', 0) + 1
+    try:
+        yield session
+    finally:
+        session.info['jt_replica_depth'] -= 1
+
+
+def replica_read(fn):
+    """Mark a read-only service function as safe to run on a replica.
+
+    The function takes the session as its first argument (or as the
+    ``session`` keyword). Generator functions read from the replica until
+    the generator is exhausted or closed.
+    """
+    def _session(args, kwargs):
+        return kwargs['session'] if 'session' in kwargs else args[0]
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            with replica_reads(_session(args, kwargs)):
+                yield from fn(*args, **kwargs)
+
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with replica_reads(_session(args, kwargs)):
+            return fn(*args, **kwargs)
+
+    return wrapper
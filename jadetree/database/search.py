@@ -0,0 +1,177 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+# Transaction Full-Text Search Index
+
+import re
+
+from sqlalchemy import Integer, event, func, inspect, select, text
+from sqlalchemy.orm import Session
+
+from jadetree.domain.models import Payee, Transaction, TransactionSplit
+
+from .tables import (
+    TRANSACTION_SEARCH_FTS,
+    payees,
+    transaction_search,
+    transaction_splits,
+    transactions,
+)
+
+__all__ = (
+    'init_search',
+    'q_search_match',
+    'rebuild_search_index',
+    'search_document',
+    'search_terms',
+    'update_search_index',
+)
+
+#: Number of Transactions indexed per statement (below the SQLite limit on
+#: bound parameters)
+INDEX_CHUNK_SIZE = 500
+
+_term_re = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def search_terms(query):
+    '''Split a user search string into lower-case word terms'''
+    if not query:
+        return []
+    return [t.lower() for t in _term_re.findall(query)]
+
+
+def search_document(payee_name, memo, check, split_memos):
+    '''Build the search document text for a single Transaction'''
+    parts = [payee_name, memo, check]
+    parts.extend(split_memos)
+    return ' '.join(p for p in parts if p)
+
+
+def _chunks(ids):
+    ids = sorted(set(ids))
+    for i in range(0, len(ids), INDEX_CHUNK_SIZE):
+        yield ids[i:i + INDEX_CHUNK_SIZE]
+
+
+def _index_chunk(session, txn_ids):
+    '''Rebuild the search documents for a chunk of Transaction ids'''
+    t = transactions.c
+    rows = session.execute(
+        select([t.id, t.user_id, t.memo, t.check, payees.c.name])
+        .select_from(transactions.outerjoin(payees, payees.c.id == t.payee_id))
+        .where(t.id.in_(txn_ids))
+    ).fetchall()
+
+    split_memos = {}
+    for r in session.execute(
+        select([transaction_splits.c.transaction_id, transaction_splits.c.memo])
+        .where(transaction_splits.c.transaction_id.in_(txn_ids))
+        .where(transaction_splits.c.memo != None)     # noqa: E711
+        .order_by(transaction_splits.c.id)
+    ):
+        split_memos.setdefault(r.transaction_id, []).append(r.memo)
+
+    session.execute(
+        transaction_search.delete().where(
+            transaction_search.c.transaction_id.in_(txn_ids)
+        )
+    )
+
+    if rows:
+        session.execute(transaction_search.insert(), [
+            dict(
+                transaction_id=r.id,
+                user_id=r.user_id,
+                document=search_document(r.name, r.memo, r.check, split_memos.get(r.id, ())),
+            ) for r in rows
+        ])
+
+
+def update_search_index(session, transaction_ids):
+    '''
+    Rebuild the search documents for the given Transaction ids. Documents for
+    ids which no longer exist are removed.
+    '''
+    for chunk in _chunks(transaction_ids):
+        _index_chunk(session, chunk)
+
+
+def rebuild_search_index(session, user_id=None):
+    '''
+    Rebuild the search index for all Transactions, or for all Transactions
+    belonging to a single user. This is required after Transactions are
+    written with Core statements which bypass the ORM.
+    '''
+    q = select([transactions.c.id])
+    d = transaction_search.delete()
+    if user_id is not None:
+        q = q.where(transactions.c.user_id == user_id)
+        d = d.where(transaction_search.c.user_id == user_id)
+
+    session.execute(d)
+    update_search_index(session, [r[0] for r in session.execute(q)])
+
+
+def q_search_match(session, terms):
+    '''
+    Return a selectable of Transaction ids whose search document contains
+    every term (as a word prefix) using the dialect's full-text index.
+    '''
+    if session.bind.dialect.name == 'postgresql':
+        tsquery = ' & '.join(f'{t}:*' for t in terms)
+        return select([transaction_search.c.transaction_id]).where(
+            func.to_tsvector('simple', transaction_search.c.document).op('@@')(
+                func.to_tsquery('simple', tsquery)
+            )
+        )
+
+    # FTS5 implicitly ANDs the quoted prefix terms
+    match = ' '.join(f'"{t}"*' for t in terms)
+    return text(
+        f'SELECT rowid AS transaction_id FROM {TRANSACTION_SEARCH_FTS} '
+        f'WHERE {TRANSACTION_SEARCH_FTS} MATCH :match'
+    ).bindparams(match=match).columns(transaction_id=Integer)
+
+
+def _changed_payee_name(obj):
+    return inspect(obj).attrs.name.history.has_changes()
+
+
+def _sync_search_index(session, flush_context):
+    '''Reindex Transactions whose searchable fields changed in the flush'''
+    txn_ids = set()
+    payee_ids = set()
+
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Transaction):
+            txn_ids.add(obj.id)
+        elif isinstance(obj, TransactionSplit):
+            txn_ids.add(obj.transaction_id)
+        elif isinstance(obj, Payee) and obj.id is not None and _changed_payee_name(obj):
+            payee_ids.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, (Transaction, TransactionSplit)):
+            txn_ids.add(obj.id if isinstance(obj, Transaction) else obj.transaction_id)
+
+    if payee_ids:
+        txn_ids.update(
+            r[0] for r in session.execute(
+                select([transactions.c.id]).where(transactions.c.payee_id.in_(payee_ids))
+            )
+        )
+
+    txn_ids.discard(None)
+    if txn_ids:
+        update_search_index(session, txn_ids)
+
+
+def init_search():
+    '''Register the Session hook which keeps the search index in sync'''
+    if not event.contains(Session, 'after_flush', _sync_search_index):
+        event.listen(Session, 'after_flush', _sync_search_index)
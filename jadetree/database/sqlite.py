@@ -0,0 +1,176 @@
+"""Jade Tree SQLite Connection Profile.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+"""
+
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+
+from jadetree.exc import ConfigError
+
+__all__ = ('SQLiteProfile', 'init_sqlite')
+
+#: Journal modes accepted for ``DB_SQLITE_JOURNAL_MODE``
+SQLITE_JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+
+#: Synchronous levels accepted for ``DB_SQLITE_SYNCHRONOUS``
+SQLITE_SYNCHRONOUS = ('off', 'normal', 'full', 'extra')
+
+
+def _config_bool(value):
+    """Read a boolean configuration value, which may come from the environment."""
+    if isinstance(value, str):
+        return value.strip().lower() not in ('', '0', 'false', 'no', 'off')
+    return bool(value)
+
+
+class SQLiteProfile:
+    """Connection settings applied to each new SQLite connection.
+
+    The default profile switches the database to the write-ahead log, so
+    readers are not blocked by a writer and only one ``fsync`` is needed per
+    checkpoint rather than per commit (``synchronous=NORMAL`` is durable
+    across application crashes but may lose the last commits on a power
+    failure). Writers wait up to ``busy_timeout`` milliseconds for the
+    database lock instead of failing with "database is locked", and the
+    page cache, memory-mapped I/O size and in-memory temporary tables speed
+    up the larger report queries.
+
+    SQLite recommends that long-running applications run ``PRAGMA optimize``
+    periodically to refresh the query planner statistics; this is done when
+    a connection is returned to the pool, at most once every
+    ``optimize_interval`` seconds.
+    """
+    def __init__(
+        self,
+        journal_mode='wal',
+        synchronous='normal',
+        cache_size=65536,
+        mmap_size=268435456,
+        busy_timeout=5000,
+        optimize_interval=3600,
+    ):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.optimize_interval = optimize_interval
+
+        self._lock = threading.Lock()
+        self._last_optimize = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config):
+        """Load the profile from the ``DB_SQLITE_*`` configuration keys.
+
+        Returns None if ``DB_SQLITE_PROFILE`` is false.
+        """
+        if not _config_bool(config.get('DB_SQLITE_PROFILE', True)):
+            return None
+
+        options = {}
+        for key, arg, choices in (
+            ('DB_SQLITE_JOURNAL_MODE', 'journal_mode', SQLITE_JOURNAL_MODES),
+            ('DB_SQLITE_SYNCHRONOUS', 'synchronous', SQLITE_SYNCHRONOUS),
+        ):
+            if key in config:
+                value = str(config[key]).lower()
+                if value not in choices:
+                    raise ConfigError(
+                        '{} must be one of {}'.format(key, ', '.join(choices)),
+                        config_key=key
+                    )
+                options[arg] = value
+
+        for key, arg in (
+            ('DB_SQLITE_CACHE_SIZE', 'cache_size'),
+            ('DB_SQLITE_MMAP_SIZE', 'mmap_size'),
+            ('DB_SQLITE_BUSY_TIMEOUT', 'busy_timeout'),
+            ('DB_SQLITE_OPTIMIZE', 'optimize_interval'),
+        ):
+            if key in config:
+                try:
+                    value = int(config[key])
+                except (TypeError, ValueError):
+                    value = None
+                if value is None or value < 0:
+                    raise ConfigError(
+                        '{} must be a non-negative integer'.format(key),
+                        config_key=key
+                    )
+                options[arg] = value
+
+        return cls(**options)
+
+    def pragmas(self):
+        """Return the ``PRAGMA`` statements run on each new connection."""
+        return [
+            'PRAGMA busy_timeout = {:d}'.format(self.busy_timeout),
+            'PRAGMA journal_mode = {}'.format(self.journal_mode),
+            'PRAGMA synchronous = {}'.format(self.synchronous),
+            # Negative cache sizes are in KiB rather than pages
+            'PRAGMA cache_size = -{:d}'.format(self.cache_size),
+            'PRAGMA mmap_size = {:d}'.format(self.mmap_size),
+            'PRAGMA temp_store = MEMORY',
+        ]
+
+    def on_connect(self, dbapi_connection, connection_record):
+        """Apply the profile to a new DBAPI connection."""
+        cursor = dbapi_connection.cursor()
+        try:
+            for stmt in self.pragmas():
+                cursor.execute(stmt)
+        finally:
+            cursor.close()
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        """Run ``PRAGMA optimize`` if the optimize interval has passed."""
+        if not self.optimize_interval or dbapi_connection is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_optimize < self.optimize_interval:
+                return
+            self._last_optimize = now
+
+        # Statistics are refreshed on a best-effort basis, so a busy database
+        # is not reported to the caller returning the connection
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass
+        finally:
+            cursor.close()
+
+    def install(self, engine):
+        """Register the profile connection hooks on an Engine."""
+        event.listen(engine, 'connect', self.on_connect)
+        event.listen(engine, 'checkin', self.on_checkin)
+
+
+def init_sqlite(app, engine):
+    """Apply the configured `SQLiteProfile` to an SQLite Engine.
+
+    Returns the installed profile, or None if the Engine is not an SQLite
+    Engine or the profile is disabled.
+    """
+    if engine.dialect.name != 'sqlite':
+        return None
+
+    profile = SQLiteProfile.from_config(app.config)
+    if profile is not None:
+        profile.install(engine)
+        app.logger.debug(
+            'SQLite profile: journal_mode=%s synchronous=%s',
+            profile.journal_mode,
+            profile.synchronous,
+        )
+
+    return profile
@@ -9,12 +9,15 @@ from jadetree.domain.types import (
     AccountRole,
     AccountSubtype,
     AccountType,
+    JobStatus,
     PayeeRole,
     TransactionType,
 )
+from jadetree.domain.util import new_version_token
 
 from .globals import db
 from .types import AmountType, ArrowType
+from .views import REFRESH_WRITE
 
 
 def _enum_values(x):
@@ -65,6 +68,9 @@ users = db.Table(
     db.Column('fmt_currency', db.String(64), default=None),
     db.Column('fmt_accounting', db.String(64), default=None),
 
+    # Payee Index Version (replaced whenever a Payee is added or renamed)
+    db.Column('payee_version', db.String(32), default=new_version_token),
+
     # Mixin Columns
     db.Column('created_at', ArrowType),
     db.Column('modified_at', ArrowType),
@@ -95,6 +101,10 @@ accounts = db.Table(
     db.Column('opened', db.Date),
     db.Column('closed', db.Date),
 
+    # Reconciliation Checkpoint
+    db.Column('reconciled_balance', AmountType),
+    db.Column('reconciled_at', db.Date),
+
     db.Column('display_order', db.Integer),
 
     # Mixin Columns
@@ -118,6 +128,9 @@ budgets = db.Table(
     db.Column('name', db.String(128), nullable=False),
     db.Column('currency', db.String(8), nullable=False),
 
+    # Category Tree Version (replaced whenever a Category changes)
+    db.Column('category_version', db.String(32), default=new_version_token),
+
     # Mixin Columns
     db.Column('notes', db.Text),
     db.Column('created_at', ArrowType),
@@ -161,6 +174,7 @@ budget_entries = db.Table(
 
     # Budget Entry Attributes
     db.Column('month', db.Date),
+    db.Column('month_key', db.Integer, index=True),
     db.Column('amount', AmountType),
     db.Column('rollover', db.Boolean, default=False),
 
@@ -183,12 +197,19 @@ transactions = db.Table(
 
     # Transaction Attributes
     db.Column('date', db.Date, nullable=False),
+    db.Column('month_key', db.Integer, index=True),
     db.Column('check', db.String(64)),
     db.Column('memo', db.String(255)),
 
     db.Column('currency', db.String(8), nullable=False),
     db.Column('foreign_currency', db.String(8)),
     db.Column('foreign_exchrate', AmountType(scale=6)),
+
+    # Index for the paginated Transaction list (newest first)
+    db.Index('ix_transactions_user_date', 'user_id', 'date', 'id'),
+
+    # Index for the latest Transactions of a Payee (autofill statistics)
+    db.Index('ix_transactions_payee_date', 'payee_id', 'date', 'id'),
 )
 
 
@@ -208,6 +229,15 @@ transaction_splits = db.Table(
     # Transaction Split Attributes
     db.Column('type', db.Enum(TransactionType, values_callable=_enum_values), nullable=False),
     db.Column('memo', db.String(255)),
+
+    # Accounts of the left and right lines and the transfer flag, stored when
+    # the split is written so ledger queries need not derive them
+    db.Column('left_account_id', db.Integer, db.ForeignKey('accounts.id'), nullable=True),
+    db.Column('right_account_id', db.Integer, db.ForeignKey('accounts.id'), nullable=True),
+    db.Column('transfer', db.Boolean, nullable=False, default=False),
+
+    # Index for loading the Splits of a range of Transactions
+    db.Index('ix_transaction_splits_transaction', 'transaction_id'),
 )
 
 
@@ -227,6 +257,12 @@ transaction_lines = db.Table(
     db.Column('cleared_at', db.Date),
     db.Column('reconciled', db.Boolean, default=False),
     db.Column('reconciled_at', db.Date),
+
+    # Index for finding Lines cleared since the last Reconciliation
+    db.Index('ix_transaction_lines_reconcile', 'account_id', 'reconciled', 'cleared'),
+
+    # Index for loading the Lines of a range of Transactions
+    db.Index('ix_transaction_lines_transaction', 'transaction_id'),
 )
 
 
@@ -244,6 +280,10 @@ transaction_entries = db.Table(
     # Ledger Entry Attributes
     db.Column('amount', AmountType, nullable=False),
     db.Column('currency', db.String(8), nullable=False),
+
+    # Indexes for loading the Entries of Lines and Splits
+    db.Index('ix_transaction_entries_line', 'line_id'),
+    db.Index('ix_transaction_entries_split', 'split_id'),
 )
 
 
@@ -267,7 +307,230 @@ payees = db.Table(
     db.Column('memo', db.String(255)),
     db.Column('amount', AmountType),
 
+    # Autofill Statistics (maintained by the ledger services)
+    db.Column('use_count', db.Integer, nullable=False, default=0),
+    db.Column('last_date', db.Date),
+    db.Column('last_type', db.Enum(TransactionType, values_callable=_enum_values)),
+    db.Column(
+        'last_category_id',
+        db.Integer,
+        db.ForeignKey('categories.id', ondelete='SET NULL'),
+        nullable=True,
+    ),
+    db.Column(
+        'last_account_id',
+        db.Integer,
+        db.ForeignKey('accounts.id', ondelete='SET NULL'),
+        nullable=True,
+    ),
+    db.Column('last_amount', AmountType),
+    db.Column('last_memo', db.String(255)),
+
     # Mixin Columns
     db.Column('created_at', ArrowType),
     db.Column('modified_at', ArrowType),
 )
+
+
+#: `Job` table
+jobs = db.Table(
+    'jobs',
+
+    # Primary Key
+    db.Column('id', db.Integer, primary_key=True),
+
+    # Foreign Keys
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False),
+
+    # Job Attributes
+    db.Column('kind', db.String(32), nullable=False),
+    db.Column('status', db.Enum(JobStatus, values_callable=_enum_values), nullable=False),
+    db.Column('params', db.JSON),
+
+    db.Column('progress', db.Integer, nullable=False, default=0),
+    db.Column('message', db.Text),
+
+    # Downloadable Artifact
+    db.Column('artifact_name', db.String(255)),
+    db.Column('artifact_type', db.String(64)),
+    db.Column('artifact_path', db.String(1024)),
+
+    db.Column('created_at', ArrowType),
+    db.Column('started_at', ArrowType),
+    db.Column('finished_at', ArrowType),
+
+    # Process running the Job and the last time it reported being alive
+    db.Column('owner', db.String(64)),
+    db.Column('heartbeat_at', ArrowType),
+
+    # Index for the per-user Job list and for claiming queued Jobs
+    db.Index('ix_jobs_user_status', 'user_id', 'status'),
+    db.Index('ix_jobs_status_id', 'status', 'id'),
+)
+
+
+#: `TransactionSearch` table holding the full-text search document for each
+#: Transaction (payee name, memos and check number), kept in sync on flush by
+#: `jadetree.database.search`
+transaction_search = db.Table(
+    'transaction_search',
+
+    # Primary Key
+    db.Column(
+        'transaction_id',
+        db.Integer,
+        db.ForeignKey('transactions.id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+
+    # Foreign Keys
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False, index=True),
+
+    # Search Document
+    db.Column('document', db.Text, nullable=False),
+)
+
+#: Name of the SQLite FTS5 index over `transaction_search`
+TRANSACTION_SEARCH_FTS = 'transaction_search_fts'
+
+#: Dialect-specific full-text index DDL for `transaction_search`. SQLite uses
+#: an external-content FTS5 table synchronized by triggers; PostgreSQL uses a
+#: GIN expression index over the document tsvector.
+TRANSACTION_SEARCH_DDL = {
+    'sqlite': (
+        f'''CREATE VIRTUAL TABLE {TRANSACTION_SEARCH_FTS} USING fts5(
+            document,
+            content='transaction_search',
+            content_rowid='transaction_id',
+            prefix='2 3'
+        )''',
+        f'''CREATE TRIGGER {TRANSACTION_SEARCH_FTS}_ai AFTER INSERT ON transaction_search BEGIN
+            INSERT INTO {TRANSACTION_SEARCH_FTS}(rowid, document)
+                VALUES (new.transaction_id, new.document);
+        END''',
+        f'''CREATE TRIGGER {TRANSACTION_SEARCH_FTS}_ad AFTER DELETE ON transaction_search BEGIN
+            INSERT INTO {TRANSACTION_SEARCH_FTS}({TRANSACTION_SEARCH_FTS}, rowid, document)
+                VALUES ('delete', old.transaction_id, old.document);
+        END''',
+        f'''CREATE TRIGGER {TRANSACTION_SEARCH_FTS}_au AFTER UPDATE ON transaction_search BEGIN
+            INSERT INTO {TRANSACTION_SEARCH_FTS}({TRANSACTION_SEARCH_FTS}, rowid, document)
+                VALUES ('delete', old.transaction_id, old.document);
+            INSERT INTO {TRANSACTION_SEARCH_FTS}(rowid, document)
+                VALUES (new.transaction_id, new.document);
+        END''',
+    ),
+    'postgresql': (
+        '''CREATE INDEX ix_transaction_search_document ON transaction_search
+            USING gin (to_tsvector('simple', document))''',
+    ),
+}
+
+for _dialect, _stmts in TRANSACTION_SEARCH_DDL.items():
+    for _stmt in _stmts:
+        db.event.listen(
+            transaction_search,
+            'after_create',
+            db.DDL(_stmt).execute_if(dialect=_dialect),
+        )
+
+db.event.listen(
+    transaction_search,
+    'before_drop',
+    db.DDL(f'DROP TABLE IF EXISTS {TRANSACTION_SEARCH_FTS}').execute_if(dialect='sqlite'),
+)
+
+
+#: Source tables of the Transaction aggregate views, which are refreshed when
+#: any of them is written
+TRANSACTION_VIEW_TABLES = (
+    'accounts',
+    'transactions',
+    'transaction_entries',
+    'transaction_lines',
+    'transaction_splits',
+)
+
+#: Budget Outflows and Transaction counts by Category and Month
+budget_outflows = db.View(
+    'budget_outflows',
+    db.select([
+        transaction_splits.c.category_id.label('category_id'),
+        transactions.c.month_key.label('month_key'),
+        db.func.sum(
+            transaction_entries.c.amount * db.case(
+                [
+                    (accounts.c.type == AccountType.Liability, 1),
+                    (accounts.c.type == AccountType.Expense, 1),
+                ],
+                else_=-1,
+            )
+        ).label('outflow'),
+        db.func.count(transactions.c.id.distinct()).label('num_transactions'),
+    ]).select_from(
+        transaction_splits.join(
+            transaction_entries,
+            transaction_entries.c.split_id == transaction_splits.c.id,
+        ).join(
+            transaction_lines,
+            transaction_lines.c.id == transaction_entries.c.line_id,
+        ).join(
+            accounts,
+            accounts.c.id == transaction_lines.c.account_id,
+        ).join(
+            transactions,
+            transactions.c.id == transaction_splits.c.transaction_id,
+        )
+    ).where(
+        accounts.c.role == AccountRole.Budget,
+    ).group_by(
+        transaction_splits.c.category_id,
+        transactions.c.month_key,
+    ),
+    materialized=True,
+    refresh=REFRESH_WRITE,
+    refresh_tables=TRANSACTION_VIEW_TABLES,
+    refresh_keys=('category_id', 'month_key'),
+)
+
+#: Asset and Liability Account totals by Month
+net_worth_months = db.View(
+    'net_worth_months',
+    db.select([
+        accounts.c.user_id.label('user_id'),
+        accounts.c.id.label('account_id'),
+        transactions.c.month_key.label('month_key'),
+        db.func.sum(
+            db.case(
+                [(accounts.c.type == AccountType.Asset, transaction_entries.c.amount)],
+                else_=0
+            )
+        ).label('asset'),
+        db.func.sum(
+            db.case(
+                [(accounts.c.type == AccountType.Liability, transaction_entries.c.amount)],
+                else_=0
+            )
+        ).label('liability'),
+    ]).select_from(
+        transactions.join(
+            transaction_lines,
+            transaction_lines.c.transaction_id == transactions.c.id,
+        ).join(
+            transaction_entries,
+            transaction_entries.c.line_id == transaction_lines.c.id,
+        ).join(
+            accounts,
+            accounts.c.id == transaction_lines.c.account_id,
+        )
+    ).where(
+        accounts.c.type.in_((AccountType.Asset, AccountType.Liability)),
+    ).group_by(
+        accounts.c.user_id,
+        accounts.c.id,
+        transactions.c.month_key,
+    ),
+    materialized=True,
+    refresh=REFRESH_WRITE,
+    refresh_tables=TRANSACTION_VIEW_TABLES,
+    refresh_keys=('account_id', 'month_key'),
+)
@@ -4,13 +4,47 @@ Jade Tree Personal Budgeting Application | jadetree.io
 Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
 """
 
-from decimal import Decimal, getcontext
+from decimal import Context, Decimal
 
 from sqlalchemy.types import Integer, Numeric, TypeDecorator
 
 __all__ = ('AmountType', )
 
 
+def _sqlite_converters(precision, scale):
+    """Build the SQLite integer conversion functions for an `AmountType`.
+
+    Values which are not :class:`decimal.Decimal` objects are converted
+    through :func:`str` when stored, which matters for float values: without
+    it ``Decimal(17.99)`` is ``17.989999999999998436805981327779591083526611328125``
+    and would be stored as 179899 rather than 179900. Stored values are
+    rounded to ``precision`` digits in a private context and any digits
+    beyond ``scale`` are truncated.
+
+    Loaded values are divided by the pre-built scale factor, which is exact
+    in any decimal context with at least 19 digits of precision (the default
+    is 28) and keeps the ``Decimal(value) / 10**scale`` representation (so
+    179900 loads as ``17.99``). The operator is used rather than a private
+    context's ``divide`` method since this runs for every fetched amount.
+    """
+    factor = Decimal(10**scale)
+    multiply = Context(prec=precision).multiply
+
+    def to_integer(value):
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        return int(multiply(value, factor))
+
+    def from_integer(value):
+        if value is None:
+            return None
+        return Decimal(value) / factor
+
+    return to_integer, from_integer
+
+
 class AmountType(TypeDecorator):
     """SQLalchemy Amount Type.
 
@@ -26,6 +60,9 @@ class AmountType(TypeDecorator):
     one trillion currency units, but the precision and scale may be overridden.
     SQLite and PostgreSQL use 64-bit integers as the underlying storage, so the
     practical limit on the precision (total digits) is 18.
+
+    The SQLite integer conversions never change the thread's decimal context,
+    and are used directly as the SQLalchemy bind and result processors.
     """
     #: Caching is allowed
     cache_ok = True
@@ -40,6 +77,8 @@ class AmountType(TypeDecorator):
         self._scale = scale
         self._multiplier = 10**scale
 
+        self._to_integer, self._from_integer = _sqlite_converters(precision, scale)
+
     def load_dialect_impl(self, dialect):
         """Load the dialect-native type.
 
@@ -53,21 +92,18 @@ class AmountType(TypeDecorator):
                 Numeric(self._precision, self._scale)
             )
 
+    def to_integer(self, value):
+        """Convert an amount to its SQLite integer representation."""
+        return self._to_integer(value)
+
+    def from_integer(self, value):
+        """Convert an SQLite integer to a :class:`decimal.Decimal` amount."""
+        return self._from_integer(value)
+
     def process_bind_param(self, value, dialect):
         """Assign the Bind Parameter Value from :class:`decimal.Decimal`."""
-        if value is None:
-            return None
-        elif dialect.name == 'sqlite':
-            # Note: casting to str is important in case the value passed in
-            #       is a float object.  For example, without the explicit cast,
-            #       Decimal(17.99) * 10000 = 179899, while
-            #       Decimal('17.99') * 10000 = 179900
-            #
-            # Expliticly setting the precision may do the same thing, but we do
-            # both to be safe (this also fixes Decimal(17.99) expanding to
-            # "17.989999999999998436805981327779591083526611328125")
-            getcontext().prec = self._precision
-            return int(Decimal(str(value)) * self._multiplier)
+        if dialect.name == 'sqlite':
+            return self.to_integer(value)
         return value
 
     def process_result_value(self, value, dialect):
@@ -75,5 +111,24 @@ class AmountType(TypeDecorator):
         if value is None:
             return None
         elif dialect.name == 'sqlite':
-            return Decimal(value) / self._multiplier
+            return self.from_integer(value)
         return Decimal(value)
+
+    def process_result_values(self, values, dialect):
+        """Convert a sequence of raw column values to a list of amounts."""
+        process = self.result_processor(dialect, None)
+        if process is None:
+            return list(values)
+        return list(map(process, values))
+
+    def bind_processor(self, dialect):
+        """Return the bind processor, which on SQLite is `to_integer`."""
+        if dialect.name == 'sqlite' and Integer().dialect_impl(dialect).bind_processor(dialect) is None:
+            return self._to_integer
+        return super().bind_processor(dialect)
+
+    def result_processor(self, dialect, coltype):
+        """Return the result processor, which on SQLite is `from_integer`."""
+        if dialect.name == 'sqlite' and Integer().dialect_impl(dialect).result_processor(dialect, coltype) is None:
+            return self._from_integer
+        return super().result_processor(dialect, coltype)
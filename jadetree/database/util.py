@@ -8,9 +8,42 @@
 import os
 from urllib.parse import quote_plus
 
+from sqlalchemy import tuple_
+
 from jadetree.exc import ConfigError
 
-__all__ = ('make_uri', )
+__all__ = ('keyset_pages', 'make_uri')
+
+
+def keyset_pages(session, query, keys, page_size):
+    '''
+    Yield the rows of a query in pages of ``page_size`` rows, ordered by the
+    ``keys`` columns, which must be selected by the query and identify each
+    row. Each page is a separate query for the rows after the last key of
+    the previous page, so no result is left open while the caller runs
+    other queries between pages (which MySQL server-side cursors do not
+    allow), and each page starts with an index seek rather than an offset.
+
+    :param session: Database session
+    :param query: :class:`~sqlalchemy.sql.expression.Select` without an
+        ``ORDER BY`` clause
+    :param keys: list of the key columns
+    :param page_size: number of rows in each page
+    '''
+    query = query.order_by(*keys).limit(page_size)
+    last = None
+    while True:
+        page = query
+        if last is not None:
+            page = page.where(tuple_(*keys) > tuple_(*last))
+
+        rows = session.execute(page).fetchall()
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+
+        last = [rows[-1]._mapping[k] for k in keys]
 
 
 def make_uri(app):
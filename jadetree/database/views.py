@@ -0,0 +1,427 @@
+"""Jade Tree Materialized Views.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+"""
+
+import threading
+import time
+import zlib
+
+from sqlalchemy import and_, event, inspect, select, text, tuple_
+from sqlalchemy.orm import ColumnProperty, Session, object_mapper
+from sqlalchemy.orm.interfaces import MANYTOONE
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.elements import Label
+from sqlalchemy.sql.schema import Column, Table
+
+__all__ = (
+    'MaterializedView',
+    'MaterializedViews',
+    'REFRESH_DEMAND',
+    'REFRESH_INTERVAL',
+    'REFRESH_WRITE',
+    'init_views',
+    'materialized_views',
+)
+
+#: Refresh only when `MaterializedViews.refresh` is called
+REFRESH_DEMAND = 'demand'
+
+#: Refresh at most once per interval
+REFRESH_INTERVAL = 'interval'
+
+#: Refresh the rows affected by a transaction when it commits
+REFRESH_WRITE = 'write'
+
+#: Refresh strategies accepted by `MaterializedView`
+REFRESH_STRATEGIES = (REFRESH_DEMAND, REFRESH_INTERVAL, REFRESH_WRITE)
+
+#: Maximum number of bound parameters in one statement (SQLite allows 999
+#: before version 3.32)
+MAX_BIND_PARAMS = 900
+
+
+def _chunks(values, size):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _lock_id(value):
+    """Return a stable signed 32-bit id for a PostgreSQL advisory lock."""
+    v = zlib.crc32(value.encode('utf-8'))
+    return v - (1 << 32) if v >= (1 << 31) else v
+
+
+def _source_tables(selectable):
+    """Return the tables read by a query and the columns used from each."""
+    tables = {}
+    columns = {}
+    for elem in visitors.iterate(selectable):
+        if isinstance(elem, Table):
+            tables[elem.name] = elem
+        elif isinstance(elem, Column) and elem.table is not None:
+            columns.setdefault(elem.table.name, set()).add(elem.name)
+    return tables, columns
+
+
+class MaterializedView:
+    """Materialized View created with ``db.View(..., materialized=True)``.
+
+    Views refreshed on ``write`` are stored as a table on every database and
+    kept up to date incrementally: each commit recomputes only the view rows
+    whose ``keys`` (the view's grouping columns) were affected by the rows
+    written in the transaction. Other views are native ``MATERIALIZED
+    VIEW``\\ s on PostgreSQL (refreshed concurrently when they have keys,
+    which are given a unique index), tables on SQLite, and plain views,
+    which are always current, on other databases.
+
+    The ``refresh`` strategy selects when the view is refreshed outside of
+    explicit calls to `MaterializedViews.refresh`:
+
+    ``demand``
+        Never (the view is refreshed by ``flask views refresh``).
+    ``interval``
+        By the first commit after ``interval`` seconds have passed since the
+        last refresh by this process.
+    ``write``
+        By each commit which wrote to one of the ``tables``, within the same
+        transaction, so readers never see a view which is out of date.
+    """
+    def __init__(self, table, selectable, refresh=REFRESH_DEMAND, interval=None, tables=(), keys=()):
+        if refresh not in REFRESH_STRATEGIES:
+            raise ValueError(
+                'Invalid refresh strategy "{}" for view {} (expected one of {})'.format(
+                    refresh, table.name, ', '.join(REFRESH_STRATEGIES)
+                )
+            )
+        if refresh == REFRESH_INTERVAL and not interval:
+            raise ValueError(f'View {table.name} needs a refresh interval')
+        if refresh == REFRESH_WRITE and not (tables and keys):
+            raise ValueError(f'View {table.name} needs a list of source tables and keys')
+        for k in keys:
+            if k not in selectable.selected_columns:
+                raise ValueError(f'View {table.name} has no key column {k}')
+
+        self.name = table.name
+        self.table = table
+        self.selectable = selectable
+        self.strategy = refresh
+        self.interval = interval
+        self.tables = frozenset(tables)
+        self.keys = tuple(keys)
+
+        # Columns of each source table which the view reads; writes which
+        # change only other columns do not affect the view
+        self.source_tables, self.columns = _source_tables(selectable)
+
+        self._lock = threading.Lock()
+        self._last_refresh = time.monotonic()
+
+    @property
+    def is_table(self):
+        """True if the view is stored as a table on every database."""
+        return self.strategy == REFRESH_WRITE
+
+    def is_due(self):
+        """Check if an interval view should be refreshed before a commit."""
+        if self.strategy != REFRESH_INTERVAL:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_refresh < self.interval:
+                return False
+            self._last_refresh = now
+            return True
+
+    def affects(self, table, changed):
+        """Check if changing columns of a source table row affects the view.
+
+        ``changed`` holds the changed column names, or None if they are not
+        known (for inserted and deleted rows).
+        """
+        if table not in self.tables:
+            return False
+        if changed is None:
+            return True
+        return not self.columns.get(table, set()).isdisjoint(changed)
+
+    def _key_columns(self):
+        cols = [self.selectable.selected_columns[k] for k in self.keys]
+        return [c.element if isinstance(c, Label) else c for c in cols]
+
+    def affected_keys(self, session, table, ids):
+        """Return the view keys of the source table rows with the given ids.
+
+        The keys are read from the database, so this returns the keys before
+        a flush when called from ``before_flush`` and after it when called
+        from ``after_flush``.
+        """
+        if table not in self.source_tables:
+            return set()
+
+        id_col = self.source_tables[table].c.id
+        ret = set()
+        q = self.selectable.with_only_columns(self._key_columns())
+        for chunk in _chunks(ids, MAX_BIND_PARAMS):
+            ret.update(tuple(r) for r in session.execute(q.where(id_col.in_(chunk))))
+
+        return ret
+
+    def _key_filter(self, columns, keys):
+        """Build the filter matching rows with any of the given keys.
+
+        Keys with NULL values cannot be matched by a tuple ``IN``, so they
+        are grouped by which values are NULL and matched with ``IS NULL``.
+        """
+        groups = {}
+        for key in keys:
+            nulls = tuple(v is None for v in key)
+            groups.setdefault(nulls, []).append(tuple(v for v in key if v is not None))
+
+        for nulls, values in groups.items():
+            cols = [c for c, n in zip(columns, nulls) if not n]
+            null_filter = [c.is_(None) for c, n in zip(columns, nulls) if n]
+            size = max(MAX_BIND_PARAMS // max(len(cols), 1), 1)
+            for chunk in _chunks(set(values), size):
+                if not cols:
+                    yield and_(*null_filter)
+                elif len(cols) == 1:
+                    yield and_(cols[0].in_([v[0] for v in chunk]), *null_filter)
+                else:
+                    yield and_(tuple_(*cols).in_(chunk), *null_filter)
+
+    def _lock_keys(self, session, keys):
+        """Serialize concurrent refreshes of the same view rows.
+
+        Without a lock, two transactions refreshing the same key both delete
+        the old row and insert a new one, and the second insert fails on the
+        view's unique key index. On PostgreSQL each key takes a transaction
+        level advisory lock (in sorted order, so that refreshes cannot
+        deadlock) and the whole view a shared one, which a full refresh
+        takes exclusively. The second refresh then waits for the first to
+        commit, and its statements read the committed rows. Other databases
+        lock the existing view rows; SQLite only has a single writer.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            view_id = _lock_id(self.name)
+            session.execute(
+                text('SELECT pg_advisory_xact_lock_shared(:view_id, 0)'),
+                dict(view_id=view_id),
+            )
+            session.execute(
+                text(
+                    'SELECT pg_advisory_xact_lock(:view_id, k) '
+                    'FROM unnest(CAST(:key_ids AS integer[])) AS k'
+                ),
+                dict(view_id=view_id, key_ids=sorted({_lock_id(repr(k)) for k in keys})),
+            )
+        elif dialect != 'sqlite':
+            view_cols = [self.table.c[k] for k in self.keys]
+            for flt in self._key_filter(view_cols, keys):
+                session.execute(select(view_cols).where(flt).with_for_update())
+
+    def refresh_keys(self, session, keys):
+        """Recompute the view rows with the given keys."""
+        self._lock_keys(session, keys)
+        view_cols = [self.table.c[k] for k in self.keys]
+        for flt in self._key_filter(view_cols, keys):
+            session.execute(self.table.delete().where(flt))
+        for flt in self._key_filter(self._key_columns(), keys):
+            session.execute(
+                self.table.insert().from_select(
+                    [c.name for c in self.selectable.selected_columns],
+                    self.selectable.where(flt),
+                )
+            )
+
+    def refresh_view(self, session):
+        """Refresh the whole view using the session's connection."""
+        dialect = session.get_bind().dialect.name
+        if dialect == 'postgresql' and not self.is_table:
+            session.execute(text('REFRESH MATERIALIZED VIEW {}{}'.format(
+                'CONCURRENTLY ' if self.keys else '',
+                self.name,
+            )))
+        elif dialect == 'sqlite' or self.is_table:
+            if dialect == 'postgresql':
+                # Wait for the key refreshes in progress (see _lock_keys)
+                session.execute(
+                    text('SELECT pg_advisory_xact_lock(:view_id, 0)'),
+                    dict(view_id=_lock_id(self.name)),
+                )
+            session.execute(self.table.delete())
+            session.execute(
+                self.table.insert().from_select(
+                    [c.name for c in self.selectable.selected_columns],
+                    self.selectable,
+                )
+            )
+
+        self._last_refresh = time.monotonic()
+
+
+class MaterializedViews:
+    """Registry of the Materialized Views.
+
+    Each Session tracks the source rows written by its flushes, reading the
+    keys of the view rows they affect both before the flush (for updated
+    and deleted rows) and after it (for inserted and updated rows), and
+    refreshes those view rows just before the Session commits. Core INSERT
+    and DELETE statements (and UPDATE statements whose columns are not
+    known) on a source table cannot be tracked by row, so they cause a full
+    refresh of the view on commit.
+    """
+    def __init__(self):
+        self._views = {}
+
+    def __contains__(self, name):
+        return name in self._views
+
+    def __getitem__(self, name):
+        return self._views[name]
+
+    def __iter__(self):
+        return iter(self._views.values())
+
+    def register(self, view):
+        """Register a `MaterializedView`."""
+        self._views[view.name] = view
+
+    def refresh(self, session, names=None):
+        """Refresh the named views (or all views) in the session.
+
+        :returns: the names of the refreshed views
+        """
+        if names is None:
+            names = list(self._views)
+
+        for name in names:
+            if name not in self._views:
+                raise ValueError(f'No materialized view named {name}')
+
+        # Refreshing writes to the views, so must not use a read replica
+        session.info['jt_primary'] = True
+        for name in names:
+            self._views[name].refresh_view(session)
+
+        return list(names)
+
+    @property
+    def _write_views(self):
+        return [v for v in self if v.strategy == REFRESH_WRITE]
+
+    def _written_rows(self, view, session, objects):
+        """Group the ids of flushed objects which affect a view by table."""
+        ret = {}
+        objects = [(obj, obj in session.new or obj in session.deleted) for obj in objects]
+        while objects:
+            obj, whole_row = objects.pop()
+            mapper = object_mapper(obj)
+            changed = None
+            if not whole_row:
+                # Find the changed columns of an updated row, counting a
+                # changed many-to-one relationship as a change to its foreign
+                # keys. Rows removed from a one-to-many collection may be
+                # deleted as orphans, so they are tracked as whole rows.
+                changed = set()
+                for attr in inspect(obj).attrs:
+                    hist = attr.history
+                    if not hist.has_changes():
+                        continue
+                    prop = mapper.get_property(attr.key)
+                    if isinstance(prop, ColumnProperty):
+                        changed.update(c.name for c in prop.columns)
+                    elif prop.direction is MANYTOONE:
+                        changed.update(c.name for c in prop.local_columns)
+                    else:
+                        objects.extend((o, True) for o in hist.deleted if o is not None)
+
+            table = mapper.local_table.name
+            pk = mapper.primary_key_from_instance(obj)[0]
+            if pk is not None and view.affects(table, changed):
+                ret.setdefault(table, set()).add(pk)
+
+        return ret
+
+    def _track_keys(self, session, objects):
+        views = self._write_views
+        if not views:
+            return
+
+        keys = session.info.setdefault('jt_view_keys', {})
+        for view in views:
+            for table, ids in self._written_rows(view, session, objects).items():
+                keys.setdefault(view.name, set()).update(
+                    view.affected_keys(session, table, ids)
+                )
+
+    def _before_flush(self, session, flush_context, instances):
+        # Keys of the rows as they are before the flush changes them
+        self._track_keys(session, list(session.dirty) + list(session.deleted))
+
+    def _after_flush(self, session, flush_context):
+        # Keys of the rows as they are after the flush
+        self._track_keys(session, list(session.new) + list(session.dirty))
+
+    def _track_execute(self, orm_execute_state):
+        stmt = orm_execute_state.statement
+        if not getattr(stmt, 'is_dml', False) or getattr(stmt, 'table', None) is None:
+            return
+
+        changed = None
+        if getattr(stmt, 'is_update', False) and stmt._values:
+            changed = {getattr(k, 'key', k) for k in stmt._values}
+
+        for view in self._write_views:
+            if view.affects(stmt.table.name, changed):
+                session = orm_execute_state.session
+                session.info.setdefault('jt_view_full', set()).add(view.name)
+
+    def _before_commit(self, session):
+        if not self._views:
+            return
+
+        session.flush()
+        keys = session.info.pop('jt_view_keys', {})
+        full = session.info.pop('jt_view_full', set())
+
+        due = [v.name for v in self if v.name in full or v.is_due()]
+        if due:
+            self.refresh(session, due)
+
+        for name, view_keys in keys.items():
+            if name not in due and view_keys:
+                session.info['jt_primary'] = True
+                self._views[name].refresh_keys(session, view_keys)
+
+        session.info.pop('jt_view_keys', None)
+        session.info.pop('jt_view_full', None)
+
+    def _after_rollback(self, session):
+        session.info.pop('jt_view_keys', None)
+        session.info.pop('jt_view_full', None)
+
+    def install(self):
+        """Register the Session hooks which refresh the views."""
+        for name, fn in (
+            ('before_flush', self._before_flush),
+            ('after_flush', self._after_flush),
+            ('do_orm_execute', self._track_execute),
+            ('before_commit', self._before_commit),
+            ('after_rollback', self._after_rollback),
+        ):
+            if not event.contains(Session, name, fn):
+                event.listen(Session, name, fn)
+
+
+#: Global Materialized View Registry
+materialized_views = MaterializedViews()
+
+
+def init_views():
+    """Register the Session hooks which refresh the Materialized Views."""
+    materialized_views.install()
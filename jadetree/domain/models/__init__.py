@@ -7,6 +7,7 @@
 
 from .account import Account
 from .budget import Budget, BudgetEntry, Category
+from .job import Job
 from .payee import Payee
 from .transaction import (
     Transaction,
@@ -17,6 +18,7 @@ from .transaction import (
 from .user import User
 
 __all__ = (
-    'Account', 'Budget', 'BudgetEntry', 'Category', 'Payee', 'Transaction',
-    'TransactionEntry', 'TransactionLine', 'TransactionSplit', 'User',
+    'Account', 'Budget', 'BudgetEntry', 'Category', 'Job', 'Payee',
+    'Transaction', 'TransactionEntry', 'TransactionLine', 'TransactionSplit',
+    'User',
 )
@@ -82,6 +82,20 @@ class Account(NotesMixin, TimestampMixin):
 
         Date the account was closed.
 
+    .. py:attribute:: reconciled_balance
+        :type: `~decimal.Decimal`
+
+        Account balance as of the last reconciled statement, which is the sum
+        of all reconciled transaction lines. Used as the starting point for
+        the next reconciliation so that already-reconciled history does not
+        need to be summed again.
+
+    .. py:attribute:: reconciled_at
+        :type: `~datetime.date`
+
+        Statement date of the last reconciliation, or None if the account has
+        never been reconciled.
+
     .. py:attribute:: user
         :type: `User`
 
@@ -106,6 +120,9 @@ class Account(NotesMixin, TimestampMixin):
     opened: date = None
     closed: date = None
 
+    reconciled_balance: Decimal = None
+    reconciled_at: date = None
+
     display_order: int = None
 
     # Relationship Fields
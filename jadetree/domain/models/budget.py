@@ -12,6 +12,7 @@ from decimal import Decimal
 from jadetree.exc import DomainError
 
 from ..mixins import NotesMixin, TimestampMixin
+from ..util import ORDER_STEP
 
 __all__ = ('Budget', 'Category', 'BudgetEntry')
 
@@ -28,6 +29,9 @@ class BudgetEntry(NotesMixin):
     budget: 'Budget' = None
     category: 'Category' = None
 
+    # Populated by ORM
+    # month_key: int (maintained from month, see jadetree.domain.util)
+
     # Helpers
     def __repr__(self):
         return '<BudgetEntry "{}" {}-{}>'.format(
@@ -105,6 +109,7 @@ class Budget(NotesMixin, TimestampMixin):
     user: 'User' = None                                             # noqa: F821
 
     # Populated by ORM
+    # category_version: str (replaced whenever the category tree changes)
     # accounts: List['Account'] = field(default_factory=list)       # noqa: F821
     # categories: List['Category'] = field(default_factory=list)    # noqa: F821
     # groups: List['CategoryGroup'] = field(default_factory=list)   # noqa: F821
@@ -131,7 +136,10 @@ class Budget(NotesMixin, TimestampMixin):
             }
 
         Display ordering is automatically set based on the relative positions
-        of the ``group_def`` and ``category_def`` entries within their lists.
+        of the ``group_def`` and ``category_def`` entries within their lists,
+        spaced `ORDER_STEP` apart so that items can later be moved without
+        renumbering their siblings. The ``start_display_order`` parameter is
+        the position of the first group.
 
         '''
         ret = []
@@ -157,7 +165,7 @@ class Budget(NotesMixin, TimestampMixin):
                 )
 
             ci = 0
-            cg = self.add_category_group(g_name, g_system, g_hidden, gi)
+            cg = self.add_category_group(g_name, g_system, g_hidden, gi * ORDER_STEP)
             ret.append(cg)
             for itm in categories:
                 if not isinstance(itm, (str, dict)):
@@ -192,7 +200,7 @@ class Budget(NotesMixin, TimestampMixin):
                         cg,
                         c_system,
                         c_hidden,
-                        ci,
+                        ci * ORDER_STEP,
                         c_default,
                     )
                 )
@@ -0,0 +1,72 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from dataclasses import dataclass
+
+from arrow import Arrow, utcnow
+
+from ..types import JobStatus
+
+__all__ = ('Job', )
+
+
+@dataclass
+class Job:
+    '''
+    A background operation (e.g. a data export) requested by a user, which
+    is run by the job runner outside of the API request. Jobs which produce
+    a file store it as an artifact which the user can download once the job
+    is complete.
+    '''
+    kind: str = None
+    status: JobStatus = None
+    params: dict = None
+
+    progress: int = None
+    message: str = None
+
+    artifact_name: str = None
+    artifact_type: str = None
+    artifact_path: str = None
+
+    created_at: Arrow = None
+    started_at: Arrow = None
+    finished_at: Arrow = None
+
+    owner: str = None
+    heartbeat_at: Arrow = None
+
+    # Relationship Fields
+    user: 'User' = None         # noqa: F821
+
+    # Domain Logic
+    def start(self):
+        '''Mark the Job as running'''
+        self.status = JobStatus.Running
+        self.progress = 0
+        self.started_at = utcnow()
+
+    def complete(self, message=None):
+        '''Mark the Job as finished successfully'''
+        self.status = JobStatus.Complete
+        self.progress = 100
+        self.message = message
+        self.finished_at = utcnow()
+
+    def fail(self, message):
+        '''Mark the Job as failed with an error message'''
+        self.status = JobStatus.Failed
+        self.message = message
+        self.finished_at = utcnow()
+
+    # Helpers
+    @property
+    def is_finished(self):
+        return self.status in (JobStatus.Complete, JobStatus.Failed)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
@@ -9,7 +9,7 @@ from dataclasses import dataclass
 from decimal import Decimal
 
 from ..mixins import TimestampMixin
-from ..types import PayeeRole
+from ..types import PayeeRole, TransactionType
 
 __all__ = ('Payee', )
 
@@ -31,6 +31,48 @@ class Payee(TimestampMixin):
     category: 'Category' = None     # noqa: F821
     account: 'Account' = None       # noqa: F821
 
+    # Populated by ORM
+    # use_count: int (number of Transactions using the Payee)
+    # last_date: date (date of the latest Transaction using the Payee)
+    # last_type: TransactionType (type of the latest Split)
+    # last_category_id: int (category of the latest non-transfer Split)
+    # last_account_id: int (opposing account of the latest transfer Split)
+    # last_amount: Decimal (amount of the latest Split)
+    # last_memo: str (memo of the latest Split)
+
+    # Domain Logic
+    def set_last_split(self, split, date):
+        '''Store the autofill statistics from the Payee's latest Split'''
+        self.last_date = date
+        self.last_type = split.type
+        self.last_amount = split.amount
+        self.last_memo = split.memo
+        if split.type == TransactionType.Transfer:
+            self.last_category_id = None
+            self.last_account_id = split.right_line.account.id
+        else:
+            self.last_category_id = split.category.id if split.category else None
+            self.last_account_id = None
+
+    def clear_last_split(self):
+        '''Clear the autofill statistics for a Payee with no Transactions'''
+        self.last_date = None
+        self.last_type = None
+        self.last_amount = None
+        self.last_memo = None
+        self.last_category_id = None
+        self.last_account_id = None
+
+    def record_transaction(self, txn):
+        '''
+        Update the autofill statistics with a newly created Transaction,
+        without reading the Payee's Transaction history. The use count is
+        incremented in the database by the service which saves the
+        Transaction.
+        '''
+        if txn.splits and (self.last_date is None or txn.date >= self.last_date):
+            self.set_last_split(txn.splits[0], txn.date)
+
     # Helpers
     def __repr__(self):
         return '<Payee {}>'.format(self.name)
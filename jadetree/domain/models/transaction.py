@@ -134,6 +134,9 @@ class TransactionSplit:
 
     # Populated by ORM
     # entries: List[TransactionEntry]
+    # left_account_id: int (stored from left_line on flush)
+    # right_account_id: int (stored from right_line on flush)
+    # transfer: bool (stored from is_transfer on flush)
 
     # Helpers
     @property
@@ -148,7 +151,9 @@ class TransactionSplit:
         split_amount = Decimal()
         split_currency = self.left_line.account.currency
         for entry in self.entries:
-            if entry.line == self.left_line:
+            # Identity comparison avoids the field-by-field dataclass __eq__,
+            # which would load every attribute and relationship of the lines
+            if entry.line is self.left_line:
                 split_amount = split_amount + entry.amount
                 assert entry.currency == split_currency, \
                     'Entry Currency differs from Line Currency'
@@ -219,6 +224,7 @@ class Transaction:
     # Populated by ORM
     # lines: List[TransactionLine]
     # splits: List[TransactionSplit]
+    # month_key: int (maintained from date, see jadetree.domain.util)
 
     # Domain Logic
     def _check_objects(self, fn_name):
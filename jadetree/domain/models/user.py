@@ -199,8 +199,10 @@ class User(TimestampMixin):
     fmt_accounting: str = None
 
     # Populated by ORM
+    # payee_version: str (replaced whenever a Payee is added or renamed)
     # accounts: List['Account'] = field(default_factory=list)     # noqa: F821
     # budgets: List['Budget'] = field(default_factory=list)       # noqa: F821
+    # jobs: List['Job'] = field(default_factory=list)             # noqa: F821
 
     # Domain Logic
     def _generate_user_hash(self):
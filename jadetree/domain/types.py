@@ -159,3 +159,22 @@ class TransactionType(enum.Enum):
     Outflow = 'outflow'         #: Withdrawal from a Personal Account
     Transfer = 'transfer'       #: Transfer between two Personal Accounts
     System = 'system'           #: System Transaction
+
+
+class JobStatus(enum.Enum):
+    '''
+    :class:`jadetree.models.Job` objects move through the following states:
+
+    * :attr:`JobStatus.Queued` jobs are waiting for a free worker (and for
+      the user's other jobs to finish, up to the per-user limit)
+    * :attr:`JobStatus.Running` jobs have been claimed by a worker
+    * :attr:`JobStatus.Complete` jobs finished successfully, and may have a
+      downloadable artifact
+    * :attr:`JobStatus.Failed` jobs raised an error, which is stored in the
+      job message
+
+    '''
+    Queued = 'queued'           #: Waiting for a Worker
+    Running = 'running'         #: Running on a Worker
+    Complete = 'complete'       #: Finished Successfully
+    Failed = 'failed'           #: Finished with an Error
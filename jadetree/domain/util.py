@@ -0,0 +1,98 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from datetime import date
+import uuid
+
+from arrow import Arrow
+
+__all__ = (
+    'ORDER_STEP',
+    'month_key',
+    'month_from_key',
+    'new_version_token',
+    'order_key_between',
+)
+
+#: Spacing between consecutive Display Order keys
+ORDER_STEP = 1024
+
+
+def month_key(value):
+    '''
+    Calculate the integer Month Key for a date, which is defined as
+    ``year * 12 + (month - 1)`` so that consecutive months have consecutive
+    keys and the key can be split back into a (year, month) tuple with
+    :func:`divmod`. The Month Key is stored alongside dated records so that
+    queries can group and join by month using an indexed integer column
+    instead of extracting the year and month from a date column.
+
+    :param value: date, Arrow, or (year, month) tuple
+    :type value: date or tuple
+    :returns: Month Key or None if ``value`` is None
+    :rtype: int
+    '''
+    if value is None:
+        return None
+    if isinstance(value, (date, Arrow)):
+        return value.year * 12 + value.month - 1
+    if isinstance(value, (tuple, list)) and len(value) == 2:
+        return int(value[0]) * 12 + int(value[1]) - 1
+    raise TypeError('Month Key requires a date or (year, month) tuple')
+
+
+def month_from_key(key):
+    '''
+    Convert an integer Month Key back into a (year, month) tuple.
+
+    :param key: Month Key as returned by :func:`month_key`
+    :type key: int
+    :returns: tuple of (year, month)
+    :rtype: tuple
+    '''
+    y, m = divmod(int(key), 12)
+    return (y, m + 1)
+
+
+def order_key_between(before, after):
+    '''
+    Calculate a sparse Display Order key which sorts between two existing
+    keys, so that an item can be moved by updating only its own key. Either
+    bound may be None to place the item at the start or end of the list.
+    Returns None if there is no integer left between the two keys, in which
+    case the list must be renumbered with :data:`ORDER_STEP` spacing.
+
+    :param before: key of the item sorting immediately before, or None
+    :type before: int
+    :param after: key of the item sorting immediately after, or None
+    :type after: int
+    :returns: new key or None if the keys are exhausted
+    :rtype: int
+    '''
+    if before is None and after is None:
+        return 0
+    if before is None:
+        return after - ORDER_STEP
+    if after is None:
+        return before + ORDER_STEP
+    if after - before < 2:
+        return None
+    return before + (after - before) // 2
+
+
+def new_version_token():
+    '''
+    Generate a new opaque version token. Version tokens are stored with a
+    record and replaced whenever the data they describe changes, so that
+    cached copies can be validated by comparing tokens. Random tokens are
+    used instead of counters so that a re-created record never matches a
+    token cached for a previous record with the same id.
+
+    :returns: 32-character hexadecimal token
+    :rtype: str
+    '''
+    return uuid.uuid4().hex
@@ -0,0 +1,513 @@
+"""Jade Tree Background Jobs.
+
+Long-running operations (e.g. data exports) are submitted as :class:`Job`
+rows and run by an in-process worker pool, so that they never tie up an API
+worker. Each user may only have ``JOB_USER_LIMIT`` jobs running at once; the
+remaining jobs stay queued until one of the user's jobs finishes. Progress
+is reported to listeners (the API forwards it to the user's Socket.IO room)
+and files produced by a job are kept in ``JOB_ARTIFACT_DIR`` for download.
+
+Worker threads are only used by the serving process, which calls
+`start_jobs` from its entry point (``jadetree.wsgi`` or ``python -m
+jadetree``). Other processes which create the application, such as
+``flask`` commands and their worker processes, run jobs synchronously and
+never claim jobs submitted by users.
+
+Each claimed job records the process running it, which updates the job's
+heartbeat every ``JOB_HEARTBEAT`` seconds while it runs. Jobs left running
+by a process which crashed or was restarted stop receiving heartbeats and
+are marked as failed after ``JOB_STALE_AFTER`` seconds, so that they no
+longer count against the user's limit.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import secrets
+import socket
+import threading
+
+from arrow import utcnow
+from flask import current_app
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.utils import secure_filename
+
+from jadetree.database import db
+from jadetree.database.tables import jobs
+from jadetree.domain.models import Job
+from jadetree.domain.types import JobStatus
+from jadetree.exc import ConfigError
+
+__all__ = ('JOB_HANDLERS', 'JobContext', 'JobRunner', 'init_jobs', 'job_handler', 'runner', 'start_jobs')
+
+#: Registered Job Handlers by Job kind
+JOB_HANDLERS = {}
+
+#: Message of Jobs which were failed because their process stopped
+STALE_MESSAGE = 'The job was interrupted because the server stopped'
+
+
+def job_handler(kind):
+    '''Register a function as the handler for a Job kind'''
+    def decorator(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+
+    return decorator
+
+
+class JobContext:
+    '''
+    Context passed to a Job handler, holding the database session, the
+    `Job` and its user, and methods to report progress and write the
+    downloadable artifact.
+    '''
+    def __init__(self, runner, session, job):
+        self.runner = runner
+        self.session = session
+        self.job = job
+
+    @property
+    def user(self):
+        return self.job.user
+
+    @property
+    def params(self):
+        return self.job.params or {}
+
+    def progress(self, done, total):
+        '''
+        Report that ``done`` of ``total`` items have been processed. Listeners
+        are only notified when the whole percentage changes.
+        '''
+        pct = min(100, int(100 * done / total)) if total else 0
+        self.runner._set_progress(self.job, pct)
+
+    def open_artifact(self, name, mimetype):
+        '''
+        Open the Job artifact file for writing in text mode. The file is
+        stored in the user's directory under the artifact directory, and
+        ``name`` is the file name offered for download.
+        '''
+        user_dir = self.runner.user_dir(self.user)
+
+        self.job.artifact_name = name
+        self.job.artifact_type = mimetype
+        self.job.artifact_path = os.path.join(
+            user_dir,
+            '{}-{}'.format(self.job.id, secure_filename(name)),
+        )
+
+        return open(self.job.artifact_path, 'w', encoding='utf-8')
+
+
+class JobRunner:
+    '''
+    In-process Job Runner. Queued Jobs are claimed with a conditional update
+    so that each Job runs once even with several application processes, and
+    are run on a thread pool with ``workers`` threads. With ``workers`` set
+    to zero, Jobs are run synchronously by `dispatch` (used for testing and
+    from the command line). The runner is synchronous until `start` enables
+    the ``JOB_WORKERS`` threads in the serving process.
+
+    With workers, a monitor thread updates the heartbeat of the Jobs run by
+    this process every ``heartbeat`` seconds and then dispatches queued
+    Jobs, so that Jobs queued behind a stale Job are started once it fails.
+    Synchronous Jobs only record a heartbeat when they are claimed.
+    '''
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self.user_limit = 1
+        self.heartbeat = 60
+        self.stale_after = 300
+        self.artifact_dir = None
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._monitor = None
+        self._stop = threading.Event()
+        self._owner = None
+        self._active = 0
+        self._progress = {}
+        self._listeners = []
+
+    def init_app(self, app):
+        '''Load the Job Runner configuration from the Application'''
+        for key, default, minimum in (
+            ('JOB_WORKERS', 2, 0),
+            ('JOB_USER_LIMIT', 1, 1),
+            ('JOB_HEARTBEAT', 60, 1),
+            ('JOB_STALE_AFTER', 300, 1),
+        ):
+            try:
+                value = int(app.config.get(key, default))
+            except (TypeError, ValueError):
+                value = None
+            if value is None or value < minimum:
+                raise ConfigError(
+                    '{} must be an integer of at least {}'.format(key, minimum),
+                    config_key=key
+                )
+            app.config[key] = value
+
+        if app.config['JOB_STALE_AFTER'] <= app.config['JOB_HEARTBEAT']:
+            raise ConfigError(
+                'JOB_STALE_AFTER must be longer than JOB_HEARTBEAT',
+                config_key='JOB_STALE_AFTER'
+            )
+
+        self.app = app
+        self.workers = 0
+        self.user_limit = app.config['JOB_USER_LIMIT']
+        self.heartbeat = app.config['JOB_HEARTBEAT']
+        self.stale_after = app.config['JOB_STALE_AFTER']
+        self.artifact_dir = app.config.get(
+            'JOB_ARTIFACT_DIR',
+            os.path.join(app.instance_path, 'jobs'),
+        )
+
+    @property
+    def owner(self):
+        '''
+        Identifier of this process, recorded in the Jobs it claims. The
+        identifier includes a random token, since process ids are reused
+        (e.g. by a restarted container), and is regenerated in forked
+        processes.
+        '''
+        pid = os.getpid()
+        if self._owner is None or self._owner[0] != pid:
+            self._owner = (pid, '{}:{}:{}'.format(
+                socket.gethostname()[:32],
+                pid,
+                secrets.token_hex(4),
+            ))
+        return self._owner[1]
+
+    def user_dir(self, user):
+        '''Return the user's directory under the artifact directory'''
+        user_dir = os.path.join(self.artifact_dir, user.uid_hash)
+        os.makedirs(user_dir, exist_ok=True)
+        return user_dir
+
+    def new_upload(self, name):
+        '''
+        Return a unique file name for a file uploaded as the input of a Job,
+        to be stored in the Job parameters and opened with `upload_path`.
+        '''
+        return 'upload-{}-{}'.format(secrets.token_hex(8), secure_filename(name))
+
+    def upload_path(self, user, upload):
+        '''
+        Return the path of an uploaded Job input file in the user's
+        directory. Only names from `new_upload` are accepted, so that Job
+        parameters cannot refer to other files.
+        '''
+        if not upload or upload != secure_filename(upload) or not upload.startswith('upload-'):
+            raise ValueError('Invalid upload file name "{}"'.format(upload))
+        return os.path.join(self.user_dir(user), upload)
+
+    def add_listener(self, fn):
+        '''
+        Register a function to be called with a `Job` when it is claimed,
+        reports progress or finishes
+        '''
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def live_progress(self, job):
+        '''Return the current progress of a Job, including unsaved progress'''
+        return self._progress.get(job.id, job.progress)
+
+    def _notify(self, job):
+        for fn in self._listeners:
+            try:
+                fn(job)
+            except Exception as e:
+                current_app.logger.exception(
+                    'Job listener error (%s): %s',
+                    e.__class__.__name__,
+                    str(e)
+                )
+
+    def _set_progress(self, job, pct):
+        # Progress is held in memory while the Job runs, so that reporting
+        # does not write to the database
+        if self._progress.get(job.id) == pct:
+            return
+        self._progress[job.id] = pct
+        self._notify(job)
+
+    def fail_stale(self, session):
+        '''
+        Mark running Jobs which have not reported a heartbeat for
+        ``stale_after`` seconds as failed, since the process running them
+        has stopped. Returns the number of failed Jobs.
+        '''
+        j = jobs.c
+        now = utcnow()
+        result = session.execute(
+            jobs.update()
+            .where(j.status == JobStatus.Running)
+            .where(or_(
+                j.heartbeat_at.is_(None),
+                j.heartbeat_at < now.shift(seconds=-self.stale_after),
+            ))
+            .values(status=JobStatus.Failed, message=STALE_MESSAGE, finished_at=now)
+        )
+        return result.rowcount
+
+    def beat(self, session):
+        '''Update the heartbeat of the Jobs run by this process'''
+        j = jobs.c
+        session.execute(
+            jobs.update()
+            .where(j.owner == self.owner)
+            .where(j.status == JobStatus.Running)
+            .values(heartbeat_at=utcnow())
+        )
+        session.commit()
+
+    def _claim(self, session):
+        '''
+        Mark queued Jobs as running, oldest first, while workers are free
+        and each user has fewer than ``user_limit`` running Jobs. Stale Jobs
+        are failed first so that they do not count against the limit.
+        Returns the list of claimed Job ids.
+        '''
+        j = jobs.c
+        with self._lock:
+            free = self.workers - self._active if self.workers else None
+            if free == 0:
+                return []
+
+            self.fail_stale(session)
+
+            running = dict(session.execute(
+                select([j.user_id, func.count(j.id)])
+                .where(j.status == JobStatus.Running)
+                .group_by(j.user_id)
+            ).fetchall())
+
+            queued = session.execute(
+                select([j.id, j.user_id])
+                .where(j.status == JobStatus.Queued)
+                .order_by(j.id)
+            ).fetchall()
+
+            claimed = []
+            now = utcnow()
+            for row in queued:
+                if free is not None and len(claimed) >= free:
+                    break
+                if running.get(row.user_id, 0) >= self.user_limit:
+                    continue
+
+                # The status condition prevents another process from
+                # claiming the same Job
+                result = session.execute(
+                    jobs.update()
+                    .where(j.id == row.id)
+                    .where(j.status == JobStatus.Queued)
+                    .values(
+                        status=JobStatus.Running,
+                        progress=0,
+                        started_at=now,
+                        owner=self.owner,
+                        heartbeat_at=now,
+                    )
+                )
+                if result.rowcount:
+                    claimed.append(row.id)
+                    running[row.user_id] = running.get(row.user_id, 0) + 1
+
+            session.commit()
+            if self.workers:
+                self._active += len(claimed)
+
+        return claimed
+
+    def dispatch(self, session):
+        '''
+        Claim and start queued Jobs. This is called when a Job is created
+        and by each worker after it finishes a Job.
+        '''
+        while True:
+            claimed = self._claim(session)
+            if not claimed:
+                return
+
+            if not self.workers:
+                for job_id in claimed:
+                    self._run(session, job_id)
+                continue
+
+            if self._executor is None:
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix='jadetree-job',
+                        )
+
+            for job_id in claimed:
+                self._executor.submit(self._work, job_id)
+            return
+
+    def _work(self, job_id):
+        '''Run a Job on a worker thread'''
+        with self.app.app_context():
+            try:
+                self._run(db.session, job_id)
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+            self.dispatch(db.session)
+
+    def _run(self, session, job_id):
+        '''Run the handler for a claimed Job and record the result'''
+        job = session.query(Job).get(job_id)
+        session.refresh(job)
+        self._notify(job)
+
+        try:
+            handler = JOB_HANDLERS.get(job.kind)
+            if handler is None:
+                raise ValueError('No handler for job kind "{}"'.format(job.kind))
+
+            # Handlers may return a message summarizing the result
+            message = handler(JobContext(self, session, job))
+            job.complete(message)
+            session.commit()
+
+        except Exception as e:
+            current_app.logger.exception(
+                'Job %d (%s) failed (%s): %s',
+                job_id,
+                job.kind,
+                e.__class__.__name__,
+                str(e)
+            )
+
+            session.rollback()
+            job = session.query(Job).get(job_id)
+            job.fail(str(e) or e.__class__.__name__)
+            session.commit()
+
+        finally:
+            self._progress.pop(job_id, None)
+
+        self._notify(job)
+
+    def recover(self, session):
+        '''
+        Fail the stale Jobs left running by a stopped process and start the
+        queued Jobs. This is called when the application starts, since
+        queued Jobs are otherwise only started when a Job is created or a
+        worker finishes.
+        '''
+        with self._lock:
+            failed = self.fail_stale(session)
+            session.commit()
+
+        if self.workers:
+            self.dispatch(session)
+
+        return failed
+
+    def start(self):
+        '''
+        Enable the ``JOB_WORKERS`` worker threads, fail the stale Jobs left
+        by a stopped process, start the queued Jobs and start the monitor
+        thread which updates heartbeats.
+        '''
+        self.workers = self.app.config['JOB_WORKERS']
+        with self.app.app_context():
+            try:
+                failed = self.recover(db.session)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                self.app.logger.warning(
+                    'Could not recover background jobs (%s): %s',
+                    e.__class__.__name__,
+                    str(e)
+                )
+            else:
+                if failed:
+                    self.app.logger.warning('Failed %d background jobs which were left running', failed)
+
+        with self._lock:
+            if self._monitor is not None or not self.workers:
+                return
+            self._stop.clear()
+            self._monitor = threading.Thread(
+                target=self._watch,
+                name='jadetree-job-monitor',
+                daemon=True,
+            )
+            self._monitor.start()
+
+    def _watch(self):
+        '''Update heartbeats and dispatch queued Jobs until stopped'''
+        while not self._stop.wait(self.heartbeat):
+            with self.app.app_context():
+                try:
+                    self.beat(db.session)
+                    self.dispatch(db.session)
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    current_app.logger.exception(
+                        'Job monitor error (%s): %s',
+                        e.__class__.__name__,
+                        str(e)
+                    )
+
+    def shutdown(self, wait=True):
+        '''Stop the monitor thread and the worker pool'''
+        self._stop.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+            monitor, self._monitor = self._monitor, None
+        if monitor is not None and wait:
+            monitor.join()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+#: Global Job Runner
+runner = JobRunner()
+
+
+def init_jobs(app):
+    '''Initialize the Job Runner and register the built-in Job handlers'''
+    runner.init_app(app)
+
+    import jadetree.service.export.jobs  # noqa: F401
+    import jadetree.service.importer.jobs  # noqa: F401
+
+    # Notify Initialization
+    app.logger.debug(
+        'Job Runner Initialized with a limit of %d jobs per user',
+        runner.user_limit,
+    )
+
+
+def start_jobs(app):
+    '''
+    Start the Job worker threads in the serving process. This is called by
+    the server entry points rather than by `init_jobs`, so that command
+    line tools do not run users' queued Jobs. Nothing is started until the
+    database has been set up.
+    '''
+    if app.config.get('_JT_DB_NEEDS_INIT', True) or app.config.get('_JT_DB_NEEDS_UPGRADE'):
+        app.logger.warning('Background jobs were not started because the database is not up to date')
+        return False
+
+    runner.start()
+
+    app.logger.info('Job Runner started with %d workers', runner.workers)
+    return True
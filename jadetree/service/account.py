@@ -13,14 +13,30 @@ from decimal import Decimal
 import arrow
 
 from jadetree.database.queries import q_account_balances, q_account_list
+from jadetree.database.tables import accounts as accounts_table, payees as payees_table
 from jadetree.domain.models import Account, Budget, Category, Payee, Transaction
 from jadetree.domain.types import AccountRole, AccountType, PayeeRole, TransactionType
-from jadetree.exc import NoResults, Unauthorized
+from jadetree.domain.util import ORDER_STEP
+from jadetree.exc import DomainError, NoResults, Unauthorized
 
+from .budget.cache import invalidate_category_tree
+from .payee_index import invalidate_payee_index, update_payee_index
 from .user import get_initial_payee
-from .util import check_session, check_user
-
-__all__ = ('_load_account', 'create_user_account', 'get_user_account_list')
+from .util import (
+    check_session,
+    check_user,
+    increment_counts,
+    renumber_display_order,
+    sparse_display_order,
+)
+
+__all__ = (
+    '_load_account',
+    'create_user_account',
+    'get_user_account_list',
+    'move_account',
+    'reorder_accounts',
+)
 
 
 def create_user_account(
@@ -115,7 +131,10 @@ def create_user_account(
         type=type,
         subtype=subtype,
         currency=currency,
-        display_order=len([a for a in user.accounts if a.role == AccountRole.Personal]),
+        display_order=max(
+            [a.display_order or 0 for a in user.accounts if a.role == AccountRole.Personal],
+            default=-ORDER_STEP,
+        ) + ORDER_STEP,
     )
 
     # Create a Payee for this account
@@ -128,12 +147,14 @@ def create_user_account(
         system=True,
         hidden=False
     )
+    payee_version = invalidate_payee_index(user)
 
     # If the account has no balance, add and return
     if balance is None or balance == 0:
         session.add(a)
         session.add(p)
         session.commit()
+        update_payee_index(user, p, payee_version)
 
         return a, p, None
 
@@ -181,6 +202,7 @@ def create_user_account(
 
             # Create the Expense Category for the opening debt
             balance_cat = b.add_category(name, debt_grp)
+            invalidate_category_tree(b)
             session.add(balance_cat)
 
             # Load the Budget's Expense Account
@@ -254,11 +276,16 @@ def create_user_account(
         memo=memo,
     )
 
+    # Update Payee Autofill Statistics
+    t.payee.record_transaction(t)
+    increment_counts(session, payees_table, 'use_count', {t.payee.id: 1})
+
     # Add to Session and Commit Batch
     session.add(a)
     session.add(p)
     session.add(t)
     session.commit()
+    update_payee_index(user, p, payee_version)
 
     return a, p, t
 
@@ -321,3 +348,69 @@ def get_user_account_list(session, user, budget_id=None):
         ret.append(row)
 
     return ret
+
+
+def move_account(session, user, account_id, new_position):
+    '''
+    Update the display ordering of a personal account. The ``new_position``
+    is the index of the account among the user's other personal accounts;
+    only the moved account is written unless the sparse ordering keys around
+    the new position are exhausted.
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    a = _load_account(session, user, account_id)
+    if a.role != AccountRole.Personal:
+        raise DomainError(f'Account {account_id} is not a personal account')
+
+    a.display_order = sparse_display_order(
+        session,
+        accounts_table,
+        (
+            accounts_table.c.user_id == user.id,
+            accounts_table.c.role == AccountRole.Personal,
+        ),
+        account_id,
+        new_position,
+    )
+    session.add(a)
+    session.commit()
+
+    return a
+
+
+def reorder_accounts(session, user, account_ids):
+    '''
+    Apply a complete personal account ordering in one operation. Accounts
+    which are not listed in ``account_ids`` keep their relative order and
+    are placed after the listed accounts.
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    accts = {
+        a.id: a for a in session.query(Account).filter(
+            Account.user_id == user.id,
+            Account.role == AccountRole.Personal,
+        )
+    }
+
+    for a_id in account_ids:
+        if a_id not in accts:
+            raise NoResults(f'No personal account found for id {a_id}')
+
+    if len(set(account_ids)) != len(account_ids):
+        raise DomainError('Account ordering lists an account more than once')
+
+    ordered = list(account_ids) + [
+        a.id for a in sorted(
+            accts.values(),
+            key=lambda a: (a.display_order or 0, a.id),
+        ) if a.id not in account_ids
+    ]
+
+    renumber_display_order(session, accounts_table, ordered)
+    session.commit()
+
+    return [accts[a_id] for a_id in ordered]
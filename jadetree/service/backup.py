@@ -0,0 +1,457 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+# Backup and Restore Services
+#
+# A backup holds all of a user's data in a compact binary format which can be
+# restored with bulk inserts on another server. The file is laid out as:
+#
+#   magic (4 bytes) | format version (u16) | header length (u32) | header
+#   block*          | end marker
+#
+# The header is a JSON document listing the tables, their columns and column
+# codecs, row counts and primary key ranges. Each block holds up to
+# BACKUP_BLOCK_ROWS rows of one table, stored column by column and compressed
+# with zlib:
+#
+#   table index (u16) | row count (u32) | payload length (u32) | payload
+#
+# Each column in the payload is a null mask (one byte per row) followed by
+# the values. Integer-like columns (keys, amounts in integer minor units,
+# dates as ordinals and timestamps as microseconds) are stored as delta-coded
+# little-endian 64-bit integers, and text columns as 32-bit lengths followed
+# by the UTF-8 data. All integers in the framing are big-endian.
+
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import accumulate
+import json
+import struct
+import sys
+import zlib
+
+import arrow
+from sqlalchemy import Boolean, Date, Enum, Integer, JSON, bindparam, func, select, text
+
+from jadetree.database.search import rebuild_search_index
+from jadetree.database.tables import (
+    accounts,
+    budget_entries,
+    budgets,
+    categories,
+    payees,
+    transaction_entries,
+    transaction_lines,
+    transaction_splits,
+    transactions,
+    users,
+)
+from jadetree.database.types import AmountType, ArrowType
+from jadetree.domain.models import User
+from jadetree.exc import DomainError, ImportError
+
+from .util import check_session, check_user
+
+__all__ = (
+    'BACKUP_BLOCK_ROWS',
+    'BACKUP_VERSION',
+    'read_backup_header',
+    'restore_backup',
+    'write_backup',
+)
+
+#: Backup File Magic Number
+BACKUP_MAGIC = b'JTBK'
+
+#: Backup File Format Version
+BACKUP_VERSION = 1
+
+#: Maximum number of rows stored in one block
+BACKUP_BLOCK_ROWS = 20000
+
+#: Table index of the end marker block
+_END_BLOCK = 0xFFFF
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_USEC = timedelta(microseconds=1)
+
+_file_header = struct.Struct('>4sHI')
+_block_header = struct.Struct('>HII')
+
+#: Tables in a backup in insertion order (parents before children)
+BACKUP_TABLES = (
+    users,
+    budgets,
+    categories,
+    budget_entries,
+    accounts,
+    payees,
+    transactions,
+    transaction_lines,
+    transaction_splits,
+    transaction_entries,
+)
+
+
+def _backup_query(table, user_id):
+    '''Return the query selecting a user's rows of a table'''
+    t = transactions.c
+    q = select([table]).order_by(table.c.id)
+    if table is users:
+        return q.where(users.c.id == user_id)
+    if 'user_id' in table.c:
+        return q.where(table.c.user_id == user_id)
+    if 'budget_id' in table.c:
+        return q.select_from(
+            table.join(budgets, budgets.c.id == table.c.budget_id)
+        ).where(budgets.c.user_id == user_id)
+    if 'transaction_id' in table.c:
+        return q.select_from(
+            table.join(transactions, t.id == table.c.transaction_id)
+        ).where(t.user_id == user_id)
+    if table is transaction_entries:
+        return q.select_from(
+            table.join(
+                transaction_lines, transaction_lines.c.id == table.c.line_id
+            ).join(
+                transactions, t.id == transaction_lines.c.transaction_id
+            )
+        ).where(t.user_id == user_id)
+
+    raise ValueError('Table {} is not part of a backup'.format(table.name))
+
+
+def _column_codec(column):
+    '''Return the codec name used to store a column'''
+    if isinstance(column.type, AmountType):
+        return 'a{}'.format(column.type._scale)
+    if isinstance(column.type, ArrowType):
+        return 't'
+    if isinstance(column.type, Boolean):
+        return 'b'
+    if isinstance(column.type, Integer):
+        return 'i'
+    if isinstance(column.type, Date):
+        return 'd'
+    if isinstance(column.type, Enum):
+        return 'e'
+    if isinstance(column.type, JSON):
+        return 'j'
+    return 's'
+
+
+def _to_int(codec, value):
+    '''Convert a column value to its stored integer'''
+    if codec == 't':
+        return (value.datetime - _EPOCH) // _USEC
+    if codec == 'd':
+        return value.toordinal()
+    if codec[0] == 'a':
+        return int(value.scaleb(int(codec[1:])))
+    return int(value)
+
+
+def _from_int(codec, value):
+    '''Convert a stored integer to the column value'''
+    if codec == 't':
+        return arrow.get(_EPOCH + value * _USEC)
+    if codec == 'd':
+        return date.fromordinal(value)
+    if codec == 'b':
+        return bool(value)
+    if codec[0] == 'a':
+        return Decimal(value).scaleb(-int(codec[1:]))
+    return value
+
+
+def _encode_column(codec, values):
+    '''Encode the values of one column of a block'''
+    mask = bytes(v is None for v in values)
+    if codec in ('s', 'e', 'j'):
+        if codec == 'e':
+            values = [None if v is None else v.value for v in values]
+        elif codec == 'j':
+            values = [None if v is None else json.dumps(v) for v in values]
+        data = [b'' if v is None else v.encode('utf-8') for v in values]
+        lengths = array('I', [len(d) for d in data])
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        return mask + lengths.tobytes() + b''.join(data)
+
+    ints = array('q')
+    prev = 0
+    for v in values:
+        if v is None:
+            ints.append(0)
+            continue
+        v = _to_int(codec, v)
+        ints.append(v - prev)
+        prev = v
+
+    if sys.byteorder == 'big':
+        ints.byteswap()
+    return mask + ints.tobytes()
+
+
+def _decode_column(codec, payload, offset, n):
+    '''Decode one column of a block, returning the values and next offset'''
+    mask = payload[offset:offset + n]
+    offset += n
+
+    if codec in ('s', 'e', 'j'):
+        lengths = array('I')
+        lengths.frombytes(payload[offset:offset + 4 * n])
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        offset += 4 * n
+
+        values = []
+        for i, ln in enumerate(lengths):
+            if mask[i]:
+                values.append(None)
+            else:
+                s = payload[offset:offset + ln].decode('utf-8')
+                values.append(json.loads(s) if codec == 'j' else s)
+            offset += ln
+        return values, offset
+
+    ints = array('q')
+    ints.frombytes(payload[offset:offset + 8 * n])
+    if sys.byteorder == 'big':
+        ints.byteswap()
+    offset += 8 * n
+
+    # Null values are stored as a zero delta
+    values = list(accumulate(ints))
+    if any(mask):
+        values = [None if m else v for v, m in zip(values, mask)]
+    if codec != 'i':
+        values = [v if v is None else _from_int(codec, v) for v in values]
+    return values, offset
+
+
+def _write_block(fp, index, columns, rows):
+    '''Write one compressed block of rows'''
+    payload = b''.join(
+        _encode_column(codec, values)
+        for (_, codec), values in zip(columns, zip(*rows))
+    )
+    data = zlib.compress(payload)
+    fp.write(_block_header.pack(index, len(rows), len(data)))
+    fp.write(data)
+
+
+def write_backup(session, user, fp, block_rows=BACKUP_BLOCK_ROWS):
+    '''
+    Write a backup of all of a user's data to a binary file object. Each
+    table is read from a server-side cursor and written in blocks of up to
+    ``block_rows`` rows, so memory use does not grow with the ledger.
+
+    :param session: Database session
+    :type session: ~sqlalchemy.orm.session.Session
+    :param user:
+    :type user: User
+    :param fp: Binary file object
+    '''
+    check_session(session)
+    check_user(user)
+
+    tables = []
+    for table in BACKUP_TABLES:
+        q = _backup_query(table, user.id).subquery()
+        n, lo, hi = session.execute(
+            select([func.count(), func.min(q.c.id), func.max(q.c.id)])
+        ).fetchone()
+        tables.append(dict(
+            name=table.name,
+            columns=[[c.name, _column_codec(c)] for c in table.c],
+            rows=n,
+            ids=[lo, hi],
+        ))
+
+    header = json.dumps(dict(
+        created_at=arrow.utcnow().isoformat(),
+        user_id=user.id,
+        tables=tables,
+    )).encode('utf-8')
+
+    fp.write(_file_header.pack(BACKUP_MAGIC, BACKUP_VERSION, len(header)))
+    fp.write(header)
+
+    conn = session.connection().execution_options(stream_results=True)
+    for index, (table, info) in enumerate(zip(BACKUP_TABLES, tables)):
+        result = conn.execute(_backup_query(table, user.id))
+        for rows in result.partitions(block_rows):
+            _write_block(fp, index, info['columns'], rows)
+
+    fp.write(_block_header.pack(_END_BLOCK, 0, 0))
+
+
+def read_backup_header(fp):
+    '''
+    Read and validate the header of a backup file, returning the header
+    information as a dictionary.
+    '''
+    data = fp.read(_file_header.size)
+    if len(data) < _file_header.size:
+        raise ImportError('Backup file is truncated')
+
+    magic, version, length = _file_header.unpack(data)
+    if magic != BACKUP_MAGIC:
+        raise ImportError('Not a Jade Tree backup file')
+    if version > BACKUP_VERSION:
+        raise ImportError(
+            'Backup file version {} is newer than supported version {}'.format(
+                version,
+                BACKUP_VERSION,
+            )
+        )
+
+    header = json.loads(fp.read(length).decode('utf-8'))
+    header['version'] = version
+    return header
+
+
+def _read_blocks(fp, header):
+    '''Yield (table info, column values) for each block of a backup file'''
+    while True:
+        data = fp.read(_block_header.size)
+        if len(data) < _block_header.size:
+            raise ImportError('Backup file is truncated')
+
+        index, n, length = _block_header.unpack(data)
+        if index == _END_BLOCK:
+            return
+
+        info = header['tables'][index]
+        payload = zlib.decompress(fp.read(length))
+        offset = 0
+        values = []
+        for _, codec in info['columns']:
+            col, offset = _decode_column(codec, payload, offset, n)
+            values.append(col)
+
+        yield info, values
+
+
+def restore_backup(session, fp, email=None):
+    '''
+    Restore a user from a backup file with bulk inserts. Primary keys are
+    shifted past the existing rows of each table (and foreign keys shifted
+    to match), so the backup may be restored into a database which already
+    holds other users. The search index is rebuilt for the restored user.
+
+    Tables are restored in dependency order (`BACKUP_TABLES`), so foreign
+    key checks stay enabled. Self-referencing keys (a category's parent)
+    may refer to a later row, so they are set once their table is restored.
+
+    :param session: Database session
+    :type session: ~sqlalchemy.orm.session.Session
+    :param fp: Binary file object
+    :param email: Email address for the restored user, which also assigns a
+        new user hash. By default the backed up email and hash are kept.
+    :type email: str
+    :returns: the restored `User` object
+    :rtype: User
+    '''
+    check_session(session)
+
+    header = read_backup_header(fp)
+    tables = {t.name: t for t in BACKUP_TABLES}
+    infos = {info['name']: info for info in header['tables']}
+
+    for info in header['tables']:
+        table = tables.get(info['name'])
+        if table is None:
+            raise ImportError('Unknown table {} in backup file'.format(info['name']))
+        for name, _ in info['columns']:
+            if name not in table.c:
+                raise ImportError('Unknown column {}.{} in backup file'.format(table.name, name))
+
+    # Shift each table's keys past the highest existing key
+    offsets = {}
+    for name, table in tables.items():
+        lo = infos.get(name, {}).get('ids', [None])[0]
+        hi = session.execute(select([func.max(table.c.id)])).scalar()
+        offsets[name] = max(0, (hi or 0) + 1 - lo) if lo is not None else 0
+
+    shift = {}
+    for name, table in tables.items():
+        shift[name] = {'id': offsets[name]}
+        for c in table.c:
+            for fk in c.foreign_keys:
+                shift[name][c.name] = offsets[fk.column.table.name]
+
+    self_refs = {
+        name: [c.name for c in table.c if any(fk.column.table is table for fk in c.foreign_keys)]
+        for name, table in tables.items()
+    }
+    fixups = {}
+    user_id = None
+
+    for info, values in _read_blocks(fp, header):
+        table = tables[info['name']]
+        names = [name for name, _ in info['columns']]
+        for i, name in enumerate(names):
+            off = shift[table.name].get(name)
+            if off:
+                values[i] = [v if v is None else v + off for v in values[i]]
+
+        rows = [dict(zip(names, r)) for r in zip(*values)]
+        for col in self_refs[table.name]:
+            for row in rows:
+                if row.get(col) is not None:
+                    fixups.setdefault((table.name, col), []).append(
+                        dict(row_id=row['id'], ref_id=row[col])
+                    )
+                    row[col] = None
+
+        if table is users:
+            row = rows[0]
+            if email is not None:
+                row['email'] = email
+                row['uid_hash'] = User(email=email)._generate_user_hash()
+
+            conflict = session.execute(
+                select([users.c.id]).where(
+                    (users.c.email == row['email']) | (users.c.uid_hash == row['uid_hash'])
+                )
+            ).first()
+            if conflict is not None:
+                raise DomainError(
+                    'User {} already exists; restore with a new email address'.format(row['email'])
+                )
+
+            user_id = row['id']
+
+        session.execute(table.insert(), rows)
+
+    if user_id is None:
+        raise ImportError('Backup file does not contain a user')
+
+    for (name, col), params in fixups.items():
+        table = tables[name]
+        session.execute(
+            table.update()
+            .where(table.c.id == bindparam('row_id'))
+            .values({col: bindparam('ref_id')}),
+            params,
+        )
+
+    # Move PostgreSQL sequences past the restored keys
+    if session.connection().dialect.name == 'postgresql':
+        for name in tables:
+            session.execute(text(
+                "SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+                "(SELECT max(id) FROM {0}))".format(name)
+            ))
+
+    rebuild_search_index(session, user_id)
+    session.commit()
+
+    return session.query(User).get(user_id)
@@ -8,6 +8,7 @@
 # Budget Services
 
 from .budget import _load_budget, create_budget, update_budget
+from .cache import CategoryTree, load_category_tree
 from .category import (
     _load_category,
     create_budget_category,
@@ -15,6 +16,7 @@ from .category import (
     delete_category,
     get_category_tree,
     move_category,
+    reorder_categories,
     update_category,
 )
 from .data import get_budget_data, get_budget_month, get_budget_summary
@@ -43,11 +45,14 @@ __all__ = (
     'get_budget_summary',
 
     # Categories
+    'CategoryTree',
+    'load_category_tree',
     'create_budget_category_group',
     'create_budget_category',
     'delete_category',
     'get_category_tree',
     'move_category',
+    'reorder_categories',
     'update_category',
 
     # Budget Entries
@@ -12,6 +12,7 @@ from sqlalchemy.exc import IntegrityError
 from jadetree.domain.data import CURRENCY_LIST
 from jadetree.domain.models import Account, Budget, Category
 from jadetree.domain.types import AccountRole, AccountType
+from jadetree.domain.util import ORDER_STEP
 from jadetree.exc import DomainError, NoResults, Unauthorized
 
 from ..util import check_session, check_user
@@ -140,7 +141,7 @@ def create_budget(session, user, name, currency=None, categories=None):
         parent=None,
         system=False,
         hidden=True,
-        display_order=1,
+        display_order=ORDER_STEP,
     )
 
     if categories is not None:
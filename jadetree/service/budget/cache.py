@@ -0,0 +1,192 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+# Budget Category Tree Cache
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+import threading
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from jadetree.database.tables import categories as categories_table
+from jadetree.domain.util import new_version_token
+
+from ..util import check_session, check_user
+from .budget import _load_budget
+
+__all__ = (
+    'CachedCategory',
+    'CategoryTree',
+    'invalidate_category_tree',
+    'load_category_tree',
+)
+
+#: Maximum number of Budget Category Trees held in the cache
+CACHE_SIZE = 128
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CachedCategory:
+    '''
+    Immutable snapshot of a `Category` or Category Group. Category Groups
+    hold their child categories in display order in ``children``.
+    '''
+    id: int
+    parent_id: Optional[int]
+    parent_name: Optional[str]
+    name: str
+    system: bool
+    hidden: bool
+    display_order: Optional[int]
+    default_budget: Optional[Decimal]
+    notes: Optional[str]
+    currency: str
+    children: Tuple['CachedCategory', ...] = ()
+
+    @property
+    def is_group(self):
+        '''Return True if the object is a Category Group'''
+        return self.parent_id is None
+
+
+@dataclass(frozen=True)
+class CategoryTree:
+    '''
+    Immutable snapshot of the Category Tree for a Budget, holding the
+    Category Groups in display order and a lookup map of all groups and
+    categories by id. The ``version`` is the budget's ``category_version``
+    token at the time the tree was loaded.
+    '''
+    budget_id: int
+    version: str
+    groups: Tuple[CachedCategory, ...]
+    by_id: Mapping[int, CachedCategory]
+
+    @property
+    def categories(self):
+        '''Return all non-group categories in display order'''
+        return tuple(c for g in self.groups for c in g.children)
+
+
+def _build_category_tree(session, budget):
+    '''Load the Category Tree for a Budget with a single query'''
+    c = categories_table.c
+    rows = session.execute(
+        select([
+            c.id,
+            c.parent_id,
+            c.name,
+            c.system,
+            c.hidden,
+            c.display_order,
+            c.default_budget,
+            c.notes,
+        ]).where(
+            c.budget_id == budget.id
+        ).order_by(
+            func.coalesce(c.display_order, 0),
+            c.id,
+        )
+    ).fetchall()
+
+    names = {r.id: r.name for r in rows}
+    children = {r.id: [] for r in rows if r.parent_id is None}
+    for r in rows:
+        if r.parent_id is not None:
+            children.setdefault(r.parent_id, []).append(CachedCategory(
+                id=r.id,
+                parent_id=r.parent_id,
+                parent_name=names.get(r.parent_id),
+                name=r.name,
+                system=r.system,
+                hidden=r.hidden,
+                display_order=r.display_order,
+                default_budget=r.default_budget,
+                notes=r.notes,
+                currency=budget.currency,
+            ))
+
+    groups = tuple(
+        CachedCategory(
+            id=r.id,
+            parent_id=None,
+            parent_name=None,
+            name=r.name,
+            system=r.system,
+            hidden=r.hidden,
+            display_order=r.display_order,
+            default_budget=r.default_budget,
+            notes=r.notes,
+            currency=budget.currency,
+            children=tuple(children[r.id]),
+        ) for r in rows if r.parent_id is None
+    )
+
+    by_id = {g.id: g for g in groups}
+    by_id.update({c.id: c for g in groups for c in g.children})
+
+    return CategoryTree(
+        budget_id=budget.id,
+        version=budget.category_version,
+        groups=groups,
+        by_id=MappingProxyType(by_id),
+    )
+
+
+def _category_tree(session, budget):
+    '''
+    Return the cached Category Tree for a loaded `Budget`, rebuilding it if
+    the budget's ``category_version`` token has changed.
+    '''
+    version = budget.category_version
+    if version is not None:
+        with _cache_lock:
+            tree = _cache.get(budget.id)
+            if tree is not None and tree.version == version:
+                _cache.move_to_end(budget.id)
+                return tree
+
+    tree = _build_category_tree(session, budget)
+
+    if version is not None:
+        with _cache_lock:
+            _cache[budget.id] = tree
+            _cache.move_to_end(budget.id)
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    return tree
+
+
+def invalidate_category_tree(budget):
+    '''
+    Replace the ``category_version`` token for a Budget so that cached
+    Category Trees are rebuilt by every process once the change is
+    committed. This must be called by every service which changes a
+    Category belonging to the budget.
+    '''
+    budget.category_version = new_version_token()
+    with _cache_lock:
+        _cache.pop(budget.id, None)
+
+
+def load_category_tree(session, user, budget_id):
+    '''
+    Return the immutable `CategoryTree` for a Budget, using the cached copy
+    if the budget's categories have not changed since it was loaded.
+    '''
+    check_session(session)
+    check_user(user)
+
+    return _category_tree(session, _load_budget(session, user, budget_id))
@@ -5,15 +5,16 @@
 #
 # =============================================================================
 
-from sqlalchemy import and_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func
 
 from jadetree.database.tables import categories as categories_table
 from jadetree.domain.models import Category
+from jadetree.domain.util import ORDER_STEP
 from jadetree.exc import DomainError, NoResults, Unauthorized
 
-from ..util import check_session, check_user
+from ..util import check_session, check_user, sparse_display_order
 from .budget import _load_budget
+from .cache import _category_tree, invalidate_category_tree
 
 __all__ = (
     '_load_category',
@@ -22,6 +23,7 @@ __all__ = (
     'delete_category',
     'get_category_tree',
     'move_category',
+    'reorder_categories',
     'update_category',
 )
 
@@ -52,6 +54,16 @@ def _load_category(session, user, budget_id, category_id):
     return c
 
 
+def _next_display_order(session, budget_id, parent_id):
+    '''Return the Display Order key which places a new Category last'''
+    last = session.query(func.max(Category.display_order)).filter(
+        Category.budget_id == budget_id,
+        Category.parent_id == parent_id,
+    ).scalar()
+
+    return 0 if last is None else last + ORDER_STEP
+
+
 def create_budget_category_group(session, user, budget_id, name, notes=None):
     '''
     Create a new Category Group for the Budget
@@ -67,13 +79,14 @@ def create_budget_category_group(session, user, budget_id, name, notes=None):
         name=name,
         system=False,
         hidden=False,
-        display_order=len(b.groups),
+        display_order=_next_display_order(session, budget_id, None),
         notes=notes,
     )
 
     # FIXME: Add Context Manager
     # with session:
 
+    invalidate_category_tree(b)
     session.add(cg)
     session.commit()
 
@@ -108,7 +121,7 @@ def create_budget_category(
         parent=cg,
         system=False,
         hidden=False,
-        display_order=len(cg.children),
+        display_order=_next_display_order(session, budget_id, cg.id),
         default_budget=default_budget,
         notes=notes,
     )
@@ -116,6 +129,7 @@ def create_budget_category(
     # FIXME: Add Context Manager
     # with session:
 
+    invalidate_category_tree(b)
     session.add(c)
     session.commit()
 
@@ -124,6 +138,9 @@ def create_budget_category(
 
 def get_category_tree(session, user, budget_id):
     '''
+    Return the Category Tree for the Budget as a list of Category Group
+    dictionaries in display order, each with a ``children`` list of Category
+    dictionaries. The tree is built from the cached `CategoryTree`.
     '''
     check_session(session)
     check_user(user, needs_profile=True)
@@ -131,18 +148,9 @@ def get_category_tree(session, user, budget_id):
     # Load Budget
     b = _load_budget(session, user, budget_id)
 
-    # Load Query
-    q = session.query(Category)\
-        .options(joinedload(Category.children))\
-        .filter(
-            Category.budget == b,
-            Category.parent == None         # noqa: E711
-        ) \
-        .order_by(Category.display_order)   # noqa: E123
-
     # Convert to dicts in display sort order
     ret = []
-    for grp in q.all():
+    for grp in _category_tree(session, b).groups:
         ret.append(dict(
             id=grp.id,
             name=grp.name,
@@ -158,10 +166,7 @@ def get_category_tree(session, user, budget_id):
                 order=cat.display_order,
                 notes=cat.notes,
                 default=cat.default_budget,
-            ) for cat in sorted(
-                list(grp.children),
-                key=lambda x: x.display_order or 0
-            )]
+            ) for cat in grp.children]
         ))
 
     # Return Category Tree
@@ -176,6 +181,7 @@ def delete_category(session, user, budget_id, category_id):
     # Load Category
     c = _load_category(session, user, budget_id, category_id)
 
+    invalidate_category_tree(c.budget)
     session.delete(c)
     session.commit()
 
@@ -215,56 +221,19 @@ def update_category(session, user, budget_id, category_id, **kwargs):
             'Unexpected keyword arguments: {}'.format(', '.join(kwargs.keys()))
         )
 
+    invalidate_category_tree(c.budget)
     session.add(c)
     session.commit()
 
     return c
 
 
-def _update_positions(session, budget_id, parent_id, cur_position, new_position):
-    '''
-    Update the Display Ordering of categories around the new position. Use
-    tailored SQL here for efficiency.
-    '''
-    if new_position > cur_position:
-        # Move items between current and desired position Up
-        stmt = categories_table \
-            .update() \
-            .values(
-                display_order=categories_table.c.display_order - 1
-            ).where(
-                and_(
-                    categories_table.c.budget_id == budget_id,
-                    categories_table.c.parent_id == parent_id,
-                    categories_table.c.display_order > cur_position,
-                    categories_table.c.display_order <= new_position
-                )
-            )
-
-        session.execute(stmt)
-
-    else:
-        # Move items between current and desired position Down
-        stmt = categories_table \
-            .update() \
-            .values(
-                display_order=categories_table.c.display_order + 1
-            ).where(
-                and_(
-                    categories_table.c.budget_id == budget_id,
-                    categories_table.c.parent_id == parent_id,
-                    categories_table.c.display_order >= new_position,
-                    categories_table.c.display_order < cur_position
-                )
-            )
-
-        session.execute(stmt)
-
-
 def move_category(session, user, budget_id, category_id, new_position, new_parent):
     '''
     Update the display ordering of a category within its parent or to another
-    parent category.
+    parent category. The ``new_position`` is the index of the category among
+    its new siblings; only the moved category is written unless the sparse
+    ordering keys around the new position are exhausted.
     '''
     check_session(session)
     check_user(user, needs_profile=True)
@@ -277,38 +246,97 @@ def move_category(session, user, budget_id, category_id, new_position, new_paren
     if cat is None:
         raise NoResults(f'No category found with id {category_id}')
 
-    cur_position = cat.display_order or 0
-    cur_parent = cat.parent_id
-    if new_position < 0:
-        new_position = 0
-
-    # New Position must be between 0 and number of sibling categories
-    n_cats = session \
-        .query(Category) \
-        .filter(
-            Category.budget == b,
-            Category.parent_id == new_parent
-        ) \
-        .count()
-
-    if new_position >= n_cats:
-        new_position = n_cats
-
-    # If the Parent is changing, this is a two-step process
-    if new_parent != cur_parent:
-        # Move to end position within current parent to update old siblings
-        _update_positions(session, budget_id, cur_parent, cur_position, 99999)
-        # Move to new position within new parent from end
-        _update_positions(session, budget_id, new_parent, 99999, new_position)
-
-    else:
-        # Move to new position within current parent
-        _update_positions(session, budget_id, cur_parent, cur_position, new_position)
-
-    # Update Display Order and Parent for target category
-    cat.display_order = new_position
+    # Calculate the Display Order key between the new siblings
+    cat.display_order = sparse_display_order(
+        session,
+        categories_table,
+        (
+            categories_table.c.budget_id == budget_id,
+            categories_table.c.parent_id == new_parent,
+        ),
+        category_id,
+        new_position,
+    )
     cat.parent_id = new_parent
+    invalidate_category_tree(b)
     session.add(cat)
     session.commit()
 
     return cat
+
+
+def reorder_categories(session, user, budget_id, groups):
+    '''
+    Apply a complete Category ordering to the budget in one operation. The
+    ``groups`` argument is a list of dictionaries with the Category Group
+    ``id`` and an optional ``children`` list of Category ids, each in the
+    desired display order. Categories listed under a different group are
+    moved to that group. Groups and categories which are not listed keep
+    their relative order and are placed after the listed items.
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    # Load Budget and all Categories
+    b = _load_budget(session, user, budget_id)
+    cats = {c.id: c for c in b.categories}
+
+    seen = set()
+    group_ids = []
+    child_ids = {}
+    for grp in groups:
+        g_id = grp.get('id')
+        if g_id not in cats:
+            raise NoResults(f'No category group found with id {g_id}')
+        if cats[g_id].parent_id is not None:
+            raise DomainError(f'Category {g_id} is not a Category Group')
+        if g_id in seen:
+            raise DomainError(f'Category {g_id} is listed more than once')
+
+        seen.add(g_id)
+        group_ids.append(g_id)
+        child_ids[g_id] = []
+
+        for c_id in grp.get('children', None) or []:
+            if c_id not in cats:
+                raise NoResults(f'No category found with id {c_id}')
+            if cats[c_id].parent_id is None:
+                raise DomainError(f'Category {c_id} is a Category Group')
+            if c_id in seen:
+                raise DomainError(f'Category {c_id} is listed more than once')
+
+            seen.add(c_id)
+            child_ids[g_id].append(c_id)
+
+    # Append unlisted Groups and Categories in their current order
+    def _key(c):
+        return (c.display_order or 0, c.id)
+
+    for c in sorted(cats.values(), key=_key):
+        if c.id in seen:
+            continue
+        if c.parent_id is None:
+            group_ids.append(c.id)
+            child_ids.setdefault(c.id, [])
+        else:
+            child_ids.setdefault(c.parent_id, []).append(c.id)
+
+    # Assign new Parents and evenly spaced Display Order keys
+    changed = []
+    for gi, g_id in enumerate(group_ids):
+        for ci, c_id in enumerate([g_id] + child_ids[g_id]):
+            c = cats[c_id]
+            order = (gi if c_id == g_id else ci - 1) * ORDER_STEP
+            parent = None if c_id == g_id else cats[g_id]
+            if c.display_order != order or c.parent is not parent:
+                c.display_order = order
+                c.parent = parent
+                changed.append(c)
+
+    if changed:
+        invalidate_category_tree(b)
+
+    session.add_all(changed)
+    session.commit()
+
+    return changed
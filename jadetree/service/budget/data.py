@@ -9,14 +9,17 @@ from datetime import datetime
 from decimal import Decimal
 
 from jadetree.database.queries import q_budget_summary
-from jadetree.domain.models import Category
+from jadetree.database.routing import replica_read
+from jadetree.domain.util import month_from_key
 
 from ..util import check_session, check_user
 from .budget import _load_budget
+from .cache import _category_tree
 
 __all__ = ('get_budget_data', 'get_budget_month', 'get_budget_summary')
 
 
+@replica_read
 def get_budget_data(session, user, budget_id):
     '''
     Return Budget Data for all months from the first transaction linked to
@@ -26,26 +29,16 @@ def get_budget_data(session, user, budget_id):
     check_user(user)
 
     # Check existence and authorization for budget id
-    _load_budget(session, user, budget_id)
+    b = _load_budget(session, user, budget_id)
 
-    # Load Categories and find Income Categories
-    q_categories = session.query(Category).filter(
-        Category.budget_id == budget_id,
-        Category.parent_id != None      # noqa: E711
-    )
-
-    categories = dict()
-    cat_ids = []
-    cat_grp_ids = set()
+    # Load Categories from the cached tree and find Income Categories
+    categories = _category_tree(session, b).by_id
     cat_cur_income = None
     cat_next_income = None
-    for c in q_categories.all():
-        cat_ids.append(c.id)
-        cat_grp_ids.add(c.parent_id)
-        categories[c.id] = c
-        if c.name == '_cur_month':
+    for c in categories.values():
+        if c.parent_id is not None and c.name == '_cur_month':
             cat_cur_income = c.id
-        if c.name == '_next_month':
+        if c.parent_id is not None and c.name == '_next_month':
             cat_next_income = c.id
 
     # Load Summary Items from Database (grouped and ordered by date)
@@ -127,13 +120,12 @@ def get_budget_data(session, user, budget_id):
 
     # Process Categories per Month
     for rec in session.execute(q_summary):
-        entry_id, cat, y, m, outflow, ntrans, budget, rollover, notes = rec
+        entry_id, cat, mk, outflow, ntrans, budget, rollover, notes = rec
         outflow = outflow or Decimal(0)
         budget = budget or Decimal(0)
 
-        # Force the Year and Month to be integers
-        y = int(y)
-        m = int(m)
+        # Split the Month Key into Year and Month
+        y, m = month_from_key(mk)
 
         # Advance to Next Month?
         if (y, m) != cur_ym:
@@ -224,6 +216,7 @@ def get_budget_data(session, user, budget_id):
     return data
 
 
+@replica_read
 def get_budget_month(session, user, budget_id, month=None):
     '''
     Return the Budget Data for a single month
@@ -274,6 +267,7 @@ def get_budget_month(session, user, budget_id, month=None):
     return budget_data[key]
 
 
+@replica_read
 def get_budget_summary(session, user, budget_id, month=None):
     '''
     Return the Budget Summary for the a single month
@@ -295,13 +289,14 @@ def get_budget_summary(session, user, budget_id, month=None):
         'overspent_categories': [],
     }
 
+    categories = _category_tree(session, budget_obj).by_id
     for cid, c in budget_data['categories'].items():
         if c['overspend'] < 0:
-            cat = session.query(Category).get(cid)
+            cat = categories[cid]
             ret['overspent_categories'].append({
                 'id': cid,
                 'name': cat.name,
-                'parent_name': cat.parent.name if cat.parent else '',
+                'parent_name': cat.parent_name or '',
                 'budget': c['budget'],
                 'outflow': c['outflow'],
                 'overspend': c['overspend'],
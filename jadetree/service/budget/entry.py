@@ -5,12 +5,11 @@
 #
 # =============================================================================
 
-from datetime import date
-
 from sqlalchemy import and_
 from sqlalchemy.exc import IntegrityError
 
 from jadetree.domain.models import BudgetEntry, Category
+from jadetree.domain.util import month_key
 from jadetree.exc import DomainError, NoResults, Unauthorized
 
 from ..util import check_session, check_user
@@ -61,14 +60,9 @@ def _load_entry_ymc(session, user, budget_id, year, month, category_id):
     c = _load_category(session, user, budget_id, category_id)
 
     # Load Budget Entry
-    d1 = date(year, month, 1)
-    d2 = date(year, month + 1, 1)
     e = session.query(BudgetEntry).filter(
         and_(
-            and_(
-                BudgetEntry.month >= d1,
-                BudgetEntry.month < d2,
-            ),
+            BudgetEntry.month_key == month_key((year, month)),
             BudgetEntry.category == c,
             BudgetEntry.budget == b,
         )
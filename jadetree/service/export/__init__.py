@@ -4,7 +4,7 @@ Jade Tree Personal Budgeting Application | jadetree.io
 Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
 """
 
-from .json import export_data_json
+from .json import export_data_json, iter_data_json, write_data_json
 from .qif import (
     export_account_qif,
     export_budget_qif,
@@ -18,4 +18,6 @@ __all__ = (
     export_payees_qif,
     export_transaction_qif,
     export_data_json,
+    iter_data_json,
+    write_data_json,
 )
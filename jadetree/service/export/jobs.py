@@ -0,0 +1,71 @@
+"""Jade Tree Data Export Jobs.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+from sqlalchemy import func, select
+
+from jadetree.database.tables import transaction_lines, transactions
+from jadetree.domain.types import AccountRole
+from jadetree.jobs import job_handler
+
+from ..account import _load_account
+from .json import write_data_json
+from .qif import export_account_qif
+
+# Background Export Job Handlers
+
+
+@job_handler('export_json')
+def export_json_job(ctx):
+    """Write the user's data as a JSON document artifact."""
+    total = ctx.session.execute(
+        select([func.count(transactions.c.id)])
+        .where(transactions.c.user_id == ctx.user.id)
+    ).scalar()
+
+    with ctx.open_artifact('jadetree.json', 'application/json') as fp:
+        write_data_json(
+            ctx.session,
+            ctx.user,
+            fp,
+            progress=lambda done: ctx.progress(done, total),
+        )
+
+
+@job_handler('export_qif')
+def export_qif_job(ctx):
+    """Write a QIF artifact with one Account, or all Personal Accounts.
+
+    The Account is selected with the ``account_id`` job parameter.
+    """
+    account_id = ctx.params.get('account_id')
+    if account_id is not None:
+        accts = [_load_account(ctx.session, ctx.user, account_id)]
+        filename = '{}.qif'.format(accts[0].name)
+    else:
+        accts = [
+            a for a in sorted(ctx.user.accounts, key=lambda a: a.id)
+            if a.role == AccountRole.Personal
+        ]
+        filename = 'jadetree.qif'
+
+    ln = transaction_lines.c
+    counts = dict(ctx.session.execute(
+        select([ln.account_id, func.count(ln.id)])
+        .where(ln.account_id.in_([a.id for a in accts]))
+        .group_by(ln.account_id)
+    ).fetchall())
+    total = sum(counts.values())
+
+    done = 0
+    with ctx.open_artifact(filename, 'application/qif') as fp:
+        for acct in accts:
+            def progress(n, offset=done):
+                ctx.progress(offset + n, total)
+
+            for line in export_account_qif(ctx.session, acct, progress=progress):
+                fp.write(line + '\n')
+
+            done += counts.get(acct.id, 0)
@@ -4,9 +4,24 @@ Jade Tree Personal Budgeting Application | jadetree.io
 Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
 """
 
+from decimal import Decimal
+from itertools import islice
+import json
+
 from marshmallow import Schema, fields, pre_dump
 from marshmallow_enum import EnumField
-
+from sqlalchemy import and_, select
+from sqlalchemy.orm import selectinload
+
+from jadetree.database.routing import replica_read
+from jadetree.database.tables import (
+    transaction_entries,
+    transaction_lines,
+    transaction_splits,
+    transactions as transactions_table,
+)
+from jadetree.database.util import keyset_pages
+from jadetree.domain.models import Account, Budget, Category, Payee
 from jadetree.domain.types import (
     AccountRole,
     AccountSubtype,
@@ -15,6 +30,9 @@ from jadetree.domain.types import (
     TransactionType,
 )
 
+#: Number of rows fetched from each server-side cursor batch when streaming
+STREAM_CHUNK_SIZE = 1000
+
 
 class AccountSchema(Schema):
     """Export Schema for an `Account`."""
@@ -166,3 +184,192 @@ def export_data_json(user):
         transactions=user.transactions,
         version=1,
     ))
+
+
+def _dump_chunk(schema, objs):
+    """Serialize a list of objects to JSON array items without brackets."""
+    return json.dumps(schema.dump(objs, many=True))[1:-1]
+
+
+def _split_amount(amount, line_currency, txn):
+    """Convert a Split amount to the Transaction currency.
+
+    Mirrors `TransactionSplit.amount` for rows which were loaded without the
+    ORM.
+    """
+    if line_currency == txn.currency:
+        return amount
+    if line_currency == txn.foreign_currency:
+        return amount * (txn.foreign_exchrate or 1)
+    return amount / (txn.foreign_exchrate or 1)
+
+
+def _transaction_children(session, user, lo, hi):
+    """Load the Lines, Splits and Entries for a range of Transaction ids.
+
+    Children are fetched with one query per table for the whole range. The
+    Lines and Splits are returned as dictionaries of row lists keyed by
+    Transaction id, and the Entries as a list of rows.
+    """
+    t = transactions_table.c
+    ln = transaction_lines.c
+    sp = transaction_splits.c
+
+    lines = {}
+    for r in session.execute(
+        select([transaction_lines]).select_from(
+            transaction_lines.join(transactions_table, t.id == ln.transaction_id)
+        ).where(
+            and_(t.user_id == user.id, ln.transaction_id.between(lo, hi))
+        ).order_by(ln.id)
+    ):
+        lines.setdefault(r.transaction_id, []).append(r)
+
+    splits = {}
+    for r in session.execute(
+        select([transaction_splits]).select_from(
+            transaction_splits.join(transactions_table, t.id == sp.transaction_id)
+        ).where(
+            and_(t.user_id == user.id, sp.transaction_id.between(lo, hi))
+        ).order_by(sp.id)
+    ):
+        splits.setdefault(r.transaction_id, []).append(r)
+
+    e = transaction_entries.c
+    entries = session.execute(
+        select([e.line_id, e.split_id, e.amount]).select_from(
+            transaction_entries.join(
+                transaction_lines, ln.id == e.line_id
+            ).join(
+                transactions_table, t.id == ln.transaction_id
+            )
+        ).where(
+            and_(t.user_id == user.id, ln.transaction_id.between(lo, hi))
+        )
+    ).fetchall()
+
+    return lines, splits, entries
+
+
+def _dump_transactions(session, user, accounts, chunk_size, progress=None):
+    """Yield JSON text for each chunk of a user's Transactions.
+
+    Transactions are read in ``chunk_size`` pages by id (see
+    `keyset_pages`), and the children of each page are bulk-loaded by id
+    range.
+    If given, ``progress`` is called with the number of Transactions written
+    after each batch.
+    """
+    schema = TransactionSchema()
+    t = transactions_table.c
+    pages = keyset_pages(
+        session,
+        select([transactions_table]).where(t.user_id == user.id),
+        [t.id],
+        chunk_size,
+    )
+
+    first = True
+    done = 0
+    for rows in pages:
+        lines, splits, entries = _transaction_children(session, user, rows[0].id, rows[-1].id)
+
+        line_amounts = {}
+        split_amounts = {}
+        left_lines = {sp.id: sp.left_line_id for sps in splits.values() for sp in sps}
+        for e in entries:
+            line_amounts[e.line_id] = line_amounts.get(e.line_id, Decimal()) + e.amount
+            if left_lines.get(e.split_id) == e.line_id:
+                split_amounts[e.split_id] = split_amounts.get(e.split_id, Decimal()) + e.amount
+
+        chunk = []
+        for txn in rows:
+            txn_lines = lines.get(txn.id, [])
+            line_ccy = {ln.id: accounts[ln.account_id].currency for ln in txn_lines}
+            chunk.append(dict(
+                txn._mapping,
+                lines=[dict(
+                    ln._mapping,
+                    role=accounts[ln.account_id].role,
+                    amount=line_amounts.get(ln.id, Decimal()),
+                    currency=line_ccy[ln.id],
+                ) for ln in txn_lines],
+                splits=[dict(
+                    sp._mapping,
+                    amount=_split_amount(
+                        split_amounts.get(sp.id, Decimal()),
+                        line_ccy.get(sp.left_line_id),
+                        txn,
+                    ),
+                    currency=txn.currency,
+                ) for sp in splits.get(txn.id, [])],
+            ))
+
+        yield ('' if first else ',') + _dump_chunk(schema, chunk)
+        first = False
+
+        done += len(rows)
+        if progress is not None:
+            progress(done)
+
+
+def _dump_objects(q, schema, chunk_size):
+    """Yield JSON text for each chunk of ORM objects read with yield_per."""
+    it = iter(q.yield_per(chunk_size))
+    first = True
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            break
+
+        yield ('' if first else ',') + _dump_chunk(schema, chunk)
+        first = False
+
+
+@replica_read
+def iter_data_json(session, user, chunk_size=STREAM_CHUNK_SIZE, progress=None):
+    """Export User Data as a stream of JSON text fragments.
+
+    Produces the same document as :func:`export_data_json`, but reads each
+    entity type from a server-side cursor in ``chunk_size`` batches and
+    yields the JSON text incrementally, so that memory use does not grow
+    with the size of the ledger. The fragments may be written to a file or
+    returned as a streamed response. If given, ``progress`` is called with
+    the number of Transactions written after each batch.
+    """
+    # Accounts are held for the whole export to resolve Line currencies
+    accounts = session.query(Account).filter(Account.user_id == user.id).order_by(Account.id).all()
+
+    yield '{"accounts":['
+    yield ','.join(json.dumps(d) for d in AccountSchema(many=True).dump(accounts))
+
+    yield '],"budgets":['
+    yield from _dump_objects(
+        session.query(Budget).filter(Budget.user_id == user.id).order_by(Budget.id).options(
+            selectinload(Budget.categories).selectinload(Category.children),
+            selectinload(Budget.entries),
+        ),
+        BudgetSchema(),
+        chunk_size,
+    )
+
+    yield '],"payees":['
+    yield from _dump_objects(
+        session.query(Payee).filter(Payee.user_id == user.id).order_by(Payee.id),
+        PayeeSchema(),
+        chunk_size,
+    )
+
+    yield '],"transactions":['
+    yield from _dump_transactions(
+        session, user, {a.id: a for a in accounts}, chunk_size, progress
+    )
+
+    yield '],"version":1}'
+
+
+@replica_read
+def write_data_json(session, user, fp, chunk_size=STREAM_CHUNK_SIZE, progress=None):
+    """Write User Data as JSON to a text file object incrementally."""
+    for text in iter_data_json(session, user, chunk_size, progress):
+        fp.write(text)
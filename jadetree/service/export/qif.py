@@ -4,14 +4,37 @@ Jade Tree Personal Budgeting Application | jadetree.io
 Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
 """
 
-from jadetree.domain.models import Transaction, TransactionLine
+from decimal import Decimal
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from jadetree.database.routing import replica_read
+from jadetree.database.tables import (
+    categories,
+    payees,
+    transaction_entries,
+    transaction_lines,
+    transaction_splits,
+    transactions,
+)
+from jadetree.database.util import keyset_pages
 from jadetree.domain.types import AccountSubtype, AccountType, TransactionType
 
 # Export and Import Services
 
+#: Number of Transactions loaded per batch when exporting an Account (below
+#: the SQLite limit on bound parameters)
+QIF_CHUNK_SIZE = 500
 
-def export_transaction_qif(txn, account):
-    """Export a Transaction as a QIF Record."""
+
+def _qif_transaction(txn, line, payee, splits):
+    """Build the QIF Record for a Transaction on one Account.
+
+    The ``splits`` are ``(type, category_path, transfer_account_id, memo,
+    amount)`` tuples for the Splits posting to the Account, with amounts in
+    the Account currency.
+    """
     qif_lines = []
     qif_lines.append(f'D{txn.date.isoformat()}')
     if txn.check:
@@ -23,55 +46,74 @@ def export_transaction_qif(txn, account):
     if txn.foreign_currency:
         qif_lines.append(f'XF{txn.foreign_currency}:{txn.foreign_exchrate}')
 
-    lines = txn.lines
-    if txn.account != account:
-        lines = [ln for ln in lines if ln.opposing == account]
-
-    qif_lines.append('T{}'.format(sum([ln.amount for ln in lines])))
-    if len(lines) == 1:
-        if lines[0].type == TransactionType.Transfer:
-            if lines[0].opposing == account:
-                qif_lines.append(f'PTransfer:{txn.account.id}')
-            else:
-                qif_lines.append('PTransfer:{}'.format(lines[0].opposing.id))
+    qif_lines.append('T{}'.format(sum((sp[4] for sp in splits), Decimal())))
+    if len(splits) == 1:
+        ttype, path, transfer_id, memo, amount = splits[0]
+        if ttype == TransactionType.Transfer:
+            qif_lines.append(f'PTransfer:{transfer_id}')
 
         else:
-            qif_lines.append(f'P{txn.payee.name}')
-            qif_lines.append(f'XP{txn.payee.id}')
-            qif_lines.append('L{}'.format(lines[0].category.path))
+            qif_lines.append(f'P{payee[1]}')
+            qif_lines.append(f'XP{payee[0]}')
+            if path:
+                qif_lines.append(f'L{path}')
 
     else:
-        qif_lines.append(f'P{txn.payee.name}')
-        qif_lines.append(f'XP{txn.payee.id}')
-
-        for ln in lines:
-            if ln.type == TransactionType.Transfer:
-                if ln.opposing == account:
-                    qif_lines.append(f'XX:{txn.account.id}')
-                else:
-                    qif_lines.append('XX:{}'.format(lines[0].opposing.id))
+        qif_lines.append(f'P{payee[1]}')
+        qif_lines.append(f'XP{payee[0]}')
 
-            else:
-                qif_lines.append(f'S{ln.category.path}')
+        for ttype, path, transfer_id, memo, amount in splits:
+            if ttype == TransactionType.Transfer:
+                qif_lines.append(f'XX:{transfer_id}')
+            elif path:
+                qif_lines.append(f'S{path}')
 
-            qif_lines.append(f'${ln.amount}')
-            if ln.memo:
-                qif_lines.append(f'E{ln.memo}')
+            qif_lines.append(f'${amount}')
+            if memo:
+                qif_lines.append(f'E{memo}')
 
-    if txn.cleared and txn.reconciled:
+    if line.cleared and line.reconciled:
         qif_lines.append('CR')
-    elif txn.cleared:
+    elif line.cleared:
         qif_lines.append('C*')
     qif_lines.append('^')
 
     return qif_lines
 
 
-def export_account_qif(session, account):
-    """Export Account Data as a QIF Record."""
+def export_transaction_qif(txn, account):
+    """Export a Transaction as a QIF Record."""
+    line = None
+    for ln in txn.lines:
+        if ln.account is account:
+            line = ln
+            break
+
+    if line is None:
+        raise ValueError(
+            f'Transaction {txn.id} does not post to account {account.id}'
+        )
+
+    splits = []
+    for sp in txn.splits:
+        if sp.left_line is not line and sp.right_line is not line:
+            continue
+
+        splits.append((
+            sp.type,
+            sp.category.path if sp.category else None,
+            sp.right_account.id if sp.left_line is line else txn.account.id,
+            sp.memo,
+            sum((e.amount for e in sp.entries if e.line is line), Decimal()),
+        ))
+
+    return _qif_transaction(txn, line, (txn.payee.id, txn.payee.name), splits)
+
+
+def _qif_account_header(account):
+    """Build the QIF Record lines for the Account information."""
     qif_lines = []
 
-    # Account Information
     if account.subtype == AccountSubtype.Cash:
         qif_lines.append('!Type:Cash')
     elif account.subtype in (AccountSubtype.Checking, AccountSubtype.Savings):
@@ -105,23 +147,128 @@ def export_account_qif(session, account):
 
     qif_lines.append('^')
 
-    # Transaction Information
-    txn_in = account.transactions
-    txn_out = session.query(
-        Transaction
-    ).join(
-        TransactionLine,
-        TransactionLine.transaction_id == Transaction.id
-    ).filter(
-        TransactionLine.opposing == account
-    ).all()
+    return qif_lines
+
 
-    for txn in sorted(txn_in + txn_out, key=lambda t: t.date.isoformat()):
-        qif_lines.extend(export_transaction_qif(txn, account))
+def _load_category_paths(session, category_ids, paths):
+    """Add the paths of any Categories not already in ``paths``."""
+    missing = [c for c in category_ids if c is not None and c not in paths]
+    if not missing:
+        return
+
+    parent = aliased(categories)
+    for r in session.execute(
+        select([categories.c.id, categories.c.name, parent.c.name.label('parent_name')])
+        .select_from(categories.outerjoin(parent, parent.c.id == categories.c.parent_id))
+        .where(categories.c.id.in_(missing))
+    ):
+        # Matches Category.path
+        paths[r.id] = r.name if r.parent_name is None else f'{r.parent_name}:{r.name}'
+
+
+def _load_payee_names(session, payee_ids, names):
+    """Add the names of any Payees not already in ``names``."""
+    missing = [p for p in payee_ids if p is not None and p not in names]
+    if not missing:
+        return
+
+    names.update(session.execute(
+        select([payees.c.id, payees.c.name]).where(payees.c.id.in_(missing))
+    ).fetchall())
+
+
+def _qif_account_chunk(session, account, rows, category_paths, payee_names):
+    """Build the QIF Records for a batch of an Account's Transactions.
+
+    The Splits, their Entries on the Account, and any Payees and Categories
+    not loaded by a previous batch are fetched with one query each.
+    """
+    txn_ids = [r.id for r in rows]
+    line_ids = [r.line_id for r in rows]
+    sp = transaction_splits.c
+    e = transaction_entries.c
+
+    amounts = dict(session.execute(
+        select([e.split_id, func.sum(e.amount)])
+        .where(e.line_id.in_(line_ids))
+        .group_by(e.split_id)
+    ).fetchall())
+
+    splits = {}
+    for r in session.execute(
+        select([
+            sp.id, sp.transaction_id, sp.category_id, sp.left_account_id,
+            sp.right_account_id, sp.type, sp.memo,
+        ])
+        .where(sp.transaction_id.in_(txn_ids))
+        .order_by(sp.id)
+    ):
+        if r.left_account_id == account.id or r.right_account_id == account.id:
+            splits.setdefault(r.transaction_id, []).append(r)
+
+    _load_category_paths(
+        session, {r.category_id for sps in splits.values() for r in sps}, category_paths
+    )
+    _load_payee_names(session, {r.payee_id for r in rows}, payee_names)
+
+    qif_lines = []
+    for txn in rows:
+        txn_splits = []
+        for r in splits.get(txn.id, ()):
+            txn_splits.append((
+                r.type,
+                category_paths.get(r.category_id),
+                r.right_account_id if r.left_account_id == account.id else txn.account_id,
+                r.memo,
+                amounts.get(r.id, Decimal()),
+            ))
+
+        qif_lines.extend(_qif_transaction(
+            txn, txn, (txn.payee_id, payee_names.get(txn.payee_id)), txn_splits,
+        ))
 
     return qif_lines
 
 
+@replica_read
+def export_account_qif(session, account, chunk_size=QIF_CHUNK_SIZE, progress=None):
+    """Export Account Data as QIF Records.
+
+    Returns a generator of QIF lines. The Transactions posting to the Account
+    are read in date order in pages (see `keyset_pages`), and the Splits,
+    Payees and Categories of each batch of ``chunk_size`` Transactions are
+    loaded together. If given, ``progress`` is called with the number of
+    Transactions exported after each batch.
+    """
+    yield from _qif_account_header(account)
+
+    t = transactions.c
+    ln = transaction_lines.c
+    line_id = ln.id.label('line_id')
+    pages = keyset_pages(
+        session,
+        select([
+            t.id, t.account_id, t.payee_id, t.date, t.check, t.memo,
+            t.currency, t.foreign_currency, t.foreign_exchrate,
+            line_id, ln.cleared, ln.reconciled,
+        ])
+        .select_from(transactions.join(transaction_lines, ln.transaction_id == t.id))
+        .where(ln.account_id == account.id),
+        [t.date, t.id, line_id],
+        chunk_size,
+    )
+
+    category_paths = {}
+    payee_names = {}
+    done = 0
+    for rows in pages:
+        yield from _qif_account_chunk(session, account, rows, category_paths, payee_names)
+
+        done += len(rows)
+        if progress is not None:
+            progress(done)
+
+
 def export_budget_qif(budget):
     """Export Budget Data as QIF Records."""
     qif_lines = []
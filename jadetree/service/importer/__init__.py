@@ -0,0 +1,35 @@
+"""Jade Tree Transaction Import Service.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+from .delimited import parse_csv
+from .jobs import submit_import
+from .pipeline import (
+    IMPORT_FORMATS,
+    IMPORT_OPTIONS,
+    ImportResult,
+    check_import_options,
+    import_file,
+    import_transactions,
+    load_duplicate_index,
+)
+from .qif import parse_qif
+from .records import DuplicateIndex, ImportRecord, ImportSplit
+
+__all__ = (
+    IMPORT_FORMATS,
+    IMPORT_OPTIONS,
+    DuplicateIndex,
+    ImportRecord,
+    ImportResult,
+    ImportSplit,
+    check_import_options,
+    import_file,
+    import_transactions,
+    load_duplicate_index,
+    parse_csv,
+    parse_qif,
+    submit_import,
+)
@@ -0,0 +1,79 @@
+"""Jade Tree CSV Transaction Import.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+import csv
+
+from jadetree.exc import ImportError
+
+from .records import (
+    ImportRecord,
+    ImportSplit,
+    parse_amount,
+    parse_date,
+    set_split_category,
+)
+
+# CSV Transaction Parser
+
+#: Record fields which may be read from CSV columns
+CSV_FIELDS = ('date', 'amount', 'payee', 'memo', 'category', 'check', 'cleared')
+
+#: Values of the ``cleared`` column which mark a Transaction as cleared
+CSV_CLEARED = ('1', 'c', 'x', 'r', '*', 'y', 'yes', 'true', 'cleared', 'reconciled')
+
+
+def parse_csv(lines, columns=None, date_format=None, delimiter=','):
+    """Parse Transactions from CSV lines with a header row.
+
+    Returns a generator of `ImportRecord` objects with one unsplit
+    Transaction per row. By default the columns are found by matching the
+    header names to the record fields (``date``, ``amount``, ``payee``,
+    ``memo``, ``category``, ``check`` and ``cleared``) case-insensitively;
+    ``columns`` maps record fields to other header names. The ``category``
+    column holds a category path or an ``[Account Name]`` transfer, as in a
+    QIF file, and dates are parsed with ``date_format`` if it is given.
+    """
+    reader = csv.reader(lines, delimiter=delimiter)
+    try:
+        header = [h.strip().casefold() for h in next(reader)]
+    except StopIteration:
+        return
+
+    columns = {k: v.strip().casefold() for k, v in (columns or {}).items()}
+    for k in columns:
+        if k not in CSV_FIELDS:
+            raise ValueError(f'Unknown CSV import field "{k}"')
+
+    index = {}
+    for f in CSV_FIELDS:
+        name = columns.get(f, f)
+        if name in header:
+            index[f] = header.index(name)
+        elif f in columns or f in ('date', 'amount'):
+            raise ImportError(f'CSV file has no "{name}" column')
+
+    for row in reader:
+        n = reader.line_num
+        if not any(v.strip() for v in row):
+            continue
+
+        values = {f: row[i].strip() if i < len(row) else '' for f, i in index.items()}
+        split = ImportSplit(amount=parse_amount(values['amount'], n))
+        set_split_category(split, values.get('category', ''))
+
+        rec = ImportRecord(
+            line=n,
+            date=parse_date(values['date'], n, date_format),
+            amount=split.amount,
+            payee=values.get('payee') or None,
+            memo=values.get('memo') or None,
+            check=values.get('check') or None,
+            cleared=values.get('cleared', '').casefold() in CSV_CLEARED,
+            splits=[split],
+        )
+        split.memo = rec.memo
+
+        yield rec
@@ -0,0 +1,73 @@
+"""Jade Tree Transaction Import Jobs.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+import os
+import shutil
+
+from jadetree.jobs import job_handler, runner
+
+from ..account import _load_account
+from ..job import create_job
+from .pipeline import check_import_options, import_file
+
+# Background Import Job Handlers
+
+
+def submit_import(session, user, account_id, fp, filename, format=None, **options):
+    """Queue a background Job importing an uploaded file into an Account.
+
+    The binary file ``fp`` is saved as the Job input, and the format is
+    taken from the ``filename`` extension unless ``format`` is given. Extra
+    ``options`` are passed to `import_file`.
+
+    :returns: the new `Job` object
+    :rtype: Job
+    """
+    _load_account(session, user, account_id)
+
+    if format is None:
+        format = os.path.splitext(filename)[1][1:].lower()
+    check_import_options(format, options)
+
+    upload = runner.new_upload(filename)
+    with open(runner.upload_path(user, upload), 'wb') as out:
+        shutil.copyfileobj(fp, out)
+
+    return create_job(session, user, 'import_transactions', dict(
+        account_id=account_id,
+        format=format,
+        filename=filename,
+        upload=upload,
+        options=options,
+    ))
+
+
+@job_handler('import_transactions')
+def import_transactions_job(ctx):
+    """Import the uploaded file saved by `submit_import`."""
+    path = runner.upload_path(ctx.user, ctx.params.get('upload'))
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as fp:
+            result = import_file(
+                ctx.session,
+                ctx.user,
+                ctx.params['account_id'],
+                fp,
+                format=ctx.params['format'],
+                progress=lambda done: ctx.progress(done, size),
+                **ctx.params.get('options', {}),
+            )
+
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+    return '{} imported, {} duplicates skipped, {} uncategorized'.format(
+        result.imported,
+        result.duplicates,
+        result.uncategorized,
+    )
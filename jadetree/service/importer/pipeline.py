@@ -0,0 +1,422 @@
+"""Jade Tree Transaction Import Pipeline.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+import io
+
+from sqlalchemy import case, func, select, text
+
+from jadetree.database.tables import (
+    payees as payees_table,
+    transaction_entries,
+    transaction_lines,
+    transaction_splits,
+    transactions,
+)
+from jadetree.domain.models import Account, Payee, Transaction
+from jadetree.domain.types import (
+    AccountRole,
+    AccountType,
+    PayeeRole,
+    TransactionType,
+)
+from jadetree.exc import DomainError, ImportError
+
+from ..account import _load_account
+from ..ledger import _get_txn_type
+from ..payee_index import invalidate_payee_index
+from ..util import check_session, check_user, increment_counts
+from .delimited import parse_csv
+from .qif import parse_qif
+from .records import DuplicateIndex
+
+# Transaction Import Pipeline
+
+#: Number of imported Transactions written per commit
+IMPORT_BATCH_SIZE = 500
+
+#: Record parsers by import file format
+IMPORT_FORMATS = {
+    'csv': parse_csv,
+    'qif': parse_qif,
+}
+
+#: Parser options accepted for each import file format
+IMPORT_OPTIONS = {
+    'csv': ('columns', 'date_format', 'delimiter'),
+    'qif': ('date_format', ),
+}
+
+
+@dataclass
+class ImportResult:
+    """Summary of a Transaction import."""
+    imported: int = 0
+    duplicates: int = 0
+    uncategorized: int = 0
+    payees: int = 0
+
+
+def load_duplicate_index(session, account):
+    """Build the `DuplicateIndex` of the Transactions posted to an Account.
+
+    Each Transaction is keyed by its amount on the Account (which, as with
+    imported records, is the change in the Account balance), and transfers
+    by the opposing Account, with a single aggregate query.
+    """
+    t = transactions.c
+    ln = transaction_lines.c
+    e = transaction_entries.c
+    sp = transaction_splits.c
+    opposing = case(
+        [(sp.left_account_id == account.id, sp.right_account_id)],
+        else_=sp.left_account_id,
+    )
+    rows = session.execute(
+        select([
+            t.date,
+            t.check,
+            payees_table.c.name,
+            func.sum(e.amount),
+            func.sum(case([(sp.transfer == True, 0)], else_=1)),   # noqa: E712
+            func.min(opposing),
+            func.max(opposing),
+        ])
+        .select_from(
+            transactions
+            .join(transaction_lines, ln.transaction_id == t.id)
+            .join(transaction_entries, e.line_id == ln.id)
+            .join(transaction_splits, sp.id == e.split_id)
+            .join(payees_table, payees_table.c.id == t.payee_id)
+        )
+        .where(ln.account_id == account.id)
+        .group_by(t.id, t.date, t.check, payees_table.c.name)
+    )
+
+    return DuplicateIndex(
+        DuplicateIndex.key(
+            account.id, r[0], r[3], r[2], r[1],
+            r[5] if r[4] == 0 and r[5] == r[6] else None,
+        ) for r in rows
+    )
+
+
+class _RecordMapper:
+    """Map imported names to the user's Payees, Categories and Accounts.
+
+    Lookups are cached for the whole import, so each distinct Payee,
+    Category path and split type is resolved against the database once.
+    """
+    def __init__(self, session, user, account, result):
+        self.session = session
+        self.user = user
+        self.account = account
+        self.result = result
+
+        self.payees = {}
+        self.transfer_payees = {}
+        for p in session.query(Payee).filter(Payee.user == user):
+            if p.role == PayeeRole.Transfer:
+                self.transfer_payees[p.account_id] = p
+            key = p.name.casefold()
+            if key not in self.payees or self.payees[key].role == PayeeRole.Transfer:
+                self.payees[key] = p
+
+        self.accounts = {}
+        self.account_names = {}
+        for a in session.query(Account).filter(
+            Account.user == user,
+            Account.role == AccountRole.Personal,
+        ):
+            self.accounts[a.id] = a
+            self.account_names[a.name.casefold()] = a
+
+        # Categories may be given by path, or by name if it is unique
+        self.categories = {}
+        if account.budget is not None:
+            names = {}
+            for c in account.budget.categories:
+                if c.parent is not None:
+                    self.categories[c.path.casefold()] = c.id
+                    names.setdefault(c.name.casefold(), []).append(c.id)
+            for name, ids in names.items():
+                if len(ids) == 1:
+                    self.categories.setdefault(name, ids[0])
+
+        self.types = {}
+
+    def payee(self, rec, transfer_id=None):
+        """Find the Payee for a record, or return None if it is new.
+
+        Transfers without a payee name use the opposing Account's transfer
+        Payee.
+        """
+        if rec.payee is None:
+            if transfer_id in self.transfer_payees:
+                return self.transfer_payees[transfer_id]
+            raise ImportError(f'Record on line {rec.line} has no payee')
+
+        return self.payees.get(rec.payee.casefold())
+
+    def create_payee(self, rec):
+        """Create a Payee for a record with a new payee name."""
+        p = Payee(
+            user=self.user,
+            name=rec.payee,
+            role=PayeeRole.Expense,
+            system=False,
+            hidden=False,
+        )
+        self.payees[rec.payee.casefold()] = p
+        self.result.payees += 1
+        return p
+
+    def transfer(self, rec, split):
+        """Find the Account a split transfers to."""
+        if split.transfer_id is not None:
+            opp = self.accounts.get(split.transfer_id)
+        else:
+            opp = self.account_names.get(split.transfer.casefold())
+
+        if opp is None:
+            raise ImportError(
+                'Unknown transfer account "{}" on line {}'.format(
+                    split.transfer or split.transfer_id,
+                    rec.line,
+                )
+            )
+
+        return opp
+
+    def split(self, rec, split):
+        """Resolve the type, opposing Account and Category of a split."""
+        transfer_id = category_id = None
+        if split.transfer is not None or split.transfer_id is not None:
+            transfer_id = self.transfer(rec, split).id
+        elif split.category is not None:
+            category_id = self.categories.get(split.category.casefold())
+
+        key = (transfer_id, category_id, split.amount < 0)
+        if key not in self.types:
+            self.types[key] = _get_txn_type(
+                self.session, self.user, self.account, transfer_id, category_id, split.amount,
+            )
+
+        return self.types[key]
+
+
+def _reserve_ids(session, table, count):
+    """Reserve ``count`` primary keys for new rows in a table.
+
+    PostgreSQL keys are drawn from the table sequence. SQLite keys continue
+    from the largest key, which is safe because SQLite only allows one
+    writer and the rows are inserted in the same transaction. Other
+    databases may have concurrent writers, so no keys are reserved and
+    `None` is returned; the rows then take auto-increment keys on insert.
+    """
+    dialect = session.connection().dialect.name
+    if dialect == 'postgresql':
+        return [
+            r[0] for r in session.execute(
+                text(
+                    "SELECT nextval(pg_get_serial_sequence('{}', 'id')) "
+                    "FROM generate_series(1, :count)".format(table.name)
+                ),
+                dict(count=count),
+            )
+        ]
+
+    if dialect != 'sqlite':
+        return None
+
+    start = (session.execute(select([func.max(table.c.id)])).scalar() or 0) + 1
+    return range(start, start + count)
+
+
+def _commit_batch(session, user, batch):
+    """Commit a batch of imported Transactions.
+
+    Where the database allows it (see `_reserve_ids`), primary keys are
+    assigned to the Transactions, Lines, Splits and Entries before the flush,
+    so the ORM writes each table with a single executemany INSERT rather than
+    one statement per row. The Payee autofill statistics
+    and any new Payees are committed with the batch, so the user's Payee
+    Indexes are invalidated.
+    """
+    lines = [ln for t in batch for ln in t.lines]
+    splits = [sp for t in batch for sp in t.splits]
+    entries = [e for sp in splits for e in sp.entries]
+    for table, objs in (
+        (transactions, batch),
+        (transaction_lines, lines),
+        (transaction_splits, splits),
+        (transaction_entries, entries),
+    ):
+        ids = _reserve_ids(session, table, len(objs))
+        if ids is None:
+            break
+        for obj, id in zip(objs, ids):
+            obj.id = id
+
+    # New Payees are assigned their ids by the flush
+    session.flush()
+    increment_counts(session, payees_table, 'use_count', Counter(t.payee.id for t in batch))
+
+    invalidate_payee_index(user)
+    session.commit()
+    batch.clear()
+
+
+def import_transactions(
+    session, user, account_id, records, batch_size=IMPORT_BATCH_SIZE, progress=None
+):
+    """Import a stream of `ImportRecord` objects into an Account.
+
+    Each record passes through a pipeline which maps its payee and category
+    names (creating missing Payees), skips it if the `DuplicateIndex` built
+    from the Account's existing Transactions already holds it, and adds the
+    new Transaction. Transactions are written and committed in batches of
+    ``batch_size``, so only one batch is held in memory; if the import fails
+    part way through, re-running it skips the committed batches as
+    duplicates. If given, ``progress`` is called with the number of records
+    read after each batch.
+
+    Only Accounts in the user's base currency are supported, since imported
+    files carry no exchange rates. Unknown categories are left uncategorized
+    and records with unknown transfer accounts raise `ImportError`.
+
+    :returns: an `ImportResult` summary
+    :rtype: ImportResult
+    """
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    acct = _load_account(session, user, account_id)
+    if acct.role != AccountRole.Personal:
+        raise ValueError('Transaction account role must be Personal')
+    if acct.type not in (AccountType.Asset, AccountType.Liability):
+        raise ValueError('Transaction account type must be Asset or Liability')
+    if acct.currency != user.currency:
+        raise DomainError(
+            'Transactions may only be imported into accounts in the base currency'
+        )
+
+    result = ImportResult()
+    mapper = _RecordMapper(session, user, acct, result)
+    index = load_duplicate_index(session, acct)
+
+    batch = []
+    done = 0
+    # Expired objects are reloaded after each batch commit, which must not
+    # flush the Transactions pending in the next batch one at a time
+    with session.no_autoflush:
+        for rec in records:
+            done += 1
+
+            split_info = [mapper.split(rec, sp) for sp in rec.splits]
+            if sum(sp.amount for sp in rec.splits) != rec.amount:
+                raise ImportError(
+                    f'Split amounts do not add up to the total on line {rec.line}'
+                )
+
+            transfer_id = None
+            if all(ttype == TransactionType.Transfer for ttype, _, _ in split_info):
+                if len({opp.id for _, opp, _ in split_info}) == 1:
+                    transfer_id = split_info[0][1].id
+
+            payee = mapper.payee(rec, transfer_id)
+            key = DuplicateIndex.key(
+                acct.id, rec.date, rec.amount, payee.name if payee else rec.payee, rec.check, transfer_id,
+            )
+            if index.claim(key):
+                result.duplicates += 1
+                continue
+
+            if payee is None:
+                payee = mapper.create_payee(rec)
+
+            if acct.budget is not None:
+                result.uncategorized += sum(
+                    1 for ttype, _, category in split_info
+                    if category is None and ttype != TransactionType.Transfer
+                )
+
+            t = Transaction(
+                user=user,
+                account=acct,
+                date=rec.date,
+                payee=payee,
+                currency=acct.currency,
+                memo=rec.memo,
+                check=rec.check,
+            )
+
+            for (ttype, opp, category), sp in zip(split_info, rec.splits):
+                t.add_split(
+                    opposing=opp,
+                    amount=sp.amount,
+                    currency=t.currency,
+                    category=category,
+                    memo=sp.memo,
+                    ttype=ttype,
+                )
+
+            if rec.cleared:
+                for ln in t.lines:
+                    if ln.account is acct:
+                        ln.cleared = True
+                        ln.cleared_at = rec.date
+
+            payee.record_transaction(t)
+            session.add(t)
+
+            result.imported += 1
+            batch.append(t)
+            if len(batch) >= batch_size:
+                _commit_batch(session, user, batch)
+                if progress is not None:
+                    progress(done)
+
+    if batch:
+        _commit_batch(session, user, batch)
+    if progress is not None:
+        progress(done)
+
+    return result
+
+
+def check_import_options(format, options):
+    """Check the file format and parser options for an import."""
+    if format not in IMPORT_FORMATS:
+        raise ValueError('Unknown import format "{}"'.format(format))
+
+    for k in options:
+        if k not in IMPORT_OPTIONS[format]:
+            raise ValueError('Unknown {} import option "{}"'.format(format.upper(), k))
+
+
+def import_file(session, user, account_id, fp, format='qif', encoding='utf-8-sig', progress=None, **options):
+    """Import a QIF or CSV file into an Account.
+
+    The file ``fp`` is opened in binary mode and is decoded and parsed as it
+    is read. Extra ``options`` are passed to the parser (e.g. ``columns``
+    and ``date_format`` for `parse_csv`). If given, ``progress`` is called
+    with the number of bytes read after each batch.
+    """
+    check_import_options(format, options)
+
+    text = io.TextIOWrapper(fp, encoding=encoding, newline='')
+    try:
+        return import_transactions(
+            session,
+            user,
+            account_id,
+            IMPORT_FORMATS[format](text, **options),
+            progress=None if progress is None else lambda done: progress(fp.tell()),
+        )
+    finally:
+        text.detach()
@@ -0,0 +1,140 @@
+"""Jade Tree QIF Transaction Import.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+import re
+
+from jadetree.exc import ImportError
+
+from .records import (
+    ImportRecord,
+    ImportSplit,
+    parse_amount,
+    parse_date,
+    set_split_category,
+)
+
+# QIF Transaction Parser
+
+#: QIF section types holding bank-style Transactions
+QIF_TRANSACTION_TYPES = ('bank', 'cash', 'ccard', 'oth a', 'oth l')
+
+_TRANSFER_PAYEE = re.compile(r'^Transfer:(\d+)$')
+
+
+def _finish_record(rec, split, start):
+    """Validate a QIF Record and fill in its single Split."""
+    if rec.date is None:
+        raise ImportError(f'Record starting on line {start} has no date')
+    if rec.amount is None:
+        raise ImportError(f'Record starting on line {start} has no amount')
+
+    if not rec.splits:
+        split.amount = rec.amount
+        if split.memo is None:
+            split.memo = rec.memo
+
+        # Jade Tree exports single-split transfers with the opposing Account
+        # id as the payee
+        m = _TRANSFER_PAYEE.match(rec.payee or '')
+        if m and split.category is None and split.transfer is None:
+            split.transfer_id = int(m.group(1))
+            rec.payee = None
+
+        rec.splits.append(split)
+
+    for sp in rec.splits:
+        if sp.amount is None:
+            raise ImportError(f'Split without an amount in record starting on line {start}')
+        if isinstance(sp.transfer_id, str):
+            try:
+                sp.transfer_id = int(sp.transfer_id)
+            except ValueError:
+                raise ImportError(
+                    f'Invalid transfer account "{sp.transfer_id}" in record '
+                    f'starting on line {start}'
+                )
+
+    return rec
+
+
+def parse_qif(lines, date_format=None):
+    """Parse bank-style Transactions from QIF lines.
+
+    Returns a generator of `ImportRecord` objects, one for each Transaction
+    record in ``!Type:Bank``, ``Cash``, ``CCard``, ``Oth A`` and ``Oth L``
+    sections. Records in other sections (e.g. categories, memorized
+    transactions or investments) are skipped. Split (``S``, ``E``, ``$``)
+    fields and the Jade Tree ``XX:`` transfer extension are recognized.
+    Dates are parsed with ``date_format`` if it is given.
+    """
+    in_section = False
+    rec = split = None
+    start = None
+    for n, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            continue
+
+        if line.startswith('!'):
+            if line.lower().startswith('!type:'):
+                in_section = line[6:].strip().lower() in QIF_TRANSACTION_TYPES
+            rec = None
+            continue
+
+        if not in_section:
+            continue
+
+        if rec is None:
+            rec = ImportRecord(line=n)
+            split = ImportSplit()
+            start = n
+
+        code, value = line[0], line[1:]
+        if code == '^':
+            # Records without a date or amount hold Account information (as
+            # written by the Jade Tree QIF export) and are skipped
+            if rec.date is not None or rec.amount is not None:
+                yield _finish_record(rec, split, start)
+            rec = None
+
+        elif code == 'D':
+            rec.date = parse_date(value, n, date_format)
+        elif code in ('T', 'U'):
+            rec.amount = parse_amount(value, n)
+        elif code == 'P':
+            rec.payee = value.strip() or None
+        elif code == 'M':
+            rec.memo = value.strip() or None
+        elif code == 'N':
+            rec.check = value.strip() or None
+        elif code == 'C':
+            rec.cleared = value.strip().upper() in ('*', 'C', 'X', 'R')
+        elif code == 'L':
+            set_split_category(split, value)
+
+        elif code == 'S':
+            split = ImportSplit()
+            rec.splits.append(split)
+            set_split_category(split, value)
+        elif code == 'E':
+            split.memo = value.strip() or None
+        elif code == '$':
+            # The Jade Tree QIF export omits the S field of uncategorized
+            # splits, so an amount may also start a new split
+            if split.amount is not None:
+                split = ImportSplit()
+                rec.splits.append(split)
+            elif not rec.splits:
+                rec.splits.append(split)
+            split.amount = parse_amount(value, n)
+
+        elif code == 'X' and value.startswith('X:'):
+            # Jade Tree split transfer extension (XX:<account id>)
+            split = ImportSplit(transfer_id=value[2:])
+            rec.splits.append(split)
+
+    if rec is not None:
+        raise ImportError(f'Record starting on line {start} is not terminated')
@@ -0,0 +1,142 @@
+"""Jade Tree Transaction Import Records.
+
+Jade Tree Personal Budgeting Application | jadetree.io
+Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import re
+
+from jadetree.exc import ImportError
+
+# Transaction Import Records
+
+
+@dataclass
+class ImportSplit:
+    """Parsed Split of an imported Transaction.
+
+    A Split is categorized with a ``category`` path (``Group:Category``) or
+    posted to another Account by ``transfer`` (Account name) or
+    ``transfer_id`` (Account id, as written by the Jade Tree QIF export).
+    """
+    amount: Decimal = None
+    category: str = None
+    transfer: str = None
+    transfer_id: int = None
+    memo: str = None
+
+
+@dataclass
+class ImportRecord:
+    """Parsed Transaction record from an imported file.
+
+    The ``amount`` is the change in the imported Account balance, and
+    ``line`` is the line number of the record in the file (used for error
+    messages).
+    """
+    line: int = None
+    date: date = None
+    amount: Decimal = None
+    payee: str = None
+    memo: str = None
+    check: str = None
+    cleared: bool = False
+    splits: list = field(default_factory=list)
+
+
+def parse_amount(value, line):
+    """Parse an amount, ignoring thousands separators."""
+    try:
+        return Decimal(value.strip().replace(',', ''))
+    except InvalidOperation:
+        raise ImportError(f'Invalid amount "{value}" on line {line}')
+
+
+def set_split_category(split, value):
+    """Set a Split category from a QIF ``L`` or ``S`` field or CSV column.
+
+    Quicken writes transfers as ``[Account Name]``, optionally followed by a
+    ``/Class`` suffix which is ignored.
+    """
+    value = value.strip()
+    if value.startswith('[') and ']' in value:
+        split.transfer = value[1:value.index(']')].strip()
+    elif value:
+        split.category = value
+
+
+_US_DATE = re.compile(r'^(\d{1,2})[/.-](\d{1,2})([/.\'-])(\d{2}|\d{4})$')
+
+
+def parse_date(value, line, date_format=None):
+    """Parse a date with a ``strptime`` format.
+
+    Without a format, ISO 8601 (``YYYY-MM-DD``) and US (``M/D/YY``,
+    ``M/D/YYYY`` or Quicken's ``M/D'YY``) dates are accepted. Two digit years
+    after an apostrophe are in the 2000s, and otherwise are in the 1900s
+    from 70 onwards.
+    """
+    value = value.strip().replace(' ', '')
+    try:
+        if date_format is not None:
+            return datetime.strptime(value, date_format).date()
+
+        m = _US_DATE.match(value)
+        if m is None:
+            return date.fromisoformat(value)
+
+        month, day, sep, year = m.groups()
+        year = int(year)
+        if year < 100:
+            year += 2000 if sep == '\'' or year < 70 else 1900
+
+        return date(year, int(month), int(day))
+
+    except ValueError:
+        raise ImportError(f'Invalid date "{value}" on line {line}')
+
+
+class DuplicateIndex:
+    """Hashed index of the Transactions already in an Account.
+
+    Transactions are keyed by ``(account, date, amount, payee/check)`` so
+    that checking an imported record is a single hash lookup. The index
+    counts the Transactions with each key: a record is a duplicate only
+    while unmatched existing Transactions remain, so re-importing an
+    overlapping statement skips the existing Transactions but keeps genuine
+    repeats (e.g. two identical purchases on the same day) within a file.
+    """
+    def __init__(self, keys=()):
+        self._counts = Counter(keys)
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    @staticmethod
+    def key(account_id, date, amount, payee=None, check=None, transfer_id=None):
+        """Build the index key.
+
+        Transactions are identified by their check number when present.
+        Otherwise transfers are identified by their opposing Account, which
+        matches a transfer imported from either Account's statement, and
+        other Transactions by their payee name.
+        """
+        if check:
+            return (account_id, date, amount, '#' + check.strip())
+        if transfer_id is not None:
+            return (account_id, date, amount, transfer_id)
+        return (account_id, date, amount, (payee or '').strip().casefold())
+
+    def add(self, key):
+        self._counts[key] += 1
+
+    def claim(self, key):
+        """Return True and consume the match if ``key`` is a duplicate."""
+        if self._counts.get(key, 0) > 0:
+            self._counts[key] -= 1
+            return True
+        return False
@@ -0,0 +1,143 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+# Background Job Services
+
+import os
+
+from arrow import utcnow
+
+from jadetree.domain.models import Job
+from jadetree.domain.types import JobStatus
+from jadetree.exc import DomainError, NoResults, Unauthorized
+from jadetree.jobs import JOB_HANDLERS, runner
+
+from .util import check_session, check_user
+
+__all__ = (
+    'create_job',
+    'delete_job',
+    'get_job_artifact',
+    'get_job_list',
+    '_load_job',
+)
+
+
+def _load_job(session, user, job_id):
+    '''
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    j = session.query(Job).get(job_id)
+    if j is None:
+        raise NoResults('No job found for id {}'.format(job_id))
+
+    if j.user != user:
+        raise Unauthorized(
+            'Job id {} does not belong to user {}'.format(
+                job_id,
+                user.email,
+            )
+        )
+
+    return j
+
+
+def get_job_list(session, user):
+    '''
+    :param session: Database session
+    :type session: ~sqlalchemy.orm.session.Session
+    :param user:
+    :type user: User
+    :returns: List of `Job` objects for the user, newest first
+    :rtype: list
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    return session.query(Job) \
+        .filter(Job.user == user) \
+        .order_by(Job.id.desc()) \
+        .all()
+
+
+def create_job(session, user, kind, params=None):
+    '''
+    Queue a background Job for the user and start it if a worker is free
+    and the user is below the per-user concurrency limit. With an inline
+    runner (``JOB_WORKERS = 0``) the Job has finished when this returns.
+
+    :param session: Database session
+    :type session: ~sqlalchemy.orm.session.Session
+    :param user:
+    :type user: User
+    :param kind: Job kind, which must have a registered handler
+    :type kind: str
+    :param params: Job parameters passed to the handler
+    :type params: dict
+    :returns: the new `Job` object
+    :rtype: Job
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    if kind not in JOB_HANDLERS:
+        raise ValueError('Unknown job kind "{}"'.format(kind))
+
+    job = Job(
+        user=user,
+        kind=kind,
+        status=JobStatus.Queued,
+        params=params or {},
+        progress=0,
+        created_at=utcnow(),
+    )
+
+    session.add(job)
+    session.commit()
+
+    runner.dispatch(session)
+
+    session.refresh(job)
+    return job
+
+
+def delete_job(session, user, job_id):
+    '''
+    Delete a queued or finished Job, its artifact file and any uploaded
+    input file which was not yet processed. Running Jobs cannot be deleted.
+    '''
+    job = _load_job(session, user, job_id)
+    if job.status == JobStatus.Running:
+        raise DomainError('Job id {} is still running'.format(job_id))
+
+    paths = [job.artifact_path]
+    if (job.params or {}).get('upload'):
+        paths.append(runner.upload_path(user, job.params['upload']))
+
+    for path in paths:
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+    session.delete(job)
+    session.commit()
+
+
+def get_job_artifact(session, user, job_id):
+    '''
+    Return the `Job` with the artifact file which may be downloaded, raising
+    an error if the Job has not completed or did not produce an artifact.
+    '''
+    job = _load_job(session, user, job_id)
+    if job.status != JobStatus.Complete:
+        raise DomainError('Job id {} has not completed'.format(job_id))
+
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        raise NoResults('Job id {} has no artifact'.format(job_id))
+
+    return job
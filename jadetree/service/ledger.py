@@ -11,30 +11,62 @@ from datetime import date
 from decimal import Decimal
 
 from babel.numbers import format_currency
+from sqlalchemy import and_, exists, func, or_, select
+from sqlalchemy.orm import joinedload, load_only, selectinload
 
-from jadetree.database.queries import q_txn_account_lines
-from jadetree.domain.models import Account, Category, Transaction, TransactionLine
+from jadetree.database.loading import (
+    txn_graph_options,
+    txn_header_options,
+    txn_lines_options,
+)
+from jadetree.database.queries import q_txn_account_lines, q_txn_search
+from jadetree.database.routing import replica_read
+from jadetree.database.search import search_terms
+from jadetree.database.tables import (
+    payees as payees_table,
+    transaction_entries,
+    transaction_lines,
+    transactions,
+)
+from jadetree.domain.models import (
+    Account,
+    Category,
+    Transaction,
+    TransactionEntry,
+    TransactionLine,
+    TransactionSplit,
+)
 from jadetree.domain.types import AccountRole, AccountType, TransactionType
 from jadetree.exc import DomainError, NoResults, Unauthorized
 
 from .payee import _load_payee
-from .util import check_access, check_session, check_user
+from .payee_index import update_payee_index
+from .util import check_access, check_session, check_user, increment_counts
 
 __all__ = (
+    'clear_lines',
     'create_transaction',
+    'delete_transaction',
     'load_account_lines',
     'load_all_lines',
     'load_single_transaction',
+    'load_transactions',
+    'search_transactions',
+    'update_transaction',
+    'update_transaction_with_changes',
 )
 
 
-def _load_transaction(session, user, transaction_id):
+def _load_transaction(session, user, transaction_id, options=()):
     '''
+    Load a Transaction by id and check that it belongs to the user. Loader
+    ``options`` may be given to shape the loaded Transaction graph for the
+    call site (see `jadetree.database.loading`).
     '''
     check_session(session)
     check_user(user, needs_profile=True)
 
-    t = session.query(Transaction).get(transaction_id)
+    t = session.query(Transaction).options(*options).get(transaction_id)
     if t is None:
         raise NoResults(f'No transaction found for id {transaction_id}')
 
@@ -49,6 +81,28 @@ def _load_transaction(session, user, transaction_id):
     return t
 
 
+def _refresh_payee_stats(session, payees):
+    '''
+    Recompute the autofill statistics for Payees from their latest
+    Transaction, after a Transaction using them was changed or deleted.
+    '''
+    for p in payees:
+        p.use_count = session.query(func.count(Transaction.id)) \
+            .filter(Transaction.payee_id == p.id) \
+            .scalar()
+
+        split = session.query(TransactionSplit) \
+            .join(Transaction, Transaction.id == TransactionSplit.transaction_id) \
+            .filter(Transaction.payee_id == p.id) \
+            .order_by(Transaction.date.desc(), Transaction.id.desc(), TransactionSplit.id) \
+            .first()
+
+        if split is not None:
+            p.set_last_split(split, split.transaction.date)
+        else:
+            p.clear_last_split()
+
+
 def _get_txn_type(session, user, acct, transfer_id, category_id, amount):
     '''Determine Transaction Type, Opposing Account, and Category'''
     ttype = None
@@ -315,9 +369,14 @@ def create_transaction(
             ttype=ln_ttype,
         )
 
+    # Update Payee Autofill Statistics
+    payee.record_transaction(t)
+    increment_counts(session, payees_table, 'use_count', {payee.id: 1})
+
     # Add to Session and Commit
     session.add(t)
     session.commit()
+    update_payee_index(user, payee)
 
     return t
 
@@ -349,15 +408,20 @@ def _load_transaction_lines(session, q):
     return [grouped[id] for id in id_list]
 
 
-def load_all_lines(session, user, order_by=None, reverse=False):
+@replica_read
+def load_all_lines(session, user, order_by=None, reverse=False, **filters):
     '''
+    Load the ledger lines for all of a user's accounts, restricted by the
+    ledger filters accepted by `q_txn_schema_fields` (``start_date``,
+    ``end_date``, ``cleared``, ``reconciled``, ``payee_id``, ``category_id``,
+    ``min_amount`` and ``max_amount``).
+
     Requires SQLite 3.25.0 or later to use Window Functions
     '''
     check_session(session)
     check_user(user, needs_profile=True)
 
-    q = q_txn_account_lines(session, reverse=reverse) \
-        .filter(Account.user == user)
+    q = q_txn_account_lines(session, reverse=reverse, user_id=user.id, **filters)
 
     # Apply Ordering and Pagination
     if order_by is not None:
@@ -367,8 +431,12 @@ def load_all_lines(session, user, order_by=None, reverse=False):
     return _load_transaction_lines(session, q)
 
 
-def load_account_lines(session, user, account_id, order_by=None, reverse=False):
+@replica_read
+def load_account_lines(session, user, account_id, order_by=None, reverse=False, **filters):
     '''
+    Load the ledger lines for a single account, restricted by the ledger
+    filters accepted by `load_all_lines`.
+
     Requires SQLite 3.25.0 or later to use Window Functions
     '''
     check_session(session)
@@ -387,7 +455,7 @@ def load_account_lines(session, user, account_id, order_by=None, reverse=False):
         )
 
     # Load Ledger Information
-    q = q_txn_account_lines(session, account_id, reverse=reverse)
+    q = q_txn_account_lines(session, account_id, reverse=reverse, **filters)
     if order_by is not None:
         q = q.order_by(None).order_by(order_by)
 
@@ -397,16 +465,80 @@ def load_account_lines(session, user, account_id, order_by=None, reverse=False):
 
 def load_single_transaction(session, user, transaction_id):
     '''Load a single Transaction into the TransactionSchema interface'''
-    t = _load_transaction(session, user, transaction_id)
+    t = _load_transaction(session, user, transaction_id, txn_header_options())
 
-    q = q_txn_account_lines(session) \
-        .filter(Account.id == Transaction.account_id) \
+    q = q_txn_account_lines(session, t.account_id, end_date=t.date) \
         .filter(Transaction.id == t.id)
 
     # Return as LedgerTransactionLine items
     return _load_transaction_lines(session, q)
 
 
+@replica_read
+def load_transactions(session, user, page=1, per_page=100):
+    '''
+    Load a page of a user's Transactions (newest first) for the Transaction
+    summary list, returning a tuple of the Transactions and the total number
+    of Transactions for the user.
+
+    The child collections needed to compute `Transaction.amount` are loaded
+    with one SELECT ... IN query each, projected to the columns the amount
+    calculation uses, so the number of queries does not depend on the page
+    size or on the number of splits.
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    if page < 1:
+        raise ValueError('Page number must be positive')
+    if per_page < 1:
+        raise ValueError('Page size must be positive')
+
+    total = session.query(func.count(Transaction.id)) \
+        .filter(Transaction.user_id == user.id) \
+        .scalar()
+
+    txns = session.query(Transaction).filter(
+        Transaction.user_id == user.id
+    ).options(
+        load_only(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.account_id,
+            Transaction.payee_id,
+            Transaction.date,
+            Transaction.check,
+            Transaction.memo,
+            Transaction.currency,
+            Transaction.foreign_currency,
+            Transaction.foreign_exchrate,
+        ),
+        joinedload(Transaction.account),
+        selectinload(Transaction.lines).load_only(
+            TransactionLine.id,
+            TransactionLine.transaction_id,
+            TransactionLine.account_id,
+        ).lazyload(TransactionLine.entries),
+        selectinload(Transaction.splits).load_only(
+            TransactionSplit.id,
+            TransactionSplit.transaction_id,
+            TransactionSplit.left_line_id,
+            TransactionSplit.right_line_id,
+        ).selectinload(TransactionSplit.entries).load_only(
+            TransactionEntry.id,
+            TransactionEntry.line_id,
+            TransactionEntry.split_id,
+            TransactionEntry.amount,
+            TransactionEntry.currency,
+        ),
+    ).order_by(
+        Transaction.date.desc(),
+        Transaction.id.desc(),
+    ).limit(per_page).offset((page - 1) * per_page).all()
+
+    return txns, total
+
+
 def load_reconcilable_lines(session, user, account_id, order_by=None, reverse=False):
     '''Load Transactions that are not yet reconciled'''
     check_session(session)
@@ -433,32 +565,172 @@ def load_reconcilable_lines(session, user, account_id, order_by=None, reverse=Fa
     return _load_transaction_lines(session, q)
 
 
-def update_transaction(session, user, transaction_id, **kwargs):
+@replica_read
+def search_transactions(
+    session, user, query=None, *, account_id=None, start_date=None,
+    end_date=None, min_amount=None, max_amount=None, page=1, per_page=50
+):
     '''
+    Search a user's Transactions by payee name, memo, split memo and check
+    number using the full-text search index, optionally filtered by account,
+    date range and amount range. Each search word matches as a prefix and
+    all words must match. Returns a page of LedgerEntrySchema items (newest
+    first) along with the total number of matching Transactions.
     '''
     check_session(session)
     check_user(user, needs_profile=True)
 
-    txn = session.query(Transaction).get(transaction_id)
+    if page < 1:
+        raise ValueError('Page number must be positive')
+    if per_page < 1:
+        raise ValueError('Page size must be positive')
+
+    if account_id is not None:
+        a = session.query(Account).get(account_id)
+        if a is None:
+            raise NoResults(f'No account found for id {account_id}')
+
+        check_access(user, a)
+
+    q = q_txn_search(
+        session,
+        user.id,
+        search_terms(query),
+        account_id=account_id,
+        start_date=start_date,
+        end_date=end_date,
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+
+    total = q.count()
+    line_ids = [
+        r.line_id for r in q.order_by(
+            Transaction.date.desc(),
+            Transaction.id.desc(),
+        ).limit(per_page).offset((page - 1) * per_page)
+    ]
+
+    items = []
+    if line_ids:
+        items = _load_transaction_lines(
+            session,
+            q_txn_account_lines(session, account_id, reverse=True, user_id=user.id)
+            .filter(TransactionLine.id.in_(line_ids))
+        )
+
+    return dict(
+        query=query,
+        page=page,
+        per_page=per_page,
+        total=total,
+        items=items,
+    )
+
+
+def _diff_splits(txn, split_lines):
+    '''
+    Match the parsed ``split_lines`` against the existing splits of a
+    Transaction. Splits with the same opposing account, category, amount and
+    memo are kept as-is; splits which differ only by memo are kept and have
+    their memo updated. All other existing splits are returned for removal
+    and the remaining new split lines are returned to be added.
+
+    :returns: tuple of ([(split, new_memo)] to update, [split] to remove,
+        [split_line] to add)
+    :rtype: tuple
+    '''
+    def _key(opp, cat, amt):
+        return (opp.id if opp else None, cat.id if cat else None, amt)
+
+    old = list(txn.splits)
+    new = list(split_lines)
+    updated = []
+
+    # Pass 1: Exact Matches (no change required)
+    for ln in list(new):
+        ln_ttype, ln_opp, ln_cat, ln_amt, ln_memo = ln
+        for sp in old:
+            if _key(sp.right_account, sp.category, sp.amount) == _key(ln_opp, ln_cat, ln_amt) \
+                    and sp.memo == ln_memo:
+                old.remove(sp)
+                new.remove(ln)
+                break
+
+    # Pass 2: Matches which differ only by Memo
+    for ln in list(new):
+        ln_ttype, ln_opp, ln_cat, ln_amt, ln_memo = ln
+        for sp in old:
+            if _key(sp.right_account, sp.category, sp.amount) == _key(ln_opp, ln_cat, ln_amt):
+                updated.append((sp, ln_memo))
+                old.remove(sp)
+                new.remove(ln)
+                break
+
+    return updated, old, new
+
+
+def update_transaction_with_changes(session, user, transaction_id, **kwargs):
+    '''
+    Update a Transaction and report which ledger rows were affected. Split
+    changes are applied as a difference against the existing splits, so
+    unchanged splits and their Transaction Lines keep their ids and cleared
+    status. The returned dictionary contains the ids of the added, updated
+    and removed splits, the ids of the remaining lines whose amounts or
+    running balances changed (``lines``), the ids of removed lines, and the
+    ids of all accounts whose balances may have changed.
+
+    :returns: tuple of (`Transaction`, changes)
+    :rtype: tuple
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    txn = session.query(Transaction) \
+        .options(*txn_graph_options()) \
+        .get(transaction_id)
     if txn is None:
         raise NoResults(f'No transaction found for id {transaction_id}')
 
     check_access(user, txn)
 
+    changes = dict(
+        added_splits=[],
+        updated_splits=[],
+        removed_splits=[],
+        lines=[],
+        removed_lines=[],
+        accounts=[],
+    )
+
     # FIXME: Context Manager
     # with session:
 
     if len(kwargs) == 0:
-        return txn
+        return txn, changes
 
-    # Handle Updating Date
+    # Line objects are not hashable, so track them by identity
+    affected_lines = dict()
+    removed_lines = dict()
+    added_splits = []
+
+    # Payees whose autofill statistics may change
+    stats_payees = [txn.payee]
+    refresh_stats = any(k in kwargs for k in ('date', 'payee_id', 'splits', 'amount'))
+
+    # Handle Updating Date (changes running balances for every line)
     if 'date' in kwargs:
-        txn.date = kwargs.pop('date')
+        new_date = kwargs.pop('date')
+        if new_date != txn.date:
+            affected_lines.update({id(ln): ln for ln in txn.lines})
+        txn.date = new_date
 
     # Handle Updating Payee
     if 'payee_id' in kwargs:
         payee_id = kwargs.pop('payee_id', None)
         txn.payee = _load_payee(session, user, payee_id)
+        if txn.payee is not stats_payees[0]:
+            stats_payees.append(txn.payee)
 
     # Handle Updating Memo
     if 'memo' in kwargs:
@@ -468,10 +740,6 @@ def update_transaction(session, user, transaction_id, **kwargs):
     if 'check' in kwargs:
         txn.check = kwargs.pop('check')
 
-    # Remaining updates will potentially require re-creating lines
-    new_splits = None
-    new_amount = None
-
     # Handle updating a Split Transaction
     if 'splits' in kwargs:
         for ln in txn.lines:
@@ -485,16 +753,25 @@ def update_transaction(session, user, transaction_id, **kwargs):
             session, user, txn.account, new_amount, new_currency, new_splits
         )
 
-        # Clear existing splits
-        txn.lines.clear()
-        txn.splits.clear()
+        # Compare against the existing splits so only changed rows are written
+        to_update, to_remove, to_add = _diff_splits(txn, split_lines)
 
-        # Add new Split Lines
-        trading_acct = _get_trading(session, user, txn, txn.foreign_exchrate)
+        for sp, memo in to_update:
+            sp.memo = memo
+            changes['updated_splits'].append(sp)
 
-        # Add Lines
-        for ln_ttype, ln_opp, ln_cat, ln_amt, ln_memo in split_lines:
-            ln, entries, lines = txn.add_split(
+        for sp in to_remove:
+            affected_lines.update({id(e.line): e.line for e in sp.entries})
+            changes['removed_splits'].append(sp.id)
+            txn.splits.remove(sp)
+
+        # Add new Split Lines (re-using existing Transaction Lines)
+        trading_acct = None
+        if to_add:
+            trading_acct = _get_trading(session, user, txn, txn.foreign_exchrate)
+
+        for ln_ttype, ln_opp, ln_cat, ln_amt, ln_memo in to_add:
+            sp, entries, lines = txn.add_split(
                 opposing=ln_opp,
                 amount=ln_amt,
                 currency=txn.currency,
@@ -503,6 +780,15 @@ def update_transaction(session, user, transaction_id, **kwargs):
                 memo=ln_memo,
                 ttype=ln_ttype,
             )
+            affected_lines.update({id(e.line): e.line for e in entries})
+            added_splits.append(sp)
+
+        # Remove Transaction Lines which no longer have any entries
+        used_lines = {id(e.line) for sp in txn.splits for e in sp.entries}
+        for ln in list(txn.lines):
+            if id(ln) not in used_lines:
+                removed_lines[id(ln)] = ln
+                txn.lines.remove(ln)
 
     # Ensure no unexpected arguments were passed
     if len(kwargs) > 0:
@@ -510,8 +796,54 @@ def update_transaction(session, user, transaction_id, **kwargs):
             'Unexpected keyword arguments: {}'.format(', '.join(kwargs.keys()))
         )
 
+    # Record removed line information before the rows are deleted
+    changes['removed_lines'] = sorted(ln.id for ln in removed_lines.values())
+    accounts = {ln.account.id for ln in affected_lines.values()}
+    accounts.update(ln.account.id for ln in removed_lines.values())
+
     session.add(txn)
+    if refresh_stats:
+        _refresh_payee_stats(session, stats_payees)
+
     session.commit()
+    if refresh_stats:
+        for p in stats_payees:
+            update_payee_index(user, p)
+
+    changes['added_splits'] = [sp.id for sp in added_splits]
+    changes['updated_splits'] = [sp.id for sp in changes['updated_splits']]
+    changes['lines'] = sorted(
+        ln.id for k, ln in affected_lines.items() if k not in removed_lines
+    )
+    changes['accounts'] = sorted(accounts)
+
+    return txn, changes
+
+
+def update_transaction(session, user, transaction_id, **kwargs):
+    '''
+    Update a Transaction. See :func:`update_transaction_with_changes`.
+    '''
+    txn, _ = update_transaction_with_changes(session, user, transaction_id, **kwargs)
+    return txn
+
+
+def delete_transaction(session, user, transaction_id):
+    '''
+    Delete a Transaction. Transactions with reconciled lines may not be
+    deleted, since the reconciled amounts are included in the account
+    reconciliation checkpoint.
+    '''
+    txn = _load_transaction(session, user, transaction_id)
+    for ln in txn.lines:
+        if ln.reconciled:
+            raise DomainError('Cannot delete a reconciled transaction')
+
+    payee = txn.payee
+    session.delete(txn)
+    _refresh_payee_stats(session, [payee])
+    session.commit()
+    update_payee_index(user, payee)
 
     return txn
 
@@ -525,7 +857,7 @@ def clear_transaction(
     if cleared is None:
         raise TypeError('"cleared" must be set to True or False')
 
-    txn = _load_transaction(session, user, transaction_id)
+    txn = _load_transaction(session, user, transaction_id, txn_lines_options())
     line = None
     if line_id is not None:
         for ln in txn.lines:
@@ -580,6 +912,124 @@ def clear_transaction(
     return txn
 
 
+def clear_lines(session, user, lines, cleared):
+    '''
+    Update the cleared status of many Transaction Lines at once. Each item
+    in ``lines`` is a dictionary with either the ``line_id`` key or both the
+    ``transaction_id`` and ``account_id`` keys. Ownership of all lines is
+    checked with a single query and the status is changed with a single
+    UPDATE statement. Lines which are already in the requested state are
+    left unchanged, so cleared dates are preserved.
+
+    Returns a list of dictionaries with the ``line_id``, ``transaction_id``,
+    ``account_id``, ``cleared`` and ``cleared_at`` values of each line.
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    if cleared is None:
+        raise TypeError('"cleared" must be set to True or False')
+
+    line_ids = set()
+    pairs = set()
+    for itm in lines:
+        if itm.get('line_id') is not None:
+            line_ids.add(itm['line_id'])
+        elif itm.get('transaction_id') is not None and itm.get('account_id') is not None:
+            pairs.add((itm['transaction_id'], itm['account_id']))
+        else:
+            raise TypeError(
+                '"line_id" or "transaction_id" and "account_id" must be set'
+            )
+
+    if not line_ids and not pairs:
+        return []
+
+    # Load Line Information and Ownership in a single query
+    tl = transaction_lines.c
+    criteria = []
+    if line_ids:
+        criteria.append(tl.id.in_(line_ids))
+    for txn_id, acct_id in pairs:
+        criteria.append(and_(tl.transaction_id == txn_id, tl.account_id == acct_id))
+
+    rows = session.execute(
+        select([
+            tl.id,
+            tl.transaction_id,
+            tl.account_id,
+            tl.reconciled,
+            transactions.c.user_id,
+        ]).select_from(
+            transaction_lines.join(transactions, transactions.c.id == tl.transaction_id)
+        ).where(or_(*criteria))
+    ).fetchall()
+
+    # Verify that every requested Line was found and may be changed
+    found_ids = {r.id for r in rows}
+    found_pairs = {(r.transaction_id, r.account_id) for r in rows}
+    missing_ids = line_ids - found_ids
+    if missing_ids:
+        raise NoResults(
+            'No transaction line found for id {}'.format(min(missing_ids))
+        )
+
+    missing_pairs = pairs - found_pairs
+    if missing_pairs:
+        txn_id, acct_id = min(missing_pairs)
+        raise DomainError(
+            'Line for Account {} does not exist in Transaction {}'.format(
+                acct_id, txn_id
+            )
+        )
+
+    for r in rows:
+        if r.user_id != user.id:
+            raise Unauthorized(
+                'Transaction id {} does not belong to user {}'.format(
+                    r.transaction_id,
+                    user.email,
+                )
+            )
+        if r.reconciled:
+            raise DomainError(
+                'Cannot change the cleared status of a reconciled transaction'
+            )
+
+    # Apply the new status to Lines which are not already in that state
+    all_ids = sorted(found_ids)
+    if cleared:
+        stmt = transaction_lines.update().where(and_(
+            tl.id.in_(all_ids),
+            or_(tl.cleared == False, tl.cleared == None),   # noqa: E711,E712
+        )).values(cleared=True, cleared_at=date.today())
+    else:
+        stmt = transaction_lines.update().where(
+            tl.id.in_(all_ids),
+        ).values(cleared=False, cleared_at=None)
+
+    session.execute(stmt)
+    session.commit()
+
+    return [
+        dict(
+            line_id=r.id,
+            transaction_id=r.transaction_id,
+            account_id=r.account_id,
+            cleared=r.cleared,
+            cleared_at=r.cleared_at,
+        ) for r in session.execute(
+            select([
+                tl.id,
+                tl.transaction_id,
+                tl.account_id,
+                tl.cleared,
+                tl.cleared_at,
+            ]).where(tl.id.in_(all_ids)).order_by(tl.id)
+        )
+    ]
+
+
 def reconcile_account(
     session, user, account_id, statement_date, statement_balance
 ):
@@ -590,6 +1040,10 @@ def reconcile_account(
     exception is raised. If the amounts do match, the cleared lines are marked
     as reconciled.
 
+    The Account stores the balance and date of the last reconciliation as a
+    checkpoint, so only lines cleared since then are summed (in the database)
+    and the new lines are marked as reconciled with a single UPDATE.
+
     Args:
         session (Session): SQLalchemy Database Session
         user (User): Jade Tree User
@@ -598,7 +1052,7 @@ def reconcile_account(
         statement_balance (Decimal): Statement Balance
 
     Returns:
-        list: List of newly reconciled Transactions
+        list: List of newly reconciled Transaction Lines
     '''
     check_session(session)
     check_user(user, needs_profile=True)
@@ -615,17 +1069,40 @@ def reconcile_account(
             )
         )
 
-    # Get Cleared Transactions
-    txns = session.query(TransactionLine).join(
-        Transaction, Transaction.id == TransactionLine.transaction_id,
-    ).filter(
-        TransactionLine.account == a,
-        TransactionLine.cleared == True,        # noqa: E712
-        Transaction.date <= statement_date,
-    ).all()
+    if a.reconciled_at is not None and statement_date < a.reconciled_at:
+        raise DomainError(
+            'Statement date {} is before the last reconciliation on {}'.format(
+                statement_date.isoformat(),
+                a.reconciled_at.isoformat(),
+            )
+        )
 
-    # Sum Transactions
-    cleared_balance = sum([t.amount for t in txns])
+    # Lines cleared since the last Reconciliation, which are selected by the
+    # same criteria in each statement rather than by a list of line ids
+    tl = transaction_lines.c
+    pending = and_(
+        tl.account_id == a.id,
+        tl.reconciled == False,    # noqa: E712
+        tl.cleared == True,        # noqa: E712
+        exists().where(
+            transactions.c.id == tl.transaction_id
+        ).where(
+            transactions.c.date <= statement_date
+        ),
+    )
+
+    lines = session.query(TransactionLine).filter(pending).order_by(TransactionLine.id).all()
+
+    # Sum new Lines on top of the Checkpoint Balance
+    new_balance = Decimal(0)
+    if lines:
+        new_balance = session.execute(
+            select([func.sum(transaction_entries.c.amount)]).where(
+                transaction_entries.c.line_id.in_(select([tl.id]).where(pending))
+            )
+        ).scalar() or Decimal(0)
+
+    cleared_balance = (a.reconciled_balance or Decimal(0)) + new_balance
     if cleared_balance != statement_balance:
         raise DomainError(
             'Statement balance of {} does not match cleared balance of {}'.format(
@@ -634,13 +1111,38 @@ def reconcile_account(
             )
         )
 
-    # Reconcile Transactions
-    new_txns = [t for t in txns if not t.reconciled]
-    for t in new_txns:
-        t.reconciled = True
-        t.reconciled_at = statement_date
+    # Reconcile Transaction Lines and update the Checkpoint
+    if lines:
+        result = session.execute(
+            transaction_lines.update().where(pending).values(
+                reconciled=True,
+                reconciled_at=statement_date,
+            )
+        )
+
+        # Lines cleared or uncleared by another session since they were
+        # summed would make the checkpoint balance wrong
+        if result.rowcount != len(lines):
+            session.rollback()
+            raise DomainError(
+                'Cleared transactions in account id {} changed during '
+                'reconciliation'.format(account_id)
+            )
+
+    a.reconciled_balance = cleared_balance
+    a.reconciled_at = statement_date
 
-    session.add_all(new_txns)
+    session.add(a)
     session.commit()
 
-    return new_txns
+    if not lines:
+        return []
+
+    # Reload the reconciled Lines, which were expired by the commit, in a
+    # single query
+    session.query(TransactionLine).filter(
+        TransactionLine.account_id == a.id,
+        TransactionLine.reconciled_at == statement_date,
+    ).all()
+
+    return lines
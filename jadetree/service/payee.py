@@ -13,9 +13,18 @@ from jadetree.exc import DomainError, NoResults, Unauthorized
 
 from .account import _load_account
 from .budget import _load_category
+from .payee_index import invalidate_payee_index, load_payee_index, update_payee_index
 from .util import check_session, check_user
 
-__all__ = ('get_payee_list', '_load_payee', 'get_payee_last_txn')
+__all__ = (
+    'create_payee',
+    'get_payee_autofill',
+    'get_payee_last_txn',
+    'get_payee_list',
+    'search_payees',
+    'update_payee',
+    '_load_payee',
+)
 
 
 def get_payee_list(session, user):
@@ -41,6 +50,34 @@ def get_payee_list(session, user):
     return q.all()
 
 
+def get_payee_autofill(session, user):
+    '''
+    Return the autofill statistics (last category, account, amount, memo and
+    type, and usage count) for all of a user's visible Payees with a single
+    query. The statistics are stored on the Payee by the ledger services, so
+    no Transaction history is read.
+
+    :param session: Database session
+    :type session: ~sqlalchemy.orm.session.Session
+    :param user:
+    :type user: User
+    :returns: List of `Payee` objects in the `PayeeRole.Expense` or
+        `Payee.Transfer` role, most frequently used first
+    :rtype: list
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    return session.query(Payee).filter(
+        Payee.user == user,
+        Payee.role.in_((PayeeRole.Expense, PayeeRole.Transfer)),
+        Payee.hidden == False,              # noqa: E712
+    ).order_by(
+        Payee.use_count.desc(),
+        Payee.name,
+    ).all()
+
+
 def _load_payee(session, user, payee_id):
     '''
     '''
@@ -102,12 +139,72 @@ def create_payee(
         memo=memo,
     )
 
+    payee_version = invalidate_payee_index(user)
+    session.add(p)
+    session.commit()
+    update_payee_index(user, p, payee_version)
+
+    return p
+
+
+def update_payee(session, user, payee_id, **kwargs):
+    '''
+    Update a Payee's name, visibility, default amount or default memo
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    p = _load_payee(session, user, payee_id)
+
+    payee_version = None
+    if 'name' in kwargs or 'hidden' in kwargs:
+        payee_version = invalidate_payee_index(user)
+
+    if 'name' in kwargs:
+        p.name = kwargs.pop('name')
+
+    if 'hidden' in kwargs:
+        p.hidden = kwargs.pop('hidden')
+
+    if 'amount' in kwargs:
+        p.amount = kwargs.pop('amount')
+
+    if 'memo' in kwargs:
+        p.memo = kwargs.pop('memo')
+
+    # Ensure no unexpected arguments were passed
+    if len(kwargs) > 0:
+        raise TypeError(
+            'Unexpected keyword arguments: {}'.format(', '.join(kwargs.keys()))
+        )
+
     session.add(p)
     session.commit()
+    if payee_version is not None:
+        update_payee_index(user, p, payee_version)
 
     return p
 
 
+def search_payees(session, user, query, limit=20):
+    '''
+    Return up to ``limit`` of a user's visible Payees with a name word
+    starting with ``query``, most frequently used first. Searches use the
+    user's in-memory `PayeeIndex`, which is loaded on first use and kept up
+    to date as Payees are created and renamed.
+
+    :returns: List of `IndexedPayee` snapshots
+    :rtype: list
+    '''
+    check_session(session)
+    check_user(user, needs_profile=True)
+
+    if limit < 1:
+        raise ValueError('Search limit must be positive')
+
+    return load_payee_index(session, user).search(query, limit)
+
+
 def get_payee_last_txn(session, payee_id):
     '''
     '''
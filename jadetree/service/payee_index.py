@@ -0,0 +1,224 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+# Payee Autocomplete Prefix Index
+
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from dataclasses import dataclass
+import re
+import threading
+
+from sqlalchemy import select
+
+from jadetree.database.tables import payees as payees_table
+from jadetree.domain.types import PayeeRole
+from jadetree.domain.util import new_version_token
+
+__all__ = (
+    'IndexedPayee',
+    'PayeeIndex',
+    'invalidate_payee_index',
+    'load_payee_index',
+    'update_payee_index',
+)
+
+#: Maximum number of per-user Payee Indexes held in the cache
+CACHE_SIZE = 128
+
+#: Payee roles which are offered for autocompletion
+INDEXED_ROLES = (PayeeRole.Expense, PayeeRole.Transfer)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def _normalize(text):
+    '''Case-fold a name or query and collapse whitespace'''
+    return ' '.join((text or '').casefold().split())
+
+
+def _index_keys(name):
+    '''
+    Return the index keys for a Payee name: the normalized name from the
+    start of each word, so that queries match any word prefix (e.g. "foo"
+    matches "Whole Foods").
+    '''
+    norm = _normalize(name)
+    return sorted({norm[m.start():] for m in _word_re.finditer(norm)})
+
+
+@dataclass(frozen=True)
+class IndexedPayee:
+    '''Immutable snapshot of a `Payee` held in a `PayeeIndex`'''
+    id: int
+    name: str
+    role: PayeeRole
+    use_count: int
+
+
+class PayeeIndex:
+    '''
+    Prefix index of a user's visible Payees, held as a sorted array of
+    ``(key, payee_id)`` pairs searched with `bisect`. Matches are ranked by
+    usage frequency and then by name. The ``version`` is the user's
+    ``payee_version`` token at the time the index was loaded. Updates and
+    searches are serialized with the index ``lock``.
+    '''
+    def __init__(self, version, payees=()):
+        self.version = version
+        self.lock = threading.RLock()
+        self._payees = {}
+        self._keys = []
+
+        for p in payees:
+            self._payees[p.id] = p
+            self._keys.extend((k, p.id) for k in _index_keys(p.name))
+
+        self._keys.sort()
+
+    def __len__(self):
+        return len(self._payees)
+
+    def add(self, payee):
+        '''Add or replace a Payee in the index'''
+        with self.lock:
+            self.remove(payee.id)
+            self._payees[payee.id] = payee
+            for k in _index_keys(payee.name):
+                insort(self._keys, (k, payee.id))
+
+    def remove(self, payee_id):
+        '''Remove a Payee from the index, if present'''
+        with self.lock:
+            old = self._payees.pop(payee_id, None)
+            if old is None:
+                return
+
+            for k in _index_keys(old.name):
+                i = bisect_left(self._keys, (k, payee_id))
+                if i < len(self._keys) and self._keys[i] == (k, payee_id):
+                    del self._keys[i]
+
+    def search(self, query, limit=20):
+        '''
+        Return up to ``limit`` Payees with a word starting with the query,
+        most frequently used first. An empty query returns the most
+        frequently used Payees.
+        '''
+        prefix = _normalize(query)
+        with self.lock:
+            if not prefix:
+                matches = list(self._payees.values())
+            else:
+                ids = set()
+                i = bisect_left(self._keys, (prefix, ))
+                while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+                    ids.add(self._keys[i][1])
+                    i += 1
+                matches = [self._payees[pid] for pid in ids]
+
+        return sorted(
+            matches,
+            key=lambda p: (-p.use_count, _normalize(p.name), p.id),
+        )[:limit]
+
+
+def _snapshot(payee):
+    '''Return the `IndexedPayee` for a loaded `Payee`'''
+    return IndexedPayee(
+        id=payee.id,
+        name=payee.name,
+        role=payee.role,
+        use_count=payee.use_count or 0,
+    )
+
+
+def _is_indexed(payee):
+    return payee.role in INDEXED_ROLES and not payee.hidden
+
+
+def _build_payee_index(session, user):
+    '''Load the Payee Index for a user with a single query'''
+    p = payees_table.c
+    rows = session.execute(
+        select([p.id, p.name, p.role, p.use_count]).where(
+            p.user_id == user.id
+        ).where(
+            p.role.in_(INDEXED_ROLES)
+        ).where(
+            p.hidden == False       # noqa: E712
+        )
+    ).fetchall()
+
+    return PayeeIndex(user.payee_version, [
+        IndexedPayee(id=r.id, name=r.name, role=r.role, use_count=r.use_count or 0)
+        for r in rows
+    ])
+
+
+def load_payee_index(session, user):
+    '''
+    Return the cached `PayeeIndex` for a user, building it if it is not
+    cached or the user's ``payee_version`` token has changed.
+    '''
+    version = user.payee_version
+    with _cache_lock:
+        index = _cache.get(user.id)
+        if index is not None and index.version == version:
+            _cache.move_to_end(user.id)
+            return index
+
+    index = _build_payee_index(session, user)
+
+    with _cache_lock:
+        _cache[user.id] = index
+        _cache.move_to_end(user.id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return index
+
+
+def invalidate_payee_index(user):
+    '''
+    Replace the ``payee_version`` token for a user so that cached Payee
+    Indexes in other processes are rebuilt once the change is committed.
+    This must be called by every service which creates, renames or hides a
+    Payee. Returns the previous token for `update_payee_index`.
+    '''
+    version = user.payee_version
+    user.payee_version = new_version_token()
+    return version
+
+
+def update_payee_index(user, payee, prev_version=None):
+    '''
+    Update a cached Payee Index in place after a Payee was changed. When
+    ``prev_version`` is given (i.e. the change replaced the user's token),
+    the index is carried forward to the new token only if it was current
+    before the change, and is otherwise dropped to be rebuilt.
+    '''
+    with _cache_lock:
+        index = _cache.get(user.id)
+    if index is None:
+        return
+
+    with index.lock:
+        if prev_version is not None:
+            if index.version != prev_version:
+                with _cache_lock:
+                    _cache.pop(user.id, None)
+                return
+            index.version = user.payee_version
+
+        if _is_indexed(payee):
+            index.add(_snapshot(payee))
+        else:
+            index.remove(payee.id)
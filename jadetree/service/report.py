@@ -12,11 +12,14 @@ from jadetree.database.queries.reports import (
     q_report_by_payee,
     q_report_income,
 )
+from jadetree.database.routing import replica_read
+from jadetree.domain.util import month_from_key
 
 from .budget import _load_budget
 from .util import check_session, check_user
 
 
+@replica_read
 def net_worth(session, user, filter=None):
     """Report the user's net worth in assets and liabilities per month."""
     check_session(session)
@@ -28,8 +31,9 @@ def net_worth(session, user, filter=None):
     data = []
     cur_date = datetime.date.today().replace(day=1)
     last_date = None
-    for y, m, assets, liabilities in q.all():
-        last_date = datetime.date(year=int(y), month=int(m), day=1)
+    for mk, assets, liabilities in q.all():
+        y, m = month_from_key(mk)
+        last_date = datetime.date(year=y, month=m, day=1)
         data.append(dict(
             month=last_date,
             assets=assets,
@@ -57,6 +61,7 @@ def net_worth(session, user, filter=None):
     return data
 
 
+@replica_read
 def spending_by_category(session, user, budget_id, filter=None):
     """Report the user's spending by category."""
     check_session(session)
@@ -77,6 +82,7 @@ def spending_by_category(session, user, budget_id, filter=None):
     return data
 
 
+@replica_read
 def spending_by_payee(session, user, budget_id, filter=None):
     """Report the user's spending by payee."""
     check_session(session)
@@ -97,6 +103,7 @@ def spending_by_payee(session, user, budget_id, filter=None):
     return data
 
 
+@replica_read
 def income_allocation(session, user, budget_id, filter=None):
     """Report the user's income allocation."""
     check_session(session)
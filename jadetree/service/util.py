@@ -9,8 +9,10 @@
 
 import inspect
 
+from sqlalchemy import and_, bindparam, func, select
 from werkzeug.local import LocalProxy
 
+from jadetree.domain.util import ORDER_STEP, order_key_between
 from jadetree.exc import DomainError, Unauthorized
 
 
@@ -54,3 +56,72 @@ def check_access(user, obj, user_fn=lambda o: o.user):
                 fn_name
             )
         )
+
+
+def renumber_display_order(session, table, ordered_ids):
+    '''
+    Rewrite the ``display_order`` column of ``table`` so the rows listed in
+    ``ordered_ids`` are spaced :data:`ORDER_STEP` apart in list order. This
+    is used to apply a full ordering at once and to rebalance a list when
+    its sparse keys are exhausted.
+    '''
+    if not ordered_ids:
+        return
+
+    stmt = table.update() \
+        .where(table.c.id == bindparam('row_id')) \
+        .values(display_order=bindparam('row_order'))
+
+    session.execute(stmt, [
+        dict(row_id=row_id, row_order=i * ORDER_STEP)
+        for i, row_id in enumerate(ordered_ids)
+    ])
+
+
+def increment_counts(session, table, column, counts):
+    '''
+    Add ``counts[row_id]`` to the integer ``column`` of each row of
+    ``table``. The new value is computed by the database rather than
+    written from the loaded value, so that increments made by concurrent
+    transactions are not lost.
+    '''
+    if not counts:
+        return
+
+    stmt = table.update() \
+        .where(table.c.id == bindparam('row_id')) \
+        .values({column: table.c[column] + bindparam('row_count')})
+
+    session.execute(stmt, [
+        dict(row_id=row_id, row_count=count)
+        for row_id, count in counts.items()
+    ])
+
+
+def sparse_display_order(session, table, scope, item_id, position):
+    '''
+    Calculate the ``display_order`` key which places the row ``item_id`` at
+    index ``position`` among its siblings in ``table``, where the siblings
+    are the rows matching the ``scope`` clauses. The returned key sorts
+    between the neighbouring keys so that only the moved row needs to be
+    written. If the neighbouring keys are adjacent the siblings are first
+    renumbered with :func:`renumber_display_order`.
+    '''
+    rows = session.execute(
+        select([table.c.id, func.coalesce(table.c.display_order, 0)])
+        .where(and_(*scope, table.c.id != item_id))
+        .order_by(func.coalesce(table.c.display_order, 0), table.c.id)
+    ).fetchall()
+
+    position = max(0, min(position, len(rows)))
+    before = rows[position - 1][1] if position > 0 else None
+    after = rows[position][1] if position < len(rows) else None
+
+    key = order_key_between(before, after)
+    if key is None:
+        ids = [r[0] for r in rows]
+        ids.insert(position, item_id)
+        renumber_display_order(session, table, ids)
+        key = position * ORDER_STEP
+
+    return key
@@ -6,5 +6,7 @@
 # =============================================================================
 
 from .factory import create_app
+from .jobs import start_jobs
 
 app = create_app()
+start_jobs(app)
@@ -19,6 +19,8 @@ logger = logging.getLogger('alembic.env')
 # target_metadata = mymodel.Base.metadata
 from flask import current_app
 
+from jadetree.database.views import materialized_views
+
 config.set_main_option(
     'sqlalchemy.url',
     str(current_app.extensions['migrate'].db.engine.url).replace('%', '%%'))
@@ -31,8 +33,11 @@ target_metadata = current_app.extensions['migrate'].db.metadata
 
 def include_object(object, name, type_, reflected, compare_to):
     """
-    Exclude views from Alembic's consideration.
+    Exclude views (and the tables which emulate materialized views on SQLite)
+    from Alembic's consideration.
     """
+    if type_ == 'table' and name in materialized_views:
+        return False
     return not object.info.get('is_view', False)
 
 
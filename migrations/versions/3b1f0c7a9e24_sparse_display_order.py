@@ -0,0 +1,76 @@
+"""Space category and account display order keys for sparse ordering
+
+Revision ID: 3b1f0c7a9e24
+Revises: 68fc5e458d5d
+Create Date: 2026-10-19 11:03:17.550214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0c7a9e24'
+down_revision = '68fc5e458d5d'
+branch_labels = None
+depends_on = None
+
+# Matches jadetree.domain.util.ORDER_STEP at the time of this revision
+ORDER_STEP = 1024
+
+
+# Columns which group the sibling rows that share an ordering
+PARENT_COLUMNS = dict(
+    categories=('budget_id', 'parent_id'),
+    accounts=('user_id', ),
+)
+
+
+def _tables():
+    return [
+        sa.table(
+            name,
+            sa.column('id', sa.Integer),
+            sa.column('display_order', sa.Integer),
+            *[sa.column(c, sa.Integer) for c in parents]
+        )
+        for name, parents in PARENT_COLUMNS.items()
+    ]
+
+
+def upgrade():
+    for tbl in _tables():
+        op.execute(
+            tbl.update().where(
+                tbl.c.display_order != None     # noqa: E711
+            ).values(
+                display_order=tbl.c.display_order * ORDER_STEP
+            )
+        )
+
+
+def downgrade():
+    # Dividing by ORDER_STEP would merge keys which were inserted between
+    # two others, so the siblings are renumbered densely in their order
+    bind = op.get_bind()
+    for tbl in _tables():
+        position = sa.func.row_number().over(
+            partition_by=[tbl.c[c] for c in PARENT_COLUMNS[tbl.name]],
+            order_by=[tbl.c.display_order, tbl.c.id],
+        )
+        rows = bind.execute(
+            sa.select([tbl.c.id, position.label('position')]).where(
+                tbl.c.display_order != None     # noqa: E711
+            )
+        ).fetchall()
+        if not rows:
+            continue
+
+        bind.execute(
+            tbl.update().where(
+                tbl.c.id == sa.bindparam('row_id')
+            ).values(
+                display_order=sa.bindparam('position')
+            ),
+            [dict(row_id=r.id, position=r.position) for r in rows],
+        )
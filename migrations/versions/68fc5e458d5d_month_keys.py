@@ -0,0 +1,65 @@
+"""Add stored month keys to transactions and budget entries
+
+Revision ID: 68fc5e458d5d
+Revises: 928216790a90
+Create Date: 2026-10-19 09:12:41.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import jadetree.database.types as jt
+
+
+# revision identifiers, used by Alembic.
+revision = '68fc5e458d5d'
+down_revision = '928216790a90'
+branch_labels = None
+depends_on = None
+
+
+def _month_key_expr(col):
+    """Build a dialect-agnostic SQL expression for year * 12 + month - 1."""
+    return sa.cast(sa.extract('year', col), sa.Integer) * 12 \
+        + sa.cast(sa.extract('month', col), sa.Integer) - 1
+
+
+def upgrade():
+    op.add_column('transactions', sa.Column('month_key', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_transactions_month_key'), 'transactions', ['month_key'], unique=False)
+    op.add_column('budget_entries', sa.Column('month_key', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_budget_entries_month_key'), 'budget_entries', ['month_key'], unique=False)
+
+    # Backfill Month Keys for existing rows
+    transactions = sa.table(
+        'transactions',
+        sa.column('date', sa.Date),
+        sa.column('month_key', sa.Integer),
+    )
+    budget_entries = sa.table(
+        'budget_entries',
+        sa.column('month', sa.Date),
+        sa.column('month_key', sa.Integer),
+    )
+
+    op.execute(
+        transactions.update().values(
+            month_key=_month_key_expr(transactions.c.date)
+        )
+    )
+    op.execute(
+        budget_entries.update().where(
+            budget_entries.c.month != None      # noqa: E711
+        ).values(
+            month_key=_month_key_expr(budget_entries.c.month)
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('budget_entries') as batch_op:
+        batch_op.drop_index(op.f('ix_budget_entries_month_key'))
+        batch_op.drop_column('month_key')
+
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_index(op.f('ix_transactions_month_key'))
+        batch_op.drop_column('month_key')
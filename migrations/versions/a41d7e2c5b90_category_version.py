@@ -0,0 +1,44 @@
+"""Add category tree version token to budgets
+
+Revision ID: a41d7e2c5b90
+Revises: 3b1f0c7a9e24
+Create Date: 2026-10-19 13:27:05.118342
+
+"""
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d7e2c5b90'
+down_revision = '3b1f0c7a9e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('budgets', sa.Column('category_version', sa.String(length=32), nullable=True))
+
+    # Assign a version token to existing budgets
+    budgets = sa.table(
+        'budgets',
+        sa.column('id', sa.Integer),
+        sa.column('category_version', sa.String),
+    )
+
+    conn = op.get_bind()
+    for (budget_id, ) in conn.execute(sa.select([budgets.c.id])).fetchall():
+        conn.execute(
+            budgets.update().where(
+                budgets.c.id == budget_id
+            ).values(
+                category_version=uuid.uuid4().hex
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('budgets') as batch_op:
+        batch_op.drop_column('category_version')
@@ -0,0 +1,188 @@
+"""Store payee autofill statistics
+
+Revision ID: a6c3e8f15d92
+Revises: f7b2d90c4e15
+Create Date: 2026-10-19 17:48:12.204519
+
+"""
+from decimal import Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+import jadetree.database.types as jt
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3e8f15d92'
+down_revision = 'f7b2d90c4e15'
+branch_labels = None
+depends_on = None
+
+
+def _split_amount(r, entry_amount):
+    '''Convert a left line amount to the transaction currency'''
+    if r.line_currency == r.currency:
+        return entry_amount
+    if r.line_currency == r.foreign_currency:
+        return entry_amount * (r.foreign_exchrate or 1)
+    return entry_amount / (r.foreign_exchrate or 1)
+
+
+def upgrade():
+    with op.batch_alter_table('payees') as batch_op:
+        batch_op.add_column(sa.Column('use_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('last_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column(
+            'last_type',
+            sa.Enum('inflow', 'outflow', 'transfer', 'system', name='transactiontype'),
+            nullable=True,
+        ))
+        batch_op.add_column(sa.Column('last_category_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('last_account_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('last_amount', jt.AmountType(), nullable=True))
+        batch_op.add_column(sa.Column('last_memo', sa.String(length=255), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_payees_last_category_id_categories',
+            'categories', ['last_category_id'], ['id'],
+            ondelete='SET NULL',
+        )
+        batch_op.create_foreign_key(
+            'fk_payees_last_account_id_accounts',
+            'accounts', ['last_account_id'], ['id'],
+            ondelete='SET NULL',
+        )
+
+    op.create_index(
+        'ix_transactions_payee_date',
+        'transactions',
+        ['payee_id', 'date', 'id'],
+        unique=False,
+    )
+
+    # Backfill Statistics from the latest Split of each Payee
+    payees = sa.table(
+        'payees',
+        sa.column('id', sa.Integer),
+        sa.column('use_count', sa.Integer),
+        sa.column('last_date', sa.Date),
+        sa.column('last_type', sa.String),
+        sa.column('last_category_id', sa.Integer),
+        sa.column('last_account_id', sa.Integer),
+        sa.column('last_amount', jt.AmountType),
+        sa.column('last_memo', sa.String),
+    )
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer),
+        sa.column('payee_id', sa.Integer),
+        sa.column('date', sa.Date),
+        sa.column('currency', sa.String),
+        sa.column('foreign_currency', sa.String),
+        sa.column('foreign_exchrate', jt.AmountType(scale=6)),
+    )
+    splits = sa.table(
+        'transaction_splits',
+        sa.column('id', sa.Integer),
+        sa.column('transaction_id', sa.Integer),
+        sa.column('category_id', sa.Integer),
+        sa.column('left_line_id', sa.Integer),
+        sa.column('right_account_id', sa.Integer),
+        sa.column('type', sa.String),
+        sa.column('memo', sa.String),
+    )
+    lines = sa.table(
+        'transaction_lines',
+        sa.column('id', sa.Integer),
+        sa.column('account_id', sa.Integer),
+    )
+    entries = sa.table(
+        'transaction_entries',
+        sa.column('line_id', sa.Integer),
+        sa.column('split_id', sa.Integer),
+        sa.column('amount', jt.AmountType),
+    )
+    accounts = sa.table(
+        'accounts',
+        sa.column('id', sa.Integer),
+        sa.column('currency', sa.String),
+    )
+
+    bind = op.get_bind()
+    counts = dict(bind.execute(
+        sa.select([transactions.c.payee_id, sa.func.count(transactions.c.id)])
+        .group_by(transactions.c.payee_id)
+    ).fetchall())
+
+    latest = {}
+    for r in bind.execute(
+        sa.select([
+            transactions.c.payee_id,
+            transactions.c.date,
+            transactions.c.currency,
+            transactions.c.foreign_currency,
+            transactions.c.foreign_exchrate,
+            splits.c.id,
+            splits.c.category_id,
+            splits.c.right_account_id,
+            splits.c.type,
+            splits.c.memo,
+            accounts.c.currency.label('line_currency'),
+        ]).select_from(
+            splits.join(
+                transactions, transactions.c.id == splits.c.transaction_id
+            ).join(
+                lines, lines.c.id == splits.c.left_line_id
+            ).join(
+                accounts, accounts.c.id == lines.c.account_id
+            )
+        ).order_by(
+            transactions.c.payee_id,
+            transactions.c.date.desc(),
+            transactions.c.id.desc(),
+            splits.c.id,
+        )
+    ):
+        latest.setdefault(r.payee_id, r)
+
+    for payee_id, count in counts.items():
+        values = dict(use_count=count)
+        r = latest.get(payee_id)
+        if r is not None:
+            amount = bind.execute(
+                sa.select([sa.func.sum(entries.c.amount)]).select_from(
+                    entries.join(splits, splits.c.id == entries.c.split_id)
+                ).where(sa.and_(
+                    entries.c.split_id == r.id,
+                    entries.c.line_id == splits.c.left_line_id,
+                ))
+            ).scalar()
+
+            transfer = r.type == 'transfer'
+            values.update(
+                last_date=r.date,
+                last_type=r.type,
+                last_category_id=None if transfer else r.category_id,
+                last_account_id=r.right_account_id if transfer else None,
+                last_amount=_split_amount(r, Decimal(amount or 0)),
+                last_memo=r.memo,
+            )
+
+        op.execute(
+            payees.update().where(payees.c.id == payee_id).values(**values)
+        )
+
+
+def downgrade():
+    op.drop_index('ix_transactions_payee_date', table_name='transactions')
+
+    with op.batch_alter_table('payees') as batch_op:
+        batch_op.drop_constraint('fk_payees_last_account_id_accounts', type_='foreignkey')
+        batch_op.drop_constraint('fk_payees_last_category_id_categories', type_='foreignkey')
+        batch_op.drop_column('last_memo')
+        batch_op.drop_column('last_amount')
+        batch_op.drop_column('last_account_id')
+        batch_op.drop_column('last_category_id')
+        batch_op.drop_column('last_type')
+        batch_op.drop_column('last_date')
+        batch_op.drop_column('use_count')
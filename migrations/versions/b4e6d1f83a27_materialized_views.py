@@ -0,0 +1,66 @@
+"""Add the budget outflow and net worth materialized views
+
+Revision ID: b4e6d1f83a27
+Revises: e1b7c4d92f58
+Create Date: 2026-10-19 22:05:12.472913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e6d1f83a27'
+down_revision = 'e1b7c4d92f58'
+branch_labels = None
+depends_on = None
+
+# Matches the jadetree.database.tables views at this revision
+VIEW_QUERIES = {
+    'budget_outflows': '''SELECT
+            transaction_splits.category_id AS category_id,
+            transactions.month_key AS month_key,
+            sum(transaction_entries.amount * CASE
+                WHEN (accounts.type = 'L') THEN 1
+                WHEN (accounts.type = 'E') THEN 1
+                ELSE -1 END
+            ) AS outflow,
+            count(DISTINCT transactions.id) AS num_transactions
+        FROM transaction_splits
+            JOIN transaction_entries ON transaction_entries.split_id = transaction_splits.id
+            JOIN transaction_lines ON transaction_lines.id = transaction_entries.line_id
+            JOIN accounts ON accounts.id = transaction_lines.account_id
+            JOIN transactions ON transactions.id = transaction_splits.transaction_id
+        WHERE accounts.role = 'budget'
+        GROUP BY transaction_splits.category_id, transactions.month_key''',
+    'net_worth_months': '''SELECT
+            accounts.user_id AS user_id,
+            accounts.id AS account_id,
+            transactions.month_key AS month_key,
+            sum(CASE WHEN (accounts.type = 'A') THEN transaction_entries.amount ELSE 0 END) AS asset,
+            sum(CASE WHEN (accounts.type = 'L') THEN transaction_entries.amount ELSE 0 END) AS liability
+        FROM transactions
+            JOIN transaction_lines ON transaction_lines.transaction_id = transactions.id
+            JOIN transaction_entries ON transaction_entries.line_id = transaction_lines.id
+            JOIN accounts ON accounts.id = transaction_lines.account_id
+        WHERE accounts.type IN ('A', 'L')
+        GROUP BY accounts.user_id, accounts.id, transactions.month_key''',
+}
+
+#: Key columns of each view, which are unique
+VIEW_KEYS = {
+    'budget_outflows': ('category_id', 'month_key'),
+    'net_worth_months': ('account_id', 'month_key'),
+}
+
+
+def upgrade():
+    # The views are refreshed incrementally on write, so are stored as tables
+    for name, query in VIEW_QUERIES.items():
+        op.execute(f'CREATE TABLE {name} AS {query}')
+        op.create_index(f'ux_{name}_keys', name, list(VIEW_KEYS[name]), unique=True)
+
+
+def downgrade():
+    for name in VIEW_QUERIES:
+        op.drop_index(f'ux_{name}_keys', table_name=name)
+        op.drop_table(name)
@@ -0,0 +1,44 @@
+"""Add payee index version token to users
+
+Revision ID: b9d27f4e0a31
+Revises: a6c3e8f15d92
+Create Date: 2026-10-19 18:20:44.913027
+
+"""
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9d27f4e0a31'
+down_revision = 'a6c3e8f15d92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('payee_version', sa.String(length=32), nullable=True))
+
+    # Assign a version token to existing users
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('payee_version', sa.String),
+    )
+
+    conn = op.get_bind()
+    for (user_id, ) in conn.execute(sa.select([users.c.id])).fetchall():
+        conn.execute(
+            users.update().where(
+                users.c.id == user_id
+            ).values(
+                payee_version=uuid.uuid4().hex
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('payee_version')
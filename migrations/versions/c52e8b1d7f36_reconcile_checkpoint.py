@@ -0,0 +1,72 @@
+"""Add account reconciliation checkpoints
+
+Revision ID: c52e8b1d7f36
+Revises: a41d7e2c5b90
+Create Date: 2026-10-19 15:02:48.730961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import jadetree.database.types as jt
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e8b1d7f36'
+down_revision = 'a41d7e2c5b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('accounts', sa.Column('reconciled_balance', jt.AmountType(), nullable=True))
+    op.add_column('accounts', sa.Column('reconciled_at', sa.Date(), nullable=True))
+    op.create_index(
+        'ix_transaction_lines_reconcile',
+        'transaction_lines',
+        ['account_id', 'reconciled', 'cleared'],
+        unique=False,
+    )
+
+    # Backfill Checkpoints from previously reconciled Transaction Lines
+    accounts = sa.table(
+        'accounts',
+        sa.column('id', sa.Integer),
+        sa.column('reconciled_balance', sa.Integer),
+        sa.column('reconciled_at', sa.Date),
+    )
+    lines = sa.table(
+        'transaction_lines',
+        sa.column('id', sa.Integer),
+        sa.column('account_id', sa.Integer),
+        sa.column('reconciled', sa.Boolean),
+        sa.column('reconciled_at', sa.Date),
+    )
+    entries = sa.table(
+        'transaction_entries',
+        sa.column('line_id', sa.Integer),
+        sa.column('amount', sa.Integer),
+    )
+
+    reconciled = sa.and_(
+        lines.c.account_id == accounts.c.id,
+        lines.c.reconciled == sa.true(),
+    )
+
+    op.execute(
+        accounts.update().values(
+            reconciled_balance=sa.select([sa.func.sum(entries.c.amount)])
+            .select_from(entries.join(lines, lines.c.id == entries.c.line_id))
+            .where(reconciled)
+            .scalar_subquery(),
+            reconciled_at=sa.select([sa.func.max(lines.c.reconciled_at)])
+            .where(reconciled)
+            .scalar_subquery(),
+        )
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transaction_lines_reconcile', table_name='transaction_lines')
+    with op.batch_alter_table('accounts') as batch_op:
+        batch_op.drop_column('reconciled_at')
+        batch_op.drop_column('reconciled_balance')
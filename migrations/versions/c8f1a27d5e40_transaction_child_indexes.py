@@ -0,0 +1,49 @@
+"""Index transaction lines, splits and entries by parent
+
+Revision ID: c8f1a27d5e40
+Revises: b9d27f4e0a31
+Create Date: 2026-10-19 19:02:17.530846
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f1a27d5e40'
+down_revision = 'b9d27f4e0a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_transaction_lines_transaction',
+        'transaction_lines',
+        ['transaction_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_transaction_splits_transaction',
+        'transaction_splits',
+        ['transaction_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_transaction_entries_line',
+        'transaction_entries',
+        ['line_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_transaction_entries_split',
+        'transaction_entries',
+        ['split_id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transaction_entries_split', table_name='transaction_entries')
+    op.drop_index('ix_transaction_entries_line', table_name='transaction_entries')
+    op.drop_index('ix_transaction_splits_transaction', table_name='transaction_splits')
+    op.drop_index('ix_transaction_lines_transaction', table_name='transaction_lines')
@@ -0,0 +1,131 @@
+"""Add the transaction full-text search index
+
+Revision ID: d8e4a61f03b2
+Revises: c52e8b1d7f36
+Create Date: 2026-10-19 15:42:08.318760
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8e4a61f03b2'
+down_revision = 'c52e8b1d7f36'
+branch_labels = None
+depends_on = None
+
+# Matches jadetree.database.tables.TRANSACTION_SEARCH_DDL at this revision
+FTS_DDL = {
+    'sqlite': (
+        '''CREATE VIRTUAL TABLE transaction_search_fts USING fts5(
+            document,
+            content='transaction_search',
+            content_rowid='transaction_id',
+            prefix='2 3'
+        )''',
+        '''CREATE TRIGGER transaction_search_fts_ai AFTER INSERT ON transaction_search BEGIN
+            INSERT INTO transaction_search_fts(rowid, document)
+                VALUES (new.transaction_id, new.document);
+        END''',
+        '''CREATE TRIGGER transaction_search_fts_ad AFTER DELETE ON transaction_search BEGIN
+            INSERT INTO transaction_search_fts(transaction_search_fts, rowid, document)
+                VALUES ('delete', old.transaction_id, old.document);
+        END''',
+        '''CREATE TRIGGER transaction_search_fts_au AFTER UPDATE ON transaction_search BEGIN
+            INSERT INTO transaction_search_fts(transaction_search_fts, rowid, document)
+                VALUES ('delete', old.transaction_id, old.document);
+            INSERT INTO transaction_search_fts(rowid, document)
+                VALUES (new.transaction_id, new.document);
+        END''',
+    ),
+    'postgresql': (
+        '''CREATE INDEX ix_transaction_search_document ON transaction_search
+            USING gin (to_tsvector('simple', document))''',
+    ),
+}
+
+
+def upgrade():
+    op.create_table(
+        'transaction_search',
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('document', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('transaction_id'),
+    )
+    op.create_index(op.f('ix_transaction_search_user_id'), 'transaction_search', ['user_id'], unique=False)
+
+    bind = op.get_bind()
+    for stmt in FTS_DDL.get(bind.dialect.name, ()):
+        op.execute(stmt)
+
+    # Backfill Search Documents for existing Transactions
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('payee_id', sa.Integer),
+        sa.column('check', sa.String),
+        sa.column('memo', sa.String),
+    )
+    payees = sa.table(
+        'payees',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+    )
+    splits = sa.table(
+        'transaction_splits',
+        sa.column('id', sa.Integer),
+        sa.column('transaction_id', sa.Integer),
+        sa.column('memo', sa.String),
+    )
+    search = sa.table(
+        'transaction_search',
+        sa.column('transaction_id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('document', sa.Text),
+    )
+
+    split_memos = {}
+    for r in bind.execute(
+        sa.select([splits.c.transaction_id, splits.c.memo])
+        .where(splits.c.memo != None)       # noqa: E711
+        .order_by(splits.c.id)
+    ):
+        split_memos.setdefault(r.transaction_id, []).append(r.memo)
+
+    rows = []
+    for r in bind.execute(
+        sa.select([
+            transactions.c.id,
+            transactions.c.user_id,
+            transactions.c.check,
+            transactions.c.memo,
+            payees.c.name,
+        ]).select_from(
+            transactions.outerjoin(payees, payees.c.id == transactions.c.payee_id)
+        )
+    ):
+        parts = [r.name, r.memo, r.check] + split_memos.get(r.id, [])
+        rows.append(dict(
+            transaction_id=r.id,
+            user_id=r.user_id,
+            document=' '.join(p for p in parts if p),
+        ))
+
+    if rows:
+        op.bulk_insert(search, rows)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS transaction_search_fts')
+    elif bind.dialect.name == 'postgresql':
+        op.drop_index('ix_transaction_search_document', table_name='transaction_search')
+
+    op.drop_index(op.f('ix_transaction_search_user_id'), table_name='transaction_search')
+    op.drop_table('transaction_search')
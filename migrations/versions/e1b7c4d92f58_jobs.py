@@ -0,0 +1,53 @@
+"""Add the background jobs table
+
+Revision ID: e1b7c4d92f58
+Revises: c8f1a27d5e40
+Create Date: 2026-10-19 20:14:36.208417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import jadetree.database.types as jt
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7c4d92f58'
+down_revision = 'c8f1a27d5e40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('queued', 'running', 'complete', 'failed', name='jobstatus'),
+            nullable=False,
+        ),
+        sa.Column('params', sa.JSON(), nullable=True),
+        sa.Column('progress', sa.Integer(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('artifact_name', sa.String(length=255), nullable=True),
+        sa.Column('artifact_type', sa.String(length=64), nullable=True),
+        sa.Column('artifact_path', sa.String(length=1024), nullable=True),
+        sa.Column('created_at', jt.ArrowType(), nullable=True),
+        sa.Column('started_at', jt.ArrowType(), nullable=True),
+        sa.Column('finished_at', jt.ArrowType(), nullable=True),
+        sa.Column('owner', sa.String(length=64), nullable=True),
+        sa.Column('heartbeat_at', jt.ArrowType(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_jobs_user_status', 'jobs', ['user_id', 'status'], unique=False)
+    op.create_index('ix_jobs_status_id', 'jobs', ['status', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_status_id', table_name='jobs')
+    op.drop_index('ix_jobs_user_status', table_name='jobs')
+    op.drop_table('jobs')
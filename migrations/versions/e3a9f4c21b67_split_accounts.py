@@ -0,0 +1,85 @@
+"""Store line accounts and transfer flag on transaction splits
+
+Revision ID: e3a9f4c21b67
+Revises: d8e4a61f03b2
+Create Date: 2026-10-19 16:27:51.093412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9f4c21b67'
+down_revision = 'd8e4a61f03b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transaction_splits') as batch_op:
+        batch_op.add_column(sa.Column('left_account_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('right_account_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('transfer', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.create_foreign_key(
+            'fk_transaction_splits_left_account_id_accounts',
+            'accounts', ['left_account_id'], ['id'],
+        )
+        batch_op.create_foreign_key(
+            'fk_transaction_splits_right_account_id_accounts',
+            'accounts', ['right_account_id'], ['id'],
+        )
+
+    # Backfill Line Accounts and Transfer Flags for existing Splits
+    splits = sa.table(
+        'transaction_splits',
+        sa.column('left_line_id', sa.Integer),
+        sa.column('right_line_id', sa.Integer),
+        sa.column('left_account_id', sa.Integer),
+        sa.column('right_account_id', sa.Integer),
+        sa.column('transfer', sa.Boolean),
+    )
+    lines = sa.table(
+        'transaction_lines',
+        sa.column('id', sa.Integer),
+        sa.column('account_id', sa.Integer),
+    )
+    accounts = sa.table(
+        'accounts',
+        sa.column('id', sa.Integer),
+        sa.column('role', sa.String),
+    )
+
+    op.execute(
+        splits.update().values(
+            left_account_id=sa.select([lines.c.account_id])
+            .where(lines.c.id == splits.c.left_line_id)
+            .scalar_subquery(),
+            right_account_id=sa.select([lines.c.account_id])
+            .where(lines.c.id == splits.c.right_line_id)
+            .scalar_subquery(),
+        )
+    )
+
+    def is_personal(col):
+        return sa.exists().where(
+            sa.and_(accounts.c.id == col, accounts.c.role == 'personal')
+        )
+
+    op.execute(
+        splits.update().where(
+            sa.and_(
+                is_personal(splits.c.left_account_id),
+                is_personal(splits.c.right_account_id),
+            )
+        ).values(transfer=sa.true())
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('transaction_splits') as batch_op:
+        batch_op.drop_constraint('fk_transaction_splits_right_account_id_accounts', type_='foreignkey')
+        batch_op.drop_constraint('fk_transaction_splits_left_account_id_accounts', type_='foreignkey')
+        batch_op.drop_column('transfer')
+        batch_op.drop_column('right_account_id')
+        batch_op.drop_column('left_account_id')
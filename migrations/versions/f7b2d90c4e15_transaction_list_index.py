@@ -0,0 +1,28 @@
+"""Add an index for the paginated transaction list
+
+Revision ID: f7b2d90c4e15
+Revises: e3a9f4c21b67
+Create Date: 2026-10-19 17:05:33.618024
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b2d90c4e15'
+down_revision = 'e3a9f4c21b67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_transactions_user_date',
+        'transactions',
+        ['user_id', 'date', 'id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transactions_user_date', table_name='transactions')
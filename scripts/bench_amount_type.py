@@ -0,0 +1,108 @@
+#
+# Micro-benchmark the AmountType SQLite conversions against the original
+# implementation, which set the thread decimal context precision and went
+# through str() on every bind and divided a new Decimal on every result.
+#
+# Usage: python scripts/bench_amount_type.py [num_values]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from decimal import Decimal, getcontext
+import random
+
+from bench_common import report, timed
+import sqlalchemy as sa
+from sqlalchemy.types import Integer, Numeric, TypeDecorator
+
+from jadetree.database.types import AmountType
+
+
+class LegacyAmountType(TypeDecorator):
+    '''The original AmountType conversions'''
+    cache_ok = True
+    impl = Numeric
+
+    def __init__(self, precision=13, scale=4):
+        super().__init__()
+        self._precision = precision
+        self._multiplier = 10**scale
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(Integer())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        getcontext().prec = self._precision
+        return int(Decimal(str(value)) * self._multiplier)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(value) / self._multiplier
+
+
+def make_table(engine, name, type_, rows):
+    '''Create a table with three amount columns and load the rows'''
+    md = sa.MetaData()
+    table = sa.Table(
+        name,
+        md,
+        sa.Column('id', sa.Integer, primary_key=True),
+        *[sa.Column(f'amount_{i}', type_()) for i in range(3)],
+    )
+    md.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(table.insert(), rows)
+    return table
+
+
+def main(n):
+    rnd = random.Random(47)
+    values = [Decimal(rnd.randrange(-10**9, 10**9)).scaleb(-2) for _ in range(n)]
+    floats = [float(v) for v in values]
+    ints = [int(v * 10000) for v in values]
+
+    engine = sa.create_engine('sqlite://')
+    dialect = engine.dialect
+    legacy = LegacyAmountType()
+    amount = AmountType()
+
+    legacy_bind = legacy.dialect_impl(dialect).bind_processor(dialect)
+    legacy_result = legacy.dialect_impl(dialect).result_processor(dialect, None)
+    bind = amount.dialect_impl(dialect).bind_processor(dialect)
+    result = amount.dialect_impl(dialect).result_processor(dialect, None)
+
+    rows = [
+        dict(amount_0=a, amount_1=b, amount_2=c)
+        for a, b, c in zip(values, values[1:] + values[:1], values[2:] + values[:2])
+    ]
+    t_legacy = make_table(engine, 'legacy', LegacyAmountType, rows)
+    t_amount = make_table(engine, 'amount', AmountType, rows)
+
+    def fetch(table):
+        with engine.connect() as conn:
+            return conn.execute(sa.select([table])).fetchall()
+
+    results = [
+        ('bind Decimal (legacy)', *timed(lambda: [legacy_bind(v) for v in values])),
+        ('bind Decimal', *timed(lambda: [bind(v) for v in values])),
+        ('bind float (legacy)', *timed(lambda: [legacy_bind(v) for v in floats])),
+        ('bind float', *timed(lambda: [bind(v) for v in floats])),
+        ('result (legacy)', *timed(lambda: [legacy_result(v) for v in ints])),
+        ('result', *timed(lambda: [result(v) for v in ints])),
+        ('result, bulk', *timed(lambda: amount.process_result_values(ints, dialect))),
+        (f'select {n} rows x 3 amounts (legacy)', *timed(lambda: fetch(t_legacy))),
+        (f'select {n} rows x 3 amounts', *timed(lambda: fetch(t_amount))),
+    ]
+
+    report(f'AmountType conversions, {n} values', results)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
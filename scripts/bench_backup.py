@@ -0,0 +1,65 @@
+#
+# Benchmark the binary backup format against the JSON data export: the time
+# to write each file and its size, and the time to restore the backup into
+# the same database as a new user with bulk inserts. Each seeded transaction
+# has two lines, one split and two entries.
+#
+# Usage: python scripts/bench_backup.py [num_transactions]
+#
+
+import os
+import sys
+import tempfile
+import time
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from bench_common import make_app, seed_ledger
+
+from jadetree.database import db
+from jadetree.domain.models import User
+from jadetree.service.backup import restore_backup, write_backup
+from jadetree.service.export import write_data_json
+
+
+def main(n):
+    print(f'Seeding {n} transactions...')
+    app = make_app()
+    ids = seed_ledger(app, n)
+    out_dir = tempfile.mkdtemp(prefix='jt-bench-')
+
+    json_file = os.path.join(out_dir, 'export.json')
+    backup_file = os.path.join(out_dir, 'backup.jtbk')
+
+    with app.app_context():
+        s = db.session
+        user = s.query(User).get(ids['user_id'])
+
+        t0 = time.perf_counter()
+        with open(json_file, 'w') as fp:
+            write_data_json(s, user, fp)
+        t_json = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with open(backup_file, 'wb') as fp:
+            write_backup(s, user, fp)
+        t_dump = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with open(backup_file, 'rb') as fp:
+            restored = restore_backup(s, fp, email='restored@jadetree.io')
+        t_restore = time.perf_counter() - t0
+
+        assert len(restored.transactions) == len(user.transactions)
+
+    title = f'Backup ({n} transactions)'
+    print(f'\n{title}')
+    print('-' * len(title))
+    print(f'{"JSON export":<16} {t_json:>8.2f} s {os.path.getsize(json_file) / (1 << 20):>9.1f} MiB')
+    print(f'{"backup dump":<16} {t_dump:>8.2f} s {os.path.getsize(backup_file) / (1 << 20):>9.1f} MiB')
+    print(f'{"backup restore":<16} {t_restore:>8.2f} s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,223 @@
+#
+# Shared helpers for the Jade Tree benchmark scripts
+#
+# Builds a throw-away SQLite database with a single user, budget and a set of
+# accounts, then bulk-loads a synthetic ledger with Core inserts so that large
+# data sets can be generated in seconds rather than through the service layer.
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+jt_path = os.path.abspath(os.path.join(root_path, '..'))
+sys.path.append(jt_path)
+
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+import statistics
+import tempfile
+import time
+
+from jadetree.database import db
+from jadetree.database.search import rebuild_search_index
+from jadetree.database.tables import (
+    payees,
+    transaction_entries,
+    transaction_lines,
+    transaction_splits,
+    transactions,
+)
+from jadetree.domain.models import Account, Category
+from jadetree.domain.types import (
+    AccountRole,
+    AccountSubtype,
+    AccountType,
+    PayeeRole,
+    TransactionType,
+)
+from jadetree.domain.util import month_key
+from jadetree.factory import create_app
+from jadetree.service import (
+    account as account_service,
+    auth as auth_service,
+    budget as budget_service,
+    user as user_service,
+)
+from jadetree.service.budget.defaults import JADETREE_DEFAULT_CATEGORIES
+
+
+def make_app(db_file=None, **config):
+    '''Create a Jade Tree application on a fresh SQLite database file'''
+    if db_file is None:
+        db_file = os.path.join(tempfile.mkdtemp(prefix='jt-bench-'), 'bench.db')
+    if os.path.exists(db_file):
+        os.unlink(db_file)
+
+    app_config = dict(
+        TESTING=True,
+        DB_DRIVER='sqlite',
+        DB_FILE=db_file,
+        APP_SESSION_KEY='jadetree-bench-session-key',
+        APP_TOKEN_KEY='jadetree-bench-token-key',
+        LOGGING_LEVEL='error',
+        _JT_SERVER_MODE='personal',
+        SERVER_NAME='localhost',
+    )
+    app_config.update(config)
+
+    app = create_app(app_config, 'jadetree-bench')
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def seed_ledger(app, n_transactions, n_payees=50, start=date(2015, 1, 1), seed=42, n_splits=1):
+    '''
+    Create a user with a budget and three accounts and bulk-load the given
+    number of outflow transactions, each with ``n_splits`` splits, spread
+    over the categories, payees and accounts. Returns a dictionary of the
+    created object ids.
+    '''
+    rnd = random.Random(seed)
+    with app.app_context():
+        session = db.session
+        u = auth_service.register_user(session, 'bench@jadetree.io', 'hunter2JT', 'Bench User')
+        if not u.confirmed:
+            u = auth_service.confirm_user(session, u.uid_hash, 'bench@jadetree.io')
+        u = user_service.setup_user(session, u, 'en', 'en_US', 'USD')
+        b = budget_service.create_budget(session, u, 'Bench Budget', 'USD', JADETREE_DEFAULT_CATEGORIES)
+
+        accts = []
+        for name, atype, subtype in (
+            ('Checking', AccountType.Asset, AccountSubtype.Checking),
+            ('Savings', AccountType.Asset, AccountSubtype.Savings),
+            ('Visa', AccountType.Liability, AccountSubtype.CreditCard),
+        ):
+            a, _, _ = account_service.create_user_account(
+                session, u, name, atype, 'USD', Decimal(100000), start,
+                subtype, budget_id=b.id,
+            )
+            accts.append(a)
+
+        expense = session.query(Account).filter(
+            Account.budget == b,
+            Account.role == AccountRole.Budget,
+            Account.type == AccountType.Expense,
+        ).one()
+
+        cats = [
+            c.id for c in session.query(Category).filter(
+                Category.budget == b,
+                Category.parent != None,        # noqa: E711
+                Category.system == False,       # noqa: E712
+            )
+        ]
+
+        session.execute(payees.insert(), [
+            dict(user_id=u.id, name=f'Payee {i:04}', role=PayeeRole.Expense, system=False, hidden=False)
+            for i in range(n_payees)
+        ])
+        payee_ids = [
+            r[0] for r in session.execute(
+                db.select([payees.c.id]).where(payees.c.user_id == u.id)
+            )
+        ]
+
+        next_id = {
+            t.name: (session.execute(db.select([db.func.max(t.c.id)])).scalar() or 0) + 1
+            for t in (transactions, transaction_lines, transaction_splits, transaction_entries)
+        }
+
+        batch = 10000
+        days = 365 * 6
+        for lo in range(0, n_transactions, batch):
+            rows_t, rows_l, rows_s, rows_e = [], [], [], []
+            for _ in range(lo, min(lo + batch, n_transactions)):
+                acct = rnd.choice(accts)
+                d = start + timedelta(days=rnd.randrange(days))
+                amount = Decimal(rnd.randrange(100, 50000)) / 100
+                sign = Account.inflow_sign(acct)
+
+                t_id = next_id['transactions']
+                l_id = next_id['transaction_lines']
+                s_id = next_id['transaction_splits']
+                e_id = next_id['transaction_entries']
+                next_id['transactions'] += 1
+                next_id['transaction_lines'] += 2
+                next_id['transaction_splits'] += n_splits
+                next_id['transaction_entries'] += 2 * n_splits
+
+                cleared = rnd.random() < 0.8
+                rows_t.append(dict(
+                    id=t_id, user_id=u.id, account_id=acct.id,
+                    payee_id=rnd.choice(payee_ids), date=d, month_key=month_key(d),
+                    memo=f'Memo {t_id}', currency='USD',
+                ))
+                rows_l.append(dict(
+                    id=l_id, transaction_id=t_id, account_id=acct.id,
+                    cleared=cleared, cleared_at=d if cleared else None,
+                    reconciled=False,
+                ))
+                rows_l.append(dict(
+                    id=l_id + 1, transaction_id=t_id, account_id=expense.id,
+                    cleared=False, cleared_at=None, reconciled=False,
+                ))
+                for k in range(n_splits):
+                    rows_s.append(dict(
+                        id=s_id + k, transaction_id=t_id, category_id=rnd.choice(cats),
+                        left_line_id=l_id, right_line_id=l_id + 1,
+                        left_account_id=acct.id, right_account_id=expense.id,
+                        transfer=False, type=TransactionType.Outflow,
+                    ))
+                    rows_e.append(dict(
+                        id=e_id + 2 * k, line_id=l_id, split_id=s_id + k,
+                        amount=-sign * amount, currency='USD',
+                    ))
+                    rows_e.append(dict(
+                        id=e_id + 2 * k + 1, line_id=l_id + 1, split_id=s_id + k,
+                        amount=sign * amount, currency='USD',
+                    ))
+
+            session.execute(transactions.insert(), rows_t)
+            session.execute(transaction_lines.insert(), rows_l)
+            session.execute(transaction_splits.insert(), rows_s)
+            session.execute(transaction_entries.insert(), rows_e)
+
+        # Core inserts bypass the ORM hook which maintains the search index
+        rebuild_search_index(session, u.id)
+        session.commit()
+        session.execute('ANALYZE')
+
+        return dict(
+            user_id=u.id,
+            budget_id=b.id,
+            account_ids=[a.id for a in accts],
+            expense_id=expense.id,
+            category_ids=cats,
+            payee_ids=payee_ids,
+        )
+
+
+def timed(fn, repeat=5, warmup=1):
+    '''Run a function several times and return (median, min) in milliseconds'''
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    return statistics.median(samples), min(samples)
+
+
+def report(title, rows):
+    '''Print a simple fixed-width table of (label, median, min) rows'''
+    print(f'\n{title}')
+    print('-' * len(title))
+    for label, med, best in rows:
+        print(f'{label:<48} {med:>10.2f} ms  (min {best:.2f} ms)')
@@ -0,0 +1,94 @@
+#
+# Benchmark the JSON data export: the streaming exporter, which reads each
+# table from a server-side cursor and writes the document incrementally,
+# against the previous export which builds the complete document from the
+# ORM relationships. Reports the latency and the peak Python memory allocated
+# during each export. Each seeded transaction has two entries, so the
+# default size exports 1M entries.
+#
+# The previous export is only run at the smaller comparison size, since its
+# memory use grows with the size of the ledger.
+#
+# Usage: python scripts/bench_export_json.py [num_transactions] [compare_transactions]
+#
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from bench_common import make_app, seed_ledger
+
+from jadetree.database import db
+from jadetree.domain.models import User
+from jadetree.service.export import export_data_json, write_data_json
+
+
+def measure(fn):
+    '''
+    Run a function twice and return (elapsed seconds, peak traced MiB). The
+    time is taken from a run without tracing, since tracemalloc slows down
+    allocation-heavy code.
+    '''
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return elapsed, peak / (1 << 20)
+
+
+def run(n, compare):
+    '''Seed a fresh database and measure the exporters'''
+    print(f'Seeding {n} transactions...')
+    db.clear_mappers()
+    app = make_app()
+    ids = seed_ledger(app, n)
+
+    results = []
+    with app.app_context():
+        s = db.session
+        user = s.query(User).get(ids['user_id'])
+
+        def streaming():
+            s.expire_all()
+            with open(os.devnull, 'w') as fp:
+                write_data_json(s, user, fp)
+
+        def previous():
+            s.expire_all()
+            with open(os.devnull, 'w') as fp:
+                json.dump(export_data_json(user), fp)
+
+        results.append(('streaming', n, *measure(streaming)))
+        if compare:
+            results.append(('previous', n, *measure(previous)))
+
+    return results
+
+
+def main(n, compare):
+    results = run(compare, True) + run(n, False)
+
+    title = 'JSON export'
+    print(f'\n{title}')
+    print('-' * len(title))
+    for label, size, elapsed, peak in results:
+        print(f'{label:<12} {size:>9} transactions {2 * size:>9} entries {elapsed:>9.1f} s {peak:>9.1f} MiB peak')
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000,
+    )
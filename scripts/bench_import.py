@@ -0,0 +1,109 @@
+#
+# Benchmark the streaming transaction importer against creating the same
+# transactions one at a time through the ledger service, and time the
+# re-import of an overlapping statement where every record is a duplicate.
+#
+# Usage: python scripts/bench_import.py [num_existing] [num_imported]
+#
+
+import os
+import sys
+import time
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from datetime import date, timedelta
+from decimal import Decimal
+import io
+import random
+
+from bench_common import make_app, seed_ledger
+
+from jadetree.database import db
+from jadetree.domain.models import Category, User
+from jadetree.service import ledger as ledger_service
+from jadetree.service.export import export_account_qif
+from jadetree.service.importer import import_file
+
+
+def make_qif(n, categories, seed=7):
+    '''Build a QIF file of new Checking account outflows'''
+    rnd = random.Random(seed)
+    lines = ['!Type:Bank']
+    for i in range(n):
+        d = date(2021, 1, 1) + timedelta(days=rnd.randrange(365))
+        lines.extend([
+            f'D{d.month}/{d.day}/{d.year}',
+            'T-{}'.format(Decimal(rnd.randrange(100, 50000)) / 100),
+            f'PImport Payee {rnd.randrange(200):03}',
+            f'L{rnd.choice(categories)}',
+            f'MImported {i}',
+            '^',
+        ])
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def main(n_existing, n_import):
+    print(f'Seeding {n_existing} transactions...')
+    app = make_app()
+    ids = seed_ledger(app, n_existing)
+    chk_id = ids['account_ids'][0]
+
+    with app.app_context():
+        s = db.session
+        user = s.query(User).get(ids['user_id'])
+        categories = {
+            c.id: c.path for c in s.query(Category).filter(Category.id.in_(ids['category_ids']))
+        }
+        qif = make_qif(n_import, list(categories.values()))
+
+        # Baseline: one service call (and commit) per transaction, on a
+        # sample of the records
+        n_base = min(n_import, 1000)
+        payee_id = ids['payee_ids'][0]
+        t0 = time.perf_counter()
+        for i in range(n_base):
+            ledger_service.create_transaction(
+                session=s,
+                user=user,
+                account_id=chk_id,
+                date=date(2022, 1, 1),
+                amount=Decimal(-1),
+                payee_id=payee_id,
+                splits=[dict(category_id=ids['category_ids'][0], amount=Decimal(-1))],
+            )
+        t_base = (time.perf_counter() - t0) / n_base
+
+        t0 = time.perf_counter()
+        result = import_file(s, user, chk_id, io.BytesIO(qif))
+        t_import = time.perf_counter() - t0
+        assert result.imported == n_import, result
+
+        t0 = time.perf_counter()
+        result = import_file(s, user, chk_id, io.BytesIO(qif))
+        t_dupes = time.perf_counter() - t0
+        assert result.duplicates == n_import, result
+
+        chk = [a for a in user.accounts if a.id == chk_id][0]
+        export = '\n'.join(export_account_qif(s, chk))
+        t0 = time.perf_counter()
+        result = import_file(s, user, chk_id, io.BytesIO(export.encode('utf-8')))
+        t_export = time.perf_counter() - t0
+        n_export = result.duplicates
+        assert result.imported == 0, result
+
+    title = f'Import ({n_existing} existing transactions)'
+    print(f'\n{title}')
+    print('-' * len(title))
+    print(f'{"service calls":<22} {n_base:>7} txns {1000 * t_base:>8.2f} ms/txn')
+    print(f'{"import (new)":<22} {n_import:>7} txns {1000 * t_import / n_import:>8.2f} ms/txn')
+    print(f'{"import (duplicates)":<22} {n_import:>7} txns {1000 * t_dupes / n_import:>8.2f} ms/txn')
+    print(f'{"import (own export)":<22} {n_export:>7} txns {1000 * t_export / n_export:>8.2f} ms/txn')
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10000,
+    )
@@ -0,0 +1,63 @@
+#
+# Benchmark loading a window of the ledger with the filters pushed into the
+# balance and split subqueries against loading the full ledger and filtering
+# the result in Python as the client previously did.
+#
+# Usage: python scripts/bench_ledger_filters.py [num_transactions]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from datetime import date
+
+from bench_common import make_app, report, seed_ledger, timed
+
+from jadetree.database import db
+from jadetree.domain.models import User
+from jadetree.service import ledger as ledger_service
+
+
+def main(n):
+    app = make_app()
+    print(f'Seeding {n} transactions...')
+    ids = seed_ledger(app, n)
+
+    with app.app_context():
+        s = db.session
+        u = s.query(User).get(ids['user_id'])
+        a = ids['account_ids'][0]
+        p = ids['payee_ids'][0]
+        start, end = date(2020, 6, 1), date(2020, 6, 30)
+
+        def client_window():
+            return [
+                ln for ln in ledger_service.load_account_lines(s, u, a, reverse=True)
+                if start <= ln['date'] <= end
+            ]
+
+        def client_payee():
+            return [
+                ln for ln in ledger_service.load_all_lines(s, u, reverse=True)
+                if ln['payee_id'] == p
+            ]
+
+        results = [
+            ('account, one month (client filter)', *timed(client_window, repeat=3)),
+            ('account, one month (pushed down)', *timed(lambda: ledger_service.load_account_lines(
+                s, u, a, reverse=True, start_date=start, end_date=end,
+            ))),
+            ('all accounts, one payee (client filter)', *timed(client_payee, repeat=3)),
+            ('all accounts, one payee (pushed down)', *timed(lambda: ledger_service.load_all_lines(
+                s, u, reverse=True, payee_id=p,
+            ))),
+        ]
+
+    report(f'Ledger filters, {n} transactions', results)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,126 @@
+#
+# Benchmark the Transaction relationship loading strategies: the previous
+# joined loading of lines and splits against SELECT ... IN loading, reporting
+# the statements, result rows and latency of common access patterns. Each
+# seeded transaction has several splits, so that a joined load multiplies
+# the line rows against the split and entry rows.
+#
+# Usage: python scripts/bench_loader_strategies.py [num_transactions] [num_splits]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from bench_common import make_app, report, seed_ledger, timed
+from sqlalchemy import event
+
+from jadetree.database import db
+from jadetree.database.loading import txn_graph_options, txn_header_options
+from jadetree.domain.models import Transaction, User
+from jadetree.service import ledger as ledger_service
+
+
+def count_rows(fn):
+    '''
+    Run a function and return the number of SQL statements it executed and
+    the total number of rows those statements returned. The statements are
+    re-executed after the run to count their rows, since the DBAPI does not
+    report a row count for SELECT statements.
+    '''
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    rows = 0
+    with db.engine.connect() as conn:
+        for statement, parameters in captured:
+            rows += len(conn.exec_driver_sql(statement, parameters).fetchall())
+
+    return len(captured), rows
+
+
+def access_patterns(s, ids):
+    '''Return the (label, function) access patterns for a seeded ledger'''
+    user_id = ids['user_id']
+    txn_id = s.query(Transaction.id).filter(Transaction.user_id == user_id) \
+        .order_by(Transaction.id.desc()).limit(1).scalar()
+
+    def single_detail():
+        s.expire_all()
+        u = s.query(User).get(user_id)
+        t = ledger_service._load_transaction(s, u, txn_id, txn_graph_options())
+        return t.amount, [ln.entries for ln in t.lines]
+
+    def single_default():
+        s.expire_all()
+        return s.query(Transaction).get(txn_id).date
+
+    def single_header():
+        s.expire_all()
+        return s.query(Transaction).options(*txn_header_options()).get(txn_id).date
+
+    def page_amounts():
+        s.expire_all()
+        txns = s.query(Transaction).filter(Transaction.user_id == user_id) \
+            .order_by(Transaction.date.desc(), Transaction.id.desc()) \
+            .limit(1000).all()
+        return [t.amount for t in txns]
+
+    def page_lines():
+        s.expire_all()
+        txns = s.query(Transaction).filter(Transaction.user_id == user_id) \
+            .order_by(Transaction.date.desc(), Transaction.id.desc()) \
+            .limit(1000).all()
+        return [e.amount for t in txns for ln in t.lines for e in ln.entries]
+
+    return [
+        ('single transaction, default options', single_default),
+        ('single transaction, header options', single_header),
+        ('single transaction detail, graph options', single_detail),
+        ('1000 transactions with amounts', page_amounts),
+        ('1000 transactions with line entries', page_lines),
+    ]
+
+
+def run(strategy, n, n_splits):
+    '''Seed a fresh database using a loading strategy and measure it'''
+    db.clear_mappers()
+    app = make_app(DB_TRANSACTION_LOADING=strategy)
+    ids = seed_ledger(app, n, n_splits=n_splits)
+
+    results = []
+    counts = []
+    with app.app_context():
+        for label, fn in access_patterns(db.session, ids):
+            results.append((label, *timed(fn)))
+            counts.append((label, *count_rows(fn)))
+
+    return results, counts
+
+
+def main(n, n_splits):
+    for strategy in ('joined', 'selectin'):
+        print(f'Seeding {n} transactions with {n_splits} splits ({strategy} loading)...')
+        results, counts = run(strategy, n, n_splits)
+
+        report(f'{strategy} loading, {n} transactions', results)
+        print()
+        for label, statements, rows in counts:
+            print(f'{label:<48} {statements:>4} statements {rows:>8} rows')
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+    )
@@ -0,0 +1,107 @@
+#
+# Benchmark month-grouped budget and report queries using the stored Month Key
+# against the previous EXTRACT(year)/EXTRACT(month) formulation.
+#
+# Usage: python scripts/bench_month_key.py [num_transactions]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from bench_common import make_app, report, seed_ledger, timed
+from sqlalchemy import func
+
+from jadetree.database import db
+from jadetree.database.queries import q_budget_summary, q_report_net_worth
+from jadetree.domain.models import (
+    Account,
+    Transaction,
+    TransactionEntry,
+    TransactionLine,
+    TransactionSplit,
+)
+from jadetree.domain.types import AccountRole
+
+
+def legacy_outflows(session):
+    '''Outflows grouped by EXTRACT(year), EXTRACT(month) as before Month Keys'''
+    return session.query(
+        TransactionSplit.category_id.label('category_id'),
+        func.extract('year', Transaction.date).label('year'),
+        func.extract('month', Transaction.date).label('month'),
+        func.sum(TransactionEntry.amount).label('outflow'),
+    ).join(
+        TransactionEntry, TransactionEntry.split_id == TransactionSplit.id,
+    ).join(
+        TransactionLine, TransactionLine.id == TransactionEntry.line_id,
+    ).join(
+        Account, Account.id == TransactionLine.account_id,
+    ).join(
+        Transaction, Transaction.id == TransactionSplit.transaction_id,
+    ).filter(
+        Account.role == AccountRole.Budget,
+    ).group_by('category_id', 'year', 'month')
+
+
+def keyed_outflows(session):
+    '''Outflows grouped by the stored Month Key'''
+    return session.query(
+        TransactionSplit.category_id.label('category_id'),
+        Transaction.month_key.label('month_key'),
+        func.sum(TransactionEntry.amount).label('outflow'),
+    ).join(
+        TransactionEntry, TransactionEntry.split_id == TransactionSplit.id,
+    ).join(
+        TransactionLine, TransactionLine.id == TransactionEntry.line_id,
+    ).join(
+        Account, Account.id == TransactionLine.account_id,
+    ).join(
+        Transaction, Transaction.id == TransactionSplit.transaction_id,
+    ).filter(
+        Account.role == AccountRole.Budget,
+    ).group_by(TransactionSplit.category_id, Transaction.month_key)
+
+
+def legacy_net_worth(session, user_id):
+    '''Net worth summary grouped by EXTRACT(year), EXTRACT(month)'''
+    return session.query(
+        func.extract('year', Transaction.date).label('year'),
+        func.extract('month', Transaction.date).label('month'),
+        func.sum(TransactionEntry.amount),
+    ).join(
+        TransactionLine, TransactionLine.transaction_id == Transaction.id,
+    ).join(
+        TransactionEntry, TransactionEntry.line_id == TransactionLine.id,
+    ).join(
+        Account, Account.id == TransactionLine.account_id,
+    ).filter(
+        Account.user_id == user_id,
+    ).group_by('year', 'month').order_by('year', 'month')
+
+
+def main(n):
+    app = make_app()
+    print(f'Seeding {n} transactions...')
+    ids = seed_ledger(app, n)
+
+    with app.app_context():
+        s = db.session
+        b = ids['budget_id']
+        u = ids['user_id']
+        results = [
+            ('outflows by month (extract)', *timed(lambda: legacy_outflows(s).all())),
+            ('outflows by month (month_key)', *timed(lambda: keyed_outflows(s).all())),
+            ('budget summary, all months (month_key)', *timed(lambda: q_budget_summary(s, b).all())),
+            ('budget summary, single month (month_key)', *timed(lambda: q_budget_summary(s, b, (2018, 6)).all())),
+            ('net worth by month (extract)', *timed(lambda: legacy_net_worth(s, u).all())),
+            ('net worth by month (month_key)', *timed(lambda: q_report_net_worth(s, u).all())),
+        ]
+
+    report(f'Month grouping, {n} transactions', results)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
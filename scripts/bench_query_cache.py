@@ -0,0 +1,109 @@
+#
+# Benchmark the ledger, budget and report query builders with the query
+# cache, separating the time spent building the ORM query, compiling it to
+# SQL and executing it.
+#
+# Each query is timed as:
+#   build          - building the ORM query from scratch (no query cache)
+#   cached build   - fetching the cached query and binding its parameters
+#   compile        - compiling the statement to SQL for the dialect
+#   run, uncached  - build + compile + execute (no query or compiled cache)
+#   run, no query cache - build + execute (compiled form from the engine cache)
+#   run            - cached build + execute (compiled form from the engine cache)
+#
+# Usage: python scripts/bench_query_cache.py [num_transactions]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from datetime import date
+
+from bench_common import make_app, report, seed_ledger, timed
+
+from jadetree.database import db
+from jadetree.database.queries import (
+    q_budget_summary,
+    q_report_net_worth,
+    q_txn_account_lines,
+)
+from jadetree.database.queries.budget import _q_budget_summary
+from jadetree.database.queries.cache import clear_query_cache
+from jadetree.database.queries.reports import (
+    _q_report_by_category,
+    _q_report_net_worth,
+    _spending_report_params,
+    q_report_by_category,
+)
+from jadetree.database.queries.transaction import _q_txn_schema_fields
+from jadetree.domain.models import Account
+from jadetree.domain.types import AccountRole
+
+
+def main(n):
+    app = make_app()
+    print(f'Seeding {n} transactions...')
+    ids = seed_ledger(app, n)
+
+    with app.app_context():
+        s = db.session
+        dialect = s.get_bind().dialect
+        a = ids['account_ids'][0]
+        b = ids['budget_id']
+        window = dict(start_date=date(2020, 6, 1), end_date=date(2020, 6, 30))
+        spending = dict(start_date=date(2020, 1, 1), end_date=date(2020, 6, 30))
+
+        queries = [
+            (
+                'account lines, one month',
+                lambda: q_txn_account_lines(s, a, reverse=True, **window),
+                lambda: _q_txn_schema_fields(s, True, dict(account_id=a, **window))
+                .filter(Account.role == AccountRole.Personal)
+                .params(account_id=a, **window),
+            ),
+            (
+                'budget summary',
+                lambda: q_budget_summary(s, b),
+                lambda: _q_budget_summary(s, False).params(budget_id=b),
+            ),
+            (
+                'net worth report',
+                lambda: q_report_net_worth(s, ids['user_id']),
+                lambda: _q_report_net_worth(s, False).params(user_id=ids['user_id']),
+            ),
+            (
+                'spending by category',
+                lambda: q_report_by_category(s, b, filter=spending),
+                lambda: _q_report_by_category(s, _spending_report_params(b, spending))
+                .params(**_spending_report_params(b, spending)),
+            ),
+        ]
+
+        no_cache = db.engine.connect().execution_options(compiled_cache=None)
+
+        results = []
+        for name, cached, build in queries:
+            clear_query_cache()
+            stmt = cached().statement
+
+            results.append((f'{name}: build', *timed(build, repeat=20)))
+            results.append((f'{name}: cached build', *timed(cached, repeat=20)))
+            results.append((f'{name}: compile', *timed(lambda: stmt.compile(dialect=dialect), repeat=20)))
+            results.append((f'{name}: run, uncached', *timed(
+                lambda: no_cache.execute(build().statement).fetchall(), repeat=10
+            )))
+            results.append((f'{name}: run, no query cache', *timed(
+                lambda: build().with_session(s).all(), repeat=10
+            )))
+            results.append((f'{name}: run', *timed(lambda: cached().all(), repeat=10)))
+
+        no_cache.close()
+
+    report(f'Query cache, {n} transactions', results)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
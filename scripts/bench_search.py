@@ -0,0 +1,64 @@
+#
+# Benchmark Transaction search using the full-text index against a LIKE scan
+# over the transaction memo, check number, split memos and payee names.
+#
+# Usage: python scripts/bench_search.py [num_transactions]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from bench_common import make_app, report, seed_ledger, timed
+from sqlalchemy import or_
+
+from jadetree.database import db
+from jadetree.database.queries import q_txn_search
+from jadetree.domain.models import Payee, Transaction, TransactionSplit
+
+
+def like_search(session, user_id, term):
+    '''Substring search as a client-side filter would perform it'''
+    pattern = f'%{term}%'
+    return session.query(Transaction.id).outerjoin(
+        Payee, Payee.id == Transaction.payee_id,
+    ).outerjoin(
+        TransactionSplit, TransactionSplit.transaction_id == Transaction.id,
+    ).filter(
+        Transaction.user_id == user_id,
+        or_(
+            Transaction.memo.ilike(pattern),
+            Transaction.check.ilike(pattern),
+            TransactionSplit.memo.ilike(pattern),
+            Payee.name.ilike(pattern),
+        )
+    ).distinct()
+
+
+def main(n):
+    app = make_app()
+    print(f'Seeding {n} transactions...')
+    ids = seed_ledger(app, n)
+
+    with app.app_context():
+        s = db.session
+        u = ids['user_id']
+        page = (
+            lambda q: q.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(50).all()
+        )
+        results = [
+            ('memo term (LIKE)', *timed(lambda: like_search(s, u, 'Memo 4242').all())),
+            ('memo term (FTS)', *timed(lambda: q_txn_search(s, u, ['memo', '4242']).all())),
+            ('payee term (LIKE)', *timed(lambda: like_search(s, u, 'Payee 0007').all())),
+            ('payee term (FTS)', *timed(lambda: q_txn_search(s, u, ['payee', '0007']).all())),
+            ('payee term, first page (FTS)', *timed(lambda: page(q_txn_search(s, u, ['payee', '0007'])))),
+            ('prefix term, first page (FTS)', *timed(lambda: page(q_txn_search(s, u, ['424'])))),
+        ]
+
+    report(f'Transaction search, {n} transactions', results)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
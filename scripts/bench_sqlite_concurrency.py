@@ -0,0 +1,121 @@
+#
+# Benchmark mixed read/write throughput on an SQLite database from several
+# threads, as concurrent API requests and Socket.IO handlers would run it,
+# with and without the SQLite connection profile (WAL journal, busy timeout
+# and larger page cache).
+#
+# Usage: python scripts/bench_sqlite_concurrency.py [num_transactions] [threads] [seconds] [write_pct]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from datetime import date
+from decimal import Decimal
+import random
+import statistics
+import threading
+import time
+
+from bench_common import make_app, seed_ledger
+from sqlalchemy.exc import OperationalError
+
+from jadetree.database import db
+from jadetree.domain.models import User
+from jadetree.service import account as account_service, ledger as ledger_service
+
+
+def worker(app, ids, seed, deadline, write_pct, stats):
+    '''Run random reads and writes until the deadline'''
+    rnd = random.Random(seed)
+    with app.app_context():
+        s = db.session
+        user = s.query(User).get(ids['user_id'])
+        while time.perf_counter() < deadline:
+            is_write = rnd.randrange(100) < write_pct
+            t0 = time.perf_counter()
+            try:
+                if is_write:
+                    amount = Decimal(-rnd.randrange(100, 10000)) / 100
+                    ledger_service.create_transaction(
+                        session=s,
+                        user=user,
+                        account_id=rnd.choice(ids['account_ids']),
+                        date=date(2022, 1, 1 + rnd.randrange(28)),
+                        amount=amount,
+                        payee_id=rnd.choice(ids['payee_ids']),
+                        splits=[dict(category_id=rnd.choice(ids['category_ids']), amount=amount)],
+                    )
+                elif rnd.randrange(2):
+                    ledger_service.load_transactions(s, user, page=1 + rnd.randrange(10), per_page=50)
+                else:
+                    account_service.get_user_account_list(s, user)
+                s.rollback()
+
+            except OperationalError as e:
+                s.rollback()
+                if 'locked' not in str(e):
+                    raise
+                stats['locked'] += 1
+                continue
+
+            elapsed = time.perf_counter() - t0
+            stats['writes' if is_write else 'reads'].append(elapsed)
+
+        db.session.remove()
+
+
+def run(label, n, n_threads, seconds, write_pct, **config):
+    db.clear_mappers()
+    app = make_app(**config)
+    ids = seed_ledger(app, n)
+
+    with app.app_context():
+        mode = db.session.execute('PRAGMA journal_mode').scalar()
+        db.session.remove()
+
+    stats = [dict(reads=[], writes=[], locked=0) for _ in range(n_threads)]
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=worker, args=(app, ids, i, deadline, write_pct, stats[i]))
+        for i in range(n_threads)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    reads = [x for st in stats for x in st['reads']]
+    writes = [x for st in stats for x in st['writes']]
+    locked = sum(st['locked'] for st in stats)
+
+    def p95(xs):
+        return 1000 * statistics.quantiles(xs, n=20)[-1] if len(xs) > 1 else 0
+
+    print(
+        f'{label:<20} {mode:<8} {len(reads) / seconds:>9.1f} {len(writes) / seconds:>9.1f} '
+        f'{p95(reads):>9.1f} {p95(writes):>9.1f} {locked:>7}'
+    )
+
+
+def main(n, n_threads, seconds, write_pct):
+    title = f'SQLite mixed load ({n} transactions, {n_threads} threads, {write_pct}% writes, {seconds}s)'
+    print(f'\n{title}')
+    print('-' * len(title))
+    print(f'{"profile":<20} {"journal":<8} {"reads/s":>9} {"writes/s":>9} {"rd p95":>9} {"wr p95":>9} {"locked":>7}')
+
+    # The pysqlite default timeout is kept as the baseline busy handling
+    run('none (defaults)', n, n_threads, seconds, write_pct, DB_SQLITE_PROFILE=False)
+    run('jadetree profile', n, n_threads, seconds, write_pct)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 20,
+        int(sys.argv[4]) if len(sys.argv) > 4 else 20,
+    )
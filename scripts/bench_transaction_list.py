@@ -0,0 +1,74 @@
+#
+# Benchmark the Transaction summary list: the previous User.transactions
+# relationship load (joined lines and splits, lazy entries) against the
+# paginated load_transactions query with SELECT ... IN child loading.
+#
+# Usage: python scripts/bench_transaction_list.py [num_transactions]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from bench_common import make_app, report, seed_ledger, timed
+from sqlalchemy import event
+
+from jadetree.database import db
+from jadetree.domain.models import User
+from jadetree.service import ledger as ledger_service
+
+
+def count_statements(fn):
+    '''Run a function and return the number of SQL statements it executed'''
+    count = [0]
+
+    def before_cursor_execute(*args):
+        count[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return count[0]
+
+
+def main(n):
+    app = make_app()
+    print(f'Seeding {n} transactions...')
+    ids = seed_ledger(app, n)
+
+    with app.app_context():
+        s = db.session
+
+        def relationship_list():
+            s.expire_all()
+            u = s.query(User).get(ids['user_id'])
+            return [t.amount for t in u.transactions]
+
+        def paginated_list():
+            s.expire_all()
+            u = s.query(User).get(ids['user_id'])
+            txns, _ = ledger_service.load_transactions(s, u, page=1, per_page=100)
+            return [t.amount for t in txns]
+
+        results = [
+            ('all transactions (User.transactions)', *timed(relationship_list, repeat=3)),
+            ('first page of 100 (load_transactions)', *timed(paginated_list)),
+        ]
+        queries = [
+            ('User.transactions', count_statements(relationship_list)),
+            ('load_transactions', count_statements(paginated_list)),
+        ]
+
+    report(f'Transaction list, {n} transactions', results)
+    print()
+    for label, count in queries:
+        print(f'{label:<48} {count:>10} statements')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
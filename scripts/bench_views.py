@@ -0,0 +1,92 @@
+#
+# Benchmark the latency of single-transaction writes with the materialized
+# budget outflow and net worth views, which are refreshed incrementally on
+# each commit, against the same writes without the views and against a full
+# refresh of the views.
+#
+# Usage: python scripts/bench_views.py [num_transactions]
+#
+
+import os
+import sys
+
+root_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(root_path)
+
+from datetime import date
+from decimal import Decimal
+
+from bench_common import make_app, report, seed_ledger, timed
+
+from jadetree.database import db, materialized_views
+from jadetree.domain.models import User
+from jadetree.service import ledger as ledger_service
+
+
+def main(n):
+    app = make_app()
+    print(f'Seeding {n} transactions...')
+    ids = seed_ledger(app, n)
+
+    with app.app_context():
+        s = db.session
+        u = s.query(User).get(ids['user_id'])
+        a = ids['account_ids'][0]
+        c = ids['category_ids'][0]
+        p = ids['payee_ids'][0]
+        state = dict(cleared=False)
+
+        txn = ledger_service.create_transaction(
+            session=s, user=u, account_id=a, date=date(2020, 6, 1),
+            amount=Decimal(-10), payee_id=p,
+            splits=[dict(category_id=c, amount=Decimal(-10))],
+        )
+        txn_id = txn.id
+
+        def clear_line():
+            state['cleared'] = not state['cleared']
+            ledger_service.clear_transaction(s, u, txn_id, account_id=a, cleared=state['cleared'])
+
+        def update_amount():
+            state['amount'] = Decimal(-11) if state.get('amount') == Decimal(-10) else Decimal(-10)
+            ledger_service.update_transaction(
+                s, u, txn_id, amount=state['amount'],
+                splits=[dict(category_id=c, amount=state['amount'])],
+            )
+
+        def create_delete():
+            t = ledger_service.create_transaction(
+                session=s, user=u, account_id=a, date=date(2020, 7, 1),
+                amount=Decimal(-5), payee_id=p,
+                splits=[dict(category_id=c, amount=Decimal(-5))],
+            )
+            ledger_service.delete_transaction(s, u, t.id)
+
+        def full_refresh():
+            materialized_views.refresh(s)
+            s.commit()
+
+        writes = (
+            ('clear one line', clear_line),
+            ('update one transaction', update_amount),
+            ('create and delete one transaction', create_delete),
+        )
+
+        results = []
+        for name, fn in writes:
+            results.append((f'{name}: with views', *timed(fn, repeat=10)))
+
+        views, materialized_views._views = materialized_views._views, {}
+        try:
+            for name, fn in writes:
+                results.append((f'{name}: without views', *timed(fn, repeat=10)))
+        finally:
+            materialized_views._views = views
+
+        results.append(('full refresh of the views', *timed(full_refresh, repeat=3)))
+
+    report(f'Materialized view write latency, {n} transactions', results)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
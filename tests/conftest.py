@@ -4,6 +4,8 @@ Jade Tree Personal Budgeting Application | jadetree.io
 Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
 """
 
+from datetime import date
+from decimal import Decimal
 import os
 
 from alembic.command import upgrade
@@ -14,7 +16,15 @@ import pytest
 import jadetree
 from jadetree.database import db as _db
 from jadetree.factory import create_app
-from jadetree.service import auth as auth_service, user as user_service
+from jadetree.domain.types import AccountSubtype, AccountType
+from jadetree.service import (
+    account as account_service,
+    auth as auth_service,
+    budget as budget_service,
+    ledger as ledger_service,
+    payee as payee_service,
+    user as user_service,
+)
 
 DATA_DIR = '.pytest-data'
 
@@ -50,8 +60,10 @@ def app_config(request):
         os.unlink(db_file)
 
     def teardown():
-        if os.path.exists(db_file):
-            os.unlink(db_file)
+        # Remove the database and any SQLite write-ahead log files
+        for fn in (db_file, db_file + '-wal', db_file + '-shm'):
+            if os.path.exists(fn):
+                os.unlink(fn)
         if os.path.exists(db_dir) and len(os.listdir(db_dir)) == 0:
             os.rmdir(db_dir)
 
@@ -170,3 +182,57 @@ def user_with_profile(session, user_without_profile):
     """Create a user with a profile."""
     u = user_service.setup_user(session, user_without_profile, 'en', 'en_US', 'USD')
     return u
+
+
+@pytest.fixture(scope='function')
+def sample_ledger(session, user_with_profile):
+    """Create a user with a budget, Checking and Savings accounts, five split
+    transactions, a foreign currency transaction and a transfer."""
+    u = user_with_profile
+    b = budget_service.create_budget(session, u, 'Test Budget', 'USD')
+    g = budget_service.create_budget_category_group(session, u, b.id, 'Monthly Expenses')
+    c_rent = budget_service.create_budget_category(session, u, b.id, g.id, 'Rent')
+    c_groc = budget_service.create_budget_category(session, u, b.id, g.id, 'Groceries')
+
+    a_chk = account_service.create_user_account(session, u, 'Checking', AccountType.Asset, 'USD', Decimal(10000), date(2020, 1, 1), AccountSubtype.Checking, budget_id=b.id)[0]
+    a_svg = account_service.create_user_account(session, u, 'Savings', AccountType.Asset, 'USD', Decimal(5000), date(2020, 1, 1), AccountSubtype.Savings, budget_id=b.id)[0]
+    p_vons = payee_service.create_payee(session, u, 'Vons')
+
+    for i in range(5):
+        ledger_service.create_transaction(
+            session=session,
+            user=u,
+            account_id=a_chk.id,
+            date=date(2020, 2, i + 1),
+            amount=Decimal(-60),
+            payee_id=p_vons.id,
+            splits=[
+                dict(category_id=c_rent.id, amount=Decimal(-40), memo='Rent'),
+                dict(category_id=c_groc.id, amount=Decimal(-20), memo='Food'),
+            ],
+        )
+
+    ledger_service.create_transaction(
+        session=session,
+        user=u,
+        account_id=a_chk.id,
+        date=date(2020, 3, 1),
+        amount=Decimal(-10),
+        payee_id=p_vons.id,
+        currency='EUR',
+        exchange_rate=Decimal('1.2'),
+        splits=[dict(category_id=c_groc.id, amount=Decimal(-10))],
+    )
+
+    transfer = [p for p in u.payees if p.account_id == a_svg.id][0]
+    ledger_service.create_transaction(
+        session=session,
+        user=u,
+        account_id=a_chk.id,
+        date=date(2020, 3, 2),
+        amount=Decimal(-250),
+        payee_id=transfer.id,
+        splits=[dict(transfer_id=a_svg.id, amount=Decimal(-250))],
+    )
+
+    return u
@@ -5,8 +5,16 @@
 #
 # =============================================================================
 
+import sqlite3
+
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
 
+from jadetree.database.orm import init_orm
+from jadetree.database.pool import SQLITE_POOL_SIZE, PoolMonitor, pool_options
+from jadetree.database.sqlite import SQLiteProfile
 from jadetree.database.util import make_uri
 from jadetree.exc import ConfigError
 
@@ -178,3 +186,167 @@ def test_dbconfig_mysql_with_username():
 
     # Ensure that the application startup succeeded
     assert uri == 'mysql://root@localhost:1234/test'
+
+
+def test_dbconfig_invalid_transaction_loading():
+    '''
+    Application startup should fail if DB_TRANSACTION_LOADING is not a valid
+    relationship loading strategy
+    '''
+    with pytest.raises(ConfigError, match='loading strategy') as excinfo:
+        init_orm('eager')
+
+    assert excinfo.value.config_key == 'DB_TRANSACTION_LOADING'
+
+
+def test_dbconfig_sqlite_profile():
+    '''
+    The SQLite profile should be enabled by default and loaded from the
+    DB_SQLITE_* keys, which may be given as strings from the environment
+    '''
+    profile = SQLiteProfile.from_config(dict(BASE_TEST_CONFIG))
+    assert profile.journal_mode == 'wal'
+    assert profile.synchronous == 'normal'
+
+    test_cfg = dict(BASE_TEST_CONFIG)
+    test_cfg['DB_SQLITE_JOURNAL_MODE'] = 'DELETE'
+    test_cfg['DB_SQLITE_BUSY_TIMEOUT'] = '250'
+    profile = SQLiteProfile.from_config(test_cfg)
+    assert profile.journal_mode == 'delete'
+    assert profile.busy_timeout == 250
+
+    for value in (False, 'false', '0'):
+        test_cfg['DB_SQLITE_PROFILE'] = value
+        assert SQLiteProfile.from_config(test_cfg) is None
+
+
+def test_dbconfig_sqlite_profile_invalid():
+    '''
+    Application startup should fail if a DB_SQLITE_* key is invalid
+    '''
+    for key, value in (
+        ('DB_SQLITE_JOURNAL_MODE', 'fast'),
+        ('DB_SQLITE_SYNCHRONOUS', 'sometimes'),
+        ('DB_SQLITE_CACHE_SIZE', 'big'),
+        ('DB_SQLITE_BUSY_TIMEOUT', -1),
+    ):
+        test_cfg = dict(BASE_TEST_CONFIG)
+        test_cfg[key] = value
+        with pytest.raises(ConfigError) as excinfo:
+            SQLiteProfile.from_config(test_cfg)
+
+        assert excinfo.value.config_key == key
+
+
+def test_sqlite_profile_pragmas(tmp_path):
+    '''
+    The SQLite profile should be applied to new connections and run PRAGMA
+    optimize once the optimize interval has passed
+    '''
+    profile = SQLiteProfile(cache_size=8192, busy_timeout=1500, optimize_interval=1)
+    conn = sqlite3.connect(str(tmp_path / 'test.db'))
+    profile.on_connect(conn, None)
+
+    def pragma(name):
+        return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+    assert pragma('journal_mode') == 'wal'
+    assert pragma('synchronous') == 1
+    assert pragma('cache_size') == -8192
+    assert pragma('busy_timeout') == 1500
+    assert pragma('temp_store') == 2
+
+    # PRAGMA optimize is skipped within the interval
+    statements = []
+    conn.set_trace_callback(statements.append)
+    profile.on_checkin(conn, None)
+    assert statements == []
+
+    profile._last_optimize -= 1
+    profile.on_checkin(conn, None)
+    assert statements == ['PRAGMA optimize']
+    conn.close()
+
+
+def test_dbconfig_pool_options():
+    '''
+    The DB_POOL_* keys should be passed to a QueuePool for database servers,
+    and pool SQLite connections if DB_POOL_SIZE is set or the SQLite
+    profile is enabled
+    '''
+    test_cfg = dict(BASE_TEST_CONFIG)
+    test_cfg['DB_POOL_SIZE'] = '10'
+    test_cfg['DB_MAX_OVERFLOW'] = 5
+    test_cfg['DB_POOL_TIMEOUT'] = '2.5'
+    test_cfg['DB_POOL_PRE_PING'] = 'true'
+
+    poolclass, options = pool_options(test_cfg, 'postgresql://localhost/test')
+    assert poolclass is QueuePool
+    assert options == dict(pool_size=10, max_overflow=5, pool_timeout=2.5, pool_pre_ping=True)
+
+    poolclass, options = pool_options(test_cfg, 'sqlite:////tmp/test.db')
+    assert poolclass is QueuePool
+    assert options['connect_args'] == dict(check_same_thread=False)
+
+    del test_cfg['DB_POOL_SIZE']
+    poolclass, options = pool_options(test_cfg, 'sqlite:////tmp/test.db')
+    assert poolclass is QueuePool
+    assert options['pool_size'] == SQLITE_POOL_SIZE
+
+    test_cfg['DB_SQLITE_PROFILE'] = 'false'
+    poolclass, options = pool_options(test_cfg, 'sqlite:////tmp/test.db')
+    assert poolclass is NullPool
+    assert options == dict(pool_pre_ping=True)
+
+
+def test_dbconfig_pool_options_invalid():
+    '''
+    Application startup should fail if a pool size or timeout is invalid
+    '''
+    for key, value in (('DB_POOL_SIZE', -1), ('DB_MAX_OVERFLOW', 'many'), ('DB_POOL_TIMEOUT', -5)):
+        test_cfg = dict(BASE_TEST_CONFIG)
+        test_cfg[key] = value
+        with pytest.raises(ConfigError) as excinfo:
+            pool_options(test_cfg, 'postgresql://localhost/test')
+
+        assert excinfo.value.config_key == key
+
+
+def test_pool_monitor(tmp_path):
+    '''
+    The pool monitor should count checkouts, connections in use, overflow
+    connections and checkout timeouts
+    '''
+    monitor = PoolMonitor()
+    engine = create_engine(
+        'sqlite:///{}'.format(tmp_path / 'test.db'),
+        poolclass=monitor.pool_class(QueuePool),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+        connect_args=dict(check_same_thread=False),
+    )
+    monitor.install(engine)
+
+    c1 = engine.connect()
+    c2 = engine.connect()
+    stats = monitor.stats()
+    assert stats['pool_class'] == 'MonitoredQueuePool'
+    assert stats['checkouts'] == 2
+    assert stats['connects'] == 2
+    assert stats['overflows'] == 1
+    assert stats['in_use'] == 2
+    assert stats['overflow'] == 1
+
+    with pytest.raises(TimeoutError):
+        engine.connect()
+    assert monitor.stats()['checkout_timeouts'] == 1
+    assert monitor.stats()['checkout_wait_max'] >= 50
+
+    c1.close()
+    c2.close()
+    stats = monitor.stats()
+    assert stats['in_use'] == 0
+    assert stats['in_use_max'] == 2
+    assert stats['checked_in'] == 1
+    engine.dispose()
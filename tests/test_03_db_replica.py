@@ -0,0 +1,143 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from datetime import date
+from decimal import Decimal
+import sqlite3
+
+import pytest  # noqa: F401
+
+from jadetree.database import db
+from jadetree.database.routing import init_replicas, replica_reads
+from jadetree.domain.models import Transaction, User
+from jadetree.domain.types import AccountSubtype, AccountType
+from jadetree.factory import create_app
+from jadetree.service import (
+    account as account_service,
+    auth as auth_service,
+    budget as budget_service,
+    ledger as ledger_service,
+    user as user_service,
+)
+
+
+class MockApp(object):
+    def __init__(self, config):
+        self.config = config
+
+
+def _add_transaction(session, user, account_id, category_id, amount):
+    return ledger_service.create_transaction(
+        session=session,
+        user=user,
+        account_id=account_id,
+        date=date(2020, 2, 1),
+        amount=Decimal(amount),
+        payee_id=user.payees[0].id,
+        splits=[dict(category_id=category_id, amount=Decimal(amount))],
+    )
+
+
+@pytest.fixture(scope='module')
+def replica_app(request, app_config, tmp_path_factory):
+    """Application with a primary SQLite database and a replica copy.
+
+    The replica is a snapshot of the primary taken after the first
+    Transaction, and the primary then gets a second Transaction.
+    """
+    data_dir = tmp_path_factory.mktemp('replica')
+    cfg = dict(app_config)
+    cfg['DB_FILE'] = str(data_dir / 'primary.db')
+    cfg['DB_REPLICA_URI'] = 'sqlite:///{}'.format(data_dir / 'replica.db')
+
+    db.clear_mappers()
+    app = create_app(cfg, __name__)
+    ctx = app.app_context()
+    ctx.push()
+
+    db.create_all()
+    s = db.session
+    u = auth_service.register_user(s, 'test@jadetree.io', 'hunter2JT', 'Test User')
+    u = auth_service.confirm_user(s, u.uid_hash, 'test@jadetree.io')
+    u = user_service.setup_user(s, u, 'en', 'en_US', 'USD')
+    b = budget_service.create_budget(s, u, 'Test Budget', 'USD')
+    g = budget_service.create_budget_category_group(s, u, b.id, 'Monthly Expenses')
+    c = budget_service.create_budget_category(s, u, b.id, g.id, 'Groceries')
+    a, _, _ = account_service.create_user_account(
+        s, u, 'Checking', AccountType.Asset, 'USD', Decimal(1000), date(2020, 1, 1),
+        AccountSubtype.Checking, budget_id=b.id,
+    )
+    _add_transaction(s, u, a.id, c.id, -10)
+
+    src = sqlite3.connect(cfg['DB_FILE'])
+    dst = sqlite3.connect(str(data_dir / 'replica.db'))
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+    _add_transaction(s, u, a.id, c.id, -20)
+    app.config['_TEST_IDS'] = dict(user_id=u.id, account_id=a.id, category_id=c.id)
+    db.session.remove()
+
+    def teardown():
+        db.session.remove()
+        db.clear_mappers()
+        ctx.pop()
+
+    request.addfinalizer(teardown)
+    return app
+
+
+def test_init_replicas():
+    '''Replica URIs may be given as a list or a separated string'''
+    app = MockApp({'DB_REPLICA_URI': 'sqlite:///a.db, sqlite:///b.db'})
+    keys = init_replicas(app)
+    assert len(keys) == 2
+    assert app.config['SQLALCHEMY_BINDS'][keys[1]] == 'sqlite:///b.db'
+
+    app = MockApp({})
+    assert init_replicas(app) == []
+    assert 'SQLALCHEMY_BINDS' not in app.config
+
+
+def test_replica_reads(replica_app):
+    '''Read-only service calls are served by the replica'''
+    ids = replica_app.config['_TEST_IDS']
+    with replica_app.app_context():
+        s = db.session
+        u = s.query(User).get(ids['user_id'])
+
+        # Queries outside read-only service calls use the primary
+        assert s.query(Transaction).count() == 3
+        with replica_reads(s):
+            assert s.connection().engine.url.database.endswith('replica.db')
+            assert s.query(Transaction).count() == 2
+
+        # The replica has the first Transaction only
+        lines = ledger_service.load_account_lines(s, u, ids['account_id'])
+        assert [ln['amount'] for ln in lines if ln['amount'] < 0] == [Decimal(-10)]
+        assert 'jt_primary' not in s.info
+
+
+def test_replica_stick_to_primary(replica_app):
+    '''A session reads from the primary once it has written'''
+    ids = replica_app.config['_TEST_IDS']
+    with replica_app.app_context():
+        s = db.session
+        u = s.query(User).get(ids['user_id'])
+        _add_transaction(s, u, ids['account_id'], ids['category_id'], -30)
+        assert s.info['jt_primary'] is True
+
+        lines = ledger_service.load_account_lines(s, u, ids['account_id'])
+        assert sorted(ln['amount'] for ln in lines if ln['amount'] < 0) == [Decimal(-30), Decimal(-20), Decimal(-10)]
+
+    # The next request starts on the replica again
+    with replica_app.app_context():
+        s = db.session
+        u = s.query(User).get(ids['user_id'])
+        lines = ledger_service.load_account_lines(s, u, ids['account_id'])
+        assert len([ln for ln in lines if ln['amount'] < 0]) == 1
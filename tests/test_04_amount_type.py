@@ -0,0 +1,154 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from decimal import Decimal, InvalidOperation, getcontext, localcontext
+import random
+import threading
+
+import pytest
+import sqlalchemy as sa
+
+from jadetree.database.types import AmountType
+
+
+def legacy_to_integer(value, precision=13, scale=4):
+    '''Reference conversion of the original AmountType implementation'''
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return int(Decimal(str(value)) * 10**scale)
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return sa.create_engine('sqlite://')
+
+
+@pytest.fixture(scope='module')
+def amount_table(engine):
+    md = sa.MetaData()
+    table = sa.Table(
+        'amounts',
+        md,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('amount', AmountType()),
+    )
+    md.create_all(engine)
+    return table
+
+
+@pytest.mark.parametrize('value,expected', [
+    (Decimal('17.99'), 179900),
+    (17.99, 179900),
+    ('17.99', 179900),
+    (0.1 + 0.2, 3000),
+    (-45.1, -451000),
+    (1e-5, 0),
+    ('-0.00005', 0),
+    ('1.23456', 12345),
+    ('-1.23456', -12345),
+    (1000, 10000000),
+    ('999999999.9999', 9999999999999),
+    (Decimal('123456789.12345'), 1234567891234),
+    (None, None),
+])
+def test_amount_to_integer(value, expected):
+    '''Amounts are scaled, rounded to the precision and truncated'''
+    t = AmountType()
+    assert t.to_integer(value) == expected
+    if value is not None:
+        assert t.to_integer(value) == legacy_to_integer(value)
+
+
+def test_amount_to_integer_invalid():
+    t = AmountType()
+    with pytest.raises(InvalidOperation):
+        t.to_integer('1,000.00')
+
+
+def test_amount_matches_legacy():
+    '''Random float, string and Decimal inputs match the original conversion'''
+    rnd = random.Random(47)
+    t = AmountType()
+    for _ in range(2000):
+        f = rnd.uniform(-1e9, 1e9)
+        d = Decimal(rnd.randrange(-10**13, 10**13)).scaleb(-rnd.randrange(7))
+        for value in (f, round(f, 2), str(d), d):
+            assert t.to_integer(value) == legacy_to_integer(value)
+
+
+def test_amount_from_integer():
+    '''Loaded amounts equal (and print as) the original division result'''
+    t = AmountType()
+    for value in (0, 1, -1, 179900, 12345, -451000, 10**17, -(10**18) + 1):
+        result = t.from_integer(value)
+        assert result == Decimal(value) / 10000
+        assert str(result) == str(Decimal(value) / 10000)
+
+    assert t.from_integer(None) is None
+    assert t.process_result_values([179900, None, 0], sa.create_engine('sqlite://').dialect) == [
+        Decimal('17.99'), None, Decimal(0),
+    ]
+
+
+def test_amount_context_unchanged():
+    '''Conversions do not change the thread decimal context'''
+    t = AmountType()
+    with localcontext() as ctx:
+        ctx.prec = 3
+        assert t.to_integer('123456.7891') == 1234567891
+        assert getcontext().prec == 3
+
+        ctx.prec = 19
+        assert t.from_integer(-(10**18) + 1) == Decimal('-99999999999999.9999')
+        assert getcontext().prec == 19
+
+
+def test_amount_round_trip(engine, amount_table):
+    '''Amounts are stored as integers in SQLite and loaded as Decimals'''
+    values = [Decimal('17.99'), Decimal('-45.10'), Decimal(0), None, Decimal('999999999.9999')]
+    with engine.begin() as conn:
+        conn.execute(amount_table.insert(), [dict(amount=v) for v in values])
+        conn.execute(amount_table.insert(), dict(amount=17.99))
+
+        raw = conn.execute(sa.text('SELECT amount FROM amounts ORDER BY id')).scalars().all()
+        assert raw == [179900, -451000, 0, None, 9999999999999, 179900]
+
+        loaded = conn.execute(sa.select([amount_table.c.amount]).order_by(amount_table.c.id)).scalars().all()
+        assert loaded == values + [Decimal('17.99')]
+
+        # Literal binds are converted as well
+        n = conn.execute(
+            sa.select([sa.func.count()]).where(amount_table.c.amount == Decimal('17.99'))
+        ).scalar()
+        assert n == 2
+
+        conn.execute(amount_table.delete())
+
+
+def test_amount_threads():
+    '''Concurrent conversions with different thread contexts agree'''
+    t = AmountType()
+    values = [Decimal(i).scaleb(-4) * 7 for i in range(-5000, 5000)]
+    expected = [legacy_to_integer(v) for v in values]
+    errors = []
+
+    def worker(prec):
+        getcontext().prec = prec
+        for _ in range(5):
+            ints = [t.to_integer(v) for v in values]
+            if ints != expected:
+                errors.append(prec)
+            if prec >= 19 and [t.from_integer(i) for i in ints] != values:
+                errors.append(prec)
+
+    threads = [threading.Thread(target=worker, args=(p, )) for p in (2, 6, 13, 19, 28)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    assert errors == []
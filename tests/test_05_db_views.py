@@ -0,0 +1,300 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from jadetree.database import db, materialized_views, query_profiler
+from jadetree.database.globals import CreateView, DropView
+from jadetree.database.tables import budget_outflows, net_worth_months
+from jadetree.database.views import MaterializedView, _lock_id
+from jadetree.domain.models import User
+from jadetree.domain.types import AccountSubtype, AccountType
+from jadetree.service import (
+    account as account_service,
+    auth as auth_service,
+    budget as budget_service,
+    ledger as ledger_service,
+    user as user_service,
+)
+
+
+def _view_table(name='test_view'):
+    md = sa.MetaData()
+    src = sa.Table('src', md, sa.Column('id', sa.Integer, primary_key=True), sa.Column('n', sa.Integer))
+    sel = sa.select([src.c.n, sa.func.count().label('count')]).group_by(src.c.n)
+    table = sa.Table(name, md, sa.Column('n', sa.Integer), sa.Column('count', sa.Integer))
+    return table, sel
+
+
+def _compile(element, dialect):
+    return ' '.join(str(element.compile(dialect=dialect)).split())
+
+
+def _view_rows(view):
+    return sorted(db.session.execute(sa.select([view])).fetchall(), key=repr)
+
+
+def _query_rows(view):
+    return sorted(db.session.execute(materialized_views[view.name].selectable).fetchall(), key=repr)
+
+
+def test_view_ddl():
+    '''Materialized views are native on PostgreSQL and tables on SQLite'''
+    table, sel = _view_table()
+
+    create = CreateView('test_view', sel, materialized=True)
+    assert _compile(create, postgresql.dialect()).startswith('CREATE MATERIALIZED VIEW test_view AS SELECT')
+    assert _compile(create, sqlite.dialect()).startswith('CREATE TABLE test_view AS SELECT')
+    assert _compile(create, mysql.dialect()).startswith('CREATE VIEW test_view AS SELECT')
+    assert _compile(CreateView('test_view', sel), postgresql.dialect()).startswith('CREATE VIEW test_view')
+    assert _compile(CreateView('test_view', sel), sqlite.dialect()).startswith('CREATE VIEW test_view')
+
+    # Views refreshed on write are tables on every database
+    create = CreateView('test_view', sel, materialized=True, table=True)
+    assert _compile(create, postgresql.dialect()).startswith('CREATE TABLE test_view AS SELECT')
+    assert _compile(create, mysql.dialect()).startswith('CREATE TABLE test_view AS SELECT')
+
+    drop = DropView('test_view', materialized=True)
+    assert _compile(drop, postgresql.dialect()) == 'DROP MATERIALIZED VIEW IF EXISTS test_view CASCADE'
+    assert _compile(drop, sqlite.dialect()) == 'DROP TABLE IF EXISTS test_view'
+    assert _compile(DropView('test_view'), sqlite.dialect()) == 'DROP VIEW IF EXISTS test_view'
+    assert _compile(DropView('test_view', table=True), postgresql.dialect()) == 'DROP TABLE IF EXISTS test_view CASCADE'
+
+
+def test_view_refresh_strategies():
+    table, sel = _view_table()
+
+    with pytest.raises(ValueError, match='strategy'):
+        MaterializedView(table, sel, refresh='hourly')
+    with pytest.raises(ValueError, match='interval'):
+        MaterializedView(table, sel, refresh='interval')
+    with pytest.raises(ValueError, match='source tables and keys'):
+        MaterializedView(table, sel, refresh='write', tables=('src', ))
+    with pytest.raises(ValueError, match='key column'):
+        MaterializedView(table, sel, refresh='write', tables=('src', ), keys=('id', ))
+
+    v = MaterializedView(table, sel)
+    assert not v.is_due()
+    assert not v.is_table
+
+    v = MaterializedView(table, sel, refresh='write', tables=('src', ), keys=('n', ))
+    assert v.is_table
+    assert not v.is_due()
+    assert v.affects('src', None)
+    assert v.affects('src', {'n', 'memo'})
+    assert not v.affects('src', {'memo'})
+    assert not v.affects('other', None)
+
+    v = MaterializedView(table, sel, refresh='interval', interval=60)
+    assert not v.is_due()
+    v._last_refresh -= 61
+    assert v.is_due()
+    assert not v.is_due()
+
+
+def test_views_registered():
+    assert budget_outflows.name in materialized_views
+    assert net_worth_months.name in materialized_views
+    assert materialized_views['budget_outflows'].strategy == 'write'
+    assert materialized_views['budget_outflows'].keys == ('category_id', 'month_key')
+
+
+@pytest.fixture(scope='function')
+def ledger(session, user_with_profile):
+    u = user_with_profile
+    b = budget_service.create_budget(session, u, 'Test Budget', 'USD')
+    g = budget_service.create_budget_category_group(session, u, b.id, 'Monthly Expenses')
+    c1 = budget_service.create_budget_category(session, u, b.id, g.id, 'Groceries')
+    c2 = budget_service.create_budget_category(session, u, b.id, g.id, 'Rent')
+    a, _, _ = account_service.create_user_account(
+        session, u, 'Checking', AccountType.Asset, 'USD', Decimal(1000), date(2020, 1, 1),
+        AccountSubtype.Checking, budget_id=b.id,
+    )
+    return u, a, c1, c2
+
+
+def test_views_refresh_on_commit(session, ledger):
+    '''Views are refreshed by commits which write their source tables'''
+    u, a, c, _ = ledger
+
+    def outflows():
+        return session.execute(
+            sa.select([budget_outflows]).where(budget_outflows.c.category_id == c.id)
+        ).fetchall()
+
+    def net_worth():
+        return session.execute(
+            sa.select([net_worth_months.c.month_key, net_worth_months.c.asset])
+            .where(net_worth_months.c.account_id == a.id)
+            .order_by(net_worth_months.c.month_key)
+        ).fetchall()
+
+    assert outflows() == []
+    assert net_worth() == [(2020 * 12, Decimal(1000))]
+
+    ledger_service.create_transaction(
+        session=session, user=u, account_id=a.id, date=date(2020, 2, 1),
+        amount=Decimal(-40), payee_id=u.payees[0].id,
+        splits=[dict(category_id=c.id, amount=Decimal(-40))],
+    )
+    assert outflows() == [(c.id, 2020 * 12 + 1, Decimal(40), 1)]
+    assert net_worth() == [(2020 * 12, Decimal(1000)), (2020 * 12 + 1, Decimal(-40))]
+
+    # Uncommitted writes are not visible until the next commit
+    session.execute(
+        budget_outflows.delete().where(budget_outflows.c.category_id == c.id)
+    )
+    assert outflows() == []
+    assert materialized_views.refresh(session, ['budget_outflows']) == ['budget_outflows']
+    assert outflows() == [(c.id, 2020 * 12 + 1, Decimal(40), 1)]
+
+    with pytest.raises(ValueError):
+        materialized_views.refresh(session, ['no_such_view'])
+
+
+def test_views_refresh_incremental(session, ledger):
+    '''Commits recompute only the view rows affected by their writes'''
+    u, a, c1, c2 = ledger
+
+    # A stale row for a key which is not written is left alone
+    session.execute(budget_outflows.insert().values(
+        category_id=c2.id, month_key=2000 * 12, outflow=Decimal(1), num_transactions=1
+    ))
+    stale = (c2.id, 2000 * 12, Decimal(1), 1)
+
+    def check_views():
+        assert _view_rows(budget_outflows) == sorted(_query_rows(budget_outflows) + [stale], key=repr)
+        assert _view_rows(net_worth_months) == _query_rows(net_worth_months)
+
+    t1 = ledger_service.create_transaction(
+        session=session, user=u, account_id=a.id, date=date(2020, 2, 1),
+        amount=Decimal(-40), payee_id=u.payees[0].id,
+        splits=[dict(category_id=c1.id, amount=Decimal(-40))],
+    )
+    t2 = ledger_service.create_transaction(
+        session=session, user=u, account_id=a.id, date=date(2020, 2, 10),
+        amount=Decimal(-60), payee_id=u.payees[0].id,
+        splits=[
+            dict(category_id=c1.id, amount=Decimal(-20)),
+            dict(category_id=c2.id, amount=Decimal(-40)),
+        ],
+    )
+    check_views()
+
+    # Moving a Transaction to another month and category updates both the
+    # old and the new rows
+    ledger_service.update_transaction(
+        session, u, t1.id, date=date(2020, 3, 1), amount=Decimal(-45),
+        splits=[dict(category_id=c2.id, amount=Decimal(-45))],
+    )
+    check_views()
+
+    # Removing a split
+    ledger_service.update_transaction(
+        session, u, t2.id, amount=Decimal(-20),
+        splits=[dict(category_id=c1.id, amount=Decimal(-20))],
+    )
+    check_views()
+
+    ledger_service.delete_transaction(session, u, t1.id)
+    check_views()
+    assert session.execute(
+        sa.select([budget_outflows]).where(budget_outflows.c.month_key == 2020 * 12 + 2)
+    ).fetchall() == []
+
+    # Clearing a line does not touch the views
+    with query_profiler.profile() as p:
+        ledger_service.clear_transaction(session, u, t2.id, account_id=a.id, cleared=True)
+        ledger_service.clear_lines(session, u, [dict(transaction_id=t2.id, account_id=a.id)], False)
+    assert p.statements > 0
+    assert not any('budget_outflows' in s or 'net_worth_months' in s for s in p.shapes)
+    check_views()
+
+
+class _RecordingSession:
+    """Session stand-in which records the statements it executes."""
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.statements = []
+
+    def get_bind(self):
+        return sa.create_mock_engine(f'{self.dialect}://', None)
+
+    def execute(self, stmt, params=None):
+        self.statements.append((str(stmt), params))
+
+
+def test_view_key_locks_postgresql():
+    '''Refreshes of the same keys are serialized with advisory locks'''
+    view = materialized_views['budget_outflows']
+    keys = {(2, 24241), (1, 24240), (1, 24241)}
+    s = _RecordingSession('postgresql')
+    view.refresh_keys(s, keys)
+
+    (shared, shared_params), (locks, lock_params) = s.statements[:2]
+    assert 'pg_advisory_xact_lock_shared' in shared
+    assert shared_params == dict(view_id=_lock_id('budget_outflows'))
+    assert 'pg_advisory_xact_lock(' in locks
+    assert lock_params['key_ids'] == sorted(_lock_id(repr(k)) for k in keys)
+    assert s.statements[2][0].startswith('DELETE FROM budget_outflows')
+
+    # A full refresh waits for all key refreshes
+    s = _RecordingSession('postgresql')
+    view.refresh_view(s)
+    assert s.statements[0] == (
+        'SELECT pg_advisory_xact_lock(:view_id, 0)', dict(view_id=_lock_id('budget_outflows'))
+    )
+    assert s.statements[1][0].startswith('DELETE FROM budget_outflows')
+
+    # SQLite has a single writer, so no locks are taken
+    s = _RecordingSession('sqlite')
+    view.refresh_keys(s, keys)
+    assert s.statements[0][0].startswith('DELETE FROM budget_outflows')
+
+
+def test_views_refresh_two_sessions(app):
+    '''Two sessions writing to the same view key both commit'''
+    s1 = db.create_scoped_session()
+    s2 = db.create_scoped_session()
+    try:
+        u = auth_service.register_user(s1, 'views@jadetree.io', 'hunter2JT', 'Views User')
+        u = auth_service.confirm_user(s1, u.uid_hash, 'views@jadetree.io')
+        u = user_service.setup_user(s1, u, 'en', 'en_US', 'USD')
+        b = budget_service.create_budget(s1, u, 'Views Budget', 'USD')
+        g = budget_service.create_budget_category_group(s1, u, b.id, 'Monthly Expenses')
+        c = budget_service.create_budget_category(s1, u, b.id, g.id, 'Groceries')
+        a, _, _ = account_service.create_user_account(
+            s1, u, 'Checking', AccountType.Asset, 'USD', Decimal(1000), date(2020, 1, 1),
+            AccountSubtype.Checking, budget_id=b.id,
+        )
+        payee_id = u.payees[0].id
+
+        # The second session loads its objects before the first one writes
+        u2 = s2.query(User).get(u.id)
+        before = s2.execute(sa.select([budget_outflows]).where(budget_outflows.c.category_id == c.id)).fetchall()
+        assert before == []
+
+        for s, user, amount in ((s1, u, 40), (s2, u2, 25)):
+            ledger_service.create_transaction(
+                session=s, user=user, account_id=a.id, date=date(2020, 2, 1),
+                amount=Decimal(-amount), payee_id=payee_id,
+                splits=[dict(category_id=c.id, amount=Decimal(-amount))],
+            )
+
+        for s in (s1, s2):
+            assert s.execute(
+                sa.select([budget_outflows]).where(budget_outflows.c.category_id == c.id)
+            ).fetchall() == [(c.id, 2020 * 12 + 1, Decimal(65), 2)]
+
+    finally:
+        s1.remove()
+        s2.remove()
@@ -0,0 +1,122 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2021 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+import json
+
+import pytest
+import sqlalchemy as sa
+
+from jadetree.database import db, query_profiler
+from jadetree.database.profiler import QueryProfile, QueryProfiler, init_profiler, statement_shape
+from jadetree.exc import ConfigError
+
+
+def test_statement_shape():
+    assert statement_shape('SELECT a\n  FROM t WHERE id = ?') == 'SELECT a FROM t WHERE id = ?'
+    assert statement_shape('SELECT a FROM t WHERE id IN (?, ?, ?)') == 'SELECT a FROM t WHERE id IN (?)'
+    assert statement_shape('SELECT a FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)') \
+        == 'SELECT a FROM t WHERE id IN (%(id_1_1)s)'
+
+
+def test_query_profile_n_plus_one():
+    p = QueryProfile(n1_threshold=3)
+    p.record('SELECT * FROM accounts', 0.002)
+    for i in range(3):
+        p.record('SELECT * FROM transactions WHERE id IN ({})'.format(', '.join('?' * (i + 1))), 0.001)
+    p.record_fetch(7, 0.001)
+
+    assert p.statements == 4
+    assert p.rows == 7
+    assert p.duration == pytest.approx(0.006)
+    assert p.n_plus_one == [('SELECT * FROM transactions WHERE id IN (?)', 3)]
+    assert p.server_timing() == \
+        'db;dur=6.000;desc="4 queries, 7 rows", db-n1;desc="1 repeated statements, 3 executions"'
+
+
+def test_query_profiler_engine():
+    '''The profiler counts statements and rows within a profile block'''
+    profiler = QueryProfiler()
+    engine = sa.create_engine('sqlite://')
+    profiler.install(engine)
+
+    with engine.connect() as conn:
+        conn.execute(sa.text('CREATE TABLE t (id INTEGER PRIMARY KEY)'))
+        conn.execute(sa.text('INSERT INTO t (id) VALUES (:id)'), [dict(id=i) for i in range(5)])
+
+        with profiler.profile(n1_threshold=3) as outer:
+            assert conn.execute(sa.text('SELECT id FROM t')).fetchall() == [(i, ) for i in range(5)]
+            with profiler.profile() as inner:
+                for i in range(3):
+                    assert conn.execute(sa.text('SELECT id FROM t WHERE id = :id'), dict(id=i)).scalar() == i
+
+        # Statements after the block are not recorded
+        conn.execute(sa.text('SELECT id FROM t')).fetchall()
+
+    assert outer.statements == 4
+    assert outer.rows == 8
+    assert outer.n_plus_one == [('SELECT id FROM t WHERE id = ?', 3)]
+    assert inner.statements == 3
+    assert inner.rows == 3
+    assert inner.n_plus_one == []
+    assert profiler.active == []
+
+
+def test_query_profiler_config(app):
+    for value in (1, 'many'):
+        app.config['DB_PROFILE_N1'] = value
+        with pytest.raises(ConfigError) as excinfo:
+            init_profiler(app, [])
+        assert excinfo.value.config_key == 'DB_PROFILE_N1'
+
+    del app.config['DB_PROFILE_N1']
+    app.config['DB_PROFILE'] = 'off'
+    assert init_profiler(app, []) is False
+    del app.config['DB_PROFILE']
+
+
+def test_request_server_timing(app):
+    '''Each request reports its SQL statements in the Server-Timing header'''
+    setup_data = {
+        'mode': 'personal',
+        'email': 'test@jadetree.io',
+        'password': 'hunter2JT',
+        'name': 'Test User',
+    }
+    with app.test_client() as client:
+        with query_profiler.profile() as p:
+            rv = client.post(
+                '/api/v1/setup',
+                content_type='application/json',
+                data=json.dumps(setup_data),
+            )
+        assert rv.status_code == 204
+
+    # Query budget for the endpoint
+    assert 0 < p.statements <= 20
+    assert p.n_plus_one == []
+
+    timing = rv.headers['Server-Timing']
+    assert timing.startswith('db;dur=')
+    assert f'desc="{p.statements} queries, {p.rows} rows"' in timing
+
+
+def test_request_n_plus_one_logged(app, caplog, monkeypatch):
+    @app.route('/test/n-plus-one')
+    def n_plus_one():
+        for i in range(12):
+            db.session.execute(sa.text('SELECT :i'), dict(i=i)).scalar()
+        return ''
+
+    # Alembic's logging configuration disables the application logger
+    monkeypatch.setattr(app.logger, 'disabled', False)
+    monkeypatch.setitem(app.config, '_JT_NEEDS_SETUP', False)
+    with app.test_client() as client:
+        rv = client.get('/test/n-plus-one')
+        assert rv.status_code == 200
+
+    assert 'db-n1;desc="1 repeated statements, 12 executions"' in rv.headers['Server-Timing']
+    assert 'possible N+1 query, 12 executions of "SELECT ?"' in caplog.text
@@ -9,6 +9,7 @@ import pytest  # noqa: F401
 
 from jadetree.domain.models import Account, Budget, Category
 from jadetree.domain.types import AccountRole, AccountType
+from jadetree.exc import DomainError
 from jadetree.service import budget as budget_service
 
 
@@ -231,3 +232,179 @@ def test_create_budget_with_complex_categories(session, user_with_profile):
     assert c3.parent == g2
     assert c3.system is True
     assert c3.hidden is False
+
+
+def _ordered_names(session, b, parent):
+    return [
+        c.name for c in session.query(Category).filter(
+            Category.budget == b,
+            Category.parent == parent,
+        ).order_by(Category.display_order, Category.id)
+    ]
+
+
+def test_move_category_updates_only_target(session, user_with_profile):
+    b = budget_service.create_budget(
+        session,
+        user_with_profile,
+        'Test Budget',
+        categories=[
+            {'name': 'Monthly Expenses', 'categories': ['Rent', 'Groceries', 'Phone', 'Internet']},
+        ],
+    )
+
+    g1 = session.query(Category).filter(Category.budget == b, Category.name == 'Monthly Expenses').one()
+    c4 = session.query(Category).filter(Category.budget == b, Category.name == 'Internet').one()
+    before = {c.id: c.display_order for c in g1.children if c is not c4}
+
+    budget_service.move_category(session, user_with_profile, b.id, c4.id, 1, g1.id)
+
+    session.expire_all()
+    assert _ordered_names(session, b, g1) == ['Rent', 'Internet', 'Groceries', 'Phone']
+    assert {c.id: c.display_order for c in g1.children if c is not c4} == before
+
+
+def test_move_category_rebalances_exhausted_keys(session, user_with_profile):
+    b = budget_service.create_budget(
+        session,
+        user_with_profile,
+        'Test Budget',
+        categories=[
+            {'name': 'Monthly Expenses', 'categories': ['Rent', 'Groceries', 'Phone']},
+        ],
+    )
+
+    g1 = session.query(Category).filter(Category.budget == b, Category.name == 'Monthly Expenses').one()
+    c2 = session.query(Category).filter(Category.budget == b, Category.name == 'Groceries').one()
+    c3 = session.query(Category).filter(Category.budget == b, Category.name == 'Phone').one()
+
+    # Repeatedly swap the last two categories until the keys are exhausted
+    for i in range(20):
+        target = c3 if i % 2 == 0 else c2
+        budget_service.move_category(session, user_with_profile, b.id, target.id, 1, g1.id)
+
+    session.expire_all()
+    assert _ordered_names(session, b, g1) == ['Rent', 'Groceries', 'Phone']
+    keys = sorted(c.display_order for c in g1.children)
+    assert len(set(keys)) == 3
+
+
+def test_move_category_to_new_parent(session, user_with_profile):
+    b = budget_service.create_budget(
+        session,
+        user_with_profile,
+        'Test Budget',
+        categories=[
+            {'name': 'Monthly Expenses', 'categories': ['Rent', 'Groceries']},
+            {'name': 'Rainy Day Funds', 'categories': ['Car Insurance']},
+        ],
+    )
+
+    g1 = session.query(Category).filter(Category.budget == b, Category.name == 'Monthly Expenses').one()
+    g2 = session.query(Category).filter(Category.budget == b, Category.name == 'Rainy Day Funds').one()
+    c2 = session.query(Category).filter(Category.budget == b, Category.name == 'Groceries').one()
+
+    budget_service.move_category(session, user_with_profile, b.id, c2.id, 0, g2.id)
+
+    session.expire_all()
+    assert _ordered_names(session, b, g1) == ['Rent']
+    assert _ordered_names(session, b, g2) == ['Groceries', 'Car Insurance']
+
+
+def test_reorder_categories(session, user_with_profile):
+    b = budget_service.create_budget(
+        session,
+        user_with_profile,
+        'Test Budget',
+        categories=[
+            {'name': 'Monthly Expenses', 'categories': ['Rent', 'Groceries']},
+            {'name': 'Rainy Day Funds', 'categories': ['Car Insurance']},
+        ],
+    )
+
+    g1 = session.query(Category).filter(Category.budget == b, Category.name == 'Monthly Expenses').one()
+    g2 = session.query(Category).filter(Category.budget == b, Category.name == 'Rainy Day Funds').one()
+    c1 = session.query(Category).filter(Category.budget == b, Category.name == 'Rent').one()
+    c2 = session.query(Category).filter(Category.budget == b, Category.name == 'Groceries').one()
+    c3 = session.query(Category).filter(Category.budget == b, Category.name == 'Car Insurance').one()
+
+    budget_service.reorder_categories(session, user_with_profile, b.id, [
+        {'id': g2.id, 'children': [c3.id, c1.id]},
+        {'id': g1.id, 'children': [c2.id]},
+    ])
+
+    session.expire_all()
+    assert _ordered_names(session, b, None) == ['Rainy Day Funds', 'Monthly Expenses', '_income', '_debt']
+    assert _ordered_names(session, b, g2) == ['Car Insurance', 'Rent']
+    assert _ordered_names(session, b, g1) == ['Groceries']
+
+
+def test_reorder_categories_throws_not_group(session, user_with_profile):
+    b = budget_service.create_budget(
+        session,
+        user_with_profile,
+        'Test Budget',
+        categories=[
+            {'name': 'Monthly Expenses', 'categories': ['Rent']},
+        ],
+    )
+
+    c1 = session.query(Category).filter(Category.budget == b, Category.name == 'Rent').one()
+
+    with pytest.raises(DomainError) as exc_data:
+        budget_service.reorder_categories(session, user_with_profile, b.id, [{'id': c1.id}])
+
+    assert 'not a Category Group' in str(exc_data.value)
+
+
+def test_category_tree_is_cached(session, user_with_profile):
+    b = budget_service.create_budget(
+        session,
+        user_with_profile,
+        'Test Budget',
+        categories=[
+            {'name': 'Monthly Expenses', 'categories': ['Rent', 'Groceries']},
+        ],
+    )
+
+    t1 = budget_service.load_category_tree(session, user_with_profile, b.id)
+    t2 = budget_service.load_category_tree(session, user_with_profile, b.id)
+
+    assert t1 is t2
+    assert [g.name for g in t1.groups] == ['_income', '_debt', 'Monthly Expenses']
+    assert [c.name for c in t1.groups[2].children] == ['Rent', 'Groceries']
+    assert t1.by_id[t1.groups[2].children[0].id].parent_name == 'Monthly Expenses'
+
+
+def test_category_tree_invalidated_by_changes(session, user_with_profile):
+    b = budget_service.create_budget(
+        session,
+        user_with_profile,
+        'Test Budget',
+        categories=[
+            {'name': 'Monthly Expenses', 'categories': ['Rent', 'Groceries']},
+        ],
+    )
+
+    g1 = session.query(Category).filter(Category.budget == b, Category.name == 'Monthly Expenses').one()
+    c1 = session.query(Category).filter(Category.budget == b, Category.name == 'Rent').one()
+
+    t1 = budget_service.load_category_tree(session, user_with_profile, b.id)
+
+    budget_service.update_category(session, user_with_profile, b.id, c1.id, name='Mortgage')
+    t2 = budget_service.load_category_tree(session, user_with_profile, b.id)
+    assert t2 is not t1
+    assert t2.version != t1.version
+    assert t2.by_id[c1.id].name == 'Mortgage'
+
+    budget_service.create_budget_category(session, user_with_profile, b.id, g1.id, 'Phone')
+    t3 = budget_service.load_category_tree(session, user_with_profile, b.id)
+    assert [c.name for c in t3.by_id[g1.id].children] == ['Mortgage', 'Groceries', 'Phone']
+
+    budget_service.move_category(session, user_with_profile, b.id, c1.id, 2, g1.id)
+    t4 = budget_service.load_category_tree(session, user_with_profile, b.id)
+    assert [c.name for c in t4.by_id[g1.id].children] == ['Groceries', 'Phone', 'Mortgage']
+
+    budget_service.delete_category(session, user_with_profile, b.id, c1.id)
+    t5 = budget_service.load_category_tree(session, user_with_profile, b.id)
+    assert c1.id not in t5.by_id
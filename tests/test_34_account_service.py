@@ -77,21 +77,21 @@ def test_create_user_asset_account_with_capital(session, user_with_profile):
     assert t.payee.system is True
 
     assert len(t.lines) == 2
-    assert t.lines[0].account.role == AccountRole.System
-    assert t.lines[0].account.type == AccountType.Capital
-    assert t.lines[0].amount == Decimal(100)
-    assert t.lines[1].account == a
+    assert t.lines[1].account.role == AccountRole.System
+    assert t.lines[1].account.type == AccountType.Capital
     assert t.lines[1].amount == Decimal(100)
+    assert t.lines[0].account == a
+    assert t.lines[0].amount == Decimal(100)
 
     assert len(t.splits) == 1
-    assert t.splits[0].left_line == t.lines[1]
-    assert t.splits[0].right_line == t.lines[0]
+    assert t.splits[0].left_line == t.lines[0]
+    assert t.splits[0].right_line == t.lines[1]
     assert t.splits[0].type == TransactionType.System
     assert t.splits[0].amount == Decimal(100)
 
     check_entries(t.splits[0], [
         (a,                  Decimal(100), 'USD'),
-        (t.lines[0].account, Decimal(100), 'USD'),
+        (t.lines[1].account, Decimal(100), 'USD'),
     ])
 
     assert t.amount == Decimal(100)
@@ -126,21 +126,21 @@ def test_create_user_liability_account_with_capital(session, user_with_profile):
     assert t.payee.system is True
 
     assert len(t.lines) == 2
-    assert t.lines[0].account.role == AccountRole.System
-    assert t.lines[0].account.type == AccountType.Capital
-    assert t.lines[0].amount == Decimal(-100)
-    assert t.lines[1].account == a
-    assert t.lines[1].amount == Decimal(100)
+    assert t.lines[1].account.role == AccountRole.System
+    assert t.lines[1].account.type == AccountType.Capital
+    assert t.lines[1].amount == Decimal(-100)
+    assert t.lines[0].account == a
+    assert t.lines[0].amount == Decimal(100)
 
     assert len(t.splits) == 1
-    assert t.splits[0].left_line == t.lines[1]
-    assert t.splits[0].right_line == t.lines[0]
+    assert t.splits[0].left_line == t.lines[0]
+    assert t.splits[0].right_line == t.lines[1]
     assert t.splits[0].type == TransactionType.System
     assert t.splits[0].amount == Decimal(100)
 
     check_entries(t.splits[0], [
         (a,                  Decimal( 100), 'USD'),
-        (t.lines[0].account, Decimal(-100), 'USD'),
+        (t.lines[1].account, Decimal(-100), 'USD'),
     ])
 
     assert t.amount == Decimal(100)
@@ -179,16 +179,16 @@ def test_create_user_asset_account_with_income(session, user_with_profile, budge
     assert t.payee.system is True
 
     assert len(t.lines) == 2
-    assert t.lines[0].account.role == AccountRole.Budget
-    assert t.lines[0].account.type == AccountType.Income
-    assert t.lines[0].account.name == '_income'
-    assert t.lines[0].amount == Decimal(100)
-    assert t.lines[1].account == a
+    assert t.lines[1].account.role == AccountRole.Budget
+    assert t.lines[1].account.type == AccountType.Income
+    assert t.lines[1].account.name == '_income'
     assert t.lines[1].amount == Decimal(100)
+    assert t.lines[0].account == a
+    assert t.lines[0].amount == Decimal(100)
 
     assert len(t.splits) == 1
-    assert t.splits[0].left_line == t.lines[1]
-    assert t.splits[0].right_line == t.lines[0]
+    assert t.splits[0].left_line == t.lines[0]
+    assert t.splits[0].right_line == t.lines[1]
     assert t.splits[0].type == TransactionType.System
     assert t.splits[0].amount == Decimal(100)
     assert t.splits[0].category is not None
@@ -197,7 +197,7 @@ def test_create_user_asset_account_with_income(session, user_with_profile, budge
 
     check_entries(t.splits[0], [
         (a,                  Decimal(100), 'USD'),
-        (t.lines[0].account, Decimal(100), 'USD'),
+        (t.lines[1].account, Decimal(100), 'USD'),
     ])
 
     assert t.amount == Decimal(100)
@@ -236,16 +236,16 @@ def test_create_user_liability_account_with_debt(session, user_with_profile, bud
     assert t.payee.system is True
 
     assert len(t.lines) == 2
-    assert t.lines[0].account.role == AccountRole.Budget
-    assert t.lines[0].account.type == AccountType.Expense
-    assert t.lines[0].account.name == '_expense'
-    assert t.lines[0].amount == Decimal(100)
-    assert t.lines[1].account == a
+    assert t.lines[1].account.role == AccountRole.Budget
+    assert t.lines[1].account.type == AccountType.Expense
+    assert t.lines[1].account.name == '_expense'
     assert t.lines[1].amount == Decimal(100)
+    assert t.lines[0].account == a
+    assert t.lines[0].amount == Decimal(100)
 
     assert len(t.splits) == 1
-    assert t.splits[0].left_line == t.lines[1]
-    assert t.splits[0].right_line == t.lines[0]
+    assert t.splits[0].left_line == t.lines[0]
+    assert t.splits[0].right_line == t.lines[1]
     assert t.splits[0].type == TransactionType.System
     assert t.splits[0].amount == Decimal(100)
     assert t.splits[0].category is not None
@@ -254,7 +254,51 @@ def test_create_user_liability_account_with_debt(session, user_with_profile, bud
 
     check_entries(t.splits[0], [
         (a,                  Decimal(100), 'USD'),
-        (t.lines[0].account, Decimal(100), 'USD'),
+        (t.lines[1].account, Decimal(100), 'USD'),
     ])
 
     assert t.amount == Decimal(100)
+
+
+def _create_accounts(session, user, names):
+    return [
+        account_service.create_user_account(
+            session=session,
+            user=user,
+            name=name,
+            type=AccountType.Asset,
+            currency='USD',
+            balance=Decimal(0),
+            balance_date=utcnow()
+        )[0] for name in names
+    ]
+
+
+def _ordered_account_names(session):
+    return [
+        a.name for a in session.query(Account).filter(
+            Account.role == AccountRole.Personal,
+        ).order_by(Account.display_order, Account.id)
+    ]
+
+
+def test_move_account(session, user_with_profile):
+    a1, a2, a3 = _create_accounts(session, user_with_profile, ['Checking', 'Savings', 'Cash'])
+    keys = (a1.display_order, a2.display_order)
+
+    assert a1.display_order < a2.display_order < a3.display_order
+
+    account_service.move_account(session, user_with_profile, a3.id, 0)
+
+    session.expire_all()
+    assert _ordered_account_names(session) == ['Cash', 'Checking', 'Savings']
+    assert (a1.display_order, a2.display_order) == keys
+
+
+def test_reorder_accounts(session, user_with_profile):
+    a1, a2, a3 = _create_accounts(session, user_with_profile, ['Checking', 'Savings', 'Cash'])
+
+    account_service.reorder_accounts(session, user_with_profile, [a2.id, a3.id])
+
+    session.expire_all()
+    assert _ordered_account_names(session) == ['Savings', 'Cash', 'Checking']
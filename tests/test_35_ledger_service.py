@@ -7,10 +7,17 @@
 
 from datetime import date
 from decimal import Decimal
+import threading
 
 import pytest  # noqa: F401
 from sqlalchemy import and_, func
+from sqlalchemy.orm import Query
 
+from jadetree.database import query_profiler
+from jadetree.database.loading import txn_graph_options
+from jadetree.database.queries import query_cache_info
+from jadetree.database.queries.cache import cached_query
+from jadetree.database.tables import payees as payees_table
 from jadetree.domain.models import (
     Account,
     Category,
@@ -24,11 +31,14 @@ from jadetree.domain.types import (
     PayeeRole,
     TransactionType,
 )
+from jadetree.domain.util import month_from_key, month_key, new_version_token
+from jadetree.exc import DomainError
 from jadetree.service import (
     account as account_service,
     budget as budget_service,
     ledger as ledger_service,
     payee as payee_service,
+    report as report_service,
 )
 
 from .helpers import check_transaction_entries as check_entries
@@ -151,3 +161,715 @@ def test_add_simple_transaction(
         .scalar()
 
     assert cat_balance == Decimal(80)
+
+
+def test_transaction_month_key_follows_date(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    t = ledger_service.create_transaction(
+        session=session,
+        user=user_with_profile,
+        account_id=a_chk,
+        date=date(2020, 12, 30),
+        amount=Decimal(-25),
+        payee_id=p_vons,
+        splits=[dict(category_id=c_groc, amount=Decimal(-25))],
+    )
+
+    assert t.month_key == month_key(date(2020, 12, 1))
+    assert month_from_key(t.month_key) == (2020, 12)
+
+    t = ledger_service.update_transaction(
+        session, user_with_profile, t.id, date=date(2021, 1, 2)
+    )
+
+    session.expire(t)
+    assert t.month_key == 2021 * 12
+    assert month_from_key(t.month_key) == (2021, 1)
+
+
+def test_budget_data_grouped_by_month_key(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    for d, amt in ((date(2020, 1, 5), 40), (date(2020, 1, 20), 60), (date(2020, 3, 1), 15)):
+        ledger_service.create_transaction(
+            session=session,
+            user=user_with_profile,
+            account_id=a_chk,
+            date=d,
+            amount=Decimal(-amt),
+            payee_id=p_vons,
+            splits=[dict(category_id=c_groc, amount=Decimal(-amt))],
+        )
+
+    e = budget_service.create_entry(session, user_with_profile, budget_id, dict(
+        month=date(2020, 1, 1),
+        category_id=c_groc,
+        amount=Decimal(120),
+    ))
+    assert e.month_key == month_key((2020, 1))
+    assert budget_service._load_entry_ymc(
+        session, user_with_profile, budget_id, 2020, 1, c_groc
+    ) == e
+
+    data = budget_service.get_budget_data(session, user_with_profile, budget_id)
+
+    assert (2020, 1) in data
+    assert (2020, 2) in data
+    assert (2020, 3) in data
+
+    jan = data[(2020, 1)]['categories'][c_groc]
+    assert jan['budget'] == Decimal(120)
+    assert jan['outflow'] == Decimal(100)
+    assert jan['num_transactions'] == 2
+    assert jan['balance'] == Decimal(20)
+
+    mar = data[(2020, 3)]['categories'][c_groc]
+    assert mar['outflow'] == Decimal(15)
+    assert mar['balance'] == Decimal(5)
+
+
+def _create_split_transaction(session, user, a_chk, p_vons, c_rent, c_groc, c_ins):
+    return ledger_service.create_transaction(
+        session=session,
+        user=user,
+        account_id=a_chk,
+        date=date(2020, 2, 1),
+        amount=Decimal(-60),
+        payee_id=p_vons,
+        splits=[
+            dict(category_id=c_rent, amount=Decimal(-30), memo='Rent'),
+            dict(category_id=c_groc, amount=Decimal(-20), memo='Food'),
+            dict(category_id=c_ins, amount=Decimal(-10), memo='Car'),
+        ],
+    )
+
+
+def test_update_split_memo_keeps_rows(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    t = _create_split_transaction(session, user_with_profile, a_chk, p_vons, c_rent, c_groc, c_ins)
+
+    split_ids = sorted(sp.id for sp in t.splits)
+    line_ids = sorted(ln.id for ln in t.lines)
+    entry_ids = sorted(e.id for sp in t.splits for e in sp.entries)
+
+    t, changes = ledger_service.update_transaction_with_changes(
+        session, user_with_profile, t.id,
+        amount=Decimal(-60),
+        splits=[
+            dict(category_id=c_rent, amount=Decimal(-30), memo='Rent'),
+            dict(category_id=c_groc, amount=Decimal(-20), memo='Groceries'),
+            dict(category_id=c_ins, amount=Decimal(-10), memo='Car'),
+        ],
+    )
+
+    assert sorted(sp.id for sp in t.splits) == split_ids
+    assert sorted(ln.id for ln in t.lines) == line_ids
+    assert sorted(e.id for sp in t.splits for e in sp.entries) == entry_ids
+    assert sorted(sp.memo for sp in t.splits) == ['Car', 'Groceries', 'Rent']
+
+    assert changes['added_splits'] == []
+    assert changes['removed_splits'] == []
+    assert len(changes['updated_splits']) == 1
+    assert changes['lines'] == []
+    assert changes['accounts'] == []
+
+
+def test_update_split_amount_reuses_lines(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    t = _create_split_transaction(session, user_with_profile, a_chk, p_vons, c_rent, c_groc, c_ins)
+
+    rent_split = [sp for sp in t.splits if sp.memo == 'Rent'][0].id
+    line_ids = sorted(ln.id for ln in t.lines)
+
+    ledger_service.clear_transaction(session, user_with_profile, t.id, account_id=a_chk, cleared=True)
+
+    t, changes = ledger_service.update_transaction_with_changes(
+        session, user_with_profile, t.id,
+        amount=Decimal(-70),
+        splits=[
+            dict(category_id=c_rent, amount=Decimal(-30), memo='Rent'),
+            dict(category_id=c_groc, amount=Decimal(-40), memo='Food'),
+        ],
+    )
+
+    assert t.amount == Decimal(-70)
+    assert sorted(ln.id for ln in t.lines) == line_ids
+    assert rent_split in [sp.id for sp in t.splits]
+    assert t.account_line(t.account).cleared is True
+
+    assert len(changes['added_splits']) == 1
+    assert len(changes['removed_splits']) == 2
+    assert changes['removed_lines'] == []
+    assert changes['lines'] == line_ids
+    assert a_chk in changes['accounts']
+
+
+def test_update_split_transfer_removes_line(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    t = ledger_service.create_transaction(
+        session=session,
+        user=user_with_profile,
+        account_id=a_chk,
+        date=date(2020, 2, 1),
+        amount=Decimal(-50),
+        payee_id=p_vons,
+        splits=[
+            dict(category_id=c_groc, amount=Decimal(-20)),
+            dict(transfer_id=a_svg, amount=Decimal(-30)),
+        ],
+    )
+
+    svg_line = t.account_line(session.query(Account).get(a_svg)).id
+
+    t, changes = ledger_service.update_transaction_with_changes(
+        session, user_with_profile, t.id,
+        amount=Decimal(-50),
+        splits=[dict(category_id=c_groc, amount=Decimal(-50))],
+    )
+
+    assert len(t.splits) == 1
+    assert len(t.lines) == 2
+    assert changes['removed_lines'] == [svg_line]
+    assert a_svg in changes['accounts']
+    assert session.query(TransactionLine).get(svg_line) is None
+
+
+def test_reconcile_account_uses_checkpoint(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+
+    txns = []
+    for d, amt in ((date(2020, 1, 5), 40), (date(2020, 1, 20), 60), (date(2020, 2, 3), 15)):
+        txns.append(ledger_service.create_transaction(
+            session=session,
+            user=user_with_profile,
+            account_id=a_chk,
+            date=d,
+            amount=Decimal(-amt),
+            payee_id=p_vons,
+            splits=[dict(category_id=c_groc, amount=Decimal(-amt))],
+        ))
+
+    # Opening Balance Transaction is cleared along with the first two
+    for t in session.query(TransactionLine).filter(TransactionLine.account_id == a_chk):
+        ledger_service.clear_transaction(
+            session, user_with_profile, t.transaction_id, account_id=a_chk, cleared=True
+        )
+
+    with pytest.raises(DomainError):
+        ledger_service.reconcile_account(
+            session, user_with_profile, a_chk, date(2020, 1, 31), Decimal(10000)
+        )
+
+    # Lines are selected by criteria, so no list of line ids is bound into
+    # the statements (which could exceed the database's parameter limit)
+    with query_profiler.profile() as p:
+        lines = ledger_service.reconcile_account(
+            session, user_with_profile, a_chk, date(2020, 1, 31), Decimal(9900)
+        )
+
+    assert not [s for s in p.shapes if 'transaction_lines.id IN (?' in s]
+    assert len(lines) == 3
+    assert all(ln.reconciled for ln in lines)
+
+    a = session.query(Account).get(a_chk)
+    assert a.reconciled_balance == Decimal(9900)
+    assert a.reconciled_at == date(2020, 1, 31)
+
+    # Second Statement only sums the new line on top of the checkpoint
+    lines = ledger_service.reconcile_account(
+        session, user_with_profile, a_chk, date(2020, 2, 29), Decimal(9885)
+    )
+
+    assert [ln.transaction_id for ln in lines] == [txns[2].id]
+    assert a.reconciled_balance == Decimal(9885)
+
+    with pytest.raises(DomainError):
+        ledger_service.reconcile_account(
+            session, user_with_profile, a_chk, date(2020, 1, 1), Decimal(9885)
+        )
+
+    with pytest.raises(DomainError):
+        ledger_service.delete_transaction(session, user_with_profile, txns[0].id)
+
+
+def test_clear_lines_bulk(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+
+    txns = [
+        ledger_service.create_transaction(
+            session=session,
+            user=user_with_profile,
+            account_id=a_chk,
+            date=date(2020, 1, 5 + i),
+            amount=Decimal(-10),
+            payee_id=p_vons,
+            splits=[dict(category_id=c_groc, amount=Decimal(-10))],
+        ) for i in range(3)
+    ]
+
+    line_id = txns[0].account_line(txns[0].account).id
+    lines = ledger_service.clear_lines(session, user_with_profile, [
+        dict(line_id=line_id),
+        dict(transaction_id=txns[1].id, account_id=a_chk),
+    ], True)
+
+    assert [ln['transaction_id'] for ln in lines] == [txns[0].id, txns[1].id]
+    assert all(ln['cleared'] for ln in lines)
+    assert all(ln['cleared_at'] == date.today() for ln in lines)
+
+    session.expire_all()
+    assert txns[0].account_line(txns[0].account).cleared is True
+    assert txns[2].account_line(txns[2].account).cleared is False
+
+    lines = ledger_service.clear_lines(session, user_with_profile, [
+        dict(transaction_id=txns[1].id, account_id=a_chk),
+    ], False)
+
+    assert lines[0]['cleared'] is False
+    assert lines[0]['cleared_at'] is None
+
+    with pytest.raises(DomainError):
+        ledger_service.clear_lines(session, user_with_profile, [
+            dict(transaction_id=txns[1].id, account_id=a_svg),
+        ], True)
+
+
+def test_search_transactions(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    t_groc = ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 3, 1),
+        amount=Decimal(-45), payee_id=p_vons, memo='Weekly groceries',
+        splits=[dict(category_id=c_groc, amount=Decimal(-45), memo='Avocados')],
+    )
+    t_rent = ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 3, 2),
+        amount=Decimal(-1500), payee_id=p_landlord, check='1042',
+        splits=[dict(category_id=c_rent, amount=Decimal(-1500))],
+    )
+    t_xfer = ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 3, 3),
+        amount=Decimal(-200), payee_id=p_vons, memo='Grocery fund',
+        splits=[dict(transfer_id=a_svg, amount=Decimal(-200))],
+    )
+
+    def found(query=None, **kwargs):
+        res = ledger_service.search_transactions(session, u, query, **kwargs)
+        return [ln['transaction_id'] for ln in res['items']]
+
+    # Payee names, memos, split memos and check numbers are indexed
+    assert found('vons') == [t_xfer.id, t_groc.id]
+    assert found('groc') == [t_xfer.id, t_groc.id]
+    assert found('avocado') == [t_groc.id]
+    assert found('1042') == [t_rent.id]
+    assert found('vons weekly') == [t_groc.id]
+    assert found('nothing') == []
+
+    # Filters combine with the search terms
+    assert found('groc', max_amount=Decimal(-100)) == [t_xfer.id]
+    assert found('groc', start_date=date(2020, 3, 2)) == [t_xfer.id]
+    assert found('groc', account_id=a_svg) == [t_xfer.id]
+    assert found(min_amount=Decimal(-1000), start_date=date(2020, 3, 1)) == [t_xfer.id, t_groc.id]
+
+    # Transfers are returned from the requested account's side
+    res = ledger_service.search_transactions(session, u, 'fund', account_id=a_svg)
+    assert res['items'][0]['line_account_id'] == a_svg
+    assert res['items'][0]['amount'] == Decimal(200)
+
+    # Pagination
+    res = ledger_service.search_transactions(session, u, 'groc', page=2, per_page=1)
+    assert res['total'] == 2
+    assert [ln['transaction_id'] for ln in res['items']] == [t_groc.id]
+
+    # Index follows edits to transactions, splits and payee names
+    ledger_service.update_transaction(session, u, t_rent.id, memo='March rent')
+    assert found('march') == [t_rent.id]
+
+    payee = payee_service._load_payee(session, u, p_landlord)
+    payee.name = 'Property Manager'
+    session.commit()
+    assert found('landlord') == []
+    assert found('property') == [t_rent.id]
+
+    ledger_service.delete_transaction(session, u, t_groc.id)
+    assert found('avocado') == []
+
+
+def test_ledger_filters(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    for i, (payee, cat, amount) in enumerate((
+        (p_vons, c_groc, -40),
+        (p_landlord, c_rent, -1500),
+        (p_vons, c_groc, -60),
+        (p_landlord, c_rent, -1500),
+    )):
+        ledger_service.create_transaction(
+            session=session, user=u, account_id=a_chk, date=date(2020, 4 + i, 1),
+            amount=Decimal(amount), payee_id=payee,
+            splits=[dict(category_id=cat, amount=Decimal(amount))],
+        )
+
+    full = {
+        ln['line_id']: ln for ln in ledger_service.load_account_lines(session, u, a_chk)
+    }
+
+    def lines(**filters):
+        return ledger_service.load_account_lines(session, u, a_chk, **filters)
+
+    # Balances are unchanged by the date window pushed into the balance query
+    window = lines(start_date=date(2020, 5, 1), end_date=date(2020, 6, 30))
+    assert [ln['date'] for ln in window] == [date(2020, 5, 1), date(2020, 6, 1)]
+    for ln in window:
+        assert ln['balance'] == full[ln['line_id']]['balance']
+        assert ln['splits'] == full[ln['line_id']]['splits']
+
+    assert [ln['amount'] for ln in lines(payee_id=p_vons)] == [Decimal(-40), Decimal(-60)]
+    assert [ln['date'] for ln in lines(category_id=c_rent)] == [date(2020, 5, 1), date(2020, 7, 1)]
+    assert [ln['amount'] for ln in lines(min_amount=Decimal(-100), max_amount=Decimal(-50))] == [Decimal(-60)]
+    assert lines(cleared=True) == []
+    assert len(lines(reconciled=False)) == len(full)
+
+    all_lines = ledger_service.load_all_lines(
+        session, u, start_date=date(2020, 7, 1), payee_id=p_landlord
+    )
+    assert [(ln['line_account_id'], ln['balance']) for ln in all_lines] == [
+        (a_chk, full[all_lines[0]['line_id']]['balance'])
+    ]
+
+
+def test_ledger_queries_cached(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    for i, (payee, cat, amount) in enumerate((
+        (p_vons, c_groc, -40),
+        (p_landlord, c_rent, -1500),
+        (p_vons, c_groc, -60),
+    )):
+        ledger_service.create_transaction(
+            session=session, user=u, account_id=a_chk, date=date(2020, 4 + i, 1),
+            amount=Decimal(amount), payee_id=payee,
+            splits=[dict(category_id=cat, amount=Decimal(amount))],
+        )
+
+    def amounts(**filters):
+        return [ln['amount'] for ln in ledger_service.load_account_lines(session, u, a_chk, **filters)]
+
+    # Queries with the same filters share one cached statement and differ
+    # only by their bound parameters
+    assert amounts(payee_id=p_vons) == [Decimal(-40), Decimal(-60)]
+    info = query_cache_info()
+    assert amounts(payee_id=p_landlord) == [Decimal(-1500)]
+    assert amounts(payee_id=p_vons, start_date=date(2020, 5, 1)) == [Decimal(-60)]
+    assert query_cache_info()['size'] == info['size'] + 1
+    assert query_cache_info()['hits'] == info['hits'] + 1
+
+    # Report filters are bound parameters as well
+    def spending(**filter):
+        return {
+            r['category_id']: r['amount']
+            for r in report_service.spending_by_category(session, u, budget_id, filter=filter)
+        }
+
+    assert spending() == {c_groc: Decimal(100), c_rent: Decimal(1500)}
+    assert spending(start_date=date(2020, 6, 1), end_date=date(2020, 6, 1)) == {c_groc: Decimal(60)}
+    assert spending(categories=[c_rent]) == {c_rent: Decimal(1500)}
+
+
+def test_query_cache_stats_threads(session):
+    # Hits and misses are counted under the cache lock, so no increments
+    # are lost when several threads use the cache at once
+    info = query_cache_info()
+
+    def worker():
+        for i in range(200):
+            cached_query(session, ('test_query_cache_stats_threads', i % 5), lambda s: Query(Account))
+
+    threads = [threading.Thread(target=worker) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = query_cache_info()
+    assert stats['misses'] - info['misses'] >= 5
+    assert (stats['hits'] + stats['misses']) - (info['hits'] + info['misses']) == 1600
+
+
+def test_split_accounts_stored(
+    session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    t = ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 2, 1),
+        amount=Decimal(-50), payee_id=p_vons,
+        splits=[
+            dict(category_id=c_groc, amount=Decimal(-20)),
+            dict(transfer_id=a_svg, amount=Decimal(-30)),
+        ],
+    )
+
+    s_groc, s_xfer = sorted(t.splits, key=lambda sp: sp.id)
+    assert s_groc.left_account_id == a_chk
+    assert s_groc.right_account_id == s_groc.right_line.account.id
+    assert s_groc.transfer is False
+    assert (s_xfer.left_account_id, s_xfer.right_account_id) == (a_chk, a_svg)
+    assert s_xfer.transfer is True
+
+    # Each split appears once with its own transfer account
+    chk_line = ledger_service.load_single_transaction(session, u, t.id)[0]
+    assert sorted((sp['split_id'], sp['transfer_id']) for sp in chk_line['splits']) == [
+        (s_groc.id, None),
+        (s_xfer.id, a_svg),
+    ]
+
+    svg_line = [
+        ln for ln in ledger_service.load_account_lines(session, u, a_svg)
+        if ln['transaction_id'] == t.id
+    ][0]
+    assert [(sp['split_id'], sp['transfer_id']) for sp in svg_line['splits']] == [
+        (s_xfer.id, a_chk),
+    ]
+
+
+def test_load_transactions_query_budget(
+    app, session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    for i in range(12):
+        ledger_service.create_transaction(
+            session=session, user=u, account_id=(a_chk, a_cc)[i % 2],
+            date=date(2020, 5, 1 + i), amount=Decimal(-30 - i), payee_id=p_vons,
+            splits=[
+                dict(category_id=c_groc, amount=Decimal(-10 - i)),
+                dict(transfer_id=a_svg, amount=Decimal(-20)),
+            ] if i % 3 == 0 else [
+                dict(category_id=c_groc, amount=Decimal(-30 - i)),
+            ],
+        )
+
+    # Three opening balance transactions plus the twelve above
+    session.expire_all()
+    assert u.profile_setup
+
+    with query_profiler.profile() as p:
+        txns, total = ledger_service.load_transactions(session, u, page=1, per_page=10)
+        amounts = [t.amount for t in txns]
+
+    assert total == 15
+    assert [t.date for t in txns] == [date(2020, 5, 12 - i) for i in range(10)]
+    assert amounts == [Decimal(-41 + i) for i in range(10)]
+
+    # Count, page, lines, splits and entries regardless of page size
+    assert p.statements <= 5, '\n\n'.join(p.shapes)
+
+    txns, total = ledger_service.load_transactions(session, u, page=2, per_page=10)
+    assert len(txns) == 5
+
+
+def test_load_transaction_without_joined_graph(
+    app, session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    t = ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 6, 1),
+        amount=Decimal(-60), payee_id=p_vons, splits=[
+            dict(category_id=c_groc, amount=Decimal(-10)),
+            dict(category_id=c_ins, amount=Decimal(-20)),
+            dict(transfer_id=a_svg, amount=Decimal(-30)),
+        ],
+    )
+
+    session.expire_all()
+    assert u.profile_setup
+
+    with query_profiler.profile() as p:
+        t = ledger_service._load_transaction(session, u, t.id, txn_graph_options())
+        entries = [e.amount for ln in t.lines for e in ln.entries]
+        assert t.amount == Decimal(-60)
+
+    assert len(t.lines) == 3
+    assert len(t.splits) == 3
+    assert sorted(entries) == [-30, -20, -10, 10, 20, 30]
+
+    # Lines and splits are loaded separately rather than joined together
+    assert not any('JOIN transaction_lines' in s for s in p.shapes), '\n\n'.join(p.shapes)
+    assert not any('JOIN transaction_splits' in s for s in p.shapes), '\n\n'.join(p.shapes)
+    assert p.statements <= 6, '\n\n'.join(p.shapes)
+
+
+def test_payee_autofill_stats(
+    app, session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    t1 = ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 7, 10),
+        amount=Decimal(-40), payee_id=p_vons, splits=[
+            dict(category_id=c_groc, amount=Decimal(-40), memo='Weekly shop'),
+        ],
+    )
+    ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 7, 3),
+        amount=Decimal(-15), payee_id=p_vons, splits=[
+            dict(category_id=c_ins, amount=Decimal(-15)),
+        ],
+    )
+
+    # An older Transaction counts towards usage but is not the latest
+    p = payee_service._load_payee(session, u, p_vons)
+    assert p.use_count == 2
+    assert p.last_date == date(2020, 7, 10)
+    assert p.last_type == TransactionType.Outflow
+    assert p.last_category_id == c_groc
+    assert p.last_account_id is None
+    assert p.last_amount == Decimal(-40)
+    assert p.last_memo == 'Weekly shop'
+
+    # A Transaction committed by another process is not overwritten by the
+    # use count loaded into this session
+    session.execute(
+        payees_table.update().where(payees_table.c.id == p_vons).values(use_count=payees_table.c.use_count + 1)
+    )
+    assert p.use_count == 2
+    t3 = ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 7, 1),
+        amount=Decimal(-5), payee_id=p_vons, splits=[
+            dict(category_id=c_groc, amount=Decimal(-5)),
+        ],
+    )
+    assert payee_service._load_payee(session, u, p_vons).use_count == 4
+
+    # Deleting a Transaction recounts the Payee's Transactions
+    ledger_service.delete_transaction(session, u, t3.id)
+    p = payee_service._load_payee(session, u, p_vons)
+    assert p.use_count == 2
+    assert p.last_date == date(2020, 7, 10)
+
+    # Moving the latest Transaction to a transfer with another Payee
+    ledger_service.update_transaction(
+        session, u, t1.id, payee_id=p_landlord, amount=Decimal(-25),
+        splits=[dict(transfer_id=a_svg, amount=Decimal(-25))],
+    )
+
+    p = payee_service._load_payee(session, u, p_vons)
+    assert p.use_count == 1
+    assert p.last_date == date(2020, 7, 3)
+    assert p.last_category_id == c_ins
+    assert p.last_amount == Decimal(-15)
+    assert p.last_memo is None
+
+    p = payee_service._load_payee(session, u, p_landlord)
+    assert p.use_count == 1
+    assert p.last_type == TransactionType.Transfer
+    assert p.last_category_id is None
+    assert p.last_account_id == a_svg
+    assert p.last_amount == Decimal(-25)
+
+    ledger_service.delete_transaction(session, u, t1.id)
+
+    p = payee_service._load_payee(session, u, p_landlord)
+    assert p.use_count == 0
+    assert p.last_date is None
+    assert p.last_type is None
+    assert p.last_account_id is None
+
+    # Batch autofill returns every visible Payee, most used first
+    autofill = payee_service.get_payee_autofill(session, u)
+    assert autofill[0].id == p_vons
+    assert autofill[0].last_category_id == c_ins
+    assert p_landlord in [a.id for a in autofill]
+    assert all(a.use_count == 0 for a in autofill[1:])
+
+
+def test_payee_search_index(
+    app, session, user_with_profile, budget_id, default_accounts, default_payees
+):
+    (a_chk, a_svg, a_cc), (c_rent, c_groc, c_ins) = default_accounts
+    (p_vons, p_landlord) = default_payees
+    u = user_with_profile
+
+    p_foods = payee_service.create_payee(session, u, 'Whole Foods Market').id
+    p_vonage = payee_service.create_payee(session, u, 'Vonage').id
+
+    # Matches any word prefix, case-insensitively
+    assert [p.id for p in payee_service.search_payees(session, u, 'von')] == [p_vonage, p_vons]
+    assert [p.id for p in payee_service.search_payees(session, u, 'FOO')] == [p_foods]
+    assert [p.id for p in payee_service.search_payees(session, u, 'mark')] == [p_foods]
+    assert payee_service.search_payees(session, u, 'xyz') == []
+
+    # Ranked by usage frequency, kept current by the ledger
+    ledger_service.create_transaction(
+        session=session, user=u, account_id=a_chk, date=date(2020, 8, 1),
+        amount=Decimal(-20), payee_id=p_vons, splits=[
+            dict(category_id=c_groc, amount=Decimal(-20)),
+        ],
+    )
+    matches = payee_service.search_payees(session, u, 'von')
+    assert [p.id for p in matches] == [p_vons, p_vonage]
+    assert matches[0].use_count == 1
+
+    # Renamed and hidden Payees are updated in place
+    payee_service.update_payee(session, u, p_vonage, name='Phone Company')
+    assert [p.id for p in payee_service.search_payees(session, u, 'von')] == [p_vons]
+    assert [p.id for p in payee_service.search_payees(session, u, 'pho')] == [p_vonage]
+
+    payee_service.update_payee(session, u, p_foods, hidden=True)
+    assert payee_service.search_payees(session, u, 'foo') == []
+
+    # Changes committed by another process are picked up by the version token
+    session.execute(
+        payees_table.update().where(payees_table.c.id == p_landlord).values(name='Property Manager')
+    )
+    u.payee_version = new_version_token()
+    session.commit()
+    assert [p.id for p in payee_service.search_payees(session, u, 'prop')] == [p_landlord]
+
+    # Transfer Payees are created with their accounts
+    assert 'Checking' in [p.name for p in payee_service.search_payees(session, u, 'check')]
+
+    with pytest.raises(ValueError):
+        payee_service.search_payees(session, u, 'a', limit=0)
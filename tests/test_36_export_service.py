@@ -0,0 +1,111 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+import io
+import json
+
+import pytest  # noqa: F401
+from sqlalchemy import select
+
+from jadetree.database.tables import transactions
+from jadetree.database.util import keyset_pages
+from jadetree.service import export as export_service
+
+
+@pytest.mark.parametrize('page_size', [1, 4, 9, 100])
+def test_keyset_pages(session, sample_ledger, page_size):
+    t = transactions.c
+    query = select([t.id, t.date]).where(t.user_id == sample_ledger.id)
+    pages = list(keyset_pages(session, query, [t.date, t.id], page_size))
+
+    assert all(0 < len(rows) <= page_size for rows in pages)
+    assert [(r.date, r.id) for rows in pages for r in rows] == [
+        (r.date, r.id) for r in session.execute(query.order_by(t.date, t.id))
+    ]
+    assert len(pages) == -(-9 // page_size)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+def test_stream_json_matches_export(session, sample_ledger, chunk_size):
+    expected = export_service.export_data_json(sample_ledger)
+    data = json.loads(''.join(
+        export_service.iter_data_json(session, sample_ledger, chunk_size=chunk_size)
+    ))
+
+    assert data['version'] == 1
+    assert data['accounts'] == expected['accounts']
+    assert data['budgets'] == expected['budgets']
+    assert data['payees'] == expected['payees']
+    assert len(data['transactions']) == 9
+    assert data['transactions'] == sorted(expected['transactions'], key=lambda t: t['id'])
+
+
+def test_write_json_to_file(session, sample_ledger):
+    fp = io.StringIO()
+    export_service.write_data_json(session, sample_ledger, fp, chunk_size=3)
+
+    data = json.loads(fp.getvalue())
+    assert [t['id'] for t in data['transactions']] == sorted(t['id'] for t in data['transactions'])
+    assert data == json.loads(''.join(export_service.iter_data_json(session, sample_ledger)))
+
+
+def _qif_records(lines):
+    records = []
+    record = []
+    for line in lines:
+        record.append(line)
+        if line == '^':
+            records.append(record)
+            record = []
+    return records
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 500])
+def test_account_qif_matches_transactions(session, sample_ledger, chunk_size):
+    for acct in sample_ledger.accounts:
+        if acct.name not in ('Checking', 'Savings'):
+            continue
+
+        records = _qif_records(export_service.export_account_qif(session, acct, chunk_size))
+        assert records[0][0] == '!Type:Bank'
+        assert records[0][1] == f'N{acct.name}'
+
+        txns = sorted(
+            [t for t in sample_ledger.transactions if any(ln.account is acct for ln in t.lines)],
+            key=lambda t: (t.date, t.id),
+        )
+        assert records[1:] == [export_service.export_transaction_qif(t, acct) for t in txns]
+
+
+def test_account_qif_records(session, sample_ledger):
+    accts = {a.name: a for a in sample_ledger.accounts}
+    chk = _qif_records(export_service.export_account_qif(session, accts['Checking']))
+    svg = _qif_records(export_service.export_account_qif(session, accts['Savings']))
+
+    # Opening balance, five split transactions, foreign and transfer
+    assert len(chk) == 9
+    assert [r[0] for r in chk[1:]] == sorted(r[0] for r in chk[1:])
+
+    split = chk[2]
+    assert 'T-60' in split
+    assert 'PVons' in split
+    assert 'SMonthly Expenses:Rent' in split
+    assert '$-40' in split
+    assert 'ERent' in split
+
+    # Foreign currency amounts are exported in the Account currency
+    assert 'XCEUR' in chk[7]
+    assert 'T-12' in chk[7]
+    assert 'LMonthly Expenses:Groceries' in chk[7]
+
+    assert 'T-250' in chk[8]
+    assert f'PTransfer:{accts["Savings"].id}' in chk[8]
+
+    # The transfer is also exported from the opposing account
+    assert len(svg) == 3
+    assert 'T250' in svg[2]
+    assert f'PTransfer:{accts["Checking"].id}' in svg[2]
@@ -0,0 +1,250 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from datetime import date
+from decimal import Decimal
+import json
+import os
+
+from arrow import utcnow
+import pytest  # noqa: F401
+
+from jadetree.database import db as _db
+from jadetree.domain.types import AccountSubtype, AccountType, JobStatus
+from jadetree.exc import ConfigError, DomainError, NoResults
+from jadetree.jobs import JOB_HANDLERS, STALE_MESSAGE, JobRunner, runner, start_jobs
+from jadetree.service import (
+    account as account_service,
+    auth as auth_service,
+    budget as budget_service,
+    export as export_service,
+    job as job_service,
+    ledger as ledger_service,
+    user as user_service,
+)
+
+
+@pytest.fixture(scope='function')
+def job_runner(monkeypatch, tmp_path):
+    monkeypatch.setattr(runner, 'workers', 0)
+    monkeypatch.setattr(runner, 'artifact_dir', str(tmp_path))
+    monkeypatch.setattr(runner, '_listeners', list(runner._listeners))
+    return runner
+
+
+@pytest.fixture(scope='function')
+def ledger(session, user_with_profile):
+    u = user_with_profile
+    b = budget_service.create_budget(session, u, 'Test Budget', 'USD')
+    g = budget_service.create_budget_category_group(session, u, b.id, 'Monthly Expenses')
+    c = budget_service.create_budget_category(session, u, b.id, g.id, 'Groceries')
+    a = account_service.create_user_account(session, u, 'Checking', AccountType.Asset, 'USD', Decimal(1000), date(2020, 1, 1), AccountSubtype.Checking, budget_id=b.id)[0]
+
+    for i in range(5):
+        ledger_service.create_transaction(
+            session=session,
+            user=u,
+            account_id=a.id,
+            date=date(2020, 2, i + 1),
+            amount=Decimal(-20),
+            payee_id=u.payees[0].id,
+            splits=[dict(category_id=c.id, amount=Decimal(-20))],
+        )
+
+    return u
+
+
+def test_export_json_job(session, ledger, job_runner):
+    updates = []
+    job_runner.add_listener(lambda job: updates.append((job.status, job_runner.live_progress(job))))
+
+    job = job_service.create_job(session, ledger, 'export_json')
+    assert job.status == JobStatus.Complete
+    assert job.progress == 100
+    assert job.started_at is not None
+    assert job.finished_at is not None
+    assert job.artifact_name == 'jadetree.json'
+    assert job.artifact_type == 'application/json'
+
+    # Progress and completion are reported to listeners
+    assert updates[0] == (JobStatus.Running, 0)
+    assert updates[-1] == (JobStatus.Complete, 100)
+
+    job = job_service.get_job_artifact(session, ledger, job.id)
+    with open(job.artifact_path) as fp:
+        data = json.load(fp)
+
+    assert data == json.loads(''.join(export_service.iter_data_json(session, ledger)))
+    assert job_service.get_job_list(session, ledger) == [job]
+
+
+def test_export_qif_job(session, ledger, job_runner):
+    acct = [a for a in ledger.accounts if a.name == 'Checking'][0]
+    job = job_service.create_job(session, ledger, 'export_qif', dict(account_id=acct.id))
+    assert job.status == JobStatus.Complete
+    assert job.artifact_name == 'Checking.qif'
+
+    with open(job.artifact_path) as fp:
+        assert fp.read().splitlines() == list(export_service.export_account_qif(session, acct))
+
+
+def test_job_unknown_kind(session, user_with_profile, job_runner):
+    with pytest.raises(ValueError, match='Unknown job kind'):
+        job_service.create_job(session, user_with_profile, 'no_such_job')
+
+
+def test_job_failure(app, job_runner, monkeypatch):
+    # Failed Jobs roll back the session, so this test commits to the module
+    # database instead of using the rolled-back session fixture
+    session = _db.session
+    u = auth_service.register_user(session, 'failure@jadetree.io', 'hunter2JT', 'Failure User')
+    u = auth_service.confirm_user(session, u.uid_hash, 'failure@jadetree.io')
+    u = user_service.setup_user(session, u, 'en', 'en_US', 'USD')
+
+    def fail_job(ctx):
+        ctx.user.name = 'Changed'
+        raise DomainError('Something went wrong')
+
+    monkeypatch.setitem(JOB_HANDLERS, 'fail', fail_job)
+
+    job = job_service.create_job(session, u, 'fail')
+    assert job.status == JobStatus.Failed
+    assert job.message == 'Something went wrong'
+    assert job.finished_at is not None
+
+    # Changes made by the failed Job are rolled back
+    assert u.name == 'Failure User'
+
+    with pytest.raises(DomainError, match='has not completed'):
+        job_service.get_job_artifact(session, u, job.id)
+
+
+def test_job_user_limit(session, user_with_profile, job_runner, monkeypatch):
+    u1 = user_with_profile
+    u2 = auth_service.register_user(session, 'test2@jadetree.io', 'hunter2JT', 'Test User 2')
+    u2 = auth_service.confirm_user(session, u2.uid_hash, 'test2@jadetree.io')
+    u2 = user_service.setup_user(session, u2, 'en', 'en_US', 'USD')
+
+    # Record dispatched Jobs without running them
+    started = []
+    monkeypatch.setattr(runner, '_run', lambda session, job_id: started.append(job_id))
+    monkeypatch.setattr(runner, 'user_limit', 1)
+
+    j1 = job_service.create_job(session, u1, 'export_json')
+    j2 = job_service.create_job(session, u1, 'export_json')
+    j3 = job_service.create_job(session, u2, 'export_json')
+
+    assert started == [j1.id, j3.id]
+    assert j1.status == JobStatus.Running
+    assert j2.status == JobStatus.Queued
+    assert j3.status == JobStatus.Running
+
+    # Running Jobs cannot be deleted
+    with pytest.raises(DomainError, match='still running'):
+        job_service.delete_job(session, u1, j1.id)
+
+    # Finishing the first Job starts the next one for the same user
+    j1.complete()
+    session.commit()
+    runner.dispatch(session)
+
+    assert started == [j1.id, j3.id, j2.id]
+
+    job_service.delete_job(session, u1, j1.id)
+    with pytest.raises(NoResults):
+        job_service._load_job(session, u1, j1.id)
+
+
+def test_stale_job_does_not_block_user(session, user_with_profile, job_runner, monkeypatch):
+    '''A Job left running by a stopped process is failed and the user's queued Jobs start'''
+    u = user_with_profile
+    started = []
+    monkeypatch.setattr(runner, '_run', lambda session, job_id: started.append(job_id))
+    monkeypatch.setattr(runner, 'user_limit', 1)
+
+    j1 = job_service.create_job(session, u, 'export_json')
+    j2 = job_service.create_job(session, u, 'export_json')
+    assert started == [j1.id]
+    assert j1.owner == runner.owner
+    assert j1.heartbeat_at is not None
+
+    # Heartbeats keep the running Job alive
+    j1.heartbeat_at = utcnow().shift(seconds=-(runner.stale_after - 10))
+    session.commit()
+    runner.beat(session)
+    session.refresh(j1)
+    assert j1.heartbeat_at > utcnow().shift(seconds=-10)
+    assert runner.recover(session) == 0
+
+    # The process running the Job crashes, so its heartbeat stops
+    j1.owner = 'crashed:1:0000'
+    j1.heartbeat_at = utcnow().shift(seconds=-(runner.stale_after + 1))
+    session.commit()
+
+    with pytest.raises(DomainError, match='still running'):
+        job_service.delete_job(session, u, j1.id)
+
+    assert runner.recover(session) == 1
+    session.refresh(j1)
+    assert j1.status == JobStatus.Failed
+    assert j1.message == STALE_MESSAGE
+    assert j1.finished_at is not None
+
+    runner.dispatch(session)
+    assert started == [j1.id, j2.id]
+
+    job_service.delete_job(session, u, j1.id)
+
+
+def test_recover_dispatches_queued_jobs(session, job_runner, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(runner, 'workers', 2)
+    monkeypatch.setattr(runner, 'dispatch', lambda session: dispatched.append(session))
+
+    assert runner.recover(session) == 0
+    assert dispatched == [session]
+
+
+def test_job_runner_config(app):
+    r = JobRunner()
+    for key, value in (('JOB_HEARTBEAT', 0), ('JOB_STALE_AFTER', 'soon'), ('JOB_STALE_AFTER', 60)):
+        config = dict(JOB_HEARTBEAT=60, JOB_STALE_AFTER=300)
+        config[key] = value
+        app.config.update(config)
+        with pytest.raises(ConfigError) as excinfo:
+            r.init_app(app)
+        assert excinfo.value.config_key == key
+
+    app.config.update(JOB_HEARTBEAT=60, JOB_STALE_AFTER=300)
+    r.init_app(app)
+    assert (r.heartbeat, r.stale_after) == (60, 300)
+
+    # Jobs are run synchronously until the server starts the workers
+    assert r.workers == 0
+
+
+def test_start_jobs(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(runner, 'start', lambda: started.append(True))
+
+    # Nothing is started on a database which is not set up
+    monkeypatch.setitem(app.config, '_JT_DB_NEEDS_INIT', True)
+    assert start_jobs(app) is False
+    assert started == []
+
+    monkeypatch.setitem(app.config, '_JT_DB_NEEDS_INIT', False)
+    assert start_jobs(app) is True
+    assert started == [True]
+
+
+def test_delete_job_artifact(session, ledger, job_runner):
+    job = job_service.create_job(session, ledger, 'export_json')
+    path = job.artifact_path
+    assert os.path.exists(path)
+
+    job_service.delete_job(session, ledger, job.id)
+    assert not os.path.exists(path)
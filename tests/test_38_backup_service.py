@@ -0,0 +1,147 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from datetime import date
+from decimal import Decimal
+import io
+
+import pytest  # noqa: F401
+from sqlalchemy import func, select
+
+from jadetree.database.tables import transaction_search
+from jadetree.exc import DomainError, ImportError
+from jadetree.service import (
+    backup as backup_service,
+    budget as budget_service,
+    ledger as ledger_service,
+)
+from jadetree.service.backup import BACKUP_TABLES, _backup_query
+
+
+@pytest.fixture(scope='function')
+def ledger(session, sample_ledger):
+    """Add a budget entry and a transaction with cents, memos and an inexact
+    exchange rate to the sample ledger, to exercise the column codecs."""
+    u = sample_ledger
+    b = u.budgets[0]
+    cats = {c.name: c for c in b.categories}
+    accts = {a.name: a for a in u.accounts}
+    budget_service.create_entry(session, u, b.id, dict(category_id=cats['Groceries'].id, month=date(2020, 2, 1), amount=Decimal('123.45')))
+
+    ledger_service.create_transaction(
+        session=session,
+        user=u,
+        account_id=accts['Checking'].id,
+        date=date(2020, 3, 5),
+        amount=Decimal('-60.01'),
+        payee_id=[p for p in u.payees if p.name == 'Vons'][0].id,
+        memo='Weekly shopping',
+        currency='EUR',
+        exchange_rate=Decimal('1.234567'),
+        splits=[
+            dict(category_id=cats['Rent'].id, amount=Decimal('-40.01'), memo='Rent'),
+            dict(category_id=cats['Groceries'].id, amount=Decimal(-20), memo='Food'),
+        ],
+    )
+
+    return u
+
+
+def _table_rows(session, table, user_id):
+    return [tuple(r) for r in session.execute(_backup_query(table, user_id))]
+
+
+def _shifted(table, rows, offsets):
+    '''Shift the keys of table rows by the per-table offsets'''
+    cols = []
+    for c in table.c:
+        refs = [fk.column.table.name for fk in c.foreign_keys]
+        cols.append(offsets[table.name] if c.name == 'id' else offsets[refs[0]] if refs else 0)
+
+    return [
+        tuple(v if v is None or not off else v + off for v, off in zip(r, cols))
+        for r in rows
+    ]
+
+
+@pytest.mark.parametrize('block_rows', [2, 20000])
+def test_backup_restore_roundtrip(session, ledger, block_rows):
+    fp = io.BytesIO()
+    backup_service.write_backup(session, ledger, fp, block_rows=block_rows)
+
+    fp.seek(0)
+    header = backup_service.read_backup_header(fp)
+    assert header['version'] == backup_service.BACKUP_VERSION
+    assert header['user_id'] == ledger.id
+
+    fp.seek(0)
+    user = backup_service.restore_backup(session, fp, email='restored@jadetree.io')
+    assert user.id != ledger.id
+    assert user.email == 'restored@jadetree.io'
+    assert user.uid_hash != ledger.uid_hash
+    assert user.name == ledger.name
+    assert len(user.transactions) == 10
+
+    offsets = {}
+    for table in BACKUP_TABLES:
+        old = _table_rows(session, table, ledger.id)
+        new = _table_rows(session, table, user.id)
+        assert len(new) == len(old), table.name
+        offsets[table.name] = new[0][0] - old[0][0] if old else 0
+
+    for table in BACKUP_TABLES:
+        old = _shifted(table, _table_rows(session, table, ledger.id), offsets)
+        new = _table_rows(session, table, user.id)
+        if table.name == 'users':
+            email = list(table.c.keys()).index('email')
+            uid_hash = list(table.c.keys()).index('uid_hash')
+            old = [r[:email] + (new[0][email], ) + r[email + 1:uid_hash] + (new[0][uid_hash], ) + r[uid_hash + 1:] for r in old]
+        assert new == old, table.name
+
+    # Amounts are restored exactly
+    assert sorted(t.amount for t in user.transactions) == sorted(t.amount for t in ledger.transactions)
+
+    # The search index is rebuilt for the restored Transactions
+    assert session.execute(
+        select([func.count()]).where(transaction_search.c.user_id == user.id)
+    ).scalar() == 10
+
+
+def test_restore_forward_parent(session, ledger):
+    '''A category whose parent group was created after it is restored'''
+    budget = ledger.budgets[0]
+    rent = [c for c in budget.categories if c.name == 'Rent'][0]
+    g = budget_service.create_budget_category_group(session, ledger, budget.id, 'Housing')
+    assert g.id > rent.id
+    rent.parent = session.query(type(g)).get(g.id)
+    session.commit()
+
+    fp = io.BytesIO()
+    backup_service.write_backup(session, ledger, fp, block_rows=2)
+    fp.seek(0)
+    user = backup_service.restore_backup(session, fp, email='restored@jadetree.io')
+
+    restored = {c.name: c for c in user.budgets[0].categories}
+    assert restored['Rent'].parent is restored['Housing']
+    assert restored['Housing'].id > restored['Rent'].id
+
+
+def test_restore_existing_user(session, ledger):
+    fp = io.BytesIO()
+    backup_service.write_backup(session, ledger, fp)
+
+    fp.seek(0)
+    with pytest.raises(DomainError, match='already exists'):
+        backup_service.restore_backup(session, fp)
+
+
+def test_restore_invalid_file(session):
+    with pytest.raises(ImportError, match='Not a Jade Tree backup'):
+        backup_service.restore_backup(session, io.BytesIO(b'{"accounts": []}'))
+
+    with pytest.raises(ImportError, match='truncated'):
+        backup_service.restore_backup(session, io.BytesIO(b'JTBK'))
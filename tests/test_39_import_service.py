@@ -0,0 +1,298 @@
+# =============================================================================
+#
+# Jade Tree Personal Budgeting Application | jadetree.io
+# Copyright (c) 2020 Asymworks, LLC.  All Rights Reserved.
+#
+# =============================================================================
+
+from datetime import date
+from decimal import Decimal
+import io
+import os
+
+import pytest  # noqa: F401
+
+from jadetree.database.tables import transactions
+from jadetree.domain.types import AccountSubtype, AccountType, JobStatus, TransactionType
+from jadetree.exc import DomainError, ImportError
+from jadetree.jobs import runner
+from jadetree.service import (
+    account as account_service,
+    budget as budget_service,
+    export as export_service,
+    importer as import_service,
+    ledger as ledger_service,
+    payee as payee_service,
+)
+from jadetree.service.importer import pipeline
+
+QIF_DATA = '''!Type:Bank
+D1/ 3'20
+T-45.10
+PVons
+MWeekly shopping
+LMonthly Expenses:Groceries
+C*
+^
+D01/04/2020
+T-100.00
+PTransfer to savings
+L[Savings]
+^
+D2020-01-05
+T-1,060.00
+N1001
+PLandlord
+SMonthly Expenses:Rent
+$-1000.00
+ERent
+SParking
+$-60.00
+^
+!Type:Memorized
+D1/6/20
+T-1.00
+PIgnored
+^
+'''
+
+
+@pytest.fixture(scope='function')
+def ledger(session, user_with_profile):
+    u = user_with_profile
+    b = budget_service.create_budget(session, u, 'Test Budget', 'USD')
+    g = budget_service.create_budget_category_group(session, u, b.id, 'Monthly Expenses')
+    budget_service.create_budget_category(session, u, b.id, g.id, 'Rent')
+    budget_service.create_budget_category(session, u, b.id, g.id, 'Groceries')
+
+    account_service.create_user_account(session, u, 'Checking', AccountType.Asset, 'USD', Decimal(10000), date(2020, 1, 1), AccountSubtype.Checking, budget_id=b.id)
+    account_service.create_user_account(session, u, 'Savings', AccountType.Asset, 'USD', Decimal(5000), date(2020, 1, 1), AccountSubtype.Savings, budget_id=b.id)
+    payee_service.create_payee(session, u, 'Vons')
+
+    return u
+
+
+def _account(user, name):
+    return [a for a in user.accounts if a.name == name][0]
+
+
+def _import_qif(session, user, account, data):
+    return import_service.import_file(session, user, account.id, io.BytesIO(data.encode('utf-8')))
+
+
+def test_parse_qif():
+    records = list(import_service.parse_qif(io.StringIO(QIF_DATA)))
+    assert len(records) == 3
+
+    assert records[0].date == date(2020, 1, 3)
+    assert records[0].amount == Decimal('-45.10')
+    assert records[0].payee == 'Vons'
+    assert records[0].cleared is True
+    assert len(records[0].splits) == 1
+    assert records[0].splits[0].category == 'Monthly Expenses:Groceries'
+    assert records[0].splits[0].memo == 'Weekly shopping'
+
+    assert records[1].date == date(2020, 1, 4)
+    assert records[1].cleared is False
+    assert records[1].splits[0].transfer == 'Savings'
+
+    assert records[2].amount == Decimal(-1060)
+    assert records[2].check == '1001'
+    assert [(sp.category, sp.amount, sp.memo) for sp in records[2].splits] == [
+        ('Monthly Expenses:Rent', Decimal(-1000), 'Rent'),
+        ('Parking', Decimal(-60), None),
+    ]
+
+
+def test_parse_qif_errors():
+    with pytest.raises(ImportError, match='Invalid date "13/45/20" on line 2'):
+        list(import_service.parse_qif(io.StringIO('!Type:Bank\nD13/45/20\nT1\n^\n')))
+
+    with pytest.raises(ImportError, match='has no amount'):
+        list(import_service.parse_qif(io.StringIO('!Type:Bank\nD1/1/20\nPVons\n^\n')))
+
+    with pytest.raises(ImportError, match='not terminated'):
+        list(import_service.parse_qif(io.StringIO('!Type:Bank\nD1/1/20\nT1\n')))
+
+
+def test_import_qif(session, ledger):
+    chk = _account(ledger, 'Checking')
+    svg = _account(ledger, 'Savings')
+    n_payees = len(ledger.payees)
+
+    result = _import_qif(session, ledger, chk, QIF_DATA)
+    assert result == import_service.ImportResult(imported=3, duplicates=0, uncategorized=1, payees=2)
+    assert len(ledger.payees) == n_payees + 2
+
+    txns = {t.payee.name: t for t in ledger.transactions if t.date >= date(2020, 1, 3)}
+    assert len(txns) == 3
+
+    vons = txns['Vons']
+    assert vons.amount == Decimal('-45.10')
+    assert vons.splits[0].category.path == 'Monthly Expenses:Groceries'
+    assert vons.splits[0].type == TransactionType.Outflow
+    assert [ln.cleared for ln in vons.lines if ln.account is chk] == [True]
+    assert vons.payee.use_count == 1
+    assert vons.payee.last_amount == Decimal('-45.10')
+
+    transfer = txns['Transfer to savings']
+    assert transfer.is_transfer
+    assert transfer.splits[0].right_account is svg
+    assert svg.balance == Decimal(5100)
+
+    rent = txns['Landlord']
+    assert rent.check == '1001'
+    assert [(sp.category.path if sp.category else None, sp.amount) for sp in rent.splits] == [
+        ('Monthly Expenses:Rent', Decimal(-1000)),
+        (None, Decimal(-60)),
+    ]
+
+    assert chk.balance == Decimal(10000) - Decimal('1205.10')
+
+
+def test_reserve_ids(session, ledger, monkeypatch):
+    chk = _account(ledger, 'Checking')
+    _import_qif(session, ledger, chk, QIF_DATA)
+    last = max(t.id for t in ledger.transactions)
+    assert list(pipeline._reserve_ids(session, transactions, 2)) == [last + 1, last + 2]
+
+    # Without a sequence or a single writer, rows take auto-increment keys
+    monkeypatch.setattr(session.connection().dialect, 'name', 'mysql')
+    assert pipeline._reserve_ids(session, transactions, 2) is None
+
+    result = _import_qif(session, ledger, chk, QIF_DATA.replace('2020', '2021'))
+    assert result.imported == 2
+    assert sorted(t.id for t in ledger.transactions)[-2:] == [last + 1, last + 2]
+
+
+def test_import_duplicates(session, ledger):
+    chk = _account(ledger, 'Checking')
+    _import_qif(session, ledger, chk, QIF_DATA)
+
+    # Re-importing the file skips every record
+    result = _import_qif(session, ledger, chk, QIF_DATA)
+    assert result == import_service.ImportResult(imported=0, duplicates=3)
+
+    # An overlapping statement only adds the new records, and keeps repeated
+    # records which are not yet in the account
+    result = _import_qif(session, ledger, chk, '''!Type:Bank
+D1/3/20
+T-45.10
+PVONS
+^
+D1/3/20
+T-45.10
+PVons
+^
+D1/5/20
+T-1060.00
+N1001
+PLandlord
+^
+D1/7/20
+T-5.00
+PLandlord
+^
+D1/7/20
+T-5.00
+PLandlord
+^
+''')
+    assert result == import_service.ImportResult(imported=3, duplicates=2, uncategorized=3)
+    assert chk.balance == Decimal(10000) - Decimal('1205.10') - Decimal('55.10')
+
+
+def test_import_exported_account(session, ledger):
+    chk = _account(ledger, 'Checking')
+    _import_qif(session, ledger, chk, QIF_DATA)
+
+    # Every Transaction in a Jade Tree export of the Account is a duplicate
+    qif = '\n'.join(export_service.export_account_qif(session, chk))
+    result = _import_qif(session, ledger, chk, qif)
+    assert result == import_service.ImportResult(imported=0, duplicates=4)
+
+    # Transfers are matched from the opposing Account too
+    svg = _account(ledger, 'Savings')
+    qif = '\n'.join(export_service.export_account_qif(session, svg))
+    result = _import_qif(session, ledger, svg, qif)
+    assert result == import_service.ImportResult(imported=0, duplicates=2)
+
+
+def test_import_csv(session, ledger):
+    chk = _account(ledger, 'Checking')
+    data = (
+        'Posted,Description,Amount,Category,Notes\n'
+        '03/01/2020,Vons,-12.34,Groceries,\n'
+        '03/02/2020,Payroll,"1,500.00",,March\n'
+        '03/03/2020,,-20.00,[Savings],\n'
+    )
+
+    result = import_service.import_file(
+        session,
+        ledger,
+        chk.id,
+        io.BytesIO(data.encode('utf-8')),
+        format='csv',
+        columns=dict(date='Posted', payee='Description', memo='Notes'),
+        date_format='%m/%d/%Y',
+    )
+    assert result == import_service.ImportResult(imported=3, uncategorized=1, payees=1)
+
+    txns = sorted((t for t in ledger.transactions if t.date >= date(2020, 3, 1)), key=lambda t: t.date)
+    assert [(t.date, t.payee.name, t.amount) for t in txns] == [
+        (date(2020, 3, 1), 'Vons', Decimal('-12.34')),
+        (date(2020, 3, 2), 'Payroll', Decimal(1500)),
+        (date(2020, 3, 3), 'Savings', Decimal(-20)),
+    ]
+    assert txns[0].splits[0].category.path == 'Monthly Expenses:Groceries'
+    assert txns[1].memo == 'March'
+    assert txns[1].splits[0].type == TransactionType.Inflow
+    assert txns[2].is_transfer
+
+
+def test_import_errors(session, ledger):
+    chk = _account(ledger, 'Checking')
+    with pytest.raises(ImportError, match='Unknown transfer account "Brokerage" on line 2'):
+        _import_qif(session, ledger, chk, '!Type:Bank\nD1/1/20\nT-1\nPVons\nL[Brokerage]\n^\n')
+
+    with pytest.raises(ImportError, match='do not add up'):
+        _import_qif(session, ledger, chk, '!Type:Bank\nD1/1/20\nT-2\nPVons\nSRent\n$-1\n^\n')
+
+    with pytest.raises(ImportError, match='has no payee'):
+        _import_qif(session, ledger, chk, '!Type:Bank\nD1/1/20\nT-2\n^\n')
+
+    with pytest.raises(ValueError, match='Unknown import format'):
+        import_service.import_file(session, ledger, chk.id, io.BytesIO(b''), format='ofx')
+
+    eur = account_service.create_user_account(session, ledger, 'Euro', AccountType.Asset, 'EUR', None, None, AccountSubtype.Checking)[0]
+    with pytest.raises(DomainError, match='base currency'):
+        _import_qif(session, ledger, eur, QIF_DATA)
+
+    # No Transactions were created
+    assert len(ledger_service.load_account_lines(session, ledger, chk.id)) == 1
+
+
+def test_import_job(session, ledger, monkeypatch, tmp_path):
+    monkeypatch.setattr(runner, 'workers', 0)
+    monkeypatch.setattr(runner, 'artifact_dir', str(tmp_path))
+    monkeypatch.setattr(runner, '_listeners', [])
+
+    chk = _account(ledger, 'Checking')
+    job = import_service.submit_import(
+        session, ledger, chk.id, io.BytesIO(QIF_DATA.encode('utf-8')), 'statement.QIF',
+    )
+    assert job.kind == 'import_transactions'
+    assert job.status == JobStatus.Complete
+    assert job.message == '3 imported, 0 duplicates skipped, 1 uncategorized'
+    assert job.params['format'] == 'qif'
+
+    # The uploaded file is removed once imported
+    assert os.listdir(os.path.join(str(tmp_path), ledger.uid_hash)) == []
+
+    with pytest.raises(ValueError, match='Unknown CSV import option "encoding"'):
+        import_service.submit_import(session, ledger, chk.id, io.BytesIO(b''), 'data.csv', encoding='latin-1')
+
+    # Job parameters may only refer to uploaded files
+    for upload in ('../../etc/passwd', '1-jadetree.json', None):
+        with pytest.raises(ValueError, match='Invalid upload file name'):
+            runner.upload_path(ledger, upload)
@@ -8,7 +8,7 @@ import json
 import pytest  # noqa: F401
 
 from jadetree.service.auth import load_user_by_email
-from tests.helpers import check_login, check_unauthorized
+from tests.helpers import check_error, check_login, check_unauthorized
 
 # Always use 'jt_setup' fixture so server gets initialized
 pytestmark = pytest.mark.usefixtures('jt_setup')
@@ -243,3 +243,30 @@ def test_user_list(app):
         assert 'name' in data[0]
         assert data[0]['email'] == 'test@jadetree.io'
         assert data[0]['name'] == 'Test User'
+
+
+def test_database_metrics_admin_only(app, session):
+    """Ensure only administrators can read the database metrics."""
+    with app.test_client() as client:
+        login_data = { 'email': 'test@jadetree.io', 'password': '' }
+        rv = client.post(
+            '/api/v1/auth/login',
+            content_type='application/json',
+            data=json.dumps(login_data),
+        )
+
+        token = check_login(rv, 'test@jadetree.io', session)
+        headers = [('Authorization', f'Bearer {token}')]
+
+        rv = client.get('/api/v1/metrics/database', headers=headers)
+        check_error(rv, 403, 'Unauthorized', 'administrators')
+
+        user = load_user_by_email(session, 'test@jadetree.io')
+        user.admin = True
+        session.flush()
+
+        rv = client.get('/api/v1/metrics/database', headers=headers)
+        assert rv.status_code == 200
+
+        data = json.loads(rv.data)
+        assert data['checkouts'] > 0